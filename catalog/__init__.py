@@ -0,0 +1,10 @@
+"""
+Marketplace catalog service
+
+Indexes the extension manifests in memory and serves the search API
+documented in api/v1/search.json. See catalog/service.py to run it.
+"""
+
+from .index import CatalogIndex, tokenize, SORTS, MAX_LIMIT
+
+__all__ = ["CatalogIndex", "tokenize", "SORTS", "MAX_LIMIT"]
@@ -0,0 +1,203 @@
+"""
+Catalog benchmark: loading, incremental reloads and search throughput
+
+Writes a --extensions synthetic marketplace (manifests plus a published
+catalog with statistics) to a temporary directory and times the initial
+load, a reload with nothing changed and one with a single manifest edited,
+in-process searches, and requests through the ASGI app with the response
+cache cold and warm. Requests are driven straight through the ASGI
+interface, so the figures exclude the HTTP server.
+
+Usage:
+    python -m catalog.benchmark [--extensions 5000] [--repeat 2000]
+"""
+
+import os
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import statistics
+from typing import Any, Callable, Dict, List
+
+from .index import CatalogIndex
+
+WORDS = (
+    "prompt", "template", "theme", "dark", "light", "ocean", "sunset", "code",
+    "python", "javascript", "interpreter", "markdown", "editor", "chart",
+    "table", "voice", "image", "translate", "summary", "writing", "research",
+    "agent", "tool", "search", "memory", "model", "adapter", "workflow",
+    "export", "import", "sync", "calendar", "notes", "shortcut", "keyboard",
+    "accessibility", "contrast", "font", "layout", "sidebar", "widget"
+)
+CATEGORIES = ("productivity", "development", "ui", "ai", "utilities", "writing")
+TYPES = ("ui", "api", "model-adapter", "tool", "theme")
+
+def write_marketplace(root: str, count: int, seed: int) -> List[str]:
+    """Write synthetic manifests and statistics; returns the extension IDs"""
+    rnd = random.Random(seed)
+    ids = []
+    published = []
+    for number in range(count):
+        extension_id = f"{rnd.choice(WORDS)}-{rnd.choice(WORDS)}-{number}"
+        ids.append(extension_id)
+        directory = os.path.join(root, "extensions", extension_id)
+        os.makedirs(directory)
+        manifest = {
+            "id": extension_id,
+            "title": " ".join(rnd.sample(WORDS, 3)).title(),
+            "description": " ".join(rnd.choice(WORDS) for _ in range(rnd.randint(8, 30))),
+            "version": f"1.{rnd.randint(0, 9)}.{rnd.randint(0, 9)}",
+            "author": f"author-{rnd.randint(1, 200)}",
+            "type": rnd.choice(TYPES),
+            "category": rnd.choice(CATEGORIES),
+            "tags": rnd.sample(WORDS, rnd.randint(2, 6)),
+            "keywords": rnd.sample(WORDS, 3)
+        }
+        with open(os.path.join(directory, "manifest.json"), "w") as f:
+            json.dump(manifest, f)
+        published.append({
+            "id": extension_id,
+            "downloads": rnd.randint(0, 100000),
+            "rating": round(rnd.uniform(1, 5), 1),
+            "createdAt": f"2025-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}T00:00:00Z",
+            "updatedAt": f"2026-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}T00:00:00Z"
+        })
+    os.makedirs(os.path.join(root, "api", "v1"))
+    with open(os.path.join(root, "api", "v1", "extensions.json"), "w") as f:
+        json.dump({"extensions": published}, f)
+    return ids
+
+def random_query(rnd: random.Random) -> Dict[str, Any]:
+    """Build a search like the ones the marketplace UI sends"""
+    words = rnd.sample(WORDS, rnd.randint(1, 2))
+    # Type-ahead queries end in a partial word
+    if rnd.random() < 0.3:
+        words[-1] = words[-1][:rnd.randint(2, len(words[-1]))]
+    query: Dict[str, Any] = {"q": " ".join(words)}
+    if rnd.random() < 0.3:
+        query["category"] = rnd.choice(CATEGORIES)
+    if rnd.random() < 0.2:
+        query["type"] = rnd.choice(TYPES)
+    if rnd.random() < 0.2:
+        query["sort"] = rnd.choice(("downloads", "rating", "newest", "updated"))
+    if rnd.random() < 0.2:
+        query["page"] = rnd.randint(2, 5)
+    return query
+
+def summarize(timings: List[float]) -> Dict[str, float]:
+    """Summarize timings in milliseconds, with the implied rate"""
+    ordered = sorted(timings)
+    return {
+        "mean_ms": round(statistics.mean(ordered) * 1000, 3),
+        "p50_ms": round(ordered[len(ordered) // 2] * 1000, 3),
+        "p99_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000, 3),
+        "per_second": round(len(ordered) / sum(ordered)) if sum(ordered) else 0
+    }
+
+def time_calls(fn: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    """Time repeated calls"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return summarize(timings)
+
+async def asgi_get(app: Any, path: str, query: str) -> int:
+    """Send a GET through the ASGI interface and return the status code"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": query.encode(), "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 1), "server": ("bench", 80), "root_path": ""
+    }
+    status = 0
+    
+    async def receive() -> Dict[str, Any]:
+        return {"type": "http.request", "body": b"", "more_body": False}
+    
+    async def send(message: Dict[str, Any]) -> None:
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+    
+    await app(scope, receive, send)
+    return status
+
+def time_requests(app: Any, queries: List[str]) -> Dict[str, float]:
+    """Time search requests through the app, one after another"""
+    async def run() -> List[float]:
+        timings = []
+        for query in queries:
+            start = time.perf_counter()
+            status = await asgi_get(app, "/api/v1/search.json", query)
+            timings.append(time.perf_counter() - start)
+            if status != 200:
+                raise RuntimeError(f"Search returned {status} for {query}")
+        return timings
+    return summarize(asyncio.run(run()))
+
+def main() -> None:
+    from urllib.parse import urlencode
+    from .service import create_app
+    
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--extensions", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument("--distinct-queries", type=int, default=200,
+                        help="Distinct queries in the warm cache run")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    
+    rnd = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as root:
+        ids = write_marketplace(root, args.extensions, args.seed)
+        catalog = CatalogIndex(root)
+        
+        start = time.perf_counter()
+        catalog.refresh()
+        load = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        catalog.refresh()
+        reload_unchanged = time.perf_counter() - start
+        
+        path = os.path.join(root, "extensions", ids[0], "manifest.json")
+        with open(path) as f:
+            manifest = json.load(f)
+        manifest["description"] += " edited with a longer description"
+        with open(path, "w") as f:
+            json.dump(manifest, f)
+        start = time.perf_counter()
+        changes = catalog.refresh()
+        reload_one = time.perf_counter() - start
+        
+        queries = [random_query(rnd) for _ in range(args.repeat)]
+        pick = iter(queries * 2)
+        inprocess = time_calls(lambda: catalog.search(**next(pick)), args.repeat)
+        
+        app = create_app(root, reload_interval=0, catalog=catalog)
+        cold = time_requests(app, [urlencode(query) for query in queries])
+        app = create_app(root, reload_interval=0, catalog=catalog)
+        popular = [urlencode(query) for query in queries[:args.distinct_queries]]
+        warm = time_requests(app, [rnd.choice(popular) for _ in range(args.repeat)])
+        
+        results = {
+            "extensions": args.extensions,
+            "load_s": round(load, 3),
+            "reload_unchanged_s": round(reload_unchanged, 4),
+            "reload_one_changed_s": round(reload_one, 4),
+            "reload_one_changed": changes,
+            "search_inprocess": inprocess,
+            "asgi_cache_cold": cold,
+            "asgi_cache_warm": warm,
+            "cache": app.state.cache.stats(),
+            "index": catalog.stats()
+        }
+        print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,639 @@
+"""
+In-memory index of the marketplace catalog
+
+Loads every extensions/<id>/manifest.json once, merges in the download,
+rating and date statistics published in api/v1/extensions.json, and keeps
+an inverted index over names, tags, keywords, categories and descriptions
+alongside facet indexes for category, type and tag. Searches follow the
+contract in api/v1/search.json.
+
+refresh() re-lists the extensions directory and re-reads only the manifests
+whose mtime or size changed, so the index stays current without a restart.
+Every change bumps generation, which callers can use to key cached responses.
+
+TOKEN_PATTERN, STOP_WORDS and tokenize() are copies of those in
+extensions/prompt-library/search.py, so a query splits into the same terms
+in the marketplace and in the library. The catalog is deployed on its own
+and cannot import code from an extension directory, so it keeps its own
+copy; a change to either tokenizer must be made in both. _signature() is
+the templates.py check for changed files, with nanosecond mtimes so a
+manifest rewritten twice within one timestamp tick is still re-read.
+"""
+
+import os
+import re
+import json
+import math
+import heapq
+import logging
+import threading
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional, Any, Set, Tuple
+
+# Setup logging
+logger = logging.getLogger("catalog.index")
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+# Kept in sync with extensions/prompt-library/search.py (see above)
+STOP_WORDS = frozenset((
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is",
+    "it", "of", "on", "or", "that", "the", "this", "to", "with"
+))
+
+# Field weights applied to term frequencies
+FIELD_WEIGHTS = (
+    ("name", 3.0),
+    ("tags", 2.0),
+    ("keywords", 2.0),
+    ("category", 1.5),
+    ("description", 1.0)
+)
+
+# Fields with a facet index, and the record field each one reads
+FACETS = (
+    ("category", "category"),
+    ("type", "type"),
+    ("tag", "tags")
+)
+
+# Sort orders from api/v1/search.json; relevance ties fall back to downloads
+SORTS = ("relevance", "downloads", "rating", "newest", "updated")
+
+# Largest page size the search contract allows
+MAX_LIMIT = 50
+
+# Fields returned for every search result, besides relevance
+RESULT_FIELDS = (
+    "id", "name", "description", "version", "author", "type", "tags",
+    "category", "rating", "downloads"
+)
+
+# Statistics taken from the published catalog rather than the manifests
+STATS_FIELDS = ("downloads", "rating", "createdAt", "updatedAt", "featured")
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lowercase search terms
+    
+    Args:
+        text (str): Text to tokenize
+    
+    Returns:
+        List[str]: Terms in order of appearance, stop words removed
+    """
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOP_WORDS]
+
+def _signature(path: str) -> Optional[Tuple[int, int]]:
+    """Get a file's mtime and size, or None if it is gone"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+class CatalogIndex:
+    """Searchable catalog built from the extension manifests"""
+    
+    def __init__(
+        self,
+        root: str,
+        stats_path: Optional[str] = None,
+        saturation: float = 1.0,
+        max_prefix_terms: int = 64
+    ):
+        """
+        Initialize an empty index; call refresh() to load it
+        
+        Args:
+            root (str): Marketplace repository root, holding extensions/
+            stats_path (Optional[str]): Published catalog with download and
+                rating statistics; defaults to api/v1/extensions.json
+            saturation (float): Weighted term frequency at which a term
+                scores half its maximum
+            max_prefix_terms (int): Maximum number of terms the last query
+                term expands to
+        """
+        self.root = root
+        self.extensions_dir = os.path.join(root, "extensions")
+        self.stats_path = stats_path or os.path.join(root, "api", "v1", "extensions.json")
+        self.saturation = saturation
+        self.max_prefix_terms = max_prefix_terms
+        
+        # Searches run on the server's threads while refresh() applies changes
+        self._lock = threading.Lock()
+        # Only one refresh at a time; reading manifests happens outside _lock
+        self._refresh_lock = threading.Lock()
+        
+        # id -> record read from the manifest
+        self._manifest_records: Dict[str, Dict[str, Any]] = {}
+        # id -> manifest record merged with its statistics; records are
+        # replaced, never modified
+        self._records: Dict[str, Dict[str, Any]] = {}
+        # id -> manifest path it is indexed from
+        self._paths: Dict[str, str] = {}
+        # id -> {term: weighted term frequency}, kept for removal
+        self._documents: Dict[str, Dict[str, float]] = {}
+        # term -> {id: saturated weighted term frequency}
+        self._postings: Dict[str, Dict[str, float]] = {}
+        # Sorted vocabulary for prefix lookups
+        self._terms: List[str] = []
+        # facet -> lowercase value -> ids
+        self._facets: Dict[str, Dict[str, Set[str]]] = {facet: {} for facet, _ in FACETS}
+        # sort -> id -> position, rebuilt on first use after a change
+        self._positions: Dict[str, Dict[str, int]] = {}
+        
+        # manifest path -> (signature, id); the id is None for unreadable files
+        self._manifests: Dict[str, Tuple[Tuple[int, int], Optional[str]]] = {}
+        # manifest path -> signature of a version that couldn't be parsed, so
+        # it is only read and reported again once it changes
+        self._invalid: Dict[str, Tuple[int, int]] = {}
+        self._stats_signature: Optional[Tuple[int, int]] = None
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        
+        self._generation = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def __len__(self) -> int:
+        return len(self._records)
+    
+    def __contains__(self, extension_id: object) -> bool:
+        return extension_id in self._records
+    
+    @property
+    def generation(self) -> int:
+        """Counter bumped whenever the indexed catalog changes"""
+        return self._generation
+    
+    def get(self, extension_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get an indexed extension
+        
+        Args:
+            extension_id (str): Extension ID
+        
+        Returns:
+            Optional[Dict[str, Any]]: The extension's record or None if not found
+        """
+        record = self._records.get(extension_id)
+        return dict(record) if record is not None else None
+    
+    def refresh(self) -> Dict[str, int]:
+        """
+        Pick up added, changed and removed manifests and statistics
+        
+        Only manifests whose mtime or size changed are read again. A manifest
+        that can't be parsed keeps its previous version indexed and is retried
+        on the next refresh.
+        
+        Returns:
+            Dict[str, int]: Counts of added, changed and removed extensions
+        """
+        counts = {"added": 0, "changed": 0, "removed": 0}
+        with self._refresh_lock:
+            found: Dict[str, Tuple[int, int]] = {}
+            try:
+                entries = list(os.scandir(self.extensions_dir))
+            except OSError as e:
+                logger.error(f"Error listing {self.extensions_dir}: {e}")
+                return counts
+            for entry in entries:
+                if not entry.is_dir():
+                    continue
+                path = os.path.join(entry.path, "manifest.json")
+                signature = _signature(path)
+                if signature is not None:
+                    found[path] = signature
+            
+            # path -> parsed record, or None if it no longer exists
+            updates: Dict[str, Optional[Dict[str, Any]]] = {}
+            for path, signature in found.items():
+                known = self._manifests.get(path)
+                if known is not None and known[0] == signature or self._invalid.get(path) == signature:
+                    continue
+                record = self._read_manifest(path)
+                if record is not None:
+                    updates[path] = record
+                    self._invalid.pop(path, None)
+                elif os.path.exists(path):
+                    self._invalid[path] = signature
+            for path in self._manifests:
+                if path not in found:
+                    updates[path] = None
+            for path in [path for path in self._invalid if path not in found]:
+                del self._invalid[path]
+            
+            stats_signature = _signature(self.stats_path)
+            stats_changed = stats_signature != self._stats_signature
+            if stats_changed:
+                stats = self._read_stats()
+                if stats is None:
+                    stats_changed = False
+                else:
+                    self._stats = stats
+                    self._stats_signature = stats_signature
+            
+            if not updates and not stats_changed:
+                return counts
+            
+            with self._lock:
+                for path, record in updates.items():
+                    known = self._manifests.pop(path, None)
+                    old_id = known[1] if known else None
+                    if record is None:
+                        if old_id is not None:
+                            self._remove(old_id)
+                            counts["removed"] += 1
+                        continue
+                    
+                    extension_id = record["id"]
+                    owner = self._paths.get(extension_id)
+                    if owner is not None and owner != path:
+                        logger.error(f"Duplicate extension ID {extension_id} in {path}; already defined in {owner}")
+                        self._manifests[path] = (found[path], None)
+                        continue
+                    if old_id is not None and old_id != extension_id:
+                        self._remove(old_id)
+                        counts["removed"] += 1
+                    counts["changed" if extension_id in self._records else "added"] += 1
+                    self._add(record)
+                    self._paths[extension_id] = path
+                    self._manifests[path] = (found[path], extension_id)
+                
+                if stats_changed:
+                    for extension_id, record in self._manifest_records.items():
+                        self._records[extension_id] = self._with_stats(record)
+                
+                self._positions = {}
+                self._generation += 1
+        
+        if any(counts.values()):
+            logger.info(f"Catalog refreshed: {counts['added']} added, {counts['changed']} changed, {counts['removed']} removed")
+        return counts
+    
+    def search(
+        self,
+        q: str = "",
+        category: Optional[str] = None,
+        type: Optional[str] = None,
+        tag: Optional[str] = None,
+        page: int = 1,
+        limit: int = 10,
+        sort: str = "relevance",
+        facets: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Search the catalog
+        
+        Every query term must match; the last one also matches as a prefix.
+        An empty query matches every extension.
+        
+        Args:
+            q (str): Search query
+            category (Optional[str]): Filter by category
+            type (Optional[str]): Filter by extension type
+            tag (Optional[str]): Filter by tag
+            page (int): Page number, starting at 1
+            limit (int): Results per page, at most MAX_LIMIT
+            sort (str): One of SORTS
+            facets (bool): Include category, type and tag counts of all matches
+        
+        Returns:
+            Dict[str, Any]: Results, pagination and the query as in api/v1/search.json
+        
+        Raises:
+            ValueError: If page, limit or sort is out of range
+        """
+        if sort not in SORTS:
+            raise ValueError(f"Invalid sort: {sort}; expected one of {', '.join(SORTS)}")
+        if page < 1:
+            raise ValueError("page must be at least 1")
+        if not 1 <= limit <= MAX_LIMIT:
+            raise ValueError(f"limit must be between 1 and {MAX_LIMIT}")
+        
+        terms = tokenize(q or "")
+        filters = (("category", category), ("type", type), ("tag", tag))
+        
+        with self._lock:
+            allowed: Optional[Set[str]] = None
+            selected = [self._facets[facet].get(value.lower(), ()) for facet, value in filters if value is not None]
+            if selected:
+                selected.sort(key=len)
+                allowed = set(selected[0])
+                for ids in selected[1:]:
+                    allowed.intersection_update(ids)
+            
+            scores: Optional[Dict[str, float]] = None
+            ceiling = 1.0
+            if terms:
+                scores, ceiling = self._score(terms, allowed)
+                matches = scores.keys()
+            else:
+                matches = allowed if allowed is not None else self._records.keys()
+            
+            positions = self._order("downloads" if sort == "relevance" else sort)
+            if sort == "relevance" and scores is not None:
+                key = lambda extension_id: (-scores[extension_id], positions[extension_id])
+            else:
+                key = positions.__getitem__
+            
+            start = (page - 1) * limit
+            if start < len(matches):
+                top = heapq.nsmallest(start + limit, matches, key=key)[start:]
+            else:
+                top = []
+            results = []
+            for extension_id in top:
+                result = {field: self._records[extension_id].get(field) for field in RESULT_FIELDS}
+                result["relevance"] = round(scores[extension_id] / ceiling, 4) if scores is not None else 0.0
+                results.append(result)
+            
+            counts = self._facet_counts(matches) if facets else None
+        
+        # Echo the query like the documented example: defaults left out
+        query: Dict[str, Any] = {"q": q}
+        for facet, value in filters:
+            if value is not None:
+                query[facet] = value
+        if page != 1:
+            query["page"] = page
+        query["limit"] = limit
+        if sort != "relevance":
+            query["sort"] = sort
+        
+        response = {
+            "results": results,
+            "pagination": {
+                "total": len(matches),
+                "page": page,
+                "pageSize": limit,
+                "totalPages": math.ceil(len(matches) / limit)
+            },
+            "query": query
+        }
+        if counts is not None:
+            response["facets"] = counts
+        return response
+    
+    def start(self, interval: float = 2.0) -> None:
+        """
+        Refresh from a daemon thread every interval seconds
+        
+        Args:
+            interval (float): Seconds between checks for changed manifests
+        """
+        if self._thread is not None or interval <= 0:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval,), name="catalog-refresh", daemon=True)
+        self._thread.start()
+    
+    def stop(self) -> None:
+        """Stop refreshing"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get index statistics
+        
+        Returns:
+            Dict[str, Any]: Extension, manifest and term counts and the generation
+        """
+        with self._lock:
+            return {
+                "extensions": len(self._records),
+                "manifests": len(self._manifests),
+                "terms": len(self._postings),
+                "generation": self._generation
+            }
+    
+    def _run(self, interval: float) -> None:
+        """Refresh until stopped"""
+        while not self._stop.wait(interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Error refreshing catalog: {e}")
+    
+    def _read_manifest(self, path: str) -> Optional[Dict[str, Any]]:
+        """Read a manifest into a catalog record, or None if it is invalid"""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.error(f"Error reading manifest {path}: {e}")
+            return None
+        if not isinstance(manifest, dict):
+            logger.error(f"Error reading manifest {path}: expected an object")
+            return None
+        
+        extension_id = manifest.get("id") or os.path.basename(os.path.dirname(path))
+        tags = manifest.get("tags") or []
+        return {
+            "id": str(extension_id),
+            "name": manifest.get("name") or manifest.get("title") or str(extension_id),
+            "description": manifest.get("description") or "",
+            "version": manifest.get("version"),
+            "author": manifest.get("author"),
+            "type": manifest.get("type"),
+            "tags": [str(tag) for tag in tags] if isinstance(tags, list) else [],
+            "keywords": manifest.get("keywords") or [],
+            "category": manifest.get("category"),
+            "createdAt": manifest.get("createdAt"),
+            "updatedAt": manifest.get("updatedAt")
+        }
+    
+    def _read_stats(self) -> Optional[Dict[str, Dict[str, Any]]]:
+        """Read statistics per extension ID from the published catalog"""
+        try:
+            with open(self.stats_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.error(f"Error reading catalog statistics {self.stats_path}: {e}")
+            return None
+        
+        stats = {}
+        for entry in data.get("extensions", []) if isinstance(data, dict) else []:
+            if isinstance(entry, dict) and entry.get("id"):
+                stats[entry["id"]] = {field: entry[field] for field in STATS_FIELDS if entry.get(field) is not None}
+        return stats
+    
+    def _with_stats(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Copy a manifest record with its published statistics"""
+        stats = self._stats.get(record["id"], {})
+        merged = dict(record)
+        merged["downloads"] = stats.get("downloads", 0)
+        merged["rating"] = stats.get("rating", 0)
+        merged["featured"] = stats.get("featured", False)
+        # Dates in the manifest win over the published ones
+        for field in ("createdAt", "updatedAt"):
+            merged[field] = record.get(field) or stats.get(field)
+        return merged
+    
+    @staticmethod
+    def _analyze(record: Dict[str, Any]) -> Dict[str, float]:
+        """Compute field-weighted term frequencies for a record"""
+        frequencies: Dict[str, float] = {}
+        for field, weight in FIELD_WEIGHTS:
+            value = record.get(field) or ""
+            if isinstance(value, (list, tuple)):
+                value = " ".join(str(item) for item in value)
+            for term in tokenize(str(value)):
+                frequencies[term] = frequencies.get(term, 0.0) + weight
+        return frequencies
+    
+    def _add(self, record: Dict[str, Any]) -> None:
+        """Index a record, replacing any previous version; caller holds _lock"""
+        extension_id = record["id"]
+        if extension_id in self._records:
+            self._remove(extension_id)
+        
+        frequencies = self._analyze(record)
+        for term, frequency in frequencies.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                insort(self._terms, term)
+            # Saturated once here rather than on every search
+            postings[extension_id] = frequency / (frequency + self.saturation)
+        self._documents[extension_id] = frequencies
+        
+        for facet, field in FACETS:
+            for value in self._facet_values(record, field):
+                self._facets[facet].setdefault(value, set()).add(extension_id)
+        
+        self._manifest_records[extension_id] = record
+        self._records[extension_id] = self._with_stats(record)
+    
+    def _remove(self, extension_id: str) -> None:
+        """Drop a record from the index; caller holds _lock"""
+        record = self._records.pop(extension_id, None)
+        if record is None:
+            return
+        del self._manifest_records[extension_id]
+        self._paths.pop(extension_id, None)
+        
+        for term in self._documents.pop(extension_id):
+            postings = self._postings[term]
+            del postings[extension_id]
+            if not postings:
+                del self._postings[term]
+                del self._terms[bisect_left(self._terms, term)]
+        
+        for facet, field in FACETS:
+            values = self._facets[facet]
+            for value in self._facet_values(record, field):
+                ids = values.get(value)
+                if ids is not None:
+                    ids.discard(extension_id)
+                    if not ids:
+                        del values[value]
+    
+    @staticmethod
+    def _facet_values(record: Dict[str, Any], field: str) -> Set[str]:
+        """Get the lowercase facet values of a record"""
+        value = record.get(field)
+        if isinstance(value, list):
+            return {str(item).lower() for item in value}
+        return {str(value).lower()} if value else set()
+    
+    def _expand_prefix(self, prefix: str) -> List[str]:
+        """Get indexed terms starting with the prefix, the exact term first"""
+        start = bisect_left(self._terms, prefix)
+        terms = []
+        for term in self._terms[start:start + self.max_prefix_terms]:
+            if not term.startswith(prefix):
+                break
+            terms.append(term)
+        return terms
+    
+    def _score(self, terms: List[str], allowed: Optional[Set[str]]) -> Tuple[Dict[str, float], float]:
+        """
+        Score the extensions matching every term
+        
+        Each term contributes its IDF times a saturated term frequency; for
+        the prefix-matched last term, the best completion counts. Dividing a
+        score by the returned sum of the IDFs puts it between 0 and 1.
+        
+        Args:
+            terms (List[str]): Query terms
+            allowed (Optional[Set[str]]): Only score these extensions
+        
+        Returns:
+            Tuple[Dict[str, float], float]: Scores of the matches, and the
+                sum of the IDFs
+        """
+        total = len(self._records)
+        scores: Optional[Dict[str, float]] = None
+        ceiling = 0.0
+        
+        for position, term in enumerate(terms):
+            expansions = self._expand_prefix(term) if position == len(terms) - 1 else [term]
+            # Only extensions matching the previous terms and the filters can match
+            scope = scores if scores is not None else allowed
+            contributions: Dict[str, float] = {}
+            best_idf = 0.0
+            for expansion in expansions:
+                postings = self._postings.get(expansion)
+                if not postings:
+                    continue
+                idf = math.log(1.0 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+                best_idf = max(best_idf, idf)
+                if scope is None:
+                    weights = postings.items()
+                elif len(scope) < len(postings):
+                    weights = ((extension_id, postings[extension_id]) for extension_id in scope if extension_id in postings)
+                else:
+                    weights = ((extension_id, weight) for extension_id, weight in postings.items() if extension_id in scope)
+                if not contributions:
+                    contributions = {extension_id: idf * weight for extension_id, weight in weights}
+                    continue
+                for extension_id, weight in weights:
+                    contribution = idf * weight
+                    if contribution > contributions.get(extension_id, 0.0):
+                        contributions[extension_id] = contribution
+            
+            if not contributions:
+                return {}, 1.0
+            ceiling += best_idf
+            if scores is not None:
+                # contributions only holds extensions already in scores
+                contributions = {extension_id: scores[extension_id] + contribution for extension_id, contribution in contributions.items()}
+            scores = contributions
+        
+        return scores or {}, ceiling or 1.0
+    
+    def _order(self, sort: str) -> Dict[str, int]:
+        """Get each extension's position in a sort order; caller holds _lock"""
+        positions = self._positions.get(sort)
+        if positions is not None:
+            return positions
+        
+        field = {"downloads": "downloads", "rating": "rating", "newest": "createdAt", "updated": "updatedAt"}[sort]
+        default: Any = "" if field.endswith("At") else 0
+        # Sort by ID, then stably by the field descending; ratings tie on downloads
+        ids = sorted(self._records)
+        if sort == "rating":
+            ids.sort(key=lambda extension_id: self._records[extension_id]["downloads"] or 0, reverse=True)
+        ids.sort(key=lambda extension_id: self._records[extension_id].get(field) or default, reverse=True)
+        positions = self._positions[sort] = {extension_id: position for position, extension_id in enumerate(ids)}
+        return positions
+    
+    def _facet_counts(self, matches: Set[str]) -> Dict[str, Dict[str, int]]:
+        """Count the category, type and tag values of the matches; caller holds _lock"""
+        counts: Dict[str, Dict[str, int]] = {facet: {} for facet, _ in FACETS}
+        for extension_id in matches:
+            record = self._records[extension_id]
+            for facet, field in FACETS:
+                facet_counts = counts[facet]
+                for value in self._facet_values(record, field):
+                    facet_counts[value] = facet_counts.get(value, 0) + 1
+        return {facet: dict(sorted(values.items(), key=lambda item: (-item[1], item[0]))) for facet, values in counts.items()}
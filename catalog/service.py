@@ -0,0 +1,232 @@
+"""
+HTTP service for the marketplace catalog
+
+Serves GET /api/v1/search.json from a CatalogIndex, following the contract
+in api/v1/search.json, so clients no longer download the whole catalog to
+filter it. Rendered responses are cached per query until the catalog's
+generation changes and carry an ETag digested from the body, so a mirror
+polling the same queries gets 304s or cached bytes without a search, from
+any worker and across restarts.
+
+Usage:
+    python -m catalog [--root .] [--host 0.0.0.0] [--port 8080]
+"""
+
+import os
+import json
+import logging
+import argparse
+import hashlib
+import threading
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Dict, Optional, Any, Tuple
+
+from fastapi import FastAPI, APIRouter, HTTPException, Request, Response
+
+from .index import CatalogIndex
+
+# Setup logging
+logger = logging.getLogger("catalog.service")
+
+class ResponseCache:
+    """LRU of rendered search responses, valid for one catalog generation"""
+    
+    def __init__(self, max_entries: int = 4096):
+        """
+        Initialize the cache
+        
+        Args:
+            max_entries (int): Responses kept; 0 disables caching
+        """
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # key -> (generation, body, etag)
+        self._entries: "OrderedDict[Tuple[Any, ...], Tuple[int, bytes, str]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key: Tuple[Any, ...], generation: int) -> Optional[Tuple[bytes, str]]:
+        """
+        Get a cached response
+        
+        Args:
+            key (Tuple[Any, ...]): Normalized query
+            generation (int): Current catalog generation
+        
+        Returns:
+            Optional[Tuple[bytes, str]]: The response body and its ETag, or
+                None if missing or stale
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != generation:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1], entry[2]
+    
+    def put(self, key: Tuple[Any, ...], generation: int, body: bytes, etag: str) -> None:
+        """
+        Cache a response
+        
+        Args:
+            key (Tuple[Any, ...]): Normalized query
+            generation (int): Catalog generation the response was rendered from
+            body (bytes): The response body
+            etag (str): The body's ETag
+        """
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (generation, body, etag)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def stats(self) -> Dict[str, int]:
+        """
+        Get cache statistics
+        
+        Returns:
+            Dict[str, int]: Entries, hits and misses
+        """
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+def create_router(catalog: CatalogIndex, cache: ResponseCache, max_age: int = 0) -> APIRouter:
+    """
+    Create the catalog API router
+    
+    Args:
+        catalog (CatalogIndex): Loaded catalog
+        cache (ResponseCache): Cache for rendered responses
+        max_age (int): Cache-Control max-age sent with responses, in seconds
+    
+    Returns:
+        APIRouter: Router with the catalog endpoints
+    """
+    router = APIRouter()
+    cache_control = f"public, max-age={max_age}" if max_age > 0 else "no-cache"
+    
+    @router.get("/api/v1/search.json")
+    async def search(
+        request: Request,
+        q: str,
+        category: Optional[str] = None,
+        type: Optional[str] = None,
+        tag: Optional[str] = None,
+        page: int = 1,
+        limit: int = 10,
+        sort: str = "relevance",
+        facets: bool = False
+    ):
+        """Search the catalog as documented in api/v1/search.json"""
+        # Only valid queries are cached, so a hit needs no validation and a
+        # miss is searched before If-None-Match can answer it
+        generation = catalog.generation
+        key = (q, category, type, tag, page, limit, sort, facets)
+        cached = cache.get(key, generation)
+        if cached is None:
+            try:
+                result = catalog.search(q, category=category, type=type, tag=tag, page=page, limit=limit, sort=sort, facets=facets)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            body = json.dumps(result, separators=(",", ":")).encode("utf-8")
+            etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+            cache.put(key, generation, body, etag)
+        else:
+            body, etag = cached
+        
+        headers = {"ETag": etag, "Cache-Control": cache_control}
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+    
+    @router.get("/api/v1/catalog/stats")
+    async def get_stats():
+        """Get index and response cache statistics"""
+        return {"index": catalog.stats(), "cache": cache.stats()}
+    
+    return router
+
+def create_app(
+    root: str,
+    reload_interval: float = 2.0,
+    cache_size: int = 4096,
+    catalog: Optional[CatalogIndex] = None
+) -> FastAPI:
+    """
+    Create the catalog service
+    
+    The catalog is loaded before this returns; while the app runs, changed
+    manifests are picked up every reload_interval seconds.
+    
+    Args:
+        root (str): Marketplace repository root
+        reload_interval (float): Seconds between checks for changed
+            manifests; 0 to never reload
+        cache_size (int): Rendered responses kept; 0 disables the cache
+        catalog (Optional[CatalogIndex]): Index to serve instead of a new one
+    
+    Returns:
+        FastAPI: The application
+    """
+    if catalog is None:
+        catalog = CatalogIndex(root)
+    catalog.refresh()
+    logger.info(f"Catalog loaded: {len(catalog)} extensions")
+    
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        catalog.start(reload_interval)
+        try:
+            yield
+        finally:
+            catalog.stop()
+    
+    app = FastAPI(title="Extension Marketplace Catalog", lifespan=lifespan)
+    app.state.catalog = catalog
+    app.state.cache = ResponseCache(cache_size)
+    app.include_router(create_router(catalog, app.state.cache, max_age=int(reload_interval)))
+    return app
+
+def main() -> None:
+    """Run the catalog service"""
+    parser = argparse.ArgumentParser(description="Serve the marketplace search API from the extension manifests")
+    parser.add_argument("--root", default=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                        help="Marketplace repository root (default: this checkout)")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--reload-interval", type=float, default=2.0,
+                        help="Seconds between checks for changed manifests; 0 to never reload")
+    parser.add_argument("--cache-size", type=int, default=4096,
+                        help="Rendered responses kept; 0 disables the cache")
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO)
+    try:
+        import uvicorn
+    except ImportError:
+        logger.error("uvicorn is required to run the catalog service: pip install uvicorn")
+        raise SystemExit(1)
+    
+    if args.workers > 1:
+        # Each worker process loads its own index from the environment
+        os.environ["CATALOG_ROOT"] = args.root
+        os.environ["CATALOG_RELOAD_INTERVAL"] = str(args.reload_interval)
+        os.environ["CATALOG_CACHE_SIZE"] = str(args.cache_size)
+        uvicorn.run("catalog.service:app_from_env", factory=True, host=args.host, port=args.port, workers=args.workers)
+    else:
+        app = create_app(args.root, reload_interval=args.reload_interval, cache_size=args.cache_size)
+        uvicorn.run(app, host=args.host, port=args.port)
+
+def app_from_env() -> FastAPI:
+    """Create the service from the CATALOG_* variables set by main()"""
+    return create_app(
+        os.environ["CATALOG_ROOT"],
+        reload_interval=float(os.environ.get("CATALOG_RELOAD_INTERVAL", "2")),
+        cache_size=int(os.environ.get("CATALOG_CACHE_SIZE", "4096"))
+    )
@@ -5,18 +5,59 @@ Allows users to save, organize, and reuse effective prompts
 
 import os
 import json
+import time
 import logging
-from pathlib import Path
-from typing import Dict, List, Optional, Any
+import threading
+import importlib.util
+from contextlib import contextmanager
+from collections.abc import Mapping
+from typing import Dict, List, Optional, Any, Tuple, Iterator, TYPE_CHECKING
 
-# Setup logging
-logging.basicConfig(level=logging.INFO)
+from .store import PromptStore, ReplicaPromptStore, BatchRejected, SORT_FIELDS, create_store, sort_key, prompt_version
+from .changefeed import ChangeTailer
+from .pagination import encode_cursor, decode_cursor, parse_fields, project
+from .records import as_dict
+from .response_cache import ResponseCache, FragmentCache
+from .flusher import WriteBehindFlusher
+from .validation import validate_prompt
+from .search import SearchIndex
+from .dedupe import DuplicateIndex, ImportDiff
+from .tags import TagIndex, MATCH_MODES
+from .partitions import PartitionManager, QuotaExceeded, SHARED_SCOPE, parse_scope, scope_path
+from .usage import UsageTracker, USAGE_FILE
+from .metrics import Metrics, SamplingProfiler
+from .templating import TemplateCache, CompiledTemplate
+from .templates import TemplateRegistry
+
+if TYPE_CHECKING:
+    # Imports asyncio; loaded on first use by get_executor()
+    from .executor import ExtensionExecutor
+    # Imports NumPy; loaded on first use by _similarity()
+    from .similarity import SimilarityIndex
+
+# Setup logging; handlers and levels are left to the host application
 logger = logging.getLogger("prompt_library")
 
 # Global variables
 _extension_instance = None
+_extension_lock = threading.Lock()
 _config = {}
 
+# Whether NumPy is installed, checked without importing it
+_numpy_available: Optional[bool] = None
+
+def similarity_available() -> bool:
+    """
+    Check whether similar prompt search can be used
+    
+    Returns:
+        bool: True if NumPy is installed
+    """
+    global _numpy_available
+    if _numpy_available is None:
+        _numpy_available = importlib.util.find_spec("numpy") is not None
+    return _numpy_available
+
 class PromptLibraryExtension:
     """Prompt Library Extension Class"""
     
@@ -27,40 +68,155 @@ class PromptLibraryExtension:
         self.description = "Save, organize, and reuse effective prompts"
         self.author = "Open WebUI Team"
         
-        # Load configuration
-        self.config = self.load_config()
+        # "shared", or the "user:<id>" or "team:<id>" of a partition
+        self.scope = SHARED_SCOPE
+        
+        # Configuration from extension.json, read on first access
+        self._config: Optional[Dict[str, Any]] = None
+        
+        # Template files, indexed by load_templates() and read on first use
+        self.templates: Optional[TemplateRegistry] = None
+        
+        # Prompt store, opened by load_prompts()
+        self.store: Optional[PromptStore] = None
+        
+        # Full-text index, maintained on every prompt mutation
+        self.search_index = SearchIndex()
+        
+        # Prompt IDs by normalized content, for near-duplicate detection
+        self.duplicate_index = DuplicateIndex()
+        
+        # Prompt IDs by tag and category, for multi-tag filters and facets
+        self.tag_index = TagIndex()
+        
+        # TF-IDF vectors of titles and content, for similar prompt lookups
+        # and the duplicate check on create. Created and built by the first
+        # of them (or by warm-up with similarityWarmup), then maintained on
+        # every prompt mutation; None until then
+        self.similarity_index: Optional["SimilarityIndex"] = None
+        self._similarity_lock = threading.Lock()
+        
+        # Compiled [variable] templates, invalidated on every prompt mutation;
+        # sized from the configuration by initialize()
+        self.template_cache = TemplateCache()
         
-        # Initialize storage for prompts
-        self.categories = {}
-        self.prompts = {}
-        self.templates = {}
+        # Serialized read responses, valid while generation() is unchanged
+        self.response_cache = ResponseCache()
+        
+        # Each prompt's serialized JSON, reused while the prompt is unchanged
+        self.prompt_fragments = FragmentCache()
+        
+        # Commits changes to the store in the background, coalescing bursts;
+        # started by load_prompts() for stores that allow deferred commits
+        self.flusher = WriteBehindFlusher(self._commit_store)
+        
+        # Prompt use counters and rankings; replaced by load_prompts() with
+        # one persisted in the storage directory
+        self.usage = UsageTracker()
+        
+        # Request and operation metrics for GET /metrics, and the opt-in
+        # profiler that keeps stack samples of slow requests
+        self.metrics = Metrics()
+        self.profiler = SamplingProfiler()
+        self._collect_metrics()
+        
+        # Per-owner libraries, loaded on first use and closed when idle
+        self.partitions = PartitionManager(self._open_partition, self._close_partition)
+        
+        # Held while checking maxPrompts and writing new prompts, so
+        # concurrent writes can't pass the limit together
+        self._quota_lock = threading.Lock()
+        
+        # Thread pools the API runs blocking calls on, created on first use
+        self._executor: Optional["ExtensionExecutor"] = None
+        
+        # Applies other processes' writes when the library is shared
+        self._tailer: Optional[ChangeTailer] = None
+        
+        # Opens the store and builds the indexes after initialize() returns
+        self._warmup: Optional[threading.Thread] = None
+        self._ready = threading.Event()
         
         # Initialize loaded state
         self.is_loaded = False
     
+    @property
+    def config(self) -> Dict[str, Any]:
+        """Configuration from extension.json, loaded on first access"""
+        if self._config is None:
+            self._config = self.load_config()
+        return self._config
+    
+    @config.setter
+    def config(self, value: Dict[str, Any]) -> None:
+        self._config = value
+    
+    @property
+    def categories(self) -> Mapping:
+        """Read-only view of the store's categories by ID"""
+        return self.store.categories if self.store is not None else {}
+    
+    @property
+    def prompts(self) -> Mapping:
+        """Read-only view of the store's prompts by ID"""
+        return self.store.prompts if self.store is not None else {}
+    
     def initialize(self) -> bool:
         """
         Initialize the extension
         
+        Opening the store and building the search index can take a while for
+        large libraries, so by default they run on a background thread and
+        this returns at once. Until they finish, is_ready() is False and the
+        API answers 503.
+        
         Returns:
             bool: True if initialization was successful, False otherwise
         """
         logger.info("Initializing Prompt Library Extension")
         
         try:
-            # Load templates from static files
-            self.load_templates()
+            self.template_cache.max_entries = int(self.config.get("renderCacheSize", 10000))
+            self.response_cache.max_bytes = int(self.config.get("responseCacheBytes", 64 * 1024 * 1024))
+            self.prompt_fragments.max_bytes = int(self.config.get("fragmentCacheBytes", 64 * 1024 * 1024))
+            self.flusher.interval = float(self.config.get("flushIntervalMs", 500)) / 1000.0
+            self.flusher.max_pending = max(1, int(self.config.get("flushMaxPending", 1000)))
+            self.profiler.configure(
+                enabled=bool(self.config.get("profilerEnabled", False)),
+                threshold=float(self.config.get("profilerThresholdMs", 500)) / 1000.0,
+                interval=float(self.config.get("profilerIntervalMs", 5)) / 1000.0
+            )
+            if not similarity_available():
+                logger.warning("NumPy is not installed; similar prompt search and the duplicate check are disabled")
             
-            # Load saved prompts from storage
-            self.load_prompts()
+            # Partitions of the memory backend only live in memory, so they
+            # are never closed
+            if self.config.get("storageBackend", "log") == "memory":
+                self.partitions.max_resident = 0
+                self.partitions.idle_seconds = 0
+            else:
+                self.partitions.max_resident = int(self.config.get("partitionMaxResident", 32))
+                self.partitions.idle_seconds = float(self.config.get("partitionIdleSeconds", 600))
+            
+            # Index template files; their contents are read on first use
+            self.load_templates()
             
             # Register routes with the API
             self.register_routes()
             
+            # Load saved prompts from storage
+            self._ready.clear()
+            if self.config.get("backgroundWarmup", True):
+                self._warmup = threading.Thread(target=self.warm_up, name="prompt-library-warmup", daemon=True)
+                self._warmup.start()
+            else:
+                self.warm_up()
+            self.partitions.start()
+            
             self.is_loaded = True
             logger.info("Prompt Library Extension initialized successfully")
             return True
-            
+        
         except Exception as e:
             logger.error(f"Error initializing Prompt Library Extension: {e}")
             return False
@@ -75,17 +231,44 @@ class PromptLibraryExtension:
         logger.info("Shutting down Prompt Library Extension")
         
         try:
-            # Save any pending changes
-            self.save_prompts()
+            if self._warmup is not None:
+                self._warmup.join()
+                self._warmup = None
+            
+            # Commit and close the loaded partitions
+            self.partitions.close_all()
+            
+            self._close()
+            self.profiler.configure(enabled=False)
+            
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
             
             self.is_loaded = False
             logger.info("Prompt Library Extension shut down successfully")
             return True
-            
+        
         except Exception as e:
             logger.error(f"Error shutting down Prompt Library Extension: {e}")
             return False
     
+    def _close(self) -> None:
+        """Stop the background threads, commit pending changes and close the store"""
+        if self._tailer is not None:
+            self._tailer.stop()
+            self._tailer = None
+        
+        # Stop the flusher, committing any pending changes
+        self.flusher.stop()
+        
+        # Save buffered prompt uses
+        self.usage.stop()
+        
+        if self.store is not None:
+            self.store.close()
+            self.store = None
+    
     def load_config(self) -> Dict[str, Any]:
         """
         Load extension configuration from extension.json
@@ -101,107 +284,477 @@ class PromptLibraryExtension:
             with open(config_path, "r") as f:
                 data = json.load(f)
                 return data.get("config", {})
-                
+        
         except Exception as e:
             logger.error(f"Error loading configuration: {e}")
             return {}
     
+    def warm_up(self) -> None:
+        """Load saved prompts and build the indexes, then mark the extension ready"""
+        start = time.perf_counter()
+        try:
+            self.load_prompts()
+        finally:
+            self._ready.set()
+            logger.info(f"Prompt Library ready in {time.perf_counter() - start:.2f}s")
+        
+        # Only similar prompt lookups and the duplicate check need the
+        # similarity index, so unless asked to it is left to the first of them
+        if self.config.get("similarityWarmup", False) and similarity_available():
+            try:
+                self._similarity()
+            except Exception as e:
+                logger.error(f"Error building the similarity index: {e}")
+    
+    def is_ready(self) -> bool:
+        """
+        Check whether the store is loaded and the indexes are built
+        
+        Returns:
+            bool: True once warm-up has finished
+        """
+        return self._ready.is_set()
+    
+    def wait_until_ready(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until warm-up has finished
+        
+        Args:
+            timeout (Optional[float]): Longest time to wait in seconds
+        
+        Returns:
+            bool: True if the extension is ready
+        """
+        return self._ready.wait(timeout)
+    
+    def generation(self) -> int:
+        """
+        Get a counter that increases whenever the library changes
+        
+        Every mutation of prompts or categories, including other processes'
+        writes to a shared library, and every change to a template file
+        increases it, so responses built at an equal generation are current.
+        
+        Returns:
+            int: Library generation
+        """
+        store_generation = self.store.generation if self.store is not None else 0
+        template_generation = self.templates.generation if self.templates is not None else 0
+        return store_generation + template_generation
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get runtime statistics
+        
+        Returns:
+            Dict[str, Any]: Flusher queue depth and latency, executor queues,
+                response and fragment cache counters, usage tracking and
+                partition residency
+        """
+        return {
+            "flusher": self.flusher.stats(),
+            "partitions": self.partitions.stats(),
+            "usage": self.usage.stats(),
+            "similarity": self.similarity_index.stats() if self.similarity_index is not None else {},
+            "executor": self._executor.stats() if self._executor is not None else {},
+            "response_cache": self.response_cache.stats(),
+            "fragment_cache": self.prompt_fragments.stats()
+        }
+    
+    def _collect_metrics(self) -> None:
+        """Register the metrics read from the store, caches and queues when scraped"""
+        metrics = self.metrics
+        caches = {
+            "response": self.response_cache,
+            "fragment": self.prompt_fragments,
+            "template": self.template_cache
+        }
+        
+        def cache_counter(field: str) -> Dict[Tuple[str, ...], float]:
+            return {(name,): getattr(cache, field) for name, cache in caches.items()}
+        
+        def hit_ratio() -> Dict[Tuple[str, ...], float]:
+            ratios = {}
+            for name, cache in caches.items():
+                lookups = cache.hits + cache.misses
+                ratios[(name,)] = cache.hits / lookups if lookups else 0.0
+            return ratios
+        
+        def cache_stat(field: str) -> Dict[Tuple[str, ...], float]:
+            return {(name,): cache.stats()[field] for name, cache in caches.items() if name != "template"}
+        
+        metrics.collect("prompts", "Prompts in the library", lambda: len(self.prompts))
+        metrics.collect("categories", "Categories in the library", lambda: len(self.categories))
+        metrics.collect("tags", "Distinct tags in use", lambda: self.tag_index.count_tags())
+        metrics.collect("generation", "Library generation; increases on every change", self.generation, kind="counter")
+        metrics.collect("ready", "1 once warm-up has finished", lambda: int(self.is_ready()))
+        metrics.collect("cache_hits_total", "Cache hits", lambda: cache_counter("hits"), ("cache",), kind="counter")
+        metrics.collect("cache_misses_total", "Cache misses", lambda: cache_counter("misses"), ("cache",), kind="counter")
+        metrics.collect("cache_hit_ratio", "Cache hits per lookup since startup", hit_ratio, ("cache",))
+        metrics.collect("cache_entries", "Cached entries", lambda: cache_stat("entries"), ("cache",))
+        metrics.collect("cache_bytes", "Cached bytes", lambda: cache_stat("bytes"), ("cache",))
+        metrics.collect("flush_pending", "Changes waiting for the write-behind flusher", lambda: self.flusher.stats()["pending"])
+        metrics.collect("flush_errors_total", "Failed write-behind flushes", lambda: self.flusher.stats()["errors"], kind="counter")
+        metrics.collect(
+            "executor_pending", "Extension calls queued or running per pool",
+            lambda: self._executor_stat("pending"), ("pool",)
+        )
+        metrics.collect(
+            "executor_rejected_total", "Extension calls rejected because a pool was full",
+            lambda: self._executor_stat("rejected"), ("pool",), kind="counter"
+        )
+        metrics.collect("usage_buffered", "Prompt uses not yet aggregated", lambda: self.usage.stats()["buffered"])
+        metrics.collect("partitions_resident", "Partitions loaded in memory", lambda: len(self.partitions))
+        metrics.collect("partition_loads_total", "Partitions loaded", lambda: self.partitions.loads, kind="counter")
+        metrics.collect("partition_evictions_total", "Partitions closed to free memory", lambda: self.partitions.evictions, kind="counter")
+    
+    def _executor_stat(self, field: str) -> Dict[Tuple[str, ...], float]:
+        """Read one executor counter per pool"""
+        stats = self._executor.stats() if self._executor is not None else {}
+        return {(pool,): stats.get(f"{pool}_{field}", 0) for pool in ("read", "write")}
+    
+    def get_executor(self) -> "ExtensionExecutor":
+        """
+        Get the executor API routes run extension calls on
+        
+        Returns:
+            ExtensionExecutor: Bounded read and write thread pools
+        """
+        if self._executor is None:
+            from .executor import ExtensionExecutor
+            
+            self._executor = ExtensionExecutor(
+                read_workers=int(self.config.get("readWorkers", 4)),
+                write_workers=int(self.config.get("writeWorkers", 1)),
+                max_pending=int(self.config.get("maxPendingCalls", 256))
+            )
+        return self._executor
+    
     def load_templates(self) -> None:
-        """Load prompt templates from static files"""
+        """Index the prompt template files; their contents are read on first use"""
         try:
             # Get templates directory
             extension_dir = os.path.dirname(os.path.abspath(__file__))
             templates_dir = os.path.join(extension_dir, "static", "templates")
             
-            if not os.path.exists(templates_dir):
-                logger.warning(f"Templates directory not found: {templates_dir}")
-                return
-            
-            # Load templates from each JSON file
-            for filename in os.listdir(templates_dir):
-                if filename.endswith(".json"):
-                    template_path = os.path.join(templates_dir, filename)
-                    category = filename.replace(".json", "")
-                    
-                    with open(template_path, "r") as f:
-                        templates = json.load(f)
-                        self.templates[category] = templates
-                        logger.info(f"Loaded {len(templates)} templates from {category}")
-            
+            self.templates = TemplateRegistry(
+                templates_dir,
+                max_resident=int(self.config.get("templateResidentCategories", 64)),
+                check_interval=float(self.config.get("templateReloadSeconds", 1.0))
+            )
+            self.templates.scan()
+            logger.info(f"Indexed {self.templates.stats()['files']} template files")
+        
         except Exception as e:
             logger.error(f"Error loading templates: {e}")
     
+    def get_storage_dir(self) -> str:
+        """
+        Get the directory used for durable storage
+        
+        Returns:
+            str: Absolute path of the storage directory
+        """
+        extension_dir = os.path.dirname(os.path.abspath(__file__))
+        return os.path.join(extension_dir, self.config.get("storageDir", "data"))
+    
+    @contextmanager
+    def library(self, scope: Optional[str] = None) -> Iterator["PromptLibraryExtension"]:
+        """
+        Use the library of a scope
+        
+        A partition is loaded on first use and can't be closed while held.
+        
+        Args:
+            scope (Optional[str]): "shared" (the default), "user:<id>" or
+                "team:<id>"
+        
+        Returns:
+            Iterator[PromptLibraryExtension]: Context manager yielding this
+                extension for the shared library, or the partition's library
+        
+        Raises:
+            ValueError: If the scope is malformed
+        """
+        scope = parse_scope(scope)
+        if scope == SHARED_SCOPE:
+            yield self
+            return
+        library = self.partitions.acquire(scope)
+        try:
+            yield library
+        finally:
+            self.partitions.release(scope)
+    
+    def _open_partition(self, scope: str) -> "PromptLibraryExtension":
+        """
+        Load the library of a partition; called by the partition manager
+        
+        Args:
+            scope (str): Validated "user:<id>" or "team:<id>" scope
+        
+        Returns:
+            PromptLibraryExtension: Loaded library with its own store, indexes,
+                caches and usage, sharing this extension's templates and metrics
+        
+        Raises:
+            RuntimeError: If the partition's store could not be opened
+        """
+        library = PromptLibraryExtension()
+        library.scope = scope
+        library.config = dict(self.config, storageDir=os.path.join(self.get_storage_dir(), scope_path(scope)))
+        library.templates = self.templates
+        library.metrics = self.metrics
+        library.template_cache.max_entries = self.template_cache.max_entries
+        library.response_cache.max_bytes = self.response_cache.max_bytes
+        library.prompt_fragments.max_bytes = self.prompt_fragments.max_bytes
+        library.flusher.interval = self.flusher.interval
+        library.flusher.max_pending = self.flusher.max_pending
+        with self.metrics.operation("partition_load"):
+            library.load_prompts()
+        if library.store is None:
+            raise RuntimeError(f"Could not load the {scope} library")
+        library._ready.set()
+        library.is_loaded = True
+        return library
+    
+    @staticmethod
+    def _close_partition(library: "PromptLibraryExtension") -> None:
+        """Commit and close the library of a partition; called by the partition manager"""
+        library._close()
+        library.is_loaded = False
+    
     def load_prompts(self) -> None:
-        """Load saved prompts from storage"""
+        """Load saved prompts from the configured store"""
         try:
-            # In a real implementation, this would load from the database or filesystem
-            # For this example, we'll just initialize with empty data
+            with self.metrics.operation("load"):
+                self.store = create_store(self.config, self.get_storage_dir())
+                self.store.open()
             
-            # Default categories
-            self.categories = {
-                "general": {
-                    "id": "general",
-                    "name": "General",
-                    "description": "General-purpose prompts",
-                    "icon": "chat"
-                },
-                "writing": {
-                    "id": "writing",
-                    "name": "Writing",
-                    "description": "Prompts for writing tasks",
-                    "icon": "pencil"
-                },
-                "coding": {
-                    "id": "coding",
-                    "name": "Coding",
-                    "description": "Prompts for programming tasks",
-                    "icon": "code"
-                },
-                "research": {
-                    "id": "research",
-                    "name": "Research",
-                    "description": "Prompts for research tasks",
-                    "icon": "search"
-                }
-            }
+            # A new store counts generations and versions from scratch
+            self.response_cache.clear()
+            self.prompt_fragments.clear()
             
-            # Sample prompts
-            self.prompts = {
-                "sample-1": {
-                    "id": "sample-1",
-                    "title": "Detailed Explanation",
-                    "content": "Explain [topic] in detail, covering its history, key concepts, and practical applications. Include examples to illustrate important points.",
-                    "description": "Get a comprehensive explanation of any topic",
-                    "category": "general",
-                    "tags": ["explanation", "learning"],
-                    "created_at": "2025-03-15T12:00:00Z",
-                    "updated_at": "2025-03-15T12:00:00Z"
-                },
-                "sample-2": {
-                    "id": "sample-2",
-                    "title": "Code Review",
-                    "content": "Review the following code for bugs, inefficiencies, and style issues. Suggest specific improvements with examples:\n\n```[language]\n[code]\n```",
-                    "description": "Get feedback on code quality and suggestions for improvement",
-                    "category": "coding",
-                    "tags": ["code-review", "programming"],
-                    "created_at": "2025-03-15T12:00:00Z",
-                    "updated_at": "2025-03-15T12:00:00Z"
-                }
-            }
+            # Seed a fresh library with the default data
+            if not len(self.categories) and not len(self.prompts):
+                self.seed_defaults()
             
-            logger.info(f"Loaded {len(self.categories)} categories and {len(self.prompts)} prompts")
+            # Build the derived indexes
+            self._rebuild_indexes()
+            
+            # Commit changes in the background where readers don't depend on it
+            if self.store.defer_commits:
+                self.flusher.start()
+            
+            # Usage is kept beside the store rather than in it, so recording
+            # a use neither writes a prompt nor invalidates the read caches
+            memory = self.config.get("storageBackend", "log") == "memory"
+            self.usage = UsageTracker(
+                None if memory else os.path.join(self.get_storage_dir(), USAGE_FILE),
+                half_life=float(self.config.get("usageHalfLifeHours", 168)) * 3600,
+                flush_interval=float(self.config.get("usageFlushMs", 5000)) / 1000.0,
+                exists=lambda prompt_id: prompt_id in self.prompts
+            )
+            self.usage.load()
+            self.usage.start()
             
+            # Follow writes made by other processes sharing the library
+            if isinstance(self.store, ReplicaPromptStore):
+                self._tailer = ChangeTailer(self.sync_changes, self.config.get("changeFeedPollMs", 200) / 1000.0)
+                self._tailer.start()
+            
+            logger.info(f"Loaded {len(self.categories)} categories and {len(self.prompts)} prompts")
+        
         except Exception as e:
             logger.error(f"Error loading prompts: {e}")
     
-    def save_prompts(self) -> None:
-        """Save prompts to storage"""
-        try:
-            # In a real implementation, this would save to the database or filesystem
-            logger.info(f"Saved {len(self.prompts)} prompts")
-            
-        except Exception as e:
-            logger.error(f"Error saving prompts: {e}")
+    def seed_defaults(self) -> None:
+        """Populate an empty library with default categories and sample prompts"""
+        # Default categories
+        categories = {
+            "general": {
+                "id": "general",
+                "name": "General",
+                "description": "General-purpose prompts",
+                "icon": "chat"
+            },
+            "writing": {
+                "id": "writing",
+                "name": "Writing",
+                "description": "Prompts for writing tasks",
+                "icon": "pencil"
+            },
+            "coding": {
+                "id": "coding",
+                "name": "Coding",
+                "description": "Prompts for programming tasks",
+                "icon": "code"
+            },
+            "research": {
+                "id": "research",
+                "name": "Research",
+                "description": "Prompts for research tasks",
+                "icon": "search"
+            }
+        }
+        
+        # Sample prompts
+        prompts = {
+            "sample-1": {
+                "id": "sample-1",
+                "title": "Detailed Explanation",
+                "content": "Explain [topic] in detail, covering its history, key concepts, and practical applications. Include examples to illustrate important points.",
+                "description": "Get a comprehensive explanation of any topic",
+                "category": "general",
+                "tags": ["explanation", "learning"],
+                "created_at": "2025-03-15T12:00:00Z",
+                "updated_at": "2025-03-15T12:00:00Z"
+            },
+            "sample-2": {
+                "id": "sample-2",
+                "title": "Code Review",
+                "content": "Review the following code for bugs, inefficiencies, and style issues. Suggest specific improvements with examples:\n\n```[language]\n[code]\n```",
+                "description": "Get feedback on code quality and suggestions for improvement",
+                "category": "coding",
+                "tags": ["code-review", "programming"],
+                "created_at": "2025-03-15T12:00:00Z",
+                "updated_at": "2025-03-15T12:00:00Z"
+            }
+        }
+        
+        # Partitions start with the categories but without the samples
+        if self.scope != SHARED_SCOPE:
+            prompts = {}
+        
+        for category in categories.values():
+            self.store.put_category(category)
+        for prompt in prompts.values():
+            self._put_prompt(prompt)
+        self.save_prompts(len(categories) + len(prompts))
+    
+    def sync_changes(self) -> None:
+        """Apply changes other processes made to a shared library"""
+        if not isinstance(self.store, ReplicaPromptStore):
+            return
+        
+        changed = self.store.sync()
+        if changed is None:
+            # The replica was reloaded, so the derived indexes start over too
+            self._rebuild_indexes()
+            self.template_cache.clear()
+            self.prompt_fragments.clear()
+            return
+        
+        for prompt_id in changed:
+            with self.store.prompt_lock(prompt_id):
+                self.template_cache.invalidate(("prompt", prompt_id))
+                self.prompt_fragments.invalidate(prompt_id)
+                prompt = self.store.get_prompt(prompt_id)
+                if prompt is None:
+                    self._unindex_prompt(prompt_id)
+                else:
+                    self._index_prompt(prompt)
+    
+    def save_prompts(self, changes: int = 1) -> None:
+        """
+        Commit mutations to storage
+        
+        Mutations are visible as soon as they are applied, so with a store
+        that allows it the commit is left to the write-behind flusher, which
+        coalesces bursts of changes into one commit. Otherwise the store is
+        committed before this returns.
+        
+        Args:
+            changes (int): Number of prompts and categories changed
+        """
+        if self.store is None:
+            return
+        self.flusher.mark(changes)
+    
+    def flush(self, wait: bool = True) -> None:
+        """
+        Commit pending changes now
+        
+        Args:
+            wait (bool): Return only once every change made so far is on
+                disk; otherwise just start the flush in the background
+        """
+        if self.store is None:
+            return
+        self.flusher.flush(wait, durable=wait)
+    
+    def _commit_store(self, durable: bool) -> None:
+        """Commit the store; called by the flusher"""
+        store = self.store
+        if store is not None:
+            with self.metrics.operation("commit"):
+                store.commit(durable)
+    
+    def _rebuild_indexes(self) -> None:
+        """Rebuild the derived indexes from the store"""
+        with self.metrics.operation("index_rebuild"):
+            prompts = self.store.list_prompts()
+            self.search_index.rebuild(prompts)
+            self.duplicate_index.rebuild(prompts)
+            self.tag_index.rebuild(prompts)
+            # An unbuilt similarity index is built from the store when needed
+            if self.similarity_index is not None and self.similarity_index.built:
+                self.similarity_index.rebuild(prompts)
+    
+    def _index_prompt(self, prompt: Dict[str, Any]) -> None:
+        """Add a stored prompt to the derived indexes, replacing its previous version"""
+        with self.metrics.operation("index_update"):
+            self.search_index.add(prompt)
+            self.duplicate_index.add(prompt)
+            self.tag_index.add(prompt)
+            if self.similarity_index is not None:
+                self.similarity_index.add(prompt)
+    
+    def _unindex_prompt(self, prompt_id: str) -> None:
+        """Remove a deleted prompt from the derived indexes and its usage"""
+        self.usage.forget(prompt_id)
+        with self.metrics.operation("index_update"):
+            self.search_index.remove(prompt_id)
+            self.duplicate_index.remove(prompt_id)
+            self.tag_index.remove(prompt_id)
+            if self.similarity_index is not None:
+                self.similarity_index.remove(prompt_id)
+    
+    def _put_prompt(self, prompt: Dict[str, Any], expected_version: Optional[int] = None) -> None:
+        """
+        Store a prompt and update the derived indexes
+        
+        Args:
+            prompt (Dict[str, Any]): Complete prompt data including its ID
+            expected_version (Optional[int]): Only write over this stored version
+        
+        Raises:
+            VersionConflict: If expected_version does not match
+        """
+        # The prompt's lock keeps the indexes in the same order as the store
+        with self.store.prompt_lock(prompt["id"]):
+            self.store.put_prompt(prompt, expected_version)
+            self._index_prompt(prompt)
+            self.template_cache.invalidate(("prompt", prompt["id"]))
+            self.prompt_fragments.invalidate(prompt["id"])
+    
+    def _remove_prompt(self, prompt_id: str) -> bool:
+        """
+        Remove a prompt from the store and the derived indexes
+        
+        Args:
+            prompt_id (str): Prompt ID
+        
+        Returns:
+            bool: True if the prompt existed
+        """
+        with self.store.prompt_lock(prompt_id):
+            if not self.store.delete_prompt(prompt_id):
+                return False
+            self._unindex_prompt(prompt_id)
+            self.template_cache.invalidate(("prompt", prompt_id))
+            self.prompt_fragments.invalidate(prompt_id)
+            return True
     
     def register_routes(self) -> None:
         """Register API routes"""
@@ -209,7 +762,7 @@ class PromptLibraryExtension:
             # In a real implementation, this would register the API routes
             # with the Open WebUI API framework
             logger.info("Registered API routes")
-            
+        
         except Exception as e:
             logger.error(f"Error registering routes: {e}")
     
@@ -220,21 +773,211 @@ class PromptLibraryExtension:
         Returns:
             List[Dict[str, Any]]: List of category dictionaries
         """
-        return list(self.categories.values())
+        if self.store is None:
+            return []
+        return self.store.list_categories()
     
-    def get_prompts(self, category: Optional[str] = None) -> List[Dict[str, Any]]:
+    def get_prompts(
+        self,
+        category: Optional[str] = None,
+        tag: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        match: str = "all"
+    ) -> List[Dict[str, Any]]:
         """
-        Get prompts, optionally filtered by category
+        Get prompts, optionally filtered by category and/or tags
         
         Args:
             category (Optional[str]): Category ID to filter by
-            
+            tag (Optional[str]): Tag to filter by
+            tags (Optional[List[str]]): More tags to filter by
+            match (str): "all" for prompts with every tag, "any" for prompts
+                with at least one of them
+        
         Returns:
             List[Dict[str, Any]]: List of prompt dictionaries
+        
+        Raises:
+            ValueError: If match is not "all" or "any"
         """
-        if category:
-            return [prompt for prompt in self.prompts.values() if prompt["category"] == category]
-        return list(self.prompts.values())
+        if self.store is None:
+            return []
+        return [as_dict(prompt) for prompt in self._list_prompts(category, tag, tags, match)]
+    
+    def _list_prompts(self, category: Optional[str], tag: Optional[str], tags: Optional[List[str]], match: str) -> List[Dict[str, Any]]:
+        """List stored prompts matching the filters"""
+        selected = self._select_tags(tag, tags, match)
+        if len(selected) > 1:
+            return self._tagged_prompts(selected, match, category)
+        return self.store.list_prompts(category or None, selected[0] if selected else None)
+    
+    @staticmethod
+    def _select_tags(tag: Optional[str], tags: Optional[List[str]], match: str) -> List[str]:
+        """Combine the tag filters, dropping blanks and repeats"""
+        if match not in MATCH_MODES:
+            raise ValueError(f"Invalid tag match mode: {match}")
+        return list(dict.fromkeys(name for name in [tag, *(tags or [])] if name))
+    
+    def _tagged_prompts(self, tags: List[str], match: str, category: Optional[str]) -> List[Dict[str, Any]]:
+        """Get the stored prompts a multi-tag filter selects from the tag index"""
+        prompts = []
+        for prompt_id in self.tag_index.select(tags, match, category or None):
+            # Skip prompts deleted since the index was read
+            prompt = self.store.get_prompt(prompt_id)
+            if prompt is not None:
+                prompts.append(prompt)
+        return prompts
+    
+    def get_prompts_json(
+        self,
+        category: Optional[str] = None,
+        tag: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        match: str = "all"
+    ) -> bytes:
+        """
+        Get prompts as the JSON array GET /prompts returns
+        
+        Each prompt is serialized once and its JSON reused until it changes,
+        so the response is assembled by concatenation rather than by
+        validating and encoding every prompt again.
+        
+        Args:
+            category (Optional[str]): Category ID to filter by
+            tag (Optional[str]): Tag to filter by
+            tags (Optional[List[str]]): More tags to filter by
+            match (str): "all" or "any", as for get_prompts()
+        
+        Returns:
+            bytes: JSON array of prompts
+        
+        Raises:
+            ValueError: If match is not "all" or "any"
+        """
+        if self.store is None:
+            return b"[]"
+        return self.prompt_fragments.join(self._list_prompts(category, tag, tags, match))
+    
+    def get_prompts_page(
+        self,
+        sort: str = "updated_at",
+        order: str = "desc",
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        category: Optional[str] = None,
+        tag: Optional[str] = None,
+        fields: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        match: str = "all"
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Get one page of prompts from the store's ordered indexes
+        
+        Args:
+            sort (str): Sort field: "updated_at", "created_at" or "title"
+            order (str): "asc" or "desc"
+            limit (int): Maximum number of prompts on the page
+            cursor (Optional[str]): Cursor returned with the previous page; it
+                carries the sort order, which takes precedence over sort/order
+            category (Optional[str]): Category ID to filter by
+            tag (Optional[str]): Tag to filter by
+            fields (Optional[str]): Comma-separated fields to include, or None for all
+            tags (Optional[List[str]]): More tags to filter by
+            match (str): "all" or "any", as for get_prompts()
+        
+        Returns:
+            Tuple[List[Dict[str, Any]], Optional[str]]: Prompts on the page and
+                the cursor of the next page, or None on the last page
+        
+        Raises:
+            ValueError: If the sort field, order, cursor, fields or match are invalid
+        """
+        after = None
+        if cursor:
+            position = decode_cursor(cursor)
+            sort, descending, after = position["sort"], position["descending"], position["after"]
+        else:
+            if order not in ("asc", "desc"):
+                raise ValueError(f"Invalid order: {order}")
+            descending = order == "desc"
+        
+        if sort not in SORT_FIELDS:
+            raise ValueError(f"Invalid sort field: {sort}")
+        selected = parse_fields(fields)
+        tags = self._select_tags(tag, tags, match)
+        
+        if self.store is None:
+            return [], None
+        
+        # Fetch one extra prompt to learn whether another page follows
+        if len(tags) > 1:
+            page = self._page_tagged(tags, match, category, sort, descending, after, limit + 1)
+        else:
+            page = self.store.page_prompts(sort, descending, after, limit + 1, category or None, tags[0] if tags else None)
+        next_cursor = None
+        if len(page) > limit:
+            page = page[:limit]
+            last = page[-1]
+            next_cursor = encode_cursor(sort, descending, sort_key(last, sort), last["id"])
+        
+        return project(page, selected), next_cursor
+    
+    def _page_tagged(
+        self,
+        tags: List[str],
+        match: str,
+        category: Optional[str],
+        sort: str,
+        descending: bool,
+        after: Optional[Tuple[str, str]],
+        limit: int
+    ) -> List[Dict[str, Any]]:
+        """Get one page of the prompts a multi-tag filter selects, in keyset order"""
+        entries = sorted(((sort_key(prompt, sort), prompt["id"]), prompt) for prompt in self._tagged_prompts(tags, match, category))
+        if descending:
+            entries.reverse()
+        if after is not None:
+            entries = [entry for entry in entries if (entry[0] < after if descending else entry[0] > after)]
+        return [prompt for _, prompt in entries[:limit]]
+    
+    def get_tags(self, category: Optional[str] = None, prefix: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Get the tags in use with their prompt counts
+        
+        Args:
+            category (Optional[str]): Only count prompts in this category
+            prefix (Optional[str]): Only include tags starting with it
+            limit (Optional[int]): Maximum number of tags
+        
+        Returns:
+            List[Dict[str, Any]]: {"tag", "count"} dictionaries, most used first
+        """
+        return [{"tag": tag, "count": count} for tag, count in self.tag_index.tag_counts(category or None, prefix, limit)]
+    
+    def get_facets(
+        self,
+        tags: Optional[List[str]] = None,
+        match: str = "all",
+        category: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Count the prompts matching a filter per category and per tag
+        
+        Args:
+            tags (Optional[List[str]]): Tags to filter by
+            match (str): "all" or "any", as for get_prompts()
+            category (Optional[str]): Category ID to filter by
+            limit (Optional[int]): Maximum number of tags to count
+        
+        Returns:
+            Dict[str, Any]: "total" matching prompts, and "categories" and
+                "tags" mapping each to its number of matching prompts
+        
+        Raises:
+            ValueError: If match is not "all" or "any"
+        """
+        return self.tag_index.facets(self._select_tags(None, tags, match), match, category or None, limit)
     
     def get_prompt(self, prompt_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -242,11 +985,239 @@ class PromptLibraryExtension:
         
         Args:
             prompt_id (str): Prompt ID
-            
+        
         Returns:
             Optional[Dict[str, Any]]: Prompt dictionary or None if not found
         """
-        return self.prompts.get(prompt_id)
+        if self.store is None:
+            return None
+        return as_dict(self.store.get_prompt(prompt_id))
+    
+    def has_prompt(self, prompt_id: str) -> bool:
+        """
+        Check whether a prompt exists
+        
+        Args:
+            prompt_id (str): Prompt ID
+        
+        Returns:
+            bool: True if the prompt exists
+        """
+        return self.store is not None and prompt_id in self.prompts
+    
+    def search_prompts(self, query: str, category: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Search prompts by title, description, content and tags
+        
+        Args:
+            query (str): Search query; the last term is matched as a prefix
+            category (Optional[str]): Category ID to restrict results to
+            limit (int): Maximum number of results
+        
+        Returns:
+            List[Dict[str, Any]]: Matching prompt dictionaries with a "score", best first
+        """
+        # Checked against the tag index, so deleted prompts drop out and the
+        # store isn't read for every candidate
+        predicate = None
+        if category:
+            predicate = lambda prompt_id: self.tag_index.in_category(prompt_id, category)
+        
+        results = []
+        with self.metrics.operation("search"):
+            for prompt_id, score in self.search_index.search(query, limit, predicate=predicate):
+                prompt = self.prompts.get(prompt_id)
+                if prompt is not None:
+                    results.append({**prompt, "score": score})
+        return results
+    
+    def _similarity(self) -> "SimilarityIndex":
+        """
+        Get the similarity index, creating and building it on first use
+        
+        Returns:
+            SimilarityIndex: The index, holding the library
+        
+        Raises:
+            RuntimeError: If NumPy is not installed
+        """
+        index = self.similarity_index
+        if index is None:
+            if not similarity_available():
+                raise RuntimeError("Similar prompt search requires NumPy")
+            from .similarity import SimilarityIndex
+            with self._similarity_lock:
+                index = self.similarity_index
+                if index is None:
+                    max_postings = int(self.config.get("similarityMaxPostings", 1000000))
+                    if self.scope == SHARED_SCOPE:
+                        index = SimilarityIndex(max_postings=max_postings)
+                    else:
+                        # Partitions hold at most maxPrompts prompts, so a smaller
+                        # hash space keeps each one's index a few hundred kilobytes
+                        index = SimilarityIndex(buckets=1 << 16, max_postings=max_postings)
+                    # Published before the build reads the store, so a prompt
+                    # stored after that is added to it
+                    self.similarity_index = index
+        if not index.built and self.store is not None:
+            with self.metrics.operation("similarity_build", len(self.prompts)):
+                index.ensure(self.store.list_prompts)
+        return index
+    
+    def find_similar(
+        self,
+        prompt: Dict[str, Any],
+        limit: int = 10,
+        category: Optional[str] = None,
+        min_score: float = 0.0
+    ) -> List[Dict[str, Any]]:
+        """
+        Find the stored prompts most similar to a prompt
+        
+        Similarity is the cosine of TF-IDF vectors of the prompts' titles and
+        content, over words and pairs of adjacent words.
+        
+        Args:
+            prompt (Dict[str, Any]): Prompt with a "title" and "content"; it
+                does not have to be stored, and if it has an "id" that prompt
+                is left out of the results
+            limit (int): Maximum number of results
+            category (Optional[str]): Category ID to restrict results to
+            min_score (float): Leave out prompts less similar than this
+        
+        Returns:
+            List[Dict[str, Any]]: Prompt dictionaries with a "similarity" from
+                0 to 1, most similar first
+        
+        Raises:
+            RuntimeError: If NumPy is not installed
+        """
+        predicate = None
+        if category:
+            predicate = lambda prompt_id: self.tag_index.in_category(prompt_id, category)
+        
+        index = self._similarity()
+        results = []
+        with self.metrics.operation("similar"):
+            for prompt_id, score in index.similar(prompt, limit, prompt.get("id"), min_score, predicate):
+                stored = self.prompts.get(prompt_id)
+                if stored is not None:
+                    results.append({**stored, "similarity": score})
+        return results
+    
+    def get_similar_prompts(self, prompt_id: str, limit: int = 10, category: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+        """
+        Find the prompts most similar to a stored prompt
+        
+        Args:
+            prompt_id (str): Prompt ID
+            limit (int): Maximum number of results
+            category (Optional[str]): Category ID to restrict results to
+        
+        Returns:
+            Optional[List[Dict[str, Any]]]: Prompt dictionaries with a
+                "similarity", most similar first, or None if the prompt
+                doesn't exist
+        
+        Raises:
+            RuntimeError: If NumPy is not installed
+        """
+        prompt = self.prompts.get(prompt_id)
+        if prompt is None:
+            return None
+        return self.find_similar(prompt, limit, category)
+    
+    def find_duplicates(self, prompt: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Find stored prompts a new prompt would nearly duplicate
+        
+        Args:
+            prompt (Dict[str, Any]): Prompt about to be created
+        
+        Returns:
+            List[Dict[str, Any]]: Prompts at least duplicateThreshold similar
+                (default 0.9), most similar first; empty without NumPy
+        """
+        if not similarity_available():
+            return []
+        threshold = float(self.config.get("duplicateThreshold", 0.9))
+        return self.find_similar(prompt, 5, min_score=threshold)
+    
+    def record_usage(self, prompt_id: str) -> None:
+        """
+        Record that a prompt was used
+        
+        Only buffers the use, without touching the store, so it is safe to
+        call on the event loop; callers check has_prompt first. Counters and
+        rankings catch up on the next ranking read or background flush.
+        
+        Args:
+            prompt_id (str): Prompt ID
+        """
+        self.usage.record(prompt_id)
+    
+    def get_usage_ranking(self, sort: str = "score", limit: int = 10, category: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Get the most used prompts
+        
+        Args:
+            sort (str): "score" (uses decayed by usageHalfLifeHours), "count"
+                (all-time uses) or "recent" (last used)
+            limit (int): Maximum number of prompts
+            category (Optional[str]): Category ID to restrict results to
+        
+        Returns:
+            List[Dict[str, Any]]: Prompt dictionaries with "use_count",
+                "last_used" and "score", best first
+        
+        Raises:
+            ValueError: If sort is not a known ranking
+        """
+        def predicate(prompt_id: str) -> bool:
+            prompt = self.prompts.get(prompt_id)
+            return prompt is not None and (not category or prompt["category"] == category)
+        
+        results = []
+        for prompt_id, usage in self.usage.top(limit, sort, predicate=predicate):
+            prompt = self.prompts.get(prompt_id)
+            if prompt is not None:
+                results.append({**prompt, **usage})
+        return results
+    
+    def prompt_limit(self) -> Optional[int]:
+        """
+        Get the most prompts the library may hold
+        
+        maxPrompts only applies to user and team libraries; the shared
+        library is unlimited.
+        
+        Returns:
+            Optional[int]: maxPrompts, or None if it is 0 (no limit) or this
+                is the shared library
+        """
+        if self.scope == SHARED_SCOPE:
+            return None
+        limit = int(self.config.get("maxPrompts", 100) or 0)
+        return limit if limit > 0 else None
+    
+    def prompt_room(self) -> Optional[int]:
+        """
+        Get the number of prompts that can still be added
+        
+        Returns:
+            Optional[int]: Prompts below maxPrompts, or None without a limit
+        """
+        limit = self.prompt_limit()
+        if limit is None:
+            return None
+        stored = self.store.count_prompts() if self.store is not None else 0
+        return max(0, limit - stored)
+    
+    def _check_quota(self, added: int) -> None:
+        """Reject adding prompts past maxPrompts; the caller holds the quota lock"""
+        room = self.prompt_room()
+        if room is not None and added > room:
+            raise QuotaExceeded(self.prompt_limit())
     
     def add_prompt(self, prompt: Dict[str, Any]) -> str:
         """
@@ -254,9 +1225,13 @@ class PromptLibraryExtension:
         
         Args:
             prompt (Dict[str, Any]): Prompt data
-            
+        
         Returns:
             str: ID of the new prompt
+        
+        Raises:
+            ValueError: If the prompt is not valid
+            QuotaExceeded: If the library already holds maxPrompts prompts
         """
         # Generate ID if not provided
         if "id" not in prompt:
@@ -272,37 +1247,58 @@ class PromptLibraryExtension:
         prompt["created_at"] = now
         prompt["updated_at"] = now
         
-        # Add to prompts dictionary
-        self.prompts[prompt_id] = prompt
+        # Validated once here, so responses can serialize it without checking;
+        # only the normalized fields are stored
+        prompt = validate_prompt(prompt)
+        
+        # Add to the store, unless a new prompt would pass the limit
+        with self._quota_lock:
+            if self.store.get_prompt(prompt_id) is None:
+                self._check_quota(1)
+            self._put_prompt(prompt)
         
         # Save changes
         self.save_prompts()
         
         return prompt_id
     
-    def update_prompt(self, prompt_id: str, prompt: Dict[str, Any]) -> bool:
+    def update_prompt(self, prompt_id: str, prompt: Dict[str, Any], expected_version: Optional[int] = None) -> bool:
         """
         Update an existing prompt
         
         Args:
             prompt_id (str): ID of the prompt to update
             prompt (Dict[str, Any]): Updated prompt data
-            
+            expected_version (Optional[int]): Only update if the prompt is still at
+                this version, e.g. from the client's If-Match header
+        
         Returns:
             bool: True if updated successfully, False otherwise
+        
+        Raises:
+            VersionConflict: If the prompt is no longer at expected_version
+            ValueError: If the prompt is not valid
         """
-        if prompt_id not in self.prompts:
+        if self.store is None:
             return False
         
-        # Update timestamp
-        from datetime import datetime
-        prompt["updated_at"] = datetime.utcnow().isoformat() + "Z"
-        
-        # Keep created_at from original
-        prompt["created_at"] = self.prompts[prompt_id]["created_at"]
-        
-        # Update the prompt
-        self.prompts[prompt_id] = prompt
+        # Hold the prompt's lock so it can't be deleted or rewritten in between
+        with self.store.prompt_lock(prompt_id):
+            existing = self.get_prompt(prompt_id)
+            if existing is None:
+                return False
+            
+            # Update timestamp
+            from datetime import datetime
+            prompt["updated_at"] = datetime.utcnow().isoformat() + "Z"
+            
+            # Keep created_at from original
+            prompt["created_at"] = existing["created_at"]
+            
+            # Update the prompt
+            prompt["id"] = prompt_id
+            prompt = validate_prompt(prompt)
+            self._put_prompt(prompt, expected_version)
         
         # Save changes
         self.save_prompts()
@@ -315,28 +1311,148 @@ class PromptLibraryExtension:
         
         Args:
             prompt_id (str): ID of the prompt to delete
-            
+        
         Returns:
             bool: True if deleted successfully, False otherwise
         """
-        if prompt_id not in self.prompts:
-            return False
-        
         # Remove the prompt
-        del self.prompts[prompt_id]
+        if self.store is None or not self._remove_prompt(prompt_id):
+            return False
         
         # Save changes
         self.save_prompts()
         
         return True
     
+    def apply_operations(self, operations: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Create, update and delete prompts as one atomic batch
+        
+        Every operation is validated and checked against the library before
+        anything is written, and if any of them fails none is applied.
+        Operations apply in order, so one may update a prompt an earlier one
+        created. The batch is written to the store as a unit, the derived
+        indexes are updated in one pass and storage is committed once.
+        
+        Args:
+            operations (List[Dict[str, Any]]): Operations, each with "op"
+                ("create", "update" or "delete"), "id" (generated for creates
+                without one), "prompt" data for creates and updates, and an
+                optional "expected_version" the prompt must be at
+        
+        Returns:
+            Dict[str, Any]: "applied" and the "results" of each operation in
+                order, with "index", "op", "id", "status" (201 created, 200
+                updated or deleted, 400 invalid, 403 past maxPrompts, 404 not
+                found, 409 already exists, 412 version mismatch, 424 not
+                applied because another operation failed) and the new
+                "version" or an "error"
+        """
+        from datetime import datetime
+        now = datetime.utcnow().isoformat() + "Z"
+        
+        results: List[Dict[str, Any]] = []
+        batch = []
+        for index, operation in enumerate(operations):
+            op, prompt_id = operation.get("op"), operation.get("id")
+            result = {"index": index, "op": op, "id": prompt_id}
+            results.append(result)
+            try:
+                if op not in ("create", "update", "delete"):
+                    raise ValueError(f"Unknown operation: {op}")
+                if op == "create" and prompt_id is None:
+                    import uuid
+                    prompt_id = result["id"] = f"prompt-{str(uuid.uuid4())[:8]}"
+                if not isinstance(prompt_id, str):
+                    raise ValueError("'id' must be a string")
+                
+                prompt = None
+                if op != "delete":
+                    if not isinstance(operation.get("prompt"), dict):
+                        raise ValueError("'prompt' must be an object")
+                    prompt = validate_prompt(dict(operation["prompt"], id=prompt_id, created_at=now, updated_at=now))
+                batch.append((op, prompt_id, prompt, operation.get("expected_version")))
+            except ValueError as e:
+                result.update(status=400, error=str(e))
+        
+        if self.store is None or len(batch) < len(results):
+            return self._reject_operations(results)
+        
+        with self._quota_lock, self.store.prompt_locks(prompt_id for _, prompt_id, _, _ in batch):
+            # State of each prompt as the batch goes, starting from the store
+            final: Dict[str, Optional[Dict[str, Any]]] = {}
+            existed: Dict[str, bool] = {}
+            writes = []
+            for result, (op, prompt_id, prompt, expected_version) in zip(results, batch):
+                touched = prompt_id in final
+                previous = final[prompt_id] if touched else self.get_prompt(prompt_id)
+                if op == "create" and previous is not None:
+                    result.update(status=409, error=f"Prompt already exists: {prompt_id}")
+                elif op != "create" and previous is None:
+                    result.update(status=404, error=f"Prompt not found: {prompt_id}")
+                elif op == "update":
+                    prompt["created_at"] = previous["created_at"]
+                
+                # Pin the version read here, so the store rejects the batch if
+                # another process changes the prompt before it is written
+                if expected_version is None and not touched:
+                    expected_version = prompt_version(previous) if previous is not None else 0
+                if not touched:
+                    existed[prompt_id] = previous is not None
+                final[prompt_id] = prompt
+                writes.append(("delete" if op == "delete" else "put", prompt_id, prompt, expected_version))
+            
+            if any("status" in result for result in results):
+                return self._reject_operations(results)
+            
+            # Prompts the batch leaves in the library minus those it found there
+            added = sum((prompt is not None) - existed[prompt_id] for prompt_id, prompt in final.items())
+            try:
+                self._check_quota(added)
+            except QuotaExceeded as e:
+                for result, (op, prompt_id, _, _) in zip(results, batch):
+                    if op == "create" and not existed[prompt_id]:
+                        result.update(status=403, error=str(e))
+                return self._reject_operations(results)
+            
+            try:
+                self.store.write_batch(writes)
+            except BatchRejected as e:
+                for index, conflict in e.conflicts.items():
+                    results[index].update(status=412, error=str(conflict), version=conflict.current_version)
+                return self._reject_operations(results)
+            
+            for prompt_id, prompt in final.items():
+                if prompt is None:
+                    self._unindex_prompt(prompt_id)
+                else:
+                    self._index_prompt(prompt)
+                self.template_cache.invalidate(("prompt", prompt_id))
+                self.prompt_fragments.invalidate(prompt_id)
+        
+        self.save_prompts(len(final))
+        
+        for result, (op, _, prompt, _) in zip(results, batch):
+            result["status"] = 201 if op == "create" else 200
+            if prompt is not None:
+                result["version"] = prompt["version"]
+        return {"applied": True, "results": results}
+    
+    @staticmethod
+    def _reject_operations(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Mark the operations that did not fail themselves as not applied"""
+        for result in results:
+            if "status" not in result:
+                result.update(status=424, error="Not applied: another operation in the batch failed")
+        return {"applied": False, "results": results}
+    
     def add_category(self, category: Dict[str, Any]) -> str:
         """
         Add a new category
         
         Args:
             category (Dict[str, Any]): Category data
-            
+        
         Returns:
             str: ID of the new category
         """
@@ -347,8 +1463,8 @@ class PromptLibraryExtension:
         else:
             category_id = category["id"]
         
-        # Add to categories dictionary
-        self.categories[category_id] = category
+        # Add to the store
+        self.store.put_category(category)
         
         # Save changes
         self.save_prompts()
@@ -359,15 +1475,82 @@ class PromptLibraryExtension:
         """
         Get templates, optionally filtered by category
         
+        Without a category every template file is read, so prefer filtering.
+        
         Args:
             category (Optional[str]): Category to filter by
-            
+        
         Returns:
             Dict[str, List[Dict[str, Any]]]: Dictionary of templates by category
         """
+        if self.templates is None:
+            return {category: []} if category else {}
         if category:
-            return {category: self.templates.get(category, [])}
-        return self.templates
+            return {category: self.templates.get_category(category)}
+        return self.templates.get_all()
+    
+    def get_template(self, template_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a template by ID
+        
+        Args:
+            template_id (str): Template ID
+        
+        Returns:
+            Optional[Dict[str, Any]]: Template dictionary or None if not found
+        """
+        return self.templates.get(template_id) if self.templates is not None else None
+    
+    def get_compiled(self, kind: str, item_id: str) -> Optional[CompiledTemplate]:
+        """
+        Get the compiled content of a prompt or template
+        
+        Args:
+            kind (str): "prompt" or "template"
+            item_id (str): Prompt or template ID
+        
+        Returns:
+            Optional[CompiledTemplate]: Compiled content or None if not found
+        """
+        # The stored record itself, so the cache can recognize it by identity
+        item = self.prompts.get(item_id) if kind == "prompt" else self.get_template(item_id)
+        if item is None:
+            return None
+        return self.template_cache.get((kind, item_id), item)
+    
+    def get_variables(self, kind: str, item_id: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Describe the [variable] placeholders of a prompt or template
+        
+        Args:
+            kind (str): "prompt" or "template"
+            item_id (str): Prompt or template ID
+        
+        Returns:
+            Optional[List[Dict[str, Any]]]: Variable descriptions or None if not found
+        """
+        compiled = self.get_compiled(kind, item_id)
+        return compiled.describe() if compiled is not None else None
+    
+    def render(self, kind: str, item_id: str, values: Dict[str, Any], strict: bool = True) -> Optional[str]:
+        """
+        Render a prompt or template with variable values
+        
+        Args:
+            kind (str): "prompt" or "template"
+            item_id (str): Prompt or template ID
+            values (Dict[str, Any]): Variable values; defaults fill the rest
+            strict (bool): Fail on missing required variables instead of
+                leaving their placeholders in place
+        
+        Returns:
+            Optional[str]: Rendered content or None if not found
+        
+        Raises:
+            MissingVariables: In strict mode, if required variables are missing
+        """
+        compiled = self.get_compiled(kind, item_id)
+        return compiled.render(values, strict) if compiled is not None else None
     
     def export_prompts(self) -> Dict[str, Any]:
         """
@@ -376,42 +1559,112 @@ class PromptLibraryExtension:
         Returns:
             Dict[str, Any]: Export data
         """
-        return {
-            "categories": self.categories,
-            "prompts": self.prompts
-        }
+        with self.metrics.operation("export"):
+            export = {
+                "categories": {category["id"]: category for category in self.get_categories()},
+                "prompts": {prompt["id"]: prompt for prompt in self.get_prompts()}
+            }
+        self.metrics.operation_items.inc(len(export["categories"]) + len(export["prompts"]), "export")
+        return export
+    
+    def iter_prompts(self) -> Iterator[Dict[str, Any]]:
+        """
+        Lazily iterate over all prompts for streaming export
+        
+        Returns:
+            Iterator[Dict[str, Any]]: Prompt dictionaries
+        """
+        if self.store is None:
+            return iter(())
+        return map(as_dict, self.store.iter_prompts())
     
-    def import_prompts(self, data: Dict[str, Any]) -> bool:
+    def import_records(self, records: List[Tuple[str, Dict[str, Any]]], diff: Optional[ImportDiff] = None) -> Dict[str, int]:
+        """
+        Apply one batch of validated import records
+        
+        Args:
+            records (List[Tuple[str, Dict[str, Any]]]): ("category" | "prompt", data) pairs
+            diff (Optional[ImportDiff]): Classifies the records first, so only
+                added and changed ones are written and new prompts past
+                maxPrompts are skipped; None writes them all
+        
+        Returns:
+            Dict[str, int]: Number of categories and prompts applied
+        
+        Raises:
+            QuotaExceeded: Without a diff, if the new prompts would pass
+                maxPrompts; nothing is applied then
+        """
+        with self.metrics.operation("import", len(records)), self._quota_lock:
+            if diff is not None:
+                records = diff.classify(records)
+            else:
+                new = {data["id"] for record_type, data in records if record_type == "prompt" and self.store.get_prompt(data["id"]) is None}
+                self._check_quota(len(new))
+            
+            from datetime import datetime
+            now = datetime.utcnow().isoformat() + "Z"
+            applied = {"categories": 0, "prompts": 0}
+            
+            for record_type, data in records:
+                if record_type == "category":
+                    self.store.put_category(data)
+                    applied["categories"] += 1
+                else:
+                    data["created_at"] = data.get("created_at") or now
+                    data["updated_at"] = data.get("updated_at") or data["created_at"]
+                    self._put_prompt(data)
+                    applied["prompts"] += 1
+        
+        # One durability point per batch
+        if records:
+            self.save_prompts(applied["categories"] + applied["prompts"])
+        
+        return applied
+    
+    def import_prompts(
+        self,
+        data: Dict[str, Any],
+        dry_run: bool = False,
+        skip_duplicates: bool = False
+    ) -> Optional[Dict[str, Any]]:
         """
         Import prompts and categories
         
+        Records identical to the stored ones are skipped, so re-importing an
+        export only writes what changed. Prompts whose new content duplicates
+        another prompt's are reported, and skipped with skip_duplicates.
+        
         Args:
             data (Dict[str, Any]): Import data
-            
+            dry_run (bool): Only report what the import would do
+            skip_duplicates (bool): Skip near-duplicates of other prompts
+        
         Returns:
-            bool: True if imported successfully, False otherwise
+            Optional[Dict[str, Any]]: The ImportDiff summary, or None if the
+                data is not valid
         """
         try:
             # Validate data
             if "categories" not in data or "prompts" not in data:
-                return False
+                return None
             
-            # Merge categories
+            # Check every prompt before applying any of them
+            prompts = [validate_prompt(dict(prompt, id=prompt_id)) for prompt_id, prompt in data["prompts"].items()]
             for category_id, category in data["categories"].items():
-                self.categories[category_id] = category
-            
-            # Merge prompts
-            for prompt_id, prompt in data["prompts"].items():
-                self.prompts[prompt_id] = prompt
-            
-            # Save changes
-            self.save_prompts()
+                category["id"] = category_id
             
-            return True
+            # Categories first, so the prompts' categories exist
+            records = [("category", category) for category in data["categories"].values()]
+            records.extend(("prompt", prompt) for prompt in prompts)
             
+            diff = ImportDiff(self, dry_run=dry_run, skip_duplicates=skip_duplicates)
+            self.import_records(records, diff)
+            return diff.summary()
+        
         except Exception as e:
             logger.error(f"Error importing prompts: {e}")
-            return False
+            return None
 
 # Module functions for extension initialization
 
@@ -419,7 +1672,9 @@ def get_extension():
     """Get the extension instance"""
     global _extension_instance
     if _extension_instance is None:
-        _extension_instance = PromptLibraryExtension()
+        with _extension_lock:
+            if _extension_instance is None:
+                _extension_instance = PromptLibraryExtension()
     return _extension_instance
 
 def initialize():
@@ -1,20 +1,60 @@
 """
 API endpoints for the Prompt Library extension
+
+Extension methods are synchronous and may block on disk I/O, so routes run
+them on the extension's bounded executor instead of the event loop.
 """
 
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Callable, AsyncIterator, Hashable, Tuple
+import time
 import logging
-from fastapi import APIRouter, HTTPException, Depends, Query, Body, Path
+import tempfile
+from fastapi import APIRouter, HTTPException, Depends, Query, Body, Path, Request, Response, Header
+from fastapi.routing import APIRoute
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 
 # Import the extension
 from . import get_extension
+from .streaming import iter_export, StreamingImporter, BatchRenderer
+from .executor import ExecutorOverloaded
+from .store import VersionConflict, prompt_version
+from .partitions import QuotaExceeded, ScopeDenied, SHARED_SCOPE, parse_scope, authorize_scope
+from .templating import MissingVariables
+from .response_cache import CachedResponse, dump_json
 
 # Setup logging
 logger = logging.getLogger("prompt_library.api")
 
+class TimedRoute(APIRoute):
+    """Route that records its latency and status, and reports slow requests to the profiler"""
+    
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        route = self.path_format
+        
+        async def timed_handler(request: Request) -> Response:
+            extension = get_extension()
+            token = extension.profiler.begin()
+            start = time.perf_counter()
+            status = 500
+            try:
+                response = await handler(request)
+                status = response.status_code
+                return response
+            except HTTPException as e:
+                status = e.status_code
+                raise
+            finally:
+                # Streaming responses are timed until their first byte
+                extension.metrics.requests.observe(time.perf_counter() - start, request.method, route, str(status))
+                extension.profiler.end(token, f"{request.method} {route}")
+        
+        return timed_handler
+
 # Create router
-router = APIRouter(prefix="/api/extensions/prompt-library", tags=["prompt-library"])
+router = APIRouter(prefix="/api/extensions/prompt-library", tags=["prompt-library"], route_class=TimedRoute)
 
 # Models for API requests and responses
 class PromptBase(BaseModel):
@@ -24,6 +64,7 @@ class PromptBase(BaseModel):
     description: str
     category: str
     tags: List[str] = []
+    variables: List[Dict[str, Any]] = []
 
 class PromptCreate(PromptBase):
     """Model for creating a prompt"""
@@ -34,10 +75,75 @@ class PromptUpdate(PromptBase):
     pass
 
 class Prompt(PromptBase):
-    """Model for prompt data with ID and timestamps"""
+    """Model for prompt data with ID, timestamps and version"""
     id: str
     created_at: str
     updated_at: str
+    version: int = 0
+
+class BulkOperation(BaseModel):
+    """Model for one operation of a bulk request"""
+    op: str
+    id: Optional[str] = None
+    prompt: Optional[PromptBase] = None
+    expected_version: Optional[int] = None
+
+class BulkRequest(BaseModel):
+    """Model for a bulk request, applied all or nothing"""
+    operations: List[BulkOperation]
+
+class SearchResult(Prompt):
+    """Model for a ranked search result"""
+    score: float
+
+class SimilarPrompt(Prompt):
+    """Model for a prompt with its similarity to another"""
+    similarity: float
+
+class SimilarQuery(BaseModel):
+    """Model for text to find similar prompts for"""
+    title: str = ""
+    content: str = ""
+
+class UsageResult(Prompt):
+    """Model for a prompt with its usage"""
+    use_count: int
+    last_used: str
+    score: float
+
+class TagCount(BaseModel):
+    """Model for a tag and its number of prompts"""
+    tag: str
+    count: int
+
+class Facets(BaseModel):
+    """Model for prompt counts per category and tag"""
+    total: int
+    categories: Dict[str, int]
+    tags: Dict[str, int]
+
+class ProfilerSettings(BaseModel):
+    """Model for changing the slow-request profiler at runtime"""
+    enabled: Optional[bool] = None
+    threshold_ms: Optional[float] = None
+    interval_ms: Optional[float] = None
+
+class RenderRequest(BaseModel):
+    """Model for a render request"""
+    variables: Dict[str, Any] = {}
+    strict: bool = True
+
+class RenderResult(BaseModel):
+    """Model for rendered prompt or template content"""
+    id: str
+    content: str
+
+class Variable(BaseModel):
+    """Model for a [variable] placeholder description"""
+    name: str
+    description: str = ""
+    default: Optional[str] = None
+    required: bool
 
 class CategoryBase(BaseModel):
     """Base model for category data"""
@@ -58,66 +164,369 @@ class ImportData(BaseModel):
     categories: Dict[str, Any]
     prompts: Dict[str, Any]
 
+def split_list(value: Optional[str]) -> List[str]:
+    """Split a comma-separated query parameter, dropping blank items"""
+    return [item.strip() for item in (value or "").split(",") if item.strip()]
+
+def require_ready() -> None:
+    """
+    Reject requests until the extension has loaded its store
+    
+    Raises:
+        HTTPException: 503 while warm-up is still running
+    """
+    if not get_extension().is_ready():
+        raise HTTPException(status_code=503, detail="Prompt Library is still loading", headers={"Retry-After": "1"})
+
+async def run_read(fn: Callable, *args, **kwargs) -> Any:
+    """Run a read-only extension call off the event loop"""
+    require_ready()
+    try:
+        return await get_extension().get_executor().read(fn, *args, **kwargs)
+    except ExecutorOverloaded as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
+async def run_write(fn: Callable, *args, **kwargs) -> Any:
+    """Run a mutating extension call off the event loop"""
+    require_ready()
+    try:
+        return await get_extension().get_executor().write(fn, *args, **kwargs)
+    except ExecutorOverloaded as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
+def caller_identity(request: Request) -> Tuple[Optional[str], List[str]]:
+    """
+    Get the caller's user ID and team IDs from the trusted headers
+    
+    The host (or a proxy in front of it) authenticates the caller and sets
+    the headers named by userHeader and teamsHeader; they must never be
+    passed through from clients.
+    
+    Returns:
+        Tuple[Optional[str], List[str]]: User ID, or None if the header is
+            missing, and team IDs
+    """
+    config = get_extension().config
+    user = request.headers.get(config.get("userHeader", "X-User-Id"), "").strip() or None
+    teams = split_list(request.headers.get(config.get("teamsHeader", "X-User-Teams")))
+    return user, teams
+
+async def scoped_library(
+    request: Request,
+    scope: Optional[str] = Query(None, description="shared (the default), user, user:<id> or team:<id>")
+) -> AsyncIterator[Any]:
+    """
+    Resolve the library a request addresses
+    
+    Only the caller's own library and those of its teams can be used,
+    unless scopeAccess is "trusted". A partition is loaded on the read pool
+    on first use and held until the response is sent, so it can't be closed
+    while the response is built or streamed.
+    
+    Raises:
+        HTTPException: 400 for a malformed scope, 401 without a caller
+            identity, 403 for another user's or team's library
+    """
+    extension = get_extension()
+    try:
+        if extension.config.get("scopeAccess", "identity") == "trusted":
+            scope = parse_scope(scope)
+        else:
+            scope = authorize_scope(scope, *caller_identity(request))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ScopeDenied as e:
+        raise HTTPException(status_code=403 if e.authenticated else 401, detail=str(e))
+    
+    if scope == SHARED_SCOPE:
+        yield extension
+        return
+    library = await run_read(extension.partitions.acquire, scope)
+    try:
+        yield library
+    finally:
+        extension.partitions.release(scope)
+
+def etag(version: Optional[int]) -> str:
+    """Format a prompt version as an ETag"""
+    return f'"{version}"'
+
+def parse_if_match(if_match: Optional[str]) -> Optional[int]:
+    """
+    Get the prompt version an If-Match header requires
+    
+    Args:
+        if_match (Optional[str]): If-Match header value
+    
+    Returns:
+        Optional[int]: Required version, or None for an unconditional request
+    
+    Raises:
+        HTTPException: 412 if the header can't match any prompt version
+    """
+    if if_match is None or if_match.strip() == "*":
+        return None
+    tag = if_match.strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    try:
+        return int(tag.strip('"'))
+    except ValueError:
+        raise HTTPException(status_code=412, detail=f"If-Match does not match a prompt version: {if_match}")
+
+def etag_matches(if_none_match: Optional[str], tag: str) -> bool:
+    """
+    Check an If-None-Match header against a response's ETag
+    
+    Args:
+        if_none_match (Optional[str]): If-None-Match header value
+        tag (str): Current ETag of the response
+    
+    Returns:
+        bool: True if the client's copy is current and 304 can be sent
+    """
+    if if_none_match is None:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison, so W/ prefixes are ignored
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == tag:
+            return True
+    return False
+
+def build_cached(extension: Any, key: Hashable, build: Callable[[], Tuple[bytes, Dict[str, str]]]) -> CachedResponse:
+    """
+    Get a response from the cache, building and caching it on a miss
+    
+    Runs on the read pool. The generation is read before building, so a
+    write that races with build() leaves an entry that is never served.
+    
+    Args:
+        extension (Any): Library whose cache and generation are used
+        key (Hashable): Endpoint and query parameters
+        build (Callable[[], Tuple[bytes, Dict[str, str]]]): Produces the
+            serialized JSON body and any extra headers
+    
+    Returns:
+        CachedResponse: Serialized response
+    """
+    generation = extension.generation()
+    cached = extension.response_cache.get(key, generation)
+    if cached is None:
+        body, headers = build()
+        cached = extension.response_cache.put(key, generation, body, headers)
+    return cached
+
+async def cached_json(extension: Any, key: Hashable, if_none_match: Optional[str], build: Callable[[], Tuple[bytes, Dict[str, str]]]) -> Response:
+    """
+    Serve a read endpoint from the response cache, honoring If-None-Match
+    
+    Args:
+        extension (Any): Library the response is built from
+        key (Hashable): Endpoint and query parameters
+        if_none_match (Optional[str]): If-None-Match header value
+        build (Callable[[], Tuple[bytes, Dict[str, str]]]): Produces the
+            serialized JSON body and any extra headers on a cache miss
+    
+    Returns:
+        Response: The cached body, or 304 Not Modified
+    """
+    cached = await run_read(build_cached, extension, key, build)
+    
+    # no-cache lets clients keep the body but revalidate it on every use
+    headers = {"ETag": cached.etag, "Cache-Control": "no-cache", **cached.headers}
+    if etag_matches(if_none_match, cached.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
+
 # API Routes
 
 @router.get("/categories", response_model=List[Category])
-async def get_categories():
-    """Get all categories"""
-    extension = get_extension()
-    return extension.get_categories()
+async def get_categories(if_none_match: Optional[str] = Header(None), extension: Any = Depends(scoped_library)):
+    """Get all categories, cached and with an ETag for conditional requests"""
+    
+    def build():
+        return dump_json([jsonable_encoder(Category(**category)) for category in extension.get_categories()]), {}
+    
+    return await cached_json(extension, ("categories",), if_none_match, build)
 
 @router.post("/categories", response_model=Category)
-async def create_category(category: CategoryCreate):
+async def create_category(category: CategoryCreate, extension: Any = Depends(scoped_library)):
     """Create a new category"""
-    extension = get_extension()
     
     # Convert to dictionary
     category_dict = category.dict()
     
     # Add the category
-    category_id = extension.add_category(category_dict)
+    category_id = await run_write(extension.add_category, category_dict)
     
     # Return the category
-    return extension.categories[category_id]
+    return await run_read(extension.categories.get, category_id)
 
 @router.get("/prompts", response_model=List[Prompt])
-async def get_prompts(category: Optional[str] = None):
-    """Get all prompts, optionally filtered by category"""
-    extension = get_extension()
-    return extension.get_prompts(category)
+async def get_prompts(
+    category: Optional[str] = None,
+    tag: Optional[str] = None,
+    tags: Optional[str] = Query(None, description="Comma-separated tags to filter by"),
+    match: str = Query("all", description="all (every tag) or any (at least one tag)"),
+    limit: Optional[int] = Query(None, ge=1, le=500, description="Page size (default 50 when paginating)"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value of the previous page"),
+    sort: Optional[str] = Query(None, description="updated_at, created_at or title"),
+    order: str = Query("desc", description="asc or desc"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to include, e.g. id,title,tags"),
+    if_none_match: Optional[str] = Header(None),
+    extension: Any = Depends(scoped_library)
+):
+    """
+    Get prompts, optionally filtered by category and/or tags
+    
+    tag and tags combine; with several tags, match=all (the default) keeps
+    prompts carrying every tag and match=any prompts carrying at least one.
+    Without paging parameters the whole (filtered) library is returned. Passing
+    limit, cursor, sort or fields returns one page in keyset order instead,
+    with the cursor of the next page in the X-Next-Cursor header. Responses
+    are cached until the library changes and carry an ETag.
+    """
+    tag_list = split_list(tags)
+    
+    if limit is None and cursor is None and sort is None and fields is None:
+        def build():
+            # Stored prompts are validated on write; each one's JSON is reused
+            return extension.get_prompts_json(category, tag, tag_list, match), {}
+    else:
+        def build():
+            page, next_cursor = extension.get_prompts_page(
+                sort=sort or "updated_at",
+                order=order,
+                limit=limit or 50,
+                cursor=cursor,
+                category=category,
+                tag=tag,
+                fields=fields,
+                tags=tag_list,
+                match=match
+            )
+            # Projected pages don't match the Prompt model, so they bypass it
+            return dump_json(page), ({"X-Next-Cursor": next_cursor} if next_cursor else {})
+    
+    key = ("prompts", category, tag, tuple(tag_list), match, limit, cursor, sort, order, fields)
+    try:
+        return await cached_json(extension, key, if_none_match, build)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/tags", response_model=List[TagCount])
+async def get_tags(
+    category: Optional[str] = None,
+    prefix: Optional[str] = Query(None, description="Only tags starting with this"),
+    limit: Optional[int] = Query(None, ge=1, le=10000),
+    if_none_match: Optional[str] = Header(None),
+    extension: Any = Depends(scoped_library)
+):
+    """Get the tags in use with their prompt counts, most used first"""
+    
+    def build():
+        return dump_json(extension.get_tags(category, prefix, limit)), {}
+    
+    return await cached_json(extension, ("tags", category, prefix, limit), if_none_match, build)
+
+@router.get("/facets", response_model=Facets)
+async def get_facets(
+    tags: Optional[str] = Query(None, description="Comma-separated tags to filter by"),
+    match: str = Query("all", description="all (every tag) or any (at least one tag)"),
+    category: Optional[str] = None,
+    limit: Optional[int] = Query(100, ge=1, le=10000, description="Maximum number of tags counted"),
+    if_none_match: Optional[str] = Header(None),
+    extension: Any = Depends(scoped_library)
+):
+    """
+    Count the prompts matching a filter per category and per tag
+    
+    Counts come from the tag index, so the front end can build a tag cloud
+    or filter sidebar without downloading the prompts.
+    """
+    tag_list = split_list(tags)
+    
+    def build():
+        return dump_json(extension.get_facets(tag_list, match, category, limit)), {}
+    
+    try:
+        return await cached_json(extension, ("facets", tuple(tag_list), match, category, limit), if_none_match, build)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/prompts/{prompt_id}", response_model=Prompt)
-async def get_prompt(prompt_id: str):
-    """Get a prompt by ID"""
-    extension = get_extension()
-    prompt = extension.get_prompt(prompt_id)
+async def get_prompt(prompt_id: str, response: Response, extension: Any = Depends(scoped_library)):
+    """Get a prompt by ID, with its version as the ETag"""
+    prompt = await run_read(extension.get_prompt, prompt_id)
     
     if prompt is None:
         raise HTTPException(status_code=404, detail=f"Prompt not found: {prompt_id}")
     
+    response.headers["ETag"] = etag(prompt_version(prompt))
     return prompt
 
 @router.post("/prompts", response_model=Prompt)
-async def create_prompt(prompt: PromptCreate):
-    """Create a new prompt"""
-    extension = get_extension()
+async def create_prompt(prompt: PromptCreate, response: Response, allow_duplicates: bool = False, extension: Any = Depends(scoped_library)):
+    """
+    Create a new prompt
+    
+    Fails with 409, listing the existing prompts, if the new prompt's title
+    and content are at least duplicateThreshold similar to one already in
+    the library, unless allow_duplicates is set. Fails with 403 once the
+    library holds maxPrompts prompts, and with 400 for an invalid prompt.
+    """
     
     # Convert to dictionary
     prompt_dict = prompt.dict()
     
+    if not allow_duplicates:
+        duplicates = await run_read(extension.find_duplicates, prompt_dict)
+        if duplicates:
+            raise HTTPException(status_code=409, detail={
+                "message": "Similar prompts already exist; set allow_duplicates to create it anyway",
+                "similar": [
+                    {"id": duplicate["id"], "title": duplicate["title"], "similarity": duplicate["similarity"]}
+                    for duplicate in duplicates
+                ]
+            })
+    
     # Add the prompt
-    prompt_id = extension.add_prompt(prompt_dict)
+    try:
+        prompt_id = await run_write(extension.add_prompt, prompt_dict)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except QuotaExceeded as e:
+        raise HTTPException(status_code=403, detail=str(e))
     
     # Return the prompt
-    return extension.prompts[prompt_id]
+    created = await run_read(extension.get_prompt, prompt_id)
+    response.headers["ETag"] = etag(prompt_version(created))
+    return created
 
 @router.put("/prompts/{prompt_id}", response_model=Prompt)
-async def update_prompt(prompt_id: str, prompt: PromptUpdate):
-    """Update a prompt"""
-    extension = get_extension()
+async def update_prompt(
+    prompt_id: str,
+    prompt: PromptUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None, description="ETag of the version being replaced"),
+    extension: Any = Depends(scoped_library)
+):
+    """
+    Update a prompt
+    
+    With an If-Match header the update only applies if the prompt is still at
+    that version; otherwise it fails with 412 and the current ETag. Fails
+    with 400 for an invalid prompt.
+    """
+    expected_version = parse_if_match(if_match)
     
     # Check if prompt exists
-    if extension.get_prompt(prompt_id) is None:
+    if await run_read(extension.get_prompt, prompt_id) is None:
         raise HTTPException(status_code=404, detail=f"Prompt not found: {prompt_id}")
     
     # Convert to dictionary
@@ -125,58 +534,361 @@ async def update_prompt(prompt_id: str, prompt: PromptUpdate):
     prompt_dict["id"] = prompt_id
     
     # Update the prompt
-    success = extension.update_prompt(prompt_id, prompt_dict)
+    try:
+        success = await run_write(extension.update_prompt, prompt_id, prompt_dict, expected_version)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except VersionConflict as e:
+        headers = {"ETag": etag(e.current_version)} if e.current_version is not None else {}
+        raise HTTPException(status_code=412, detail=str(e), headers=headers)
     
     if not success:
         raise HTTPException(status_code=400, detail="Failed to update prompt")
     
     # Return the updated prompt
-    return extension.prompts[prompt_id]
+    updated = await run_read(extension.get_prompt, prompt_id)
+    response.headers["ETag"] = etag(prompt_version(updated))
+    return updated
 
 @router.delete("/prompts/{prompt_id}")
-async def delete_prompt(prompt_id: str):
+async def delete_prompt(prompt_id: str, extension: Any = Depends(scoped_library)):
     """Delete a prompt"""
-    extension = get_extension()
     
     # Check if prompt exists
-    if extension.get_prompt(prompt_id) is None:
+    if await run_read(extension.get_prompt, prompt_id) is None:
         raise HTTPException(status_code=404, detail=f"Prompt not found: {prompt_id}")
     
     # Delete the prompt
-    success = extension.delete_prompt(prompt_id)
+    success = await run_write(extension.delete_prompt, prompt_id)
     
     if not success:
         raise HTTPException(status_code=400, detail="Failed to delete prompt")
     
     return {"message": f"Prompt deleted: {prompt_id}"}
 
+@router.post("/prompts/bulk")
+async def bulk_prompts(request: BulkRequest, extension: Any = Depends(scoped_library)):
+    """
+    Create, update and delete prompts in one atomic request
+    
+    Operations apply in order and either all of them are applied or none is.
+    The response lists each operation's result with its own status code. The
+    request fails with 400 if any operation is invalid, and with 409 if any
+    conflicts with the library (not found, already exists, a mismatched
+    expected_version or creates past maxPrompts).
+    """
+    
+    max_operations = int(extension.config.get("bulkMaxOperations", 10000))
+    if len(request.operations) > max_operations:
+        raise HTTPException(status_code=413, detail=f"At most {max_operations} operations per request")
+    
+    operations = [operation.dict() for operation in request.operations]
+    outcome = await run_write(extension.apply_operations, operations)
+    
+    status_code = 200
+    if not outcome["applied"]:
+        invalid = any(result["status"] == 400 for result in outcome["results"])
+        status_code = 400 if invalid else 409
+    return JSONResponse(status_code=status_code, content=outcome)
+
+@router.post("/prompts/{prompt_id}/use", status_code=204)
+async def use_prompt(prompt_id: str, extension: Any = Depends(scoped_library)):
+    """
+    Record that a prompt was inserted into a chat
+    
+    Checking that the prompt exists may query the store, so it runs on the
+    executor; recording only buffers the use, so it runs on the event loop.
+    Counts and rankings are updated in the background.
+    """
+    if not await run_read(extension.has_prompt, prompt_id):
+        raise HTTPException(status_code=404, detail=f"Prompt not found: {prompt_id}")
+    extension.record_usage(prompt_id)
+    return Response(status_code=204)
+
+@router.get("/usage", response_model=List[UsageResult])
+async def get_usage(
+    sort: str = Query("score", description="score, count or recent"),
+    limit: int = Query(10, ge=1, le=100),
+    category: Optional[str] = None,
+    extension: Any = Depends(scoped_library)
+):
+    """
+    Get the most used prompts
+    
+    Sort by "score" (uses, each counting half as much after
+    usageHalfLifeHours), "count" (all-time uses) or "recent" (last used).
+    """
+    try:
+        return await run_read(extension.get_usage_ranking, sort, limit, category)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/search", response_model=List[SearchResult])
+async def search_prompts(
+    q: str = Query(..., min_length=1, description="Search query; the last term is matched as a prefix"),
+    category: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    extension: Any = Depends(scoped_library)
+):
+    """Search prompts by title, description, content and tags"""
+    return await run_read(extension.search_prompts, q, category, limit)
+
+@router.get("/prompts/{prompt_id}/similar", response_model=List[SimilarPrompt])
+async def get_similar_prompts(
+    prompt_id: str,
+    category: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=100),
+    extension: Any = Depends(scoped_library)
+):
+    """Find the prompts most similar to a prompt by title and content"""
+    try:
+        results = await run_read(extension.get_similar_prompts, prompt_id, limit, category)
+    except RuntimeError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    
+    if results is None:
+        raise HTTPException(status_code=404, detail=f"Prompt not found: {prompt_id}")
+    
+    return results
+
+@router.post("/prompts/similar", response_model=List[SimilarPrompt])
+async def find_similar_prompts(
+    query: SimilarQuery,
+    category: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=100),
+    extension: Any = Depends(scoped_library)
+):
+    """Find the prompts most similar to a title and content, e.g. while one is being written"""
+    try:
+        return await run_read(extension.find_similar, query.dict(), limit, category)
+    except RuntimeError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+
+async def render_item(extension: Any, kind: str, item_id: str, request: RenderRequest) -> Dict[str, str]:
+    """Render a prompt or template, mapping failures to HTTP errors"""
+    try:
+        content = await run_read(extension.render, kind, item_id, request.variables, request.strict)
+    except MissingVariables as e:
+        raise HTTPException(status_code=422, detail={"message": str(e), "missing": e.names})
+    
+    if content is None:
+        raise HTTPException(status_code=404, detail=f"{kind.capitalize()} not found: {item_id}")
+    
+    return {"id": item_id, "content": content}
+
+async def describe_item(extension: Any, kind: str, item_id: str) -> List[Dict[str, Any]]:
+    """Describe the variables of a prompt or template"""
+    variables = await run_read(extension.get_variables, kind, item_id)
+    
+    if variables is None:
+        raise HTTPException(status_code=404, detail=f"{kind.capitalize()} not found: {item_id}")
+    
+    return variables
+
+async def render_batch(extension: Any, kind: str, item_id: str, request: Request, strict: bool) -> StreamingResponse:
+    """
+    Render a prompt or template once per NDJSON row of the request body
+    
+    The content is compiled once and every row is rendered from that
+    compiled form. Results are spooled (to disk past a megabyte) while the
+    body is read, then streamed back as NDJSON.
+    """
+    compiled = await run_read(extension.get_compiled, kind, item_id)
+    if compiled is None:
+        raise HTTPException(status_code=404, detail=f"{kind.capitalize()} not found: {item_id}")
+    
+    renderer = BatchRenderer(item_id, compiled, strict=strict)
+    output = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    try:
+        async for chunk in request.stream():
+            if chunk:
+                output.write(await run_read(renderer.feed, chunk))
+        output.write(renderer.finish())
+        output.seek(0)
+    except BaseException:
+        output.close()
+        raise
+    
+    async def results() -> AsyncIterator[bytes]:
+        try:
+            while True:
+                chunk = output.read(64 * 1024)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            output.close()
+    
+    return StreamingResponse(
+        results(),
+        media_type="application/x-ndjson",
+        headers={"X-Rendered-Count": str(renderer.rendered), "X-Error-Count": str(renderer.error_count)}
+    )
+
+@router.post("/prompts/{prompt_id}/render", response_model=RenderResult)
+async def render_prompt(prompt_id: str, request: RenderRequest = Body(default_factory=RenderRequest), extension: Any = Depends(scoped_library)):
+    """
+    Render a prompt's [variable] placeholders
+    
+    Variables without a value use their default. In strict mode (the default)
+    missing required variables fail with 422 and are listed under "missing";
+    otherwise their placeholders are left in place.
+    """
+    return await render_item(extension, "prompt", prompt_id, request)
+
+@router.post("/prompts/{prompt_id}/render/batch")
+async def render_prompt_batch(prompt_id: str, request: Request, strict: bool = True, extension: Any = Depends(scoped_library)):
+    """
+    Render a prompt for each line of an NDJSON body (optionally gzipped)
+    
+    Each line is an object of variable values. Each result line is
+    {"line", "id", "content"}, or {"line", "id", "error"} (plus "missing" in
+    strict mode) for a row that could not be rendered.
+    """
+    return await render_batch(extension, "prompt", prompt_id, request, strict)
+
+@router.get("/prompts/{prompt_id}/variables", response_model=List[Variable])
+async def get_prompt_variables(prompt_id: str, extension: Any = Depends(scoped_library)):
+    """List the [variable] placeholders of a prompt"""
+    return await describe_item(extension, "prompt", prompt_id)
+
+@router.get("/stats")
+async def get_stats():
+    """Get the write-behind flusher, executor and cache statistics"""
+    return get_extension().stats()
+
+@router.get("/metrics")
+async def get_metrics():
+    """Get request latency histograms, operation timers, cache counters and library size in the Prometheus text format"""
+    body = get_extension().metrics.render()
+    return Response(content=body, media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@router.get("/profiler")
+async def get_profiler():
+    """Get the slow-request profiler settings and the slow requests it captured"""
+    return get_extension().profiler.report()
+
+@router.put("/profiler")
+async def configure_profiler(settings: ProfilerSettings):
+    """
+    Turn the slow-request profiler on or off, or change its threshold or sampling interval
+    
+    While enabled, requests taking at least threshold_ms keep the stack
+    samples taken while they ran, as collapsed stacks with sample counts.
+    """
+    profiler = get_extension().profiler
+    profiler.configure(
+        enabled=settings.enabled,
+        threshold=settings.threshold_ms / 1000.0 if settings.threshold_ms is not None else None,
+        interval=settings.interval_ms / 1000.0 if settings.interval_ms is not None else None
+    )
+    return profiler.report()
+
 @router.get("/templates")
-async def get_templates(category: Optional[str] = None):
-    """Get templates, optionally filtered by category"""
+async def get_templates(category: Optional[str] = None, if_none_match: Optional[str] = Header(None)):
+    """Get templates, optionally filtered by category; cached like GET /prompts"""
     extension = get_extension()
-    return extension.get_templates(category)
+    
+    def build():
+        return dump_json(extension.get_templates(category)), {}
+    
+    return await cached_json(extension, ("templates", category), if_none_match, build)
+
+@router.get("/templates/{template_id}")
+async def get_template(template_id: str):
+    """Get a template by ID"""
+    extension = get_extension()
+    template = await run_read(extension.get_template, template_id)
+    
+    if not template:
+        raise HTTPException(status_code=404, detail=f"Template not found: {template_id}")
+    
+    return template
+
+@router.post("/templates/{template_id}/render", response_model=RenderResult)
+async def render_template(template_id: str, request: RenderRequest = Body(default_factory=RenderRequest)):
+    """Render a template's [variable] placeholders, as for prompts"""
+    return await render_item(get_extension(), "template", template_id, request)
+
+@router.post("/templates/{template_id}/render/batch")
+async def render_template_batch(template_id: str, request: Request, strict: bool = True):
+    """Render a template for each line of an NDJSON body, as for prompts"""
+    return await render_batch(get_extension(), "template", template_id, request, strict)
+
+@router.get("/templates/{template_id}/variables", response_model=List[Variable])
+async def get_template_variables(template_id: str):
+    """List the [variable] placeholders of a template"""
+    return await describe_item(get_extension(), "template", template_id)
 
 @router.post("/export")
-async def export_prompts():
+async def export_prompts(extension: Any = Depends(scoped_library)):
     """Export all prompts and categories"""
-    extension = get_extension()
-    return extension.export_prompts()
+    return await run_read(extension.export_prompts)
 
 @router.post("/import")
-async def import_prompts(data: ImportData):
-    """Import prompts and categories"""
-    extension = get_extension()
+async def import_prompts(data: ImportData, dry_run: bool = False, skip_duplicates: bool = False, extension: Any = Depends(scoped_library)):
+    """
+    Import prompts and categories
+    
+    Unchanged records are skipped and near-duplicates of other prompts are
+    reported, and only skipped with skip_duplicates. The response's diff
+    counts added, changed, unchanged and duplicate records, and new prompts
+    skipped because the library holds maxPrompts; with dry_run nothing is
+    written.
+    """
     
     # Convert to dictionary
     import_data = data.dict()
     
     # Import the data
-    success = extension.import_prompts(import_data)
+    diff = await run_write(extension.import_prompts, import_data, dry_run, skip_duplicates)
     
-    if not success:
+    if diff is None:
         raise HTTPException(status_code=400, detail="Failed to import prompts")
     
-    return {"message": "Prompts imported successfully"}
+    message = "Import checked" if dry_run else "Prompts imported successfully"
+    return {"message": message, "diff": diff}
+
+@router.post("/export/stream")
+async def export_prompts_stream(gzip: bool = False, extension: Any = Depends(scoped_library)):
+    """
+    Stream all categories and prompts as NDJSON
+    
+    Each line is {"type": "category" | "prompt", "data": {...}}. Records are
+    encoded lazily from the store, so memory use does not grow with the library.
+    """
+    require_ready()
+    filename = "prompt-library-export.ndjson" + (".gz" if gzip else "")
+    
+    return StreamingResponse(
+        iter_export(extension, compress=gzip),
+        media_type="application/gzip" if gzip else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@router.post("/import/stream")
+async def import_prompts_stream(
+    request: Request,
+    batch_size: int = Query(500, ge=1, le=10000),
+    dry_run: bool = False,
+    skip_duplicates: bool = False,
+    extension: Any = Depends(scoped_library)
+):
+    """
+    Import an NDJSON export (optionally gzipped) from the request body
+    
+    Records are parsed and validated one at a time as the body arrives and
+    applied in batches of batch_size. Invalid lines are skipped and reported,
+    as are unchanged records and near-duplicates (see POST /import).
+    """
+    importer = StreamingImporter(extension, batch_size=batch_size, dry_run=dry_run, skip_duplicates=skip_duplicates)
+    
+    # Parsing and applying run on the write pool; reads keep their own threads
+    async for chunk in request.stream():
+        if chunk:
+            await run_write(importer.feed, chunk)
+    
+    return await run_write(importer.finish)
 
 def register_routes(app):
     """
@@ -0,0 +1,196 @@
+"""
+Shared helpers for the Prompt Library benchmark scripts
+
+The extension directory name is not a valid Python identifier, so the
+package is loaded from its path under the name "prompt_library".
+"""
+
+import os
+import sys
+import json
+import math
+import random
+import tempfile
+import itertools
+import importlib
+import importlib.util
+from typing import Any, Dict, List, Optional, Tuple, Iterable, Iterator
+
+EXTENSION_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE_NAME = "prompt_library"
+
+def load_package() -> Any:
+    """
+    Import the extension package
+    
+    Returns:
+        Any: The prompt_library module
+    """
+    if PACKAGE_NAME in sys.modules:
+        return sys.modules[PACKAGE_NAME]
+    spec = importlib.util.spec_from_file_location(
+        PACKAGE_NAME,
+        os.path.join(EXTENSION_DIR, "__init__.py"),
+        submodule_search_locations=[EXTENSION_DIR]
+    )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[PACKAGE_NAME] = module
+    spec.loader.exec_module(module)
+    return module
+
+def create_app(config: Optional[Dict[str, Any]] = None) -> Tuple[Any, Any]:
+    """
+    Initialize a fresh extension in a temporary storage directory
+    
+    Args:
+        config (Optional[Dict[str, Any]]): Config overrides
+    
+    Returns:
+        Tuple[Any, Any]: FastAPI app and the extension instance
+    """
+    from fastapi import FastAPI
+    
+    package = load_package()
+    api = importlib.import_module(f"{PACKAGE_NAME}.api")
+    
+    package._extension_instance = None
+    extension = package.get_extension()
+    extension.config["storageDir"] = tempfile.mkdtemp(prefix="prompt-library-bench-")
+    extension.config.update(config or {})
+    extension.initialize()
+    extension.wait_until_ready()
+    
+    app = FastAPI()
+    api.register_routes(app)
+    return app, extension
+
+def populate(extension: Any, records: int, batch_size: int = 1000) -> None:
+    """
+    Import a synthetic library directly through the extension
+    
+    Args:
+        extension (Any): Initialized extension
+        records (int): Number of prompts, all in the "bench" category
+        batch_size (int): Records applied per import batch
+    """
+    batch = [("category", {"id": "bench", "name": "Bench", "description": "", "icon": "folder"})]
+    for i in range(records):
+        batch.append(("prompt", {
+            "id": f"bench-{i}",
+            "title": f"Benchmark prompt {i}",
+            "content": f"Write a summary of [document] {i} in five bullet points.",
+            "description": "Generated by a benchmark",
+            "category": "bench",
+            "tags": ["bench", f"group-{i % 50}"]
+        }))
+        if len(batch) >= batch_size:
+            extension.import_records(batch)
+            batch = []
+    if batch:
+        extension.import_records(batch)
+
+def synthetic_records(records: int, seed: int = 0) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Generate a realistic synthetic library as import records
+    
+    Prompts are derived from the bundled templates in static/templates: each
+    starts from a template's title, description, content and variables.
+    Content lengths follow a log-normal distribution (median about 600
+    characters, with a long tail past 8 KB). Each prompt gets 1-5 tags drawn
+    with a Zipf-like skew from the templates' tags and a long tail of rarer
+    ones. Most prompts keep their template's category.
+    
+    Args:
+        records (int): Number of prompts, with IDs "bench-0" onwards
+        seed (int): Random seed; equal seeds generate equal libraries
+    
+    Returns:
+        Iterator[Tuple[str, Dict[str, Any]]]: ("category" | "prompt", data)
+            pairs, categories first
+    """
+    templates = []
+    templates_dir = os.path.join(EXTENSION_DIR, "static", "templates")
+    for name in sorted(os.listdir(templates_dir)):
+        if name.endswith(".json"):
+            with open(os.path.join(templates_dir, name), "r", encoding="utf-8") as f:
+                templates.extend(json.load(f))
+    
+    categories = sorted({template["category"] for template in templates} | {"general", "bench"})
+    for category in categories:
+        yield "category", {"id": category, "name": category.capitalize(), "description": "", "icon": "folder"}
+    
+    vocabulary = list(dict.fromkeys(tag for template in templates for tag in template.get("tags", [])))
+    vocabulary += [f"topic-{n}" for n in range(1000)]
+    tag_weights = list(itertools.accumulate(1.0 / (rank + 1) for rank in range(len(vocabulary))))
+    sentences = [sentence.strip() + "." for template in templates for sentence in template["content"].split(".") if sentence.strip()]
+    
+    rnd = random.Random(seed)
+    for i in range(records):
+        template = templates[i % len(templates)]
+        length = min(20000, max(40, int(rnd.lognormvariate(math.log(600), 0.8))))
+        content = template["content"]
+        while len(content) < length:
+            content += " " + rnd.choice(sentences)
+        
+        yield "prompt", {
+            "id": f"bench-{i}",
+            "title": f"{template['title']} {i}",
+            "content": content[:length],
+            "description": template["description"],
+            "category": template["category"] if rnd.random() < 0.8 else rnd.choice(categories),
+            "tags": list(dict.fromkeys(rnd.choices(vocabulary, cum_weights=tag_weights, k=rnd.randint(1, 5)))),
+            "variables": template.get("variables", [])
+        }
+
+def load_records(extension: Any, records: Iterable[Tuple[str, Dict[str, Any]]], batch_size: int = 1000) -> int:
+    """
+    Import records directly through the extension in batches
+    
+    Args:
+        extension (Any): Initialized extension
+        records (Iterable[Tuple[str, Dict[str, Any]]]): Import records
+        batch_size (int): Records applied per import batch
+    
+    Returns:
+        int: Number of records imported
+    """
+    count = 0
+    records = iter(records)
+    for batch in iter(lambda: list(itertools.islice(records, batch_size)), []):
+        extension.import_records(batch)
+        count += len(batch)
+    return count
+
+def percentile(values: List[float], fraction: float) -> float:
+    """
+    Get a percentile of a list of values
+    
+    Args:
+        values (List[float]): Samples
+        fraction (float): Percentile as a fraction, e.g. 0.99
+    
+    Returns:
+        float: The percentile, or 0.0 without samples
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    """
+    Summarize latency samples in milliseconds
+    
+    Args:
+        values (List[float]): Latencies in seconds
+    
+    Returns:
+        Dict[str, float]: Count, p50, p95, p99 and max
+    """
+    return {
+        "count": len(values),
+        "p50_ms": round(percentile(values, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(values, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(values, 0.99) * 1000, 2),
+        "max_ms": round(max(values, default=0.0) * 1000, 2)
+    }
@@ -0,0 +1,108 @@
+"""
+Bulk write benchmark: single requests against one bulk request
+
+--operations prompts are created one POST /prompts request at a time, then
+updated with one PUT each, and the same creates and updates are sent again as
+single POST /prompts/bulk requests. Each phase starts from a library of
+--records prompts, so the ordered indexes have their real size.
+
+Usage:
+    python benchmarks/bulk_writes.py [--backend log] [--records 10000] [--operations 5000]
+"""
+
+import json
+import time
+import asyncio
+import logging
+import argparse
+from typing import Any, Dict, List
+
+import httpx
+
+from _harness import create_app, populate
+
+PREFIX = "/api/extensions/prompt-library"
+
+def prompt_data(i: int, revision: int) -> Dict[str, Any]:
+    """Get the request body for one benchmark prompt"""
+    return {
+        "title": f"Bulk prompt {i}, revision {revision}",
+        "content": f"Rewrite paragraph {i} of [document] for [audience].",
+        "description": "Written by the bulk benchmark",
+        "category": "bench",
+        "tags": ["bulk", f"group-{i % 50}"]
+    }
+
+async def singles(client: httpx.AsyncClient, operations: int) -> Dict[str, float]:
+    """Create and then update prompts with one request each"""
+    ids: List[str] = []
+    start = time.perf_counter()
+    for i in range(operations):
+        response = await client.post(f"{PREFIX}/prompts", json=prompt_data(i, 0))
+        response.raise_for_status()
+        ids.append(response.json()["id"])
+    created = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    for i, prompt_id in enumerate(ids):
+        response = await client.put(f"{PREFIX}/prompts/{prompt_id}", json=prompt_data(i, 1))
+        response.raise_for_status()
+    updated = time.perf_counter() - start
+    
+    return {"create_s": round(created, 3), "update_s": round(updated, 3)}
+
+async def bulk(client: httpx.AsyncClient, operations: int) -> Dict[str, float]:
+    """Create and then update prompts with one bulk request each"""
+    creates = [{"op": "create", "id": f"bulk-{i}", "prompt": prompt_data(i, 0)} for i in range(operations)]
+    start = time.perf_counter()
+    response = await client.post(f"{PREFIX}/prompts/bulk", json={"operations": creates})
+    response.raise_for_status()
+    created = time.perf_counter() - start
+    
+    updates = [{"op": "update", "id": f"bulk-{i}", "prompt": prompt_data(i, 1)} for i in range(operations)]
+    start = time.perf_counter()
+    response = await client.post(f"{PREFIX}/prompts/bulk", json={"operations": updates})
+    response.raise_for_status()
+    updated = time.perf_counter() - start
+    
+    return {"create_s": round(created, 3), "update_s": round(updated, 3)}
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    """Time both ways of writing the same operations"""
+    results = {}
+    for name, phase in (("single", singles), ("bulk", bulk)):
+        app, extension = create_app({"storageBackend": args.backend, "bulkMaxOperations": args.operations})
+        populate(extension, args.records)
+        transport = httpx.ASGITransport(app=app)
+        try:
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+                results[name] = await phase(client, args.operations)
+        finally:
+            extension.shutdown()
+    
+    speedup = {
+        key: round(results["single"][key] / results["bulk"][key], 1) if results["bulk"][key] else None
+        for key in ("create_s", "update_s")
+    }
+    return {
+        "backend": args.backend,
+        "records": args.records,
+        "operations": args.operations,
+        **results,
+        "speedup": speedup
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", default="log", choices=("log", "sqlite", "memory"))
+    parser.add_argument("--records", type=int, default=10000, help="Prompts in the library before the writes")
+    parser.add_argument("--operations", type=int, default=5000, help="Prompts created and then updated per phase")
+    args = parser.parse_args()
+    
+    # Per-request client logging would dominate the measurement
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Load test: GET /prompts latency while a bulk streaming import runs
+
+Concurrent readers request GET /prompts at a fixed rate, first on an idle
+library and then while POST /import/stream applies a large NDJSON body. With extension
+calls running on the executor, reads keep being served while the import
+runs; they only share the interpreter with it. --inline runs extension calls
+on the event loop instead, as the routes used to, for comparison.
+
+Usage:
+    python benchmarks/concurrent_reads.py [--backend log] [--records 50000] [--inline]
+"""
+
+import json
+import time
+import logging
+import asyncio
+import argparse
+from typing import Any, AsyncIterator, Callable, Dict, List
+
+import httpx
+
+from _harness import create_app, summarize
+
+PREFIX = "/api/extensions/prompt-library"
+
+class InlineExecutor:
+    """Stand-in executor that runs calls directly on the event loop"""
+    
+    async def read(self, fn: Callable, *args, **kwargs) -> Any:
+        return fn(*args, **kwargs)
+    
+    async def write(self, fn: Callable, *args, **kwargs) -> Any:
+        return fn(*args, **kwargs)
+    
+    def shutdown(self) -> None:
+        pass
+
+async def reader(
+    client: httpx.AsyncClient,
+    stop: asyncio.Event,
+    interval: float,
+    offset: float,
+    latencies: List[float]
+) -> None:
+    """
+    Request a page of prompts every interval seconds until stopped
+    
+    Latency is measured from when each request was due, so time spent
+    waiting for a blocked event loop is counted.
+    """
+    loop = asyncio.get_running_loop()
+    due = loop.time() + offset
+    while not stop.is_set():
+        await asyncio.sleep(max(0.0, due - loop.time()))
+        response = await client.get(f"{PREFIX}/prompts", params={"limit": 50, "sort": "updated_at"})
+        latencies.append(loop.time() - due)
+        response.raise_for_status()
+        due += interval
+
+def ndjson_chunks(records: int, chunk_records: int = 1000) -> List[bytes]:
+    """Build an NDJSON import body up front so encoding it isn't measured"""
+    chunks = [json.dumps({"type": "category", "data": {"id": "bench", "name": "Bench"}}).encode("utf-8") + b"\n"]
+    lines = []
+    for i in range(records):
+        prompt = {
+            "id": f"bench-{i}",
+            "title": f"Benchmark prompt {i}",
+            "content": f"Write a summary of document {i} in five bullet points.",
+            "description": "Generated by the concurrent reads benchmark",
+            "category": "bench",
+            "tags": ["bench", f"group-{i % 50}"]
+        }
+        lines.append(json.dumps({"type": "prompt", "data": prompt}))
+        if len(lines) >= chunk_records:
+            chunks.append(("\n".join(lines) + "\n").encode("utf-8"))
+            lines = []
+    if lines:
+        chunks.append(("\n".join(lines) + "\n").encode("utf-8"))
+    return chunks
+
+async def stream_body(chunks: List[bytes]) -> AsyncIterator[bytes]:
+    """Send body chunks one at a time, as a slow client upload would"""
+    for chunk in chunks:
+        yield chunk
+        await asyncio.sleep(0)
+
+async def measure(client: httpx.AsyncClient, readers: int, rate: float, work: Any) -> List[float]:
+    """Run readers concurrently with a unit of work and collect their latencies"""
+    stop = asyncio.Event()
+    latencies: List[float] = []
+    interval = readers / rate
+    tasks = [
+        asyncio.create_task(reader(client, stop, interval, i * interval / readers, latencies))
+        for i in range(readers)
+    ]
+    try:
+        await work
+    finally:
+        stop.set()
+        await asyncio.gather(*tasks)
+    return latencies
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    """Run the baseline and bulk import phases"""
+    app, extension = create_app({"storageBackend": args.backend})
+    if args.inline:
+        extension._executor = InlineExecutor()
+    transport = httpx.ASGITransport(app=app)
+    
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            baseline = await measure(client, args.readers, args.rate, asyncio.sleep(args.baseline_seconds))
+            
+            chunks = ndjson_chunks(args.records)
+            import_result: Dict[str, Any] = {}
+            
+            async def bulk_import() -> None:
+                start = time.perf_counter()
+                response = await client.post(
+                    f"{PREFIX}/import/stream",
+                    content=stream_body(chunks),
+                    params={"batch_size": 500}
+                )
+                response.raise_for_status()
+                import_result.update(response.json())
+                import_result["seconds"] = round(time.perf_counter() - start, 2)
+            
+            during = await measure(client, args.readers, args.rate, bulk_import())
+    finally:
+        extension.shutdown()
+    
+    return {
+        "backend": args.backend,
+        "executor": "inline" if args.inline else "threads",
+        "readers": args.readers,
+        "rate": args.rate,
+        "records": args.records,
+        "import": {key: import_result.get(key) for key in ("prompts", "error_count", "seconds")},
+        "baseline": summarize(baseline),
+        "during_import": summarize(during)
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", default="log", choices=("log", "sqlite", "memory"))
+    parser.add_argument("--records", type=int, default=50000)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=200.0, help="Total GET /prompts requests per second")
+    parser.add_argument("--baseline-seconds", type=float, default=3.0)
+    parser.add_argument("--inline", action="store_true", help="Run extension calls on the event loop")
+    args = parser.parse_args()
+    
+    # Per-request client logging would dominate the measurement
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+List serialization benchmark: GET /prompts on a large library
+
+Builds the full GET /prompts body for --records prompts in several ways:
+
+- pydantic: validating every prompt with the Prompt response model and
+  encoding the list, as the response_model route used to
+- fragments_cold: encoding every prompt into an empty fragment cache
+- fragments_warm: concatenating cached fragments
+- one_changed: concatenating after one prompt was updated, so only it is
+  encoded again
+
+The last row times whole HTTP requests with the response cache disabled, so
+every request assembles its body from fragments.
+
+Usage:
+    python benchmarks/list_serialization.py [--backend log] [--records 10000] [--runs 20]
+"""
+
+import json
+import time
+import asyncio
+import logging
+import argparse
+import importlib
+from typing import Any, Callable, Dict
+
+import httpx
+from fastapi.encoders import jsonable_encoder
+
+from _harness import PACKAGE_NAME, create_app, populate, percentile
+
+PREFIX = "/api/extensions/prompt-library"
+
+def time_ms(fn: Callable[[], Any], runs: int) -> float:
+    """Get the median time of fn() in milliseconds"""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return round(percentile(samples, 0.5) * 1000, 2)
+
+async def http_ms(app: Any, runs: int) -> float:
+    """Get the median GET /prompts request time in milliseconds"""
+    transport = httpx.ASGITransport(app=app)
+    samples = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for _ in range(runs):
+            start = time.perf_counter()
+            response = await client.get(f"{PREFIX}/prompts")
+            response.raise_for_status()
+            samples.append(time.perf_counter() - start)
+    return round(percentile(samples, 0.5) * 1000, 2)
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    """Time each way of building the list body"""
+    app, extension = create_app({"storageBackend": args.backend, "responseCacheBytes": 0})
+    api = importlib.import_module(f"{PACKAGE_NAME}.api")
+    response_cache = importlib.import_module(f"{PACKAGE_NAME}.response_cache")
+    populate(extension, args.records)
+    
+    def pydantic() -> bytes:
+        prompts = extension.get_prompts()
+        return response_cache.dump_json([jsonable_encoder(api.Prompt(**prompt)) for prompt in prompts])
+    
+    def fragments_cold() -> bytes:
+        extension.prompt_fragments.clear()
+        return extension.get_prompts_json()
+    
+    counter = iter(range(10 ** 9))
+    
+    def one_changed() -> bytes:
+        prompt = extension.get_prompt("bench-0")
+        prompt["title"] = f"Benchmark prompt 0, edit {next(counter)}"
+        extension.update_prompt("bench-0", prompt)
+        return extension.get_prompts_json()
+    
+    try:
+        if pydantic() != extension.get_prompts_json():
+            raise RuntimeError("Fragment output differs from the Prompt model output")
+        
+        results = {
+            "pydantic_ms": time_ms(pydantic, args.runs),
+            "fragments_cold_ms": time_ms(fragments_cold, args.runs),
+            "fragments_warm_ms": time_ms(extension.get_prompts_json, args.runs),
+            "one_changed_ms": time_ms(one_changed, args.runs),
+            "http_get_prompts_ms": asyncio.run(http_ms(app, args.runs))
+        }
+    finally:
+        extension.shutdown()
+    
+    results["warm_speedup"] = round(results["pydantic_ms"] / results["fragments_warm_ms"], 1)
+    return {"backend": args.backend, "records": args.records, "runs": args.runs, **results}
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", default="log", choices=("log", "sqlite", "memory"))
+    parser.add_argument("--records", type=int, default=10000)
+    parser.add_argument("--runs", type=int, default=20, help="Repetitions per measurement; the median is reported")
+    args = parser.parse_args()
+    
+    # Per-request client logging would dominate the measurement
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    
+    print(json.dumps(run(args), indent=2))
+
+if __name__ == "__main__":
+    main()
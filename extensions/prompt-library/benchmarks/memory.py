@@ -0,0 +1,121 @@
+"""
+Memory benchmark: bytes per prompt as dictionaries and as compact records
+
+Prompts are decoded from JSON lines, as the log store does when it opens, and
+held as plain dictionaries (how prompts used to be kept) and then as
+PromptRecords, with and without content compression. Each representation is
+measured with tracemalloc. The last rows measure a whole MemoryPromptStore
+with its category, tag and ordered indexes.
+
+Usage:
+    python benchmarks/memory.py [--records 100000] [--content-bytes 400] [--compress-bytes 256]
+"""
+
+import gc
+import json
+import random
+import argparse
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List
+
+from _harness import load_package
+
+WORDS = (
+    "summarize explain review rewrite translate outline compare draft the a of "
+    "code text report email story data results key points audience tone style"
+).split()
+
+def generate_lines(records: int, content_bytes: int, seed: int = 1) -> List[str]:
+    """Encode a synthetic library as JSON lines"""
+    rng = random.Random(seed)
+    categories = [f"category-{i}" for i in range(20)]
+    tags = [f"tag-{i}" for i in range(500)]
+    start = datetime(2025, 1, 1)
+    lines = []
+    for i in range(records):
+        created = start + timedelta(seconds=rng.randint(0, 30_000_000), microseconds=rng.randint(0, 999_999))
+        words, length = [], 0
+        while length < content_bytes:
+            word = rng.choice(WORDS)
+            words.append(word)
+            length += len(word) + 1
+        lines.append(json.dumps({
+            "id": f"prompt-{i:08x}",
+            "title": f"{rng.choice(WORDS).capitalize()} {rng.choice(WORDS)} {i}",
+            "content": " ".join(words),
+            "description": f"{rng.choice(WORDS).capitalize()} the {rng.choice(WORDS)} for [audience]",
+            "category": rng.choice(categories),
+            "tags": rng.sample(tags, 3),
+            "created_at": created.isoformat() + "Z",
+            "updated_at": (created + timedelta(days=rng.randint(0, 30))).isoformat() + "Z",
+            "version": rng.randint(1, 5)
+        }))
+    return lines
+
+def measure(build: Callable[[], Any]) -> int:
+    """Get the bytes still allocated by what build() returns"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return after - before
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    """Measure every representation"""
+    package = load_package()
+    records_module = package.records
+    store_module = package.store
+    
+    lines = generate_lines(args.records, args.content_bytes)
+    
+    def dictionaries() -> Dict[str, Dict[str, Any]]:
+        return {prompt["id"]: prompt for prompt in map(json.loads, lines)}
+    
+    def records(compress_min_bytes: int) -> Callable[[], Dict[str, Any]]:
+        def build() -> Dict[str, Any]:
+            # Each dictionary is dropped as soon as its record is built
+            return {
+                prompt["id"]: records_module.PromptRecord(prompt, compress_min_bytes)
+                for prompt in map(json.loads, lines)
+            }
+        return build
+    
+    def store(compress_min_bytes: int) -> Callable[[], Any]:
+        def build() -> Any:
+            prompt_store = store_module.MemoryPromptStore(compress_min_bytes)
+            prompt_store.prompts = dictionaries()
+            prompt_store._rebuild_indexes()
+            return prompt_store
+        return build
+    
+    results = {
+        "dict": measure(dictionaries),
+        "record": measure(records(0)),
+        "record_compressed": measure(records(args.compress_bytes)),
+        "store": measure(store(0)),
+        "store_compressed": measure(store(args.compress_bytes))
+    }
+    return {
+        "records": args.records,
+        "content_bytes": args.content_bytes,
+        "compress_bytes": args.compress_bytes,
+        "bytes_per_prompt": {name: round(total / args.records) for name, total in results.items()},
+        "record_vs_dict": round(results["record"] / results["dict"], 3)
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=100000)
+    parser.add_argument("--content-bytes", type=int, default=400, help="Approximate content length per prompt")
+    parser.add_argument("--compress-bytes", type=int, default=256, help="compressContentBytes for the compressed rows")
+    args = parser.parse_args()
+    
+    print(json.dumps(run(args), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Read-path benchmark: response cache and conditional requests
+
+A library of --records prompts is created and the polled read endpoints are
+requested back to back, first with the response cache disabled (each request
+rebuilds, re-validates and re-serializes its response), then with the cache
+enabled, and finally as conditional requests answered with 304. Both wall
+time and process CPU time are reported per request.
+
+Usage:
+    python benchmarks/read_cache.py [--backend log] [--records 10000] [--requests 200]
+"""
+
+import json
+import time
+import asyncio
+import logging
+import argparse
+from typing import Any, Dict, Optional
+
+import httpx
+
+from _harness import create_app, populate
+
+PREFIX = "/api/extensions/prompt-library"
+
+ENDPOINTS = [
+    ("prompts", "/prompts", None),
+    ("prompts_page", "/prompts", {"limit": 50, "sort": "updated_at"}),
+    ("categories", "/categories", None),
+    ("templates", "/templates", None)
+]
+
+async def measure(
+    client: httpx.AsyncClient,
+    path: str,
+    params: Optional[Dict[str, Any]],
+    requests: int,
+    conditional: bool
+) -> Dict[str, float]:
+    """Time sequential requests to one endpoint"""
+    headers = {}
+    if conditional:
+        response = await client.get(PREFIX + path, params=params)
+        headers["If-None-Match"] = response.headers["ETag"]
+    
+    expected = 304 if conditional else 200
+    wall, cpu = time.perf_counter(), time.process_time()
+    for _ in range(requests):
+        response = await client.get(PREFIX + path, params=params, headers=headers)
+        if response.status_code != expected:
+            raise RuntimeError(f"GET {path} returned {response.status_code}, expected {expected}")
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+    
+    return {"wall_ms": round(wall / requests * 1000, 3), "cpu_ms": round(cpu / requests * 1000, 3)}
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    """Measure every endpoint without the cache, with it, and with 304s"""
+    app, extension = create_app({"storageBackend": args.backend})
+    populate(extension, args.records)
+    transport = httpx.ASGITransport(app=app)
+    
+    results: Dict[str, Dict[str, Any]] = {name: {} for name, _, _ in ENDPOINTS}
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            for mode, max_bytes, conditional in (
+                ("uncached", 0, False),
+                ("cached", 256 * 1024 * 1024, False),
+                ("not_modified", 256 * 1024 * 1024, True)
+            ):
+                extension.response_cache.max_bytes = max_bytes
+                extension.response_cache.clear()
+                for name, path, params in ENDPOINTS:
+                    results[name][mode] = await measure(client, path, params, args.requests, conditional)
+    finally:
+        extension.shutdown()
+    
+    for timings in results.values():
+        uncached, cached = timings["uncached"]["cpu_ms"], timings["cached"]["cpu_ms"]
+        timings["cpu_speedup"] = round(uncached / cached, 1) if cached else None
+    
+    return {"backend": args.backend, "records": args.records, "requests": args.requests, "endpoints": results}
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", default="log", choices=("log", "sqlite", "memory"))
+    parser.add_argument("--records", type=int, default=10000)
+    parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint and mode")
+    args = parser.parse_args()
+    
+    # Per-request client logging would dominate the measurement
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+if __name__ == "__main__":
+    main()
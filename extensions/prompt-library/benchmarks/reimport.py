@@ -0,0 +1,95 @@
+"""
+Re-import benchmark: importing an export that is mostly unchanged
+
+A library of --records prompts is exported as NDJSON, --changed percent of
+the prompts are edited in the export, and the export is imported back in
+batches, once writing every record as imports used to and once through the
+deduplicating StreamingImporter. Reported per mode: import time, prompts
+written, how far the store generation moved (every write invalidates the
+read caches) and, for the deduplicating import, its diff summary.
+
+Usage:
+    python benchmarks/reimport.py [--backend log] [--records 50000] [--changed 1]
+"""
+
+import json
+import time
+import argparse
+import importlib
+from typing import Any, Dict, List
+
+from _harness import PACKAGE_NAME, create_app, populate
+
+def export_lines(extension: Any, changed_percent: float) -> List[bytes]:
+    """Export the library, editing every 1/changed_percent-th prompt"""
+    streaming = importlib.import_module(f"{PACKAGE_NAME}.streaming")
+    body = b"".join(streaming.iter_export(extension))
+    step = max(1, round(100 / changed_percent)) if changed_percent else 0
+    lines = []
+    for number, line in enumerate(body.splitlines(keepends=True)):
+        if step and number % step == 0:
+            record = json.loads(line)
+            if record["type"] == "prompt":
+                record["data"]["title"] += " (edited)"
+                line = json.dumps(record).encode("utf-8") + b"\n"
+        lines.append(line)
+    return lines
+
+def run_mode(args: argparse.Namespace, deduplicate: bool) -> Dict[str, Any]:
+    """Re-import the edited export into a fresh copy of the library"""
+    app, extension = create_app({"storageBackend": args.backend})
+    streaming = importlib.import_module(f"{PACKAGE_NAME}.streaming")
+    try:
+        populate(extension, args.records)
+        lines = export_lines(extension, args.changed)
+        extension.flush()
+        generation = extension.generation()
+        
+        start = time.perf_counter()
+        if deduplicate:
+            importer = streaming.StreamingImporter(extension, batch_size=args.batch_size)
+            for offset in range(0, len(lines), args.batch_size):
+                importer.feed(b"".join(lines[offset:offset + args.batch_size]))
+            report = importer.finish()
+            written, diff = report["prompts"], report["diff"]
+        else:
+            written, diff = 0, None
+            records = [json.loads(line) for line in lines]
+            for offset in range(0, len(records), args.batch_size):
+                batch = [(record["type"], record["data"]) for record in records[offset:offset + args.batch_size]]
+                written += extension.import_records(batch)["prompts"]
+        extension.flush()
+        elapsed = time.perf_counter() - start
+        
+        result = {
+            "seconds": round(elapsed, 3),
+            "prompts_written": written,
+            "generations": extension.generation() - generation
+        }
+        if diff is not None:
+            result["diff"] = {"prompts": diff["prompts"], "categories": diff["categories"]}
+        return result
+    finally:
+        extension.shutdown()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", default="log", choices=("log", "sqlite", "memory"))
+    parser.add_argument("--records", type=int, default=50000)
+    parser.add_argument("--changed", type=float, default=1.0, help="Percent of prompts edited in the export")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+    
+    overwrite = run_mode(args, deduplicate=False)
+    deduplicated = run_mode(args, deduplicate=True)
+    print(json.dumps({
+        "backend": args.backend,
+        "records": args.records,
+        "changed_percent": args.changed,
+        "overwrite": overwrite,
+        "deduplicated": deduplicated,
+        "speedup": round(overwrite["seconds"] / deduplicated["seconds"], 1) if deduplicated["seconds"] else None
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
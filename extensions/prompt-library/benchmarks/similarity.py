@@ -0,0 +1,113 @@
+"""
+Similar prompt benchmark: index build, queries and the duplicate check
+
+Loads a --records synthetic library (see _harness.synthetic_records) and
+times building the similarity index, similar prompt queries by ID and by
+text, both in-process and through the API, and the duplicate check run on
+create. Recall of the bounded queries is measured against exact scoring
+(every posting summed) on a sample of prompts.
+
+Usage:
+    python benchmarks/similarity.py [--backend memory] [--records 200000]
+"""
+
+import json
+import time
+import random
+import argparse
+from typing import Any, Callable, Dict, List
+
+from _harness import create_app, load_records, synthetic_records, summarize
+
+API_PREFIX = "/api/extensions/prompt-library"
+
+def time_calls(fn: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    """Time repeated calls"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return summarize(timings)
+
+def recall(extension: Any, ids: List[str], limit: int) -> float:
+    """Share of the exact top results the bounded query also returns"""
+    index = extension.similarity_index
+    bounded = [extension.get_similar_prompts(prompt_id, limit=limit) for prompt_id in ids]
+    max_postings = index.max_postings
+    index.max_postings = 1 << 62
+    try:
+        exact = [extension.get_similar_prompts(prompt_id, limit=limit) for prompt_id in ids]
+    finally:
+        index.max_postings = max_postings
+    
+    found = total = 0
+    for got, expected in zip(bounded, exact):
+        got_ids = {prompt["id"] for prompt in got}
+        found += sum(1 for prompt in expected if prompt["id"] in got_ids)
+        total += len(expected)
+    return round(found / total, 4) if total else 1.0
+
+def main() -> None:
+    from fastapi.testclient import TestClient
+    
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", default="memory", choices=("log", "sqlite", "memory"))
+    parser.add_argument("--records", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--recall-sample", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    
+    app, extension = create_app({"storageBackend": args.backend})
+    try:
+        # The index is created by its first use, so the build is timed on its own
+        load_records(extension, synthetic_records(args.records, args.seed))
+        start = time.perf_counter()
+        extension._similarity()
+        build = time.perf_counter() - start
+        
+        rnd = random.Random(args.seed)
+        ids = [prompt["id"] for prompt in extension.store.list_prompts()]
+        pick = lambda: rnd.choice(ids)
+        client = TestClient(app)
+        counter = iter(range(1 << 30))
+        
+        def check_and_add() -> None:
+            prompt = dict(extension.get_prompt(pick()))
+            prompt.pop("id")
+            prompt["title"] = f"{prompt['title']} {next(counter)}"
+            extension.find_duplicates(prompt)
+            extension.add_prompt(prompt)
+        
+        inprocess = {
+            "by_id": time_calls(lambda: extension.get_similar_prompts(pick()), args.repeat),
+            "by_text": time_calls(lambda: extension.find_similar(extension.get_prompt(pick())), args.repeat),
+            "duplicate_check": time_calls(lambda: extension.find_duplicates(extension.get_prompt(pick())), args.repeat),
+            "check_and_add": time_calls(check_and_add, args.repeat)
+        }
+        asgi = {
+            "by_id": time_calls(lambda: client.get(f"{API_PREFIX}/prompts/{pick()}/similar"), args.repeat)
+        }
+        
+        index = extension.similarity_index
+        start = time.perf_counter()
+        index.merge()
+        merge = time.perf_counter() - start
+        
+        results = {
+            "backend": args.backend,
+            "records": args.records,
+            "build_s": round(build, 3),
+            "merge_s": round(merge, 3),
+            "inprocess": inprocess,
+            "asgi": asgi,
+            "recall_at_10": recall(extension, rnd.sample(ids, min(args.recall_sample, len(ids))), 10),
+            "index": index.stats()
+        }
+        print(json.dumps(results, indent=2))
+    finally:
+        extension.shutdown()
+
+if __name__ == "__main__":
+    main()
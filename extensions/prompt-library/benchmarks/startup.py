@@ -0,0 +1,129 @@
+"""
+Startup benchmark: package import and initialize() time by library size
+
+For each size a library is populated once, then fresh interpreters import
+the package, call initialize() and wait until warm-up has finished. Each
+phase is timed separately: import, initialize() returning (when the host can
+carry on loading other extensions) and ready (when the API stops answering
+503). --foreground runs warm-up inside initialize() instead, as it used to.
+
+Usage:
+    python benchmarks/startup.py [--backend log] [--sizes 0,1000,10000,100000] [--runs 3]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import argparse
+import subprocess
+from typing import Any, Dict, List
+
+from _harness import load_package, percentile
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def populate(backend: str, records: int, batch_size: int = 1000) -> str:
+    """
+    Create a library of the given size in a new storage directory
+    
+    Returns:
+        str: The storage directory
+    """
+    package = load_package()
+    storage_dir = tempfile.mkdtemp(prefix="prompt-library-startup-")
+    
+    extension = package.PromptLibraryExtension()
+    extension.config.update({"storageDir": storage_dir, "storageBackend": backend, "backgroundWarmup": False})
+    extension.initialize()
+    
+    batch = [("category", {"id": "bench", "name": "Bench", "description": "", "icon": "folder"})]
+    for i in range(records):
+        batch.append(("prompt", {
+            "id": f"bench-{i}",
+            "title": f"Benchmark prompt {i}",
+            "content": f"Write a summary of [document] {i} in five bullet points.",
+            "description": "Generated by the startup benchmark",
+            "category": "bench",
+            "tags": ["bench", f"group-{i % 50}"]
+        }))
+        if len(batch) >= batch_size:
+            extension.import_records(batch)
+            batch = []
+    if batch:
+        extension.import_records(batch)
+    
+    extension.shutdown()
+    return storage_dir
+
+def child(storage_dir: str, backend: str, foreground: bool) -> None:
+    """Time a cold start in this (fresh) interpreter and print it as JSON"""
+    start = time.perf_counter()
+    package = load_package()
+    imported = time.perf_counter()
+    
+    extension = package.PromptLibraryExtension()
+    extension.config.update({"storageDir": storage_dir, "storageBackend": backend, "backgroundWarmup": not foreground})
+    extension.initialize()
+    initialized = time.perf_counter()
+    
+    extension.wait_until_ready()
+    ready = time.perf_counter()
+    prompts = len(extension.prompts)
+    extension.shutdown()
+    
+    print(json.dumps({
+        "import_ms": (imported - start) * 1000,
+        "initialize_ms": (initialized - imported) * 1000,
+        "ready_ms": (ready - start) * 1000,
+        "prompts": prompts
+    }))
+
+def cold_start(storage_dir: str, backend: str, foreground: bool) -> Dict[str, Any]:
+    """Run one cold start in a new interpreter"""
+    command = [sys.executable, os.path.abspath(__file__), "--child", storage_dir, "--backend", backend]
+    if foreground:
+        command.append("--foreground")
+    output = subprocess.run(command, check=True, capture_output=True, text=True, cwd=BENCHMARKS_DIR).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def run(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    """Measure every library size"""
+    results = []
+    for size in args.sizes:
+        storage_dir = populate(args.backend, size)
+        try:
+            samples = [cold_start(storage_dir, args.backend, args.foreground) for _ in range(args.runs)]
+        finally:
+            shutil.rmtree(storage_dir, ignore_errors=True)
+        
+        result: Dict[str, Any] = {"records": size, "prompts_loaded": samples[-1]["prompts"]}
+        for phase in ("import_ms", "initialize_ms", "ready_ms"):
+            result[phase] = round(percentile([sample[phase] for sample in samples], 0.5), 2)
+        results.append(result)
+    return results
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", default="log", choices=("log", "sqlite", "memory"))
+    parser.add_argument("--sizes", default="0,1000,10000,100000", help="Comma-separated library sizes")
+    parser.add_argument("--runs", type=int, default=3, help="Cold starts per size; the median is reported")
+    parser.add_argument("--foreground", action="store_true", help="Warm up inside initialize()")
+    parser.add_argument("--child", metavar="STORAGE_DIR", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.child:
+        child(args.child, args.backend, args.foreground)
+        return
+    
+    args.sizes = [int(size) for size in args.sizes.split(",")]
+    print(json.dumps({
+        "backend": args.backend,
+        "warmup": "foreground" if args.foreground else "background",
+        "results": run(args)
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+"""
+Benchmark suite: the extension's hot paths at realistic library sizes
+
+For each backend and library size, a synthetic library is generated from
+the bundled templates (see _harness.synthetic_records) and these scenarios
+are timed, each both by calling the extension in-process and through the
+FastAPI router with an in-process ASGI client:
+
+- list_full: the whole library (GET /prompts)
+- list_page: a 50 prompt page filtered by a popular tag
+- get: one prompt by ID
+- create, update: one prompt write
+- template_list, template_get: the bundled templates
+- export: the whole library as NDJSON (POST /export/stream)
+- import: --import-records new prompts (POST /import/stream)
+
+Populating the library is reported as the in-process "populate" scenario.
+After each size, --startup-runs cold starts in fresh interpreters are timed
+as the "startup" scenario.
+
+Every result is printed as one JSON line with the run's metadata, commit,
+backend, size, mode and scenario, so results can be appended to a file
+(--output) and compared across commits. Each scenario runs --repeat times or
+until --budget seconds have passed, whichever comes first.
+
+Usage:
+    python benchmarks/suite.py [--backends log,sqlite] [--sizes 1000,100000] [--output results.jsonl]
+    python benchmarks/suite.py --sizes 1000000 --scenarios get,list_page,startup
+"""
+
+import json
+import shutil
+import time
+import random
+import argparse
+import platform
+import itertools
+import importlib
+import subprocess
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from _harness import PACKAGE_NAME, EXTENSION_DIR, create_app, load_records, synthetic_records, summarize
+from startup import cold_start
+
+API_PREFIX = "/api/extensions/prompt-library"
+
+SCENARIOS = (
+    "populate", "list_full", "list_page", "get", "create", "update",
+    "template_list", "template_get", "export", "import", "startup"
+)
+
+# Scenarios too slow to repeat many times; they are not warmed up either
+BULK_SCENARIOS = ("export", "import")
+
+def git_commit() -> Optional[str]:
+    """Get the commit being benchmarked, if the tree is a git checkout"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=EXTENSION_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def measure(fn: Callable[..., Any], repeat: int, budget: float, warm_up: bool = True, prepare: Optional[Callable[[], Any]] = None) -> List[float]:
+    """
+    Time calls of fn until repeat samples are taken or budget seconds pass
+    
+    Args:
+        fn (Callable[..., Any]): The timed operation
+        repeat (int): Maximum number of samples
+        budget (float): Seconds after which no new sample is started
+        warm_up (bool): Make one untimed call first
+        prepare (Optional[Callable[[], Any]]): Builds the argument of each
+            call, outside the timing
+    
+    Returns:
+        List[float]: Latencies in seconds, at least one
+    """
+    args = lambda: (prepare(),) if prepare is not None else ()
+    if warm_up:
+        fn(*args())
+    samples = []
+    deadline = time.perf_counter() + budget
+    while len(samples) < repeat and (not samples or time.perf_counter() < deadline):
+        call_args = args()
+        start = time.perf_counter()
+        fn(*call_args)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def new_prompt(number: int) -> Dict[str, Any]:
+    """A prompt for the write scenarios"""
+    return {
+        "title": f"Suite prompt {number}",
+        "content": f"Summarize [document] {number} for a [audience] reader in three paragraphs.",
+        "description": "Written by the benchmark suite",
+        "category": "bench",
+        "tags": ["bench", "suite"]
+    }
+
+class Scenarios:
+    """The timed operations of one library, in-process and over ASGI"""
+    
+    def __init__(self, app: Any, extension: Any, records: int, import_records: int, seed: int):
+        from fastapi.testclient import TestClient
+        
+        self.extension = extension
+        self.client = TestClient(app)
+        self.records = records
+        self.import_records = import_records
+        self.rnd = random.Random(seed)
+        self.counter = itertools.count()
+        self.imported = itertools.count()
+        
+        self.template_ids = [template["id"] for templates in extension.get_templates().values() for template in templates]
+        self.tags = [tag["tag"] for tag in extension.get_tags(limit=20)]
+    
+    def prompt_id(self) -> str:
+        return f"bench-{self.rnd.randrange(self.records)}"
+    
+    def import_body(self) -> bytes:
+        """New prompts for one import sample, as an NDJSON export"""
+        batch = next(self.imported)
+        lines = []
+        for i in range(self.import_records):
+            prompt = new_prompt(i)
+            prompt["id"] = f"suite-import-{batch}-{i}"
+            lines.append(json.dumps({"type": "prompt", "data": prompt}).encode("utf-8") + b"\n")
+        return b"".join(lines)
+    
+    def ok(self, response: Any) -> Any:
+        assert response.status_code < 300, f"{response.status_code}: {response.text[:200]}"
+        return response
+    
+    def inprocess(self, scenario: str) -> Callable[..., Any]:
+        """The in-process call of a scenario; import takes the NDJSON body"""
+        extension = self.extension
+        if scenario == "list_full":
+            return lambda: extension.get_prompts_json()
+        if scenario == "list_page":
+            return lambda: extension.get_prompts_page(limit=50, tag=self.rnd.choice(self.tags))
+        if scenario == "get":
+            return lambda: extension.get_prompt(self.prompt_id())
+        if scenario == "create":
+            return lambda: extension.add_prompt(new_prompt(next(self.counter)))
+        if scenario == "update":
+            return lambda: extension.update_prompt(self.prompt_id(), new_prompt(next(self.counter)))
+        if scenario == "template_list":
+            return lambda: extension.get_templates()
+        if scenario == "template_get":
+            return lambda: extension.get_template(self.rnd.choice(self.template_ids))
+        streaming = importlib.import_module(f"{PACKAGE_NAME}.streaming")
+        if scenario == "export":
+            return lambda: b"".join(streaming.iter_export(extension))
+        if scenario == "import":
+            def import_stream(body: bytes) -> None:
+                importer = streaming.StreamingImporter(extension)
+                importer.feed(body)
+                importer.finish()
+            return import_stream
+        raise ValueError(f"Unknown scenario: {scenario}")
+    
+    def asgi(self, scenario: str) -> Callable[..., Any]:
+        """The API request of a scenario; import takes the NDJSON body"""
+        client, ok = self.client, self.ok
+        if scenario == "list_full":
+            return lambda: ok(client.get(f"{API_PREFIX}/prompts"))
+        if scenario == "list_page":
+            return lambda: ok(client.get(f"{API_PREFIX}/prompts", params={"limit": 50, "tag": self.rnd.choice(self.tags)}))
+        if scenario == "get":
+            return lambda: ok(client.get(f"{API_PREFIX}/prompts/{self.prompt_id()}"))
+        if scenario == "create":
+            return lambda: ok(client.post(f"{API_PREFIX}/prompts", json=new_prompt(next(self.counter))))
+        if scenario == "update":
+            return lambda: ok(client.put(f"{API_PREFIX}/prompts/{self.prompt_id()}", json=new_prompt(next(self.counter))))
+        if scenario == "template_list":
+            return lambda: ok(client.get(f"{API_PREFIX}/templates"))
+        if scenario == "template_get":
+            return lambda: ok(client.get(f"{API_PREFIX}/templates/{self.rnd.choice(self.template_ids)}"))
+        if scenario == "export":
+            return lambda: ok(client.post(f"{API_PREFIX}/export/stream")).content
+        if scenario == "import":
+            return lambda body: ok(client.post(f"{API_PREFIX}/import/stream", content=body))
+        raise ValueError(f"Unknown scenario: {scenario}")
+
+def result(samples: List[float], items: int = 1) -> Dict[str, Any]:
+    """Summarize samples, with throughput in items (prompts, requests) per second"""
+    summary = summarize(samples)
+    summary["items_per_s"] = round(items * len(samples) / sum(samples), 1) if sum(samples) else None
+    return summary
+
+def run_size(args: argparse.Namespace, backend: str, records: int) -> Iterator[Dict[str, Any]]:
+    """Run every selected scenario on one library"""
+    app, extension = create_app({"storageBackend": backend})
+    storage_dir = extension.get_storage_dir()
+    try:
+        start = time.perf_counter()
+        loaded = load_records(extension, synthetic_records(records, args.seed))
+        extension.flush()
+        if "populate" in args.scenarios:
+            yield {"mode": "inprocess", "scenario": "populate", **result([time.perf_counter() - start], loaded)}
+        
+        scenarios = Scenarios(app, extension, records, args.import_records, args.seed)
+        for scenario in args.scenarios:
+            if scenario in ("populate", "startup"):
+                continue
+            items = args.import_records if scenario == "import" else records if scenario in ("list_full", "export") else 1
+            bulk = scenario in BULK_SCENARIOS
+            repeat = min(args.repeat, args.bulk_repeat) if bulk else args.repeat
+            for mode in args.modes:
+                fn = scenarios.inprocess(scenario) if mode == "inprocess" else scenarios.asgi(scenario)
+                prepare = scenarios.import_body if scenario == "import" else None
+                samples = measure(fn, repeat, args.budget, warm_up=not bulk, prepare=prepare)
+                yield {"mode": mode, "scenario": scenario, **result(samples, items)}
+        extension.flush()
+    finally:
+        extension.shutdown()
+    
+    try:
+        if "startup" in args.scenarios and backend != "memory":
+            samples = [cold_start(storage_dir, backend, False) for _ in range(args.startup_runs)]
+            yield {
+                "mode": "process",
+                "scenario": "startup",
+                **result([sample["ready_ms"] / 1000 for sample in samples], records),
+                "initialize_ms": round(min(sample["initialize_ms"] for sample in samples), 2)
+            }
+    finally:
+        shutil.rmtree(storage_dir, ignore_errors=True)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", default="log", help="Comma-separated: log, sqlite, memory")
+    parser.add_argument("--sizes", default="1000,100000", help="Comma-separated library sizes, e.g. 1000,100000,1000000")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Comma-separated subset of: " + ", ".join(SCENARIOS))
+    parser.add_argument("--modes", default="inprocess,asgi", help="Comma-separated: inprocess, asgi")
+    parser.add_argument("--repeat", type=int, default=200, help="Samples per scenario")
+    parser.add_argument("--bulk-repeat", type=int, default=3, help="Samples per export and import scenario")
+    parser.add_argument("--budget", type=float, default=10.0, help="Seconds per scenario before it stops sampling")
+    parser.add_argument("--import-records", type=int, default=10000, help="Prompts per import sample")
+    parser.add_argument("--startup-runs", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Also append the JSON lines to this file")
+    args = parser.parse_args()
+    
+    args.scenarios = [scenario for scenario in args.scenarios.split(",") if scenario]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+    args.modes = [mode for mode in args.modes.split(",") if mode]
+    
+    run = {
+        "suite": "prompt-library",
+        "run_at": datetime.utcnow().isoformat() + "Z",
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform()
+    }
+    output = open(args.output, "a", encoding="utf-8") if args.output else None
+    try:
+        for backend in args.backends.split(","):
+            for records in (int(size) for size in args.sizes.split(",")):
+                for measurement in run_size(args, backend, records):
+                    line = json.dumps({**run, "backend": backend, "records": records, **measurement})
+                    print(line, flush=True)
+                    if output is not None:
+                        output.write(line + "\n")
+                        output.flush()
+    finally:
+        if output is not None:
+            output.close()
+
+if __name__ == "__main__":
+    main()
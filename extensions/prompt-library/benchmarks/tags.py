@@ -0,0 +1,73 @@
+"""
+Tag index benchmark: facet counts and multi-tag filters
+
+Builds a --records prompt library with the harness tags ("bench" and one of
+50 "group-N" tags per prompt) and times, per call: tag counts for the whole
+library, facets for a two-tag filter, and the IDs a two-tag AND and OR
+filter select, each answered from the tag index and, for comparison, by
+scanning every prompt as the front end had to.
+
+Usage:
+    python benchmarks/tags.py [--backend log] [--records 50000]
+"""
+
+import json
+import time
+import argparse
+from typing import Any, Callable, Dict, List
+
+from _harness import create_app, populate, summarize
+
+def time_calls(fn: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    """Time repeated calls"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return summarize(timings)
+
+def scan_counts(prompts: List[Dict[str, Any]]) -> Dict[str, int]:
+    """Count tags by scanning every prompt"""
+    counts: Dict[str, int] = {}
+    for prompt in prompts:
+        for tag in prompt.get("tags", []):
+            counts[tag] = counts.get(tag, 0) + 1
+    return counts
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", default="log", choices=("log", "sqlite", "memory"))
+    parser.add_argument("--records", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    
+    app, extension = create_app({"storageBackend": args.backend})
+    try:
+        populate(extension, args.records)
+        index = extension.tag_index
+        tags = ["group-3", "group-7"]
+        
+        results = {
+            "backend": args.backend,
+            "records": args.records,
+            "indexed": {
+                "tag_counts": time_calls(lambda: index.tag_counts(limit=100), args.repeat),
+                "facets_any": time_calls(lambda: index.facets(tags, "any"), args.repeat),
+                "select_all": time_calls(lambda: index.select(["bench", "group-3"], "all"), args.repeat),
+                "select_any": time_calls(lambda: index.select(tags, "any"), args.repeat)
+            },
+            "scan": {
+                "tag_counts": time_calls(lambda: scan_counts(extension.store.list_prompts()), max(1, args.repeat // 20)),
+                "select_any": time_calls(
+                    lambda: [prompt["id"] for prompt in extension.store.list_prompts() if set(tags) & set(prompt["tags"])],
+                    max(1, args.repeat // 20)
+                )
+            }
+        }
+        print(json.dumps(results, indent=2))
+    finally:
+        extension.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Usage tracking benchmark: recording uses and reading the "most used" ranking
+
+--uses uses are recorded for prompts of a --records prompt library, chosen
+with a Zipf-like skew, from --threads threads at once. Reported: recording
+throughput, latency percentiles of GET /usage (the maintained ranking) while
+uses keep arriving, and the same top-K computed by sorting every prompt's
+counters per request, which is what the ranking replaces.
+
+Usage:
+    python benchmarks/usage.py [--backend log] [--records 50000] [--uses 200000]
+"""
+
+import json
+import time
+import random
+import argparse
+import threading
+from typing import Any, Dict, List
+
+from _harness import create_app, populate, summarize
+
+def record_uses(extension: Any, prompt_ids: List[str], uses: int, threads: int) -> float:
+    """Record uses from several threads, returning uses per second"""
+    weights = [1.0 / (rank + 1) for rank in range(len(prompt_ids))]
+    chosen = random.Random(0).choices(prompt_ids, weights=weights, k=uses)
+    share = uses // threads
+    
+    def worker(offset: int) -> None:
+        for prompt_id in chosen[offset:offset + share]:
+            extension.record_usage(prompt_id)
+    
+    workers = [threading.Thread(target=worker, args=(n * share,)) for n in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return share * threads / (time.perf_counter() - start)
+
+def time_requests(fn: Any, requests: int) -> Dict[str, float]:
+    """Time repeated calls"""
+    timings = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return summarize(timings)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", default="log", choices=("log", "sqlite", "memory"))
+    parser.add_argument("--records", type=int, default=50000)
+    parser.add_argument("--uses", type=int, default=200000)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+    
+    from fastapi.testclient import TestClient
+    
+    app, extension = create_app({"storageBackend": args.backend})
+    try:
+        populate(extension, args.records)
+        prompt_ids = [f"bench-{i}" for i in range(args.records)]
+        client = TestClient(app)
+        
+        throughput = record_uses(extension, prompt_ids, args.uses, args.threads)
+        extension.usage.flush()
+        
+        # Keep recording while the ranking is read, so reads also drain the buffer
+        def ranked() -> None:
+            for prompt_id in random.sample(prompt_ids, 50):
+                extension.record_usage(prompt_id)
+            response = client.get("/api/extensions/prompt-library/usage", params={"limit": args.limit})
+            assert response.status_code == 200
+        
+        def sorted_per_request() -> None:
+            for prompt_id in random.sample(prompt_ids, 50):
+                extension.record_usage(prompt_id)
+            extension.usage._drain()
+            now = time.time()
+            entries = extension.usage._entries
+            ranking = sorted(entries, key=lambda prompt_id: entries[prompt_id][2], reverse=True)[:args.limit]
+            [extension.usage._describe(entries[prompt_id], now) for prompt_id in ranking]
+        
+        results = {
+            "backend": args.backend,
+            "records": args.records,
+            "uses": args.uses,
+            "threads": args.threads,
+            "record_per_second": round(throughput),
+            "ranked_prompts": extension.usage.stats()["prompts"],
+            "usage_endpoint": time_requests(ranked, args.requests),
+            "full_sort": time_requests(sorted_per_request, args.requests)
+        }
+        start = time.perf_counter()
+        extension.usage.flush()
+        results["flush_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        print(json.dumps(results, indent=2))
+    finally:
+        extension.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Write burst benchmark: committing every change against write-behind flushing
+
+--writes updates are made back to back to --hot prompts of a --records prompt
+library on the log backend, first with flushIntervalMs 0 (every change is
+logged and committed before the call returns) and then with write-behind
+flushing. Reported per mode: mean time per update, log records appended and
+compactions (snapshot rewrites) during the burst, and the flusher's
+statistics after a final flush(wait=True).
+
+Usage:
+    python benchmarks/write_burst.py [--records 10000] [--writes 20000] [--hot 100]
+"""
+
+import json
+import time
+import argparse
+from typing import Any, Dict
+
+from _harness import create_app, populate
+
+def run_mode(args: argparse.Namespace, interval_ms: int) -> Dict[str, Any]:
+    """Run the burst with the given flush interval"""
+    app, extension = create_app({
+        "storageBackend": "log",
+        "flushIntervalMs": interval_ms,
+        "compactThreshold": args.compact_threshold
+    })
+    try:
+        populate(extension, args.records)
+        extension.flush()
+        log = extension.store.log
+        
+        compactions = 0
+        write_snapshot = log.write_snapshot
+        
+        def counting_snapshot(*snapshot_args: Any) -> None:
+            nonlocal compactions
+            compactions += 1
+            write_snapshot(*snapshot_args)
+        log.write_snapshot = counting_snapshot
+        
+        records = 0
+        append, append_batch = log.append, log.append_batch
+        
+        def counting_append(*append_args: Any) -> None:
+            nonlocal records
+            records += 1
+            append(*append_args)
+        
+        def counting_batch(batch: Any) -> None:
+            nonlocal records
+            records += 1
+            append_batch(batch)
+        log.append, log.append_batch = counting_append, counting_batch
+        
+        start = time.perf_counter()
+        for i in range(args.writes):
+            prompt_id = f"bench-{i % args.hot}"
+            extension.update_prompt(prompt_id, {
+                "title": f"Benchmark prompt {prompt_id}, edit {i}",
+                "content": f"Write a summary of [document] {i} in five bullet points.",
+                "description": "Edited by a benchmark",
+                "category": "bench",
+                "tags": ["bench"]
+            })
+        elapsed = time.perf_counter() - start
+        
+        extension.flush()
+        return {
+            "update_us": round(elapsed / args.writes * 1e6, 1),
+            "log_records": records,
+            "compactions": compactions,
+            "flusher": extension.stats()["flusher"]
+        }
+    finally:
+        extension.shutdown()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=10000)
+    parser.add_argument("--writes", type=int, default=20000)
+    parser.add_argument("--hot", type=int, default=100, help="Distinct prompts the updates cycle through")
+    parser.add_argument("--interval-ms", type=int, default=500, help="flushIntervalMs for the write-behind run")
+    parser.add_argument("--compact-threshold", type=int, default=10000)
+    args = parser.parse_args()
+    
+    results = {
+        "records": args.records,
+        "writes": args.writes,
+        "hot": args.hot,
+        "synchronous": run_mode(args, 0),
+        "write_behind": run_mode(args, args.interval_ms)
+    }
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
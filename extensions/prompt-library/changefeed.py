@@ -0,0 +1,134 @@
+"""
+Change feed for sharing one Prompt Library between several processes
+
+Every mutation of the shared SQLite store is also recorded in a "changes"
+table, in the same transaction, under a monotonically increasing sequence
+number. Each process tails the table and refreshes the items it names in its
+in-memory replica, so writes made by one worker become visible to the others
+without reloading the library.
+"""
+
+import time
+import logging
+import threading
+from typing import List, Optional, Callable, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import sqlite3
+
+# Setup logging
+logger = logging.getLogger("prompt_library.changefeed")
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS changes (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        kind TEXT NOT NULL,
+        item_id TEXT NOT NULL,
+        op TEXT NOT NULL,
+        created_at REAL NOT NULL
+    );
+"""
+
+def create_schema(conn: "sqlite3.Connection") -> None:
+    """Create the changes table if it does not exist"""
+    conn.executescript(SCHEMA)
+
+def record_change(conn: "sqlite3.Connection", op: str, kind: str, item_id: str) -> int:
+    """
+    Record a mutation in the current transaction
+    
+    Only the item is named; readers fetch its committed state, so applying
+    changes out of order or twice still converges on the latest data.
+    
+    Args:
+        conn (sqlite3.Connection): Connection performing the mutation
+        op (str): "put" or "delete"
+        kind (str): "prompt" or "category"
+        item_id (str): ID of the mutated item
+    
+    Returns:
+        int: Sequence number of the change
+    """
+    cursor = conn.execute(
+        "INSERT INTO changes (kind, item_id, op, created_at) VALUES (?, ?, ?, ?)",
+        (kind, item_id, op, time.time())
+    )
+    return cursor.lastrowid
+
+def read_changes(conn: "sqlite3.Connection", after: int, limit: int = 1000) -> List[Tuple[int, str, str, str]]:
+    """
+    Get committed changes following a sequence number
+    
+    Args:
+        conn (sqlite3.Connection): Reader connection
+        after (int): Last sequence number already applied
+        limit (int): Maximum number of changes
+    
+    Returns:
+        List[Tuple[int, str, str, str]]: (seq, kind, item_id, op) in order
+    """
+    return conn.execute(
+        "SELECT seq, kind, item_id, op FROM changes WHERE seq > ? ORDER BY seq LIMIT ?",
+        (after, limit)
+    ).fetchall()
+
+def last_seq(conn: "sqlite3.Connection") -> int:
+    """Get the sequence number of the latest change, or 0"""
+    return conn.execute("SELECT COALESCE(MAX(seq), 0) FROM changes").fetchone()[0]
+
+def first_seq(conn: "sqlite3.Connection") -> int:
+    """Get the sequence number of the oldest retained change, or 0"""
+    return conn.execute("SELECT COALESCE(MIN(seq), 0) FROM changes").fetchone()[0]
+
+def prune_changes(conn: "sqlite3.Connection", through: int) -> int:
+    """
+    Delete changes up to and including a sequence number
+    
+    Args:
+        conn (sqlite3.Connection): Writer connection
+        through (int): Last sequence number to delete
+    
+    Returns:
+        int: Number of deleted changes
+    """
+    return conn.execute("DELETE FROM changes WHERE seq <= ?", (through,)).rowcount
+
+class ChangeTailer:
+    """Background thread calling a poll function at a fixed interval"""
+    
+    def __init__(self, poll: Callable[[], None], interval: float = 0.2):
+        """
+        Initialize the tailer
+        
+        Args:
+            poll (Callable[[], None]): Applies any new changes
+            interval (float): Seconds between polls
+        """
+        self.poll = poll
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def start(self) -> None:
+        """Start polling in a daemon thread"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="prompt-library-changefeed", daemon=True)
+        self._thread.start()
+    
+    def stop(self) -> None:
+        """Stop polling and wait for the thread to exit"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+    
+    def _run(self) -> None:
+        """Poll until stopped"""
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as e:
+                logger.error(f"Error applying change feed: {e}")
@@ -0,0 +1,316 @@
+"""
+Content hashing and deduplicating imports for the Prompt Library extension
+
+A prompt's content hash covers the fields a user edits (title, content,
+description, category, tags and variables) but not its ID, timestamps or
+version, so re-importing an unchanged prompt can be recognized and skipped.
+The normalized hash covers only its content, case-folded and with
+whitespace collapsed, and finds near-duplicates stored under other IDs.
+
+An ImportDiff classifies import records as they stream past, in one pass:
+added, changed or unchanged (skipped). New prompts, and prompts whose content
+changed, are also checked for near-duplicates of other prompts; these are
+reported, and only skipped when asked to. In a dry run nothing is written and
+the records' effect is tracked in a small overlay of hashes.
+"""
+
+import json
+import hashlib
+import threading
+from collections.abc import Mapping
+from datetime import datetime
+from typing import Dict, List, Optional, Any, Callable, Tuple
+
+# Fields covered by content_hash(), with their defaults
+HASHED_FIELDS = (
+    ("title", None),
+    ("content", None),
+    ("description", None),
+    ("category", None),
+    ("tags", []),
+    ("variables", [])
+)
+
+def _digest(data: bytes) -> str:
+    """Hash bytes to a short hex digest"""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+def content_hash(prompt: Mapping) -> str:
+    """
+    Hash the user-editable fields of a prompt
+    
+    Args:
+        prompt (Mapping): Prompt dictionary or stored record
+    
+    Returns:
+        str: Hex digest, equal for prompts that differ only in ID,
+            timestamps or version
+    """
+    fields = [prompt.get(field, default) for field, default in HASHED_FIELDS]
+    return _digest(json.dumps(fields, ensure_ascii=False, separators=(",", ":"), sort_keys=True).encode("utf-8"))
+
+def normalize_content(text: str) -> str:
+    """
+    Normalize prompt content for near-duplicate detection
+    
+    Args:
+        text (str): Prompt content
+    
+    Returns:
+        str: Case-folded content with runs of whitespace collapsed to one space
+    """
+    return " ".join(text.casefold().split())
+
+def normalized_hash(prompt: Mapping) -> str:
+    """
+    Hash a prompt's normalized content
+    
+    Args:
+        prompt (Mapping): Prompt dictionary or stored record
+    
+    Returns:
+        str: Hex digest, equal for prompts whose content differs only in case
+            and whitespace
+    """
+    content = prompt.get("content")
+    return _digest(normalize_content(content if isinstance(content, str) else "").encode("utf-8"))
+
+class DuplicateIndex:
+    """Index of prompt IDs by normalized content hash"""
+    
+    def __init__(self):
+        # Searches and updates may come from different worker threads
+        self._lock = threading.RLock()
+        self._by_hash: Dict[str, Dict[str, None]] = {}
+        self._hashes: Dict[str, str] = {}
+    
+    def __len__(self) -> int:
+        return len(self._hashes)
+    
+    def add(self, prompt: Mapping) -> None:
+        """
+        Index a prompt, replacing any previous version
+        
+        Args:
+            prompt (Mapping): Prompt dictionary or stored record
+        """
+        prompt_id = prompt["id"]
+        digest = normalized_hash(prompt)
+        with self._lock:
+            self.remove(prompt_id)
+            self._by_hash.setdefault(digest, {})[prompt_id] = None
+            self._hashes[prompt_id] = digest
+    
+    def remove(self, prompt_id: str) -> bool:
+        """
+        Remove a prompt from the index
+        
+        Args:
+            prompt_id (str): Prompt ID
+        
+        Returns:
+            bool: True if the prompt was indexed
+        """
+        with self._lock:
+            digest = self._hashes.pop(prompt_id, None)
+            if digest is None:
+                return False
+            bucket = self._by_hash[digest]
+            del bucket[prompt_id]
+            if not bucket:
+                del self._by_hash[digest]
+            return True
+    
+    def rebuild(self, prompts: List[Mapping]) -> None:
+        """
+        Replace the index contents with the given prompts
+        
+        Args:
+            prompts (List[Mapping]): All prompts
+        """
+        with self._lock:
+            self._by_hash = {}
+            self._hashes = {}
+            for prompt in prompts:
+                self.add(prompt)
+    
+    def find(self, digest: str, exclude: Optional[str] = None, predicate: Optional[Callable[[str], bool]] = None) -> Optional[str]:
+        """
+        Find a prompt with the given normalized hash
+        
+        Args:
+            digest (str): Normalized content hash
+            exclude (Optional[str]): Prompt ID to ignore
+            predicate (Optional[Callable[[str], bool]]): Only return IDs it accepts
+        
+        Returns:
+            Optional[str]: ID of a matching prompt, or None
+        """
+        with self._lock:
+            candidates = list(self._by_hash.get(digest, ()))
+        for prompt_id in candidates:
+            if prompt_id != exclude and (predicate is None or predicate(prompt_id)):
+                return prompt_id
+        return None
+
+class ImportDiff:
+    """Classifies import records against the library in a single pass"""
+    
+    def __init__(self, extension: Any, dry_run: bool = False, skip_duplicates: bool = False, max_duplicates: int = 100):
+        """
+        Initialize the diff
+        
+        Args:
+            extension (Any): PromptLibraryExtension being imported into
+            dry_run (bool): Only classify records; classify() then returns none
+                to apply
+            skip_duplicates (bool): Skip near-duplicates of other prompts
+                instead of only reporting them
+            max_duplicates (int): Number of duplicate details kept for the summary
+        """
+        self.extension = extension
+        self.dry_run = dry_run
+        self.skip_duplicates = skip_duplicates
+        self.max_duplicates = max_duplicates
+        
+        self.prompts = {"added": 0, "changed": 0, "unchanged": 0, "duplicates": 0, "over_quota": 0}
+        self.categories = {"added": 0, "changed": 0, "unchanged": 0}
+        self.duplicates: List[Dict[str, str]] = []
+        
+        # State earlier records produced that the store does not show yet:
+        # prompt ID -> (content hash, normalized hash, created_at), normalized
+        # hash -> prompt ID, and categories. Imports apply each batch before
+        # classifying the next, so only a dry run keeps it across batches.
+        self._prompts: Dict[str, Tuple[str, str, Optional[str]]] = {}
+        self._claims: Dict[str, str] = {}
+        self._categories: Dict[str, Dict[str, Any]] = {}
+        
+        # New prompts the library still has room for, or None without a limit
+        self._room: Optional[int] = None
+    
+    def classify(self, records: List[Tuple[str, Dict[str, Any]]]) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        Classify validated records and select the ones to write
+        
+        Prompts to write get their created_at and updated_at filled in:
+        created_at is kept from the stored prompt unless the record has one,
+        and a changed prompt without an updated_at is stamped now. New
+        prompts past the library's maxPrompts are skipped as over quota.
+        
+        Args:
+            records (List[Tuple[str, Dict[str, Any]]]): ("category" | "prompt", data) pairs
+        
+        Returns:
+            List[Tuple[str, Dict[str, Any]]]: Added and changed records, in
+                order; always empty in a dry run
+        """
+        if not self.dry_run:
+            self._prompts, self._claims, self._categories = {}, {}, {}
+        
+        # A dry run writes nothing, so the store doesn't count its additions
+        self._room = self.extension.prompt_room()
+        if self._room is not None and self.dry_run:
+            self._room = max(0, self._room - self.prompts["added"])
+        
+        now = datetime.utcnow().isoformat() + "Z"
+        selected = []
+        for record_type, data in records:
+            if record_type == "category":
+                write = self._category(data)
+            else:
+                write = self._prompt(data, now)
+            if write and not self.dry_run:
+                selected.append((record_type, data))
+        return selected
+    
+    def _category(self, category: Dict[str, Any]) -> bool:
+        """Classify a category, returning True if it needs writing"""
+        category_id = category["id"]
+        existing = self._categories.get(category_id) or self.extension.store.get_category(category_id)
+        if existing == category:
+            self.categories["unchanged"] += 1
+            return False
+        self.categories["changed" if existing is not None else "added"] += 1
+        self._categories[category_id] = category
+        return True
+    
+    def _prompt(self, prompt: Dict[str, Any], now: str) -> bool:
+        """Classify a prompt, returning True if it needs writing"""
+        prompt_id = prompt["id"]
+        digest = content_hash(prompt)
+        
+        if prompt_id in self._prompts:
+            existing_digest, existing_normalized, created_at = self._prompts[prompt_id]
+            exists = True
+        else:
+            existing = self.extension.store.get_prompt(prompt_id)
+            exists = existing is not None
+            existing_digest = content_hash(existing) if exists else None
+            existing_normalized = normalized_hash(existing) if exists else None
+            created_at = existing.get("created_at") if exists else None
+        
+        if digest == existing_digest:
+            self.prompts["unchanged"] += 1
+            return False
+        
+        # Only new content can introduce a duplicate; a prompt that already
+        # duplicates another still takes updates to its title, tags or category
+        normalized = normalized_hash(prompt)
+        duplicate = None
+        if normalized != existing_normalized:
+            duplicate = self._duplicate_of(prompt_id, normalized)
+        if duplicate is not None and self.skip_duplicates:
+            self._report_duplicate(prompt_id, duplicate)
+            return False
+        
+        if not exists and self._room is not None:
+            if self._room <= 0:
+                self.prompts["over_quota"] += 1
+                return False
+            self._room -= 1
+        
+        if duplicate is not None:
+            self._report_duplicate(prompt_id, duplicate)
+        
+        self.prompts["changed" if exists else "added"] += 1
+        prompt["created_at"] = prompt.get("created_at") or created_at or now
+        prompt["updated_at"] = prompt.get("updated_at") or (now if exists else prompt["created_at"])
+        
+        self._prompts[prompt_id] = (digest, normalized, prompt["created_at"])
+        self._claims[normalized] = prompt_id
+        return True
+    
+    def _report_duplicate(self, prompt_id: str, duplicate: str) -> None:
+        """Count a near-duplicate and keep its details for the summary"""
+        self.prompts["duplicates"] += 1
+        if len(self.duplicates) < self.max_duplicates:
+            self.duplicates.append({"id": prompt_id, "duplicate_of": duplicate})
+    
+    def _duplicate_of(self, prompt_id: str, normalized: str) -> Optional[str]:
+        """Find another prompt with the same normalized content"""
+        claimed = self._claims.get(normalized)
+        if claimed is not None and claimed != prompt_id and self._prompts[claimed][1] == normalized:
+            return claimed
+        
+        # Prompts earlier records rewrote no longer count as they are stored
+        def current(other_id: str) -> bool:
+            return other_id not in self._prompts or self._prompts[other_id][1] == normalized
+        
+        return self.extension.duplicate_index.find(normalized, exclude=prompt_id, predicate=current)
+    
+    def summary(self) -> Dict[str, Any]:
+        """
+        Get the diff summary
+        
+        Returns:
+            Dict[str, Any]: "dry_run", "skip_duplicates", per-outcome counts
+                for "prompts" and "categories", and up to max_duplicates
+                "duplicates", each with the prompt's "id" and the ID it duplicates
+        """
+        return {
+            "dry_run": self.dry_run,
+            "skip_duplicates": self.skip_duplicates,
+            "prompts": dict(self.prompts),
+            "categories": dict(self.categories),
+            "duplicates": list(self.duplicates)
+        }
@@ -0,0 +1,116 @@
+"""
+Bounded thread-pool executor for the Prompt Library extension
+
+The extension's methods are synchronous and may block on disk I/O, JSON
+encoding or locks. API routes run them here instead of on the event loop.
+Reads and writes use separate pools, so a long import or a slow fsync only
+occupies the write pool while reads keep being served.
+"""
+
+import asyncio
+import logging
+import threading
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable
+
+# Setup logging
+logger = logging.getLogger("prompt_library.executor")
+
+class ExecutorOverloaded(Exception):
+    """Raised when too many calls are already queued"""
+    pass
+
+class ExtensionExecutor:
+    """Runs blocking extension calls on bounded read and write pools"""
+    
+    def __init__(
+        self,
+        read_workers: int = 4,
+        write_workers: int = 1,
+        max_pending: int = 256
+    ):
+        """
+        Initialize the executor
+        
+        Args:
+            read_workers (int): Threads serving read-only calls
+            write_workers (int): Threads serving mutating calls
+            max_pending (int): Calls allowed to be queued or running per pool
+        """
+        self.max_pending = max_pending
+        self._pools = {
+            "read": ThreadPoolExecutor(max_workers=read_workers, thread_name_prefix="prompt-library-read"),
+            "write": ThreadPoolExecutor(max_workers=write_workers, thread_name_prefix="prompt-library-write")
+        }
+        self._lock = threading.Lock()
+        self._pending = {"read": 0, "write": 0}
+        self._rejected = {"read": 0, "write": 0}
+    
+    async def _run(self, kind: str, fn: Callable, *args, **kwargs) -> Any:
+        """Run fn on the given pool unless its queue is full"""
+        with self._lock:
+            if self._pending[kind] >= self.max_pending:
+                # Shed load instead of letting the queue and latency grow
+                self._rejected[kind] += 1
+                raise ExecutorOverloaded(f"Too many pending {kind} calls")
+            self._pending[kind] += 1
+        
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._pools[kind], functools.partial(fn, *args, **kwargs))
+        finally:
+            with self._lock:
+                self._pending[kind] -= 1
+    
+    async def read(self, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Run a read-only call on the read pool
+        
+        Args:
+            fn (Callable): Function to call
+        
+        Returns:
+            Any: The function's result
+        
+        Raises:
+            ExecutorOverloaded: If max_pending read calls are already queued
+        """
+        return await self._run("read", fn, *args, **kwargs)
+    
+    async def write(self, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Run a mutating call on the write pool
+        
+        Args:
+            fn (Callable): Function to call
+        
+        Returns:
+            Any: The function's result
+        
+        Raises:
+            ExecutorOverloaded: If max_pending write calls are already queued
+        """
+        return await self._run("write", fn, *args, **kwargs)
+    
+    def stats(self) -> Dict[str, int]:
+        """
+        Get queue depth and rejected calls per pool
+        
+        Returns:
+            Dict[str, int]: Pending and rejected read and write calls
+        """
+        with self._lock:
+            stats = {f"{kind}_pending": count for kind, count in self._pending.items()}
+            stats.update({f"{kind}_rejected": count for kind, count in self._rejected.items()})
+        return stats
+    
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Stop the worker threads
+        
+        Args:
+            wait (bool): Wait for running calls to finish
+        """
+        for pool in self._pools.values():
+            pool.shutdown(wait=wait)
@@ -0,0 +1,185 @@
+"""
+Write-behind flushing for the Prompt Library extension
+
+Mutations become visible to readers as soon as they are applied in memory;
+committing them to storage is what costs I/O. Rather than committing after
+every change, the WriteBehindFlusher counts pending changes and commits them
+from a background thread once the oldest has waited flushIntervalMs or
+flushMaxPending have accumulated, so a burst of edits costs a few commits
+instead of one per edit.
+"""
+
+import time
+import logging
+import threading
+from typing import Dict, Any, Callable, Optional
+
+# Setup logging
+logger = logging.getLogger("prompt_library.flusher")
+
+class WriteBehindFlusher:
+    """Background thread committing pending changes in coalesced batches"""
+    
+    def __init__(self, flush: Callable[[bool], None], interval: float = 0.5, max_pending: int = 1000):
+        """
+        Initialize the flusher
+        
+        Args:
+            flush (Callable[[bool], None]): Commits every change made so far;
+                when its argument is True, also forces them to disk
+            interval (float): Maximum seconds a change waits to be flushed
+            max_pending (int): Pending changes that trigger a flush at once
+        """
+        self.flush_fn = flush
+        self.interval = interval
+        self.max_pending = max(1, max_pending)
+        
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = False
+        
+        # Changes marked since the last flush started, and when the first was
+        self._pending = 0
+        self._oldest: Optional[float] = None
+        
+        self._flushes = 0
+        self._flushed_changes = 0
+        self._errors = 0
+        self._last_ms = 0.0
+        self._max_ms = 0.0
+        self._total_ms = 0.0
+    
+    def start(self) -> None:
+        """Start flushing in a daemon thread"""
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._stop = False
+            self._thread = threading.Thread(target=self._run, name="prompt-library-flusher", daemon=True)
+            self._thread.start()
+    
+    def stop(self) -> None:
+        """Stop the thread and flush whatever is still pending"""
+        with self._cond:
+            thread, self._thread = self._thread, None
+            self._stop = True
+            self._cond.notify()
+        if thread is not None:
+            thread.join()
+        self.flush()
+    
+    def mark(self, changes: int = 1) -> None:
+        """
+        Record changes that need flushing
+        
+        Without a running thread (or with a zero interval) they are flushed
+        before this returns.
+        
+        Args:
+            changes (int): Number of changed prompts and categories
+        """
+        with self._cond:
+            self._pending += changes
+            if self._thread is not None and self.interval > 0:
+                if self._oldest is None:
+                    self._oldest = time.monotonic()
+                    self._cond.notify()
+                elif self._pending >= self.max_pending:
+                    self._cond.notify()
+                return
+        self.flush()
+    
+    def flush(self, wait: bool = True, durable: bool = False) -> None:
+        """
+        Flush pending changes
+        
+        Args:
+            wait (bool): Flush on the calling thread and return once done;
+                otherwise only wake the background thread
+            durable (bool): Also force everything flushed so far to disk;
+                only applies when waiting
+        """
+        if not wait and self._thread is not None:
+            with self._cond:
+                if self._oldest is not None:
+                    # Due now
+                    self._oldest -= self.interval
+                    self._cond.notify()
+            return
+        self._flush(durable)
+    
+    def _flush(self, durable: bool = False) -> bool:
+        """Commit pending changes, returning False if that failed"""
+        with self._flush_lock:
+            with self._cond:
+                changes = self._pending
+                if not changes and not durable:
+                    return True
+                self._pending = 0
+                self._oldest = None
+            
+            start = time.perf_counter()
+            try:
+                self.flush_fn(durable)
+            except Exception as e:
+                # Keep the changes pending, so the next flush retries them
+                with self._cond:
+                    self._pending += changes
+                    if self._oldest is None:
+                        self._oldest = time.monotonic()
+                    self._errors += 1
+                logger.error(f"Error flushing changes: {e}")
+                return False
+            elapsed = (time.perf_counter() - start) * 1000
+            
+            with self._cond:
+                self._flushes += 1
+                self._flushed_changes += changes
+                self._last_ms = elapsed
+                self._max_ms = max(self._max_ms, elapsed)
+                self._total_ms += elapsed
+            return True
+    
+    def _run(self) -> None:
+        """Flush whenever the oldest change is due or enough have piled up"""
+        while True:
+            with self._cond:
+                while not self._stop:
+                    if self._oldest is not None:
+                        remaining = self._oldest + self.interval - time.monotonic()
+                        if remaining <= 0 or self._pending >= self.max_pending:
+                            break
+                        self._cond.wait(remaining)
+                    else:
+                        self._cond.wait()
+                if self._stop:
+                    return
+            
+            if not self._flush():
+                # Back off instead of spinning on a flush that keeps failing
+                with self._cond:
+                    if not self._stop:
+                        self._cond.wait(self.interval)
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the queue depth and flush latency
+        
+        Returns:
+            Dict[str, Any]: Pending changes, age of the oldest in ms, number
+                of flushes and changes flushed, failed flushes, and the last,
+                mean and maximum flush time in ms
+        """
+        with self._cond:
+            oldest_ms = (time.monotonic() - self._oldest) * 1000 if self._oldest is not None else 0.0
+            return {
+                "pending": self._pending,
+                "oldest_pending_ms": round(oldest_ms, 3),
+                "flushes": self._flushes,
+                "flushed_changes": self._flushed_changes,
+                "errors": self._errors,
+                "last_flush_ms": round(self._last_ms, 3),
+                "mean_flush_ms": round(self._total_ms / self._flushes, 3) if self._flushes else 0.0,
+                "max_flush_ms": round(self._max_ms, 3)
+            }
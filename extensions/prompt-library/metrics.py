@@ -0,0 +1,384 @@
+"""
+Metrics and slow-request profiling for the Prompt Library extension
+
+Metrics are kept in-process and rendered in the Prometheus text format
+(version 0.0.4) by GET /metrics, without a client library. Histograms and
+counters are updated on the hot paths; gauges such as the library size and
+the cache counters are read from their sources when the endpoint is scraped.
+
+The sampling profiler is off unless enabled. While it is enabled and a
+request is in flight, a thread samples the stacks of threads running
+extension code every few milliseconds. Requests slower than the threshold
+keep the samples taken while they ran, as collapsed stacks (the input format
+of flame graph tools).
+"""
+
+import os
+import sys
+import time
+import threading
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional, Any, Callable, Iterator, Tuple, Union
+
+# Latency buckets in seconds, from sub-millisecond index updates to slow imports
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelValues = Tuple[str, ...]
+
+def _escape(value: str) -> str:
+    """Escape a label value"""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    """Format a label set, e.g. {route="/prompts",le="0.5"}"""
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value: float) -> str:
+    """Format a sample value"""
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class Counter:
+    """Monotonic counter with optional labels"""
+    
+    def __init__(self, name: str, description: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+    
+    def inc(self, amount: float = 1.0, *values: str) -> None:
+        """
+        Increase the counter
+        
+        Args:
+            amount (float): Non-negative increment
+            *values (str): Label values, in the order of the label names
+        """
+        with self._lock:
+            self._values[values] = self._values.get(values, 0.0) + amount
+    
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.description}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            values = list(self._values.items())
+        for label_values, value in values:
+            yield f"{self.name}{_labels(self.labels, label_values)} {_number(value)}"
+
+class Histogram:
+    """Histogram of observed values with optional labels"""
+    
+    def __init__(self, name: str, description: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (last one is +Inf), sum, count]
+        self._series: Dict[LabelValues, List[Any]] = {}
+        self._lock = threading.Lock()
+    
+    def observe(self, value: float, *values: str) -> None:
+        """
+        Record one observation
+        
+        Args:
+            value (float): Observed value, e.g. seconds
+            *values (str): Label values, in the order of the label names
+        """
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(values)
+            if series is None:
+                series = self._series[values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+    
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.description}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            series = [(label_values, list(counts), total, count) for label_values, (counts, total, count) in self._series.items()]
+        for label_values, counts, total, count in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_number(bound)}"'
+                yield f"{self.name}_bucket{_labels(self.labels, label_values, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labels, label_values)} {_number(total)}"
+            yield f"{self.name}_count{_labels(self.labels, label_values)} {count}"
+
+class Collected:
+    """Gauge or counter whose values are read from a callback when scraped"""
+    
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        kind: str,
+        read: Callable[[], Union[float, Dict[LabelValues, float]]],
+        labels: Tuple[str, ...] = ()
+    ):
+        self.name = name
+        self.description = description
+        self.kind = kind
+        self.read = read
+        self.labels = labels
+    
+    def render(self) -> Iterator[str]:
+        values = self.read()
+        if not isinstance(values, dict):
+            values = {(): values}
+        yield f"# HELP {self.name} {self.description}"
+        yield f"# TYPE {self.name} {self.kind}"
+        for label_values, value in values.items():
+            yield f"{self.name}{_labels(self.labels, label_values)} {_number(value)}"
+
+class Metrics:
+    """The extension's metrics, rendered in the Prometheus text format"""
+    
+    def __init__(self, prefix: str = "prompt_library"):
+        """
+        Initialize the registry with the request and operation metrics
+        
+        Args:
+            prefix (str): Prefix of every metric name
+        """
+        self.prefix = prefix
+        self._metrics: List[Any] = []
+        
+        self.requests = self.histogram(
+            "request_duration_seconds", "API request latency by route and status", ("method", "route", "status")
+        )
+        self.operations = self.histogram(
+            "operation_duration_seconds", "Duration of extension operations", ("operation",)
+        )
+        self.operation_errors = self.counter(
+            "operation_errors_total", "Extension operations that raised", ("operation",)
+        )
+        self.operation_items = self.counter(
+            "operation_items_total", "Prompts and categories processed by extension operations", ("operation",)
+        )
+    
+    def counter(self, name: str, description: str, labels: Tuple[str, ...] = ()) -> Counter:
+        """Register a counter"""
+        metric = Counter(f"{self.prefix}_{name}", description, labels)
+        self._metrics.append(metric)
+        return metric
+    
+    def histogram(self, name: str, description: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        """Register a histogram"""
+        metric = Histogram(f"{self.prefix}_{name}", description, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+    
+    def collect(
+        self,
+        name: str,
+        description: str,
+        read: Callable[[], Union[float, Dict[LabelValues, float]]],
+        labels: Tuple[str, ...] = (),
+        kind: str = "gauge"
+    ) -> None:
+        """
+        Register a metric read from a callback when scraped
+        
+        Args:
+            name (str): Name without the prefix
+            description (str): Help text
+            read (Callable): Returns the value, or values by label values
+            labels (Tuple[str, ...]): Label names
+            kind (str): "gauge" or "counter"
+        """
+        self._metrics.append(Collected(f"{self.prefix}_{name}", description, kind, read, labels))
+    
+    @contextmanager
+    def operation(self, name: str, items: int = 0) -> Iterator[None]:
+        """
+        Time an extension operation, counting it as an error if it raises
+        
+        Args:
+            name (str): Operation name, e.g. "import"
+            items (int): Prompts and categories it processes
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.operation_errors.inc(1, name)
+            raise
+        finally:
+            self.operations.observe(time.perf_counter() - start, name)
+            if items:
+                self.operation_items.inc(items, name)
+    
+    def render(self) -> str:
+        """
+        Render every metric
+        
+        Returns:
+            str: Prometheus text exposition format
+        """
+        lines = []
+        for metric in self._metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                # One failing source must not hide the other metrics
+                lines.append(f"# {metric.name} unavailable: {e}")
+        return "\n".join(lines) + "\n"
+
+class SamplingProfiler:
+    """Samples thread stacks while requests run and keeps those of slow requests"""
+    
+    def __init__(
+        self,
+        interval: float = 0.005,
+        threshold: float = 0.5,
+        keep: int = 20,
+        max_samples: int = 100000,
+        max_depth: int = 64,
+        root: Optional[str] = None
+    ):
+        """
+        Initialize a disabled profiler
+        
+        Args:
+            interval (float): Seconds between stack samples
+            threshold (float): Requests taking at least this many seconds are kept
+            keep (int): Number of slow requests kept, newest first
+            max_samples (int): Stack samples buffered for requests in flight
+            max_depth (int): Frames recorded per stack
+            root (Optional[str]): Only threads with a frame under this
+                directory are sampled; defaults to the extension directory
+        """
+        self.interval = interval
+        self.threshold = threshold
+        self.max_depth = max_depth
+        self.root = root or os.path.dirname(os.path.abspath(__file__))
+        
+        self.enabled = False
+        self._active = 0
+        self._samples: "deque[Tuple[float, str]]" = deque(maxlen=max_samples)
+        self._slow: "deque[Dict[str, Any]]" = deque(maxlen=keep)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+    
+    def configure(self, enabled: Optional[bool] = None, threshold: Optional[float] = None, interval: Optional[float] = None) -> None:
+        """
+        Change the settings; the profiler can be toggled at any time
+        
+        Args:
+            enabled (Optional[bool]): Turn sampling on or off
+            threshold (Optional[float]): Slow request threshold in seconds
+            interval (Optional[float]): Seconds between stack samples
+        """
+        with self._lock:
+            if threshold is not None:
+                self.threshold = threshold
+            if interval is not None:
+                self.interval = max(0.001, interval)
+            if enabled is not None:
+                self.enabled = enabled
+                if not enabled:
+                    self._samples.clear()
+                elif self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name="prompt-library-profiler", daemon=True)
+                    self._thread.start()
+    
+    def begin(self) -> Optional[float]:
+        """
+        Mark the start of a request
+        
+        Returns:
+            Optional[float]: Token to pass to end(), or None while disabled
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            self._active += 1
+        return time.perf_counter()
+    
+    def end(self, started: Optional[float], label: str) -> None:
+        """
+        Mark the end of a request, keeping its samples if it was slow
+        
+        Args:
+            started (Optional[float]): Token begin() returned
+            label (str): Request description, e.g. "GET /prompts"
+        """
+        if started is None:
+            return
+        duration = time.perf_counter() - started
+        with self._lock:
+            self._active -= 1
+            if duration < self.threshold:
+                return
+            stacks: Dict[str, int] = {}
+            for sampled_at, stack in self._samples:
+                if sampled_at >= started:
+                    stacks[stack] = stacks.get(stack, 0) + 1
+            self._slow.appendleft({
+                "request": label,
+                "duration_ms": round(duration * 1000, 3),
+                "finished_at": datetime.utcnow().isoformat() + "Z",
+                "samples": sum(stacks.values()),
+                # Collapsed stacks, root first, with their sample counts
+                "stacks": dict(sorted(stacks.items(), key=lambda item: -item[1])[:50])
+            })
+    
+    def _run(self) -> None:
+        """Sample stacks while enabled and requests are in flight"""
+        own = threading.get_ident()
+        while self.enabled:
+            if self._active:
+                now = time.perf_counter()
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id == own:
+                        continue
+                    stack = self._collapse(frame)
+                    if stack is not None:
+                        self._samples.append((now, stack))
+            elif self._samples:
+                with self._lock:
+                    if not self._active:
+                        self._samples.clear()
+            time.sleep(self.interval)
+    
+    def _collapse(self, frame: Any) -> Optional[str]:
+        """Format a stack as "file:function;..." from the root, if it runs extension code"""
+        frames = []
+        relevant = False
+        while frame is not None and len(frames) < self.max_depth:
+            code = frame.f_code
+            relevant = relevant or code.co_filename.startswith(self.root)
+            frames.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+            frame = frame.f_back
+        if not relevant:
+            return None
+        return ";".join(reversed(frames))
+    
+    def report(self) -> Dict[str, Any]:
+        """
+        Get the settings and the slow requests captured
+        
+        Returns:
+            Dict[str, Any]: "enabled", "threshold_ms", "interval_ms" and
+                "slow_requests", newest first
+        """
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "threshold_ms": self.threshold * 1000,
+                "interval_ms": self.interval * 1000,
+                "slow_requests": list(self._slow)
+            }
@@ -6,6 +6,8 @@ from typing import Dict, List, Optional, Any
 from pydantic import BaseModel, Field
 from datetime import datetime
 
+from .store import PromptStore, MemoryPromptStore
+
 class PromptCategory(BaseModel):
     """Prompt category model"""
     id: str
@@ -51,73 +53,97 @@ class ImportExportData(BaseModel):
     class Config:
         orm_mode = True
 
-# Storage functions (in a real implementation, these would interact with a database)
+# Storage functions, backed by a pluggable PromptStore
+
+_store: PromptStore = MemoryPromptStore()
+
+def get_store() -> PromptStore:
+    """Get the store used by the module functions"""
+    return _store
+
+def set_store(store: PromptStore) -> None:
+    """Replace the store used by the module functions"""
+    global _store
+    _store = store
 
-_categories: Dict[str, PromptCategory] = {}
-_prompts: Dict[str, Prompt] = {}
+def _to_record(model: BaseModel) -> Dict[str, Any]:
+    """Convert a model to a JSON-compatible store record"""
+    record = model.dict()
+    for key, value in record.items():
+        if isinstance(value, datetime):
+            record[key] = value.isoformat() + ("Z" if value.tzinfo is None else "")
+    return record
 
 def get_categories() -> List[PromptCategory]:
     """Get all categories"""
-    return list(_categories.values())
+    return [PromptCategory(**category) for category in _store.list_categories()]
 
 def get_category(category_id: str) -> Optional[PromptCategory]:
     """Get a category by ID"""
-    return _categories.get(category_id)
+    category = _store.get_category(category_id)
+    return PromptCategory(**category) if category is not None else None
 
 def add_category(category: PromptCategory) -> str:
     """Add a category"""
-    _categories[category.id] = category
+    _store.put_category(_to_record(category))
+    _store.commit()
     return category.id
 
 def update_category(category_id: str, category: PromptCategory) -> bool:
     """Update a category"""
-    if category_id not in _categories:
+    if _store.get_category(category_id) is None:
         return False
-    _categories[category_id] = category
+    record = _to_record(category)
+    record["id"] = category_id
+    _store.put_category(record)
+    _store.commit()
     return True
 
 def delete_category(category_id: str) -> bool:
     """Delete a category"""
-    if category_id not in _categories:
+    if not _store.delete_category(category_id):
         return False
-    del _categories[category_id]
+    _store.commit()
     return True
 
-def get_prompts(category: Optional[str] = None) -> List[Prompt]:
-    """Get prompts, optionally filtered by category"""
-    if category:
-        return [prompt for prompt in _prompts.values() if prompt.category == category]
-    return list(_prompts.values())
+def get_prompts(category: Optional[str] = None, tag: Optional[str] = None) -> List[Prompt]:
+    """Get prompts, optionally filtered by category and/or tag"""
+    return [Prompt(**prompt) for prompt in _store.list_prompts(category or None, tag or None)]
 
 def get_prompt(prompt_id: str) -> Optional[Prompt]:
     """Get a prompt by ID"""
-    return _prompts.get(prompt_id)
+    prompt = _store.get_prompt(prompt_id)
+    return Prompt(**prompt) if prompt is not None else None
 
 def add_prompt(prompt: Prompt) -> str:
     """Add a prompt"""
-    _prompts[prompt.id] = prompt
+    _store.put_prompt(_to_record(prompt))
+    _store.commit()
     return prompt.id
 
 def update_prompt(prompt_id: str, prompt: Prompt) -> bool:
     """Update a prompt"""
-    if prompt_id not in _prompts:
+    if _store.get_prompt(prompt_id) is None:
         return False
     prompt.updated_at = datetime.utcnow()
-    _prompts[prompt_id] = prompt
+    record = _to_record(prompt)
+    record["id"] = prompt_id
+    _store.put_prompt(record)
+    _store.commit()
     return True
 
 def delete_prompt(prompt_id: str) -> bool:
     """Delete a prompt"""
-    if prompt_id not in _prompts:
+    if not _store.delete_prompt(prompt_id):
         return False
-    del _prompts[prompt_id]
+    _store.commit()
     return True
 
 def export_data() -> ImportExportData:
     """Export all data"""
     return ImportExportData(
-        categories={category.id: category for category in _categories.values()},
-        prompts={prompt.id: prompt for prompt in _prompts.values()}
+        categories={category.id: category for category in get_categories()},
+        prompts={prompt.id: prompt for prompt in get_prompts()}
     )
 
 def import_data(data: ImportExportData) -> bool:
@@ -125,12 +151,17 @@ def import_data(data: ImportExportData) -> bool:
     try:
         # Merge categories
         for category_id, category in data.categories.items():
-            _categories[category_id] = category
+            record = _to_record(category)
+            record["id"] = category_id
+            _store.put_category(record)
         
         # Merge prompts
         for prompt_id, prompt in data.prompts.items():
-            _prompts[prompt_id] = prompt
+            record = _to_record(prompt)
+            record["id"] = prompt_id
+            _store.put_prompt(record)
         
+        _store.commit()
         return True
     except Exception:
         return False
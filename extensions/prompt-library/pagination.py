@@ -0,0 +1,93 @@
+"""
+Cursor pagination helpers for the Prompt Library extension
+
+Cursors are opaque to clients: they encode the sort order and the
+(sort key, ID) position of the last prompt on the previous page.
+"""
+
+import json
+import base64
+from typing import Dict, List, Optional, Any, Iterable
+
+from .records import as_dict
+
+# Fields a prompt projection may select
+PROMPT_FIELDS = ("id", "title", "content", "description", "category", "tags", "variables", "created_at", "updated_at", "version")
+
+def encode_cursor(sort: str, descending: bool, key: str, item_id: str) -> str:
+    """
+    Encode a page position as an opaque cursor
+    
+    Args:
+        sort (str): Sort field the page was produced with
+        descending (bool): Whether the page was in descending order
+        key (str): Sort key of the last item on the page
+        item_id (str): ID of the last item on the page
+    
+    Returns:
+        str: URL-safe cursor string
+    """
+    payload = json.dumps([sort, descending, key, item_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """
+    Decode a cursor produced by encode_cursor
+    
+    Args:
+        cursor (str): Cursor string
+    
+    Returns:
+        Dict[str, Any]: "sort", "descending" and "after" (key, ID) position
+    
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort, descending, key, item_id = json.loads(base64.urlsafe_b64decode(padded))
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    # Every sort field orders by a string, and stores compare the key with
+    # stored ones, so a crafted cursor must not smuggle in other types
+    if not (isinstance(sort, str) and isinstance(descending, bool) and isinstance(key, str) and isinstance(item_id, str)):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return {"sort": sort, "descending": descending, "after": (key, item_id)}
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """
+    Parse a comma-separated field projection
+    
+    Args:
+        fields (Optional[str]): Comma-separated field names, or None for all fields
+    
+    Returns:
+        Optional[List[str]]: Selected fields (always including "id"), or None for all fields
+    
+    Raises:
+        ValueError: If an unknown field is requested
+    """
+    if not fields:
+        return None
+    selected = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in selected if field not in PROMPT_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    if "id" not in selected:
+        selected.insert(0, "id")
+    return selected
+
+def project(prompts: Iterable[Dict[str, Any]], fields: Optional[List[str]]) -> List[Dict[str, Any]]:
+    """
+    Restrict prompts to the selected fields
+    
+    Args:
+        prompts (Iterable[Dict[str, Any]]): Stored prompts
+        fields (Optional[List[str]]): Selected fields, or None for all fields
+    
+    Returns:
+        List[Dict[str, Any]]: Projected prompt dictionaries
+    """
+    if fields is None:
+        return [as_dict(prompt) for prompt in prompts]
+    return [{field: prompt.get(field) for field in fields} for prompt in prompts]
@@ -0,0 +1,344 @@
+"""
+Per-owner partitions of the Prompt Library
+
+Besides the shared library, every user and team has a library of its own,
+addressed by a scope such as "user:alice" or "team:research". A partition
+keeps its store in its own directory under partitions/ in the storage
+directory and is loaded on first use with its own indexes, so listing,
+searching or counting one owner's prompts never touches another's.
+
+A caller may only use its own library and the libraries of its teams. The
+caller's identity comes from the host: authorize_scope() checks a scope
+against the user ID and team IDs it vouches for.
+
+Loaded partitions are kept in least-recently-used order. Once more than
+max_resident are loaded, or one has not been used for idle_seconds, it is
+committed and closed, and loaded again on its next use. A partition is
+only closed once no caller holds it.
+"""
+
+import os
+import re
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Any, Callable
+
+# Setup logging
+logger = logging.getLogger("prompt_library.partitions")
+
+SHARED_SCOPE = "shared"
+
+# Scope kinds with one partition per owner
+SCOPE_KINDS = ("user", "team")
+
+# Directory under the storage directory holding the partitions
+PARTITIONS_DIR = "partitions"
+
+# Owner IDs double as directory names, so they can't start with a dot
+OWNER_PATTERN = re.compile(r"[A-Za-z0-9][A-Za-z0-9_.@-]{0,127}")
+
+class QuotaExceeded(Exception):
+    """Raised when a write would take a library past maxPrompts"""
+    
+    def __init__(self, limit: int):
+        super().__init__(f"Prompt limit reached: a library holds at most {limit} prompts")
+        self.limit = limit
+
+class ScopeDenied(Exception):
+    """Raised when a caller may not use the library a scope addresses"""
+    
+    def __init__(self, message: str, authenticated: bool = True):
+        super().__init__(message)
+        # False when the caller's identity is missing altogether
+        self.authenticated = authenticated
+
+def parse_scope(scope: Optional[str]) -> str:
+    """
+    Validate a scope
+    
+    Args:
+        scope (Optional[str]): "shared", "user:<id>" or "team:<id>"; empty
+            for the shared library
+    
+    Returns:
+        str: The scope
+    
+    Raises:
+        ValueError: If the scope is malformed
+    """
+    if not scope or scope == SHARED_SCOPE:
+        return SHARED_SCOPE
+    kind, _, owner = scope.partition(":")
+    if kind not in SCOPE_KINDS:
+        raise ValueError(f"Invalid scope: {scope}; expected shared, user:<id> or team:<id>")
+    if not OWNER_PATTERN.fullmatch(owner):
+        raise ValueError(f"Invalid {kind} ID in scope: {owner!r}")
+    return scope
+
+def authorize_scope(scope: Optional[str], user: Optional[str], teams: List[str]) -> str:
+    """
+    Validate a scope and check that the caller may use it
+    
+    "user" on its own addresses the caller's own library.
+    
+    Args:
+        scope (Optional[str]): Requested scope; empty for the shared library
+        user (Optional[str]): Caller's user ID, as vouched for by the host
+        teams (List[str]): IDs of the teams the caller belongs to
+    
+    Returns:
+        str: The validated scope
+    
+    Raises:
+        ValueError: If the scope is malformed
+        ScopeDenied: If the caller is unknown or the scope belongs to
+            another user or to a team the caller is not in
+    """
+    if scope == "user":
+        if not user:
+            raise ScopeDenied("Sign in to use your own library", authenticated=False)
+        scope = f"user:{user}"
+    scope = parse_scope(scope)
+    if scope == SHARED_SCOPE:
+        return scope
+    
+    kind, _, owner = scope.partition(":")
+    if not user:
+        raise ScopeDenied(f"Sign in to use the {kind} library {owner}", authenticated=False)
+    if kind == "user" and owner != user:
+        raise ScopeDenied(f"Not allowed to use the library of user {owner}")
+    if kind == "team" and owner not in teams:
+        raise ScopeDenied(f"Not a member of team {owner}")
+    return scope
+
+def scope_path(scope: str) -> str:
+    """
+    Get a partition's directory relative to the storage directory
+    
+    Args:
+        scope (str): Validated scope other than "shared"
+    
+    Returns:
+        str: Relative directory path
+    """
+    kind, _, owner = scope.partition(":")
+    return os.path.join(PARTITIONS_DIR, kind, owner)
+
+class _Partition:
+    """A resident partition and the callers holding it"""
+    
+    __slots__ = ("library", "holders", "last_used", "loaded", "error")
+    
+    def __init__(self):
+        self.library: Any = None
+        self.holders = 0
+        self.last_used = time.monotonic()
+        # Set once loading has finished, successfully or not
+        self.loaded = threading.Event()
+        self.error: Optional[BaseException] = None
+
+class PartitionManager:
+    """LRU of loaded partitions, loading them on first use"""
+    
+    def __init__(
+        self,
+        open_partition: Callable[[str], Any],
+        close_partition: Callable[[Any], None],
+        max_resident: int = 32,
+        idle_seconds: float = 600.0
+    ):
+        """
+        Initialize the manager
+        
+        Args:
+            open_partition (Callable[[str], Any]): Loads the library of a scope
+            close_partition (Callable[[Any], None]): Commits and closes a library
+            max_resident (int): Partitions kept loaded; 0 for no limit
+            idle_seconds (float): Close partitions unused for this long; 0
+                to keep them until the limit is reached
+        """
+        self.open_partition = open_partition
+        self.close_partition = close_partition
+        self.max_resident = max_resident
+        self.idle_seconds = idle_seconds
+        
+        self._lock = threading.Lock()
+        # scope -> partition, least recently used first
+        self._resident: "OrderedDict[str, _Partition]" = OrderedDict()
+        # scope -> set once the partition evicted from it is closed, so it
+        # is never loaded twice at the same time
+        self._closing: Dict[str, threading.Event] = {}
+        
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        
+        self.loads = 0
+        self.evictions = 0
+    
+    def __len__(self) -> int:
+        return len(self._resident)
+    
+    def acquire(self, scope: str) -> Any:
+        """
+        Get a partition's library, loading it if needed
+        
+        Every call must be paired with release(), and the library must not be
+        used after it.
+        
+        Args:
+            scope (str): Validated scope other than "shared"
+        
+        Returns:
+            Any: The partition's library
+        
+        Raises:
+            Exception: Whatever loading the partition raised
+        """
+        while True:
+            with self._lock:
+                closing = self._closing.get(scope)
+                if closing is None:
+                    partition = self._resident.get(scope)
+                    load = partition is None
+                    if load:
+                        partition = self._resident[scope] = _Partition()
+                    partition.holders += 1
+                    partition.last_used = time.monotonic()
+                    self._resident.move_to_end(scope)
+                    break
+            # Its previous library is still being closed
+            closing.wait()
+        
+        if load:
+            try:
+                partition.library = self.open_partition(scope)
+                self.loads += 1
+            except BaseException as e:
+                partition.error = e
+                with self._lock:
+                    if self._resident.get(scope) is partition:
+                        del self._resident[scope]
+            finally:
+                partition.loaded.set()
+            self._evict()
+        else:
+            partition.loaded.wait()
+        
+        if partition.error is not None:
+            with self._lock:
+                partition.holders -= 1
+            raise partition.error
+        return partition.library
+    
+    def release(self, scope: str) -> None:
+        """
+        Give back a partition taken with acquire()
+        
+        Only bookkeeping, so it can run on the event loop; partitions over
+        the limit are closed by the next acquire() or the idle sweep.
+        
+        Args:
+            scope (str): The scope passed to acquire()
+        """
+        with self._lock:
+            partition = self._resident.get(scope)
+            if partition is not None:
+                partition.holders -= 1
+                partition.last_used = time.monotonic()
+                self._resident.move_to_end(scope)
+    
+    def _evict(self) -> None:
+        """Close the partitions over the limit or idle for too long"""
+        now = time.monotonic()
+        evicted = []
+        with self._lock:
+            excess = len(self._resident) - self.max_resident if self.max_resident > 0 else 0
+            for scope, partition in self._resident.items():
+                if excess <= 0 and not (self.idle_seconds > 0 and now - partition.last_used >= self.idle_seconds):
+                    # Partitions further on were used more recently
+                    break
+                if partition.holders or not partition.loaded.is_set():
+                    continue
+                evicted.append((scope, partition))
+                excess -= 1
+            for scope, _ in evicted:
+                del self._resident[scope]
+                self._closing[scope] = threading.Event()
+        
+        for scope, partition in evicted:
+            try:
+                self.close_partition(partition.library)
+                self.evictions += 1
+            except Exception as e:
+                logger.error(f"Error closing partition {scope}: {e}")
+            finally:
+                with self._lock:
+                    self._closing.pop(scope).set()
+    
+    def close_all(self) -> None:
+        """Stop the idle sweep and close every loaded partition"""
+        self.stop()
+        with self._lock:
+            partitions = list(self._resident.items())
+            self._resident.clear()
+        for scope, partition in partitions:
+            partition.loaded.wait()
+            if partition.error is not None:
+                continue
+            try:
+                self.close_partition(partition.library)
+            except Exception as e:
+                logger.error(f"Error closing partition {scope}: {e}")
+    
+    def start(self) -> None:
+        """Close idle partitions from a daemon thread, even without requests"""
+        if self._thread is not None or self.idle_seconds <= 0:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="prompt-library-partitions", daemon=True)
+        self._thread.start()
+    
+    def stop(self) -> None:
+        """Stop the idle sweep"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+    
+    def _run(self) -> None:
+        """Sweep until stopped"""
+        while not self._stop.wait(max(1.0, self.idle_seconds / 4)):
+            try:
+                self._evict()
+            except Exception as e:
+                logger.error(f"Error evicting idle partitions: {e}")
+    
+    def resident(self) -> List[str]:
+        """
+        Get the loaded partitions
+        
+        Returns:
+            List[str]: Scopes, least recently used first
+        """
+        with self._lock:
+            return list(self._resident)
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get residency statistics
+        
+        Returns:
+            Dict[str, Any]: Resident and held partitions, the limits, and
+                loads and evictions so far
+        """
+        with self._lock:
+            return {
+                "resident": len(self._resident),
+                "held": sum(1 for partition in self._resident.values() if partition.holders),
+                "max_resident": self.max_resident,
+                "idle_seconds": self.idle_seconds,
+                "loads": self.loads,
+                "evictions": self.evictions
+            }
@@ -0,0 +1,231 @@
+"""
+Compact in-memory prompt records for the Prompt Library extension
+
+Plain dictionaries repeat every key, category, tag and ISO timestamp string
+per prompt. A PromptRecord keeps one prompt in fixed slots instead: category
+and tag strings are interned so prompts share one object per distinct value,
+timestamps are integer epoch microseconds whenever that reproduces the
+original string exactly, and long content can be kept zlib-compressed.
+
+Records are read-only mappings, so code reading prompt["title"] or
+prompt.get("tags") works on them unchanged. as_dict() turns them back into
+plain dictionaries at the API and serialization boundaries.
+"""
+
+import sys
+import zlib
+from functools import lru_cache
+from collections.abc import Mapping
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Any, Iterator, Tuple
+
+# Marks a field the original dictionary did not have
+_MISSING = object()
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+def encode_timestamp(value: Any) -> Any:
+    """
+    Get the compact form of a timestamp
+    
+    Args:
+        value (Any): Timestamp as stored, usually an ISO 8601 UTC string ending in "Z"
+    
+    Returns:
+        Any: Epoch microseconds if format_timestamp() gives back exactly
+            the same string, otherwise the value unchanged
+    """
+    if not isinstance(value, str) or not value.endswith("Z"):
+        return value
+    try:
+        parsed = datetime.fromisoformat(value[:-1])
+    except ValueError:
+        return value
+    if parsed.tzinfo is not None:
+        return value
+    
+    micros = (parsed - _EPOCH) // _MICROSECOND
+    return micros if format_timestamp(micros) == value else value
+
+@lru_cache(maxsize=4096)
+def format_timestamp(micros: int) -> str:
+    """
+    Format epoch microseconds the way the extension writes timestamps
+    
+    Sorted indexes format the same few keys on every binary search, so
+    recent results are cached.
+    """
+    return (_EPOCH + timedelta(microseconds=micros)).isoformat() + "Z"
+
+def _decode_timestamp(value: Any) -> Any:
+    """Get the original form of an encoded timestamp"""
+    return format_timestamp(value) if type(value) is int else value
+
+class PromptRecord(Mapping):
+    """Read-only, slotted representation of a stored prompt"""
+    
+    __slots__ = (
+        "id", "title", "description", "category", "_tags", "variables",
+        "version", "_content", "_created", "_updated", "_extra"
+    )
+    
+    # Keys in the order a prompt dictionary lists them
+    KEYS = ("id", "title", "content", "description", "category", "tags", "variables", "created_at", "updated_at", "version")
+    
+    def __init__(self, prompt: Mapping, compress_min_bytes: int = 0):
+        """
+        Build a record from a prompt dictionary
+        
+        Args:
+            prompt (Mapping): Prompt data
+            compress_min_bytes (int): Keep content at least this long
+                compressed; 0 never compresses
+        """
+        self.id = prompt.get("id", _MISSING)
+        self.title = prompt.get("title", _MISSING)
+        self.description = prompt.get("description", _MISSING)
+        self.variables = prompt.get("variables", _MISSING)
+        self.version = prompt.get("version", _MISSING)
+        
+        category = prompt.get("category", _MISSING)
+        self.category = sys.intern(category) if type(category) is str else category
+        
+        tags = prompt.get("tags", _MISSING)
+        if isinstance(tags, list) and all(type(tag) is str for tag in tags):
+            tags = tuple(sys.intern(tag) for tag in tags)
+        self._tags = tags
+        
+        content = prompt.get("content", _MISSING)
+        if compress_min_bytes and type(content) is str and len(content) >= compress_min_bytes:
+            compressed = zlib.compress(content.encode("utf-8"))
+            if len(compressed) < len(content):
+                content = compressed
+        self._content = content
+        
+        self._created = encode_timestamp(prompt.get("created_at", _MISSING))
+        self._updated = encode_timestamp(prompt.get("updated_at", _MISSING))
+        
+        extra = {key: value for key, value in prompt.items() if key not in _FIELDS}
+        self._extra = extra or None
+    
+    @property
+    def content(self) -> Any:
+        content = self._content
+        # JSON never yields bytes, so bytes are always compressed text
+        return zlib.decompress(content).decode("utf-8") if type(content) is bytes else content
+    
+    @property
+    def tags(self) -> Any:
+        tags = self._tags
+        # A fresh list, so callers can't modify the stored record
+        return list(tags) if type(tags) is tuple else tags
+    
+    @property
+    def created_at(self) -> Any:
+        return _decode_timestamp(self._created)
+    
+    @property
+    def updated_at(self) -> Any:
+        return _decode_timestamp(self._updated)
+    
+    def __getitem__(self, key: str) -> Any:
+        if key in _FIELDS:
+            value = getattr(self, key)
+            if value is not _MISSING:
+                return value
+        elif self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in _FIELDS:
+            value = getattr(self, key)
+            return default if value is _MISSING else value
+        if self._extra is not None:
+            return self._extra.get(key, default)
+        return default
+    
+    def __contains__(self, key: object) -> bool:
+        if key in _FIELDS:
+            return getattr(self, _SLOTS[key]) is not _MISSING
+        return self._extra is not None and key in self._extra
+    
+    def __iter__(self) -> Iterator[str]:
+        for key in self.KEYS:
+            if getattr(self, _SLOTS[key]) is not _MISSING:
+                yield key
+        if self._extra is not None:
+            yield from self._extra
+    
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Convert the record to a plain dictionary
+        
+        Returns:
+            Dict[str, Any]: Prompt dictionary equal to the one the record was built from
+        """
+        prompt = {}
+        for key in self.KEYS:
+            value = getattr(self, key)
+            if value is not _MISSING:
+                prompt[key] = value
+        if self._extra is not None:
+            prompt.update(self._extra)
+        return prompt
+    
+    def __repr__(self) -> str:
+        return f"PromptRecord({self.to_dict()!r})"
+
+# Field name to the slot holding it, for presence checks without decoding
+_SLOTS = {key: key for key in PromptRecord.KEYS}
+_SLOTS.update({"content": "_content", "tags": "_tags", "created_at": "_created", "updated_at": "_updated"})
+_FIELDS = frozenset(PromptRecord.KEYS)
+
+# Sort key of a record per sort field, read straight from its slots and
+# ordered as store.SORT_FIELDS orders prompt dictionaries; sorted indexes
+# compute these on every comparison
+RECORD_SORT_KEYS = {
+    "updated_at": lambda record: (
+        format_timestamp(value) if type(value := record._updated) is int else value if type(value) is str else ""
+    ),
+    "created_at": lambda record: (
+        format_timestamp(value) if type(value := record._created) is int else value if type(value) is str else ""
+    ),
+    "title": lambda record: value.lower() if type(value := record.title) is str else ""
+}
+
+def prompt_stamp(prompt: Mapping) -> Tuple[Any, Any, Any]:
+    """
+    Get the ID, version and updated_at of a stored prompt
+    
+    Every write changes the version or updated_at, so caches of derived data
+    compare stamps to tell whether a prompt changed. A record's slots are
+    read directly, without decoding the timestamp.
+    
+    Args:
+        prompt (Mapping): Stored prompt, a dictionary or a PromptRecord
+    
+    Returns:
+        Tuple[Any, Any, Any]: (ID, version, updated_at)
+    """
+    if type(prompt) is PromptRecord:
+        return prompt.id, prompt.version, prompt._updated
+    return prompt.get("id"), prompt.get("version"), prompt.get("updated_at")
+
+def as_dict(prompt: Optional[Mapping]) -> Optional[Dict[str, Any]]:
+    """
+    Get a prompt as a plain dictionary
+    
+    Args:
+        prompt (Optional[Mapping]): Stored prompt, a dictionary or a PromptRecord
+    
+    Returns:
+        Optional[Dict[str, Any]]: The prompt dictionary, or None
+    """
+    if isinstance(prompt, PromptRecord):
+        return prompt.to_dict()
+    return prompt
@@ -0,0 +1,263 @@
+"""
+Response caches for the Prompt Library API
+
+Read endpoints such as GET /prompts return the same JSON until the library
+changes. Their serialized bodies are cached by endpoint and query parameters,
+tagged with the library generation they were built at, and only served while
+the generation is unchanged. A body's ETag is a hash of its bytes, so it is a
+strong validator that agrees between worker processes and across restarts.
+
+Rebuilding a list after a change reuses each unchanged prompt's serialized
+JSON from the FragmentCache, so only the changed prompts are encoded again
+and the list is assembled by concatenation.
+"""
+
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import Dict, List, Optional, Any, Hashable, Iterable, Tuple
+
+from .records import prompt_stamp
+
+def dump_json(content: Any) -> bytes:
+    """
+    Serialize a response body the way FastAPI's JSONResponse does
+    
+    Args:
+        content (Any): JSON-compatible content
+    
+    Returns:
+        bytes: UTF-8 encoded JSON
+    """
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+def serialize_prompt(prompt: Mapping) -> bytes:
+    """
+    Serialize a stored prompt as the API's Prompt model would
+    
+    Prompts are validated when they are written, so this only selects the
+    model's fields, in its order and with its defaults, without validating
+    every prompt again on every response.
+    
+    Args:
+        prompt (Mapping): Stored prompt, a dictionary or a PromptRecord
+    
+    Returns:
+        bytes: The prompt as a JSON object
+    """
+    return dump_json({
+        "title": prompt.get("title"),
+        "content": prompt.get("content"),
+        "description": prompt.get("description"),
+        "category": prompt.get("category"),
+        "tags": prompt.get("tags", []),
+        "variables": prompt.get("variables", []),
+        "id": prompt.get("id"),
+        "created_at": prompt.get("created_at"),
+        "updated_at": prompt.get("updated_at"),
+        "version": prompt.get("version", 0)
+    })
+
+class CachedResponse:
+    """A serialized response body with its ETag and extra headers"""
+    
+    __slots__ = ("body", "etag", "headers", "generation")
+    
+    def __init__(self, body: bytes, headers: Dict[str, str], generation: int):
+        self.body = body
+        self.etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+        self.headers = headers
+        self.generation = generation
+
+class ResponseCache:
+    """Thread-safe LRU of serialized responses, bounded by total body size"""
+    
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        """
+        Initialize the cache
+        
+        Args:
+            max_bytes (int): Total size of the cached bodies; 0 disables caching
+        """
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+        self._size = 0
+        self._generation: Optional[int] = None
+    
+    def get(self, key: Hashable, generation: int) -> Optional[CachedResponse]:
+        """
+        Get a cached response built at the given generation
+        
+        Args:
+            key (Hashable): Endpoint and query parameters
+            generation (int): Current library generation
+        
+        Returns:
+            Optional[CachedResponse]: The response, or None if it is missing or stale
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.generation != generation:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+    
+    def put(self, key: Hashable, generation: int, body: bytes, headers: Optional[Dict[str, str]] = None) -> CachedResponse:
+        """
+        Cache a response built at the given generation
+        
+        Args:
+            key (Hashable): Endpoint and query parameters
+            generation (int): Library generation read before building the body
+            body (bytes): Serialized response body
+            headers (Optional[Dict[str, str]]): Extra response headers
+        
+        Returns:
+            CachedResponse: The response, whether or not it fit in the cache
+        """
+        entry = CachedResponse(body, headers or {}, generation)
+        if len(body) > self.max_bytes:
+            return entry
+        
+        with self._lock:
+            if generation != self._generation:
+                # Everything built at another generation is stale
+                self._entries.clear()
+                self._size = 0
+                self._generation = generation
+            
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous.body)
+            self._entries[key] = entry
+            self._size += len(body)
+            
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted.body)
+        return entry
+    
+    def clear(self) -> None:
+        """Drop every cached response"""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the cache size and hit counters
+        
+        Returns:
+            Dict[str, Any]: Entries, bytes, hits and misses
+        """
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._size, "hits": self.hits, "misses": self.misses}
+
+class FragmentCache:
+    """
+    Thread-safe LRU of serialized prompts, bounded by total size
+    
+    Entries are keyed by prompt ID and only reused while the prompt's version
+    and updated_at are unchanged, which every write changes.
+    """
+    
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        """
+        Initialize the cache
+        
+        Args:
+            max_bytes (int): Total size of the cached fragments; 0 disables caching
+        """
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[Tuple[Any, Any, Any], bytes]]" = OrderedDict()
+        self._size = 0
+    
+    def join(self, prompts: Iterable[Mapping]) -> bytes:
+        """
+        Serialize prompts as a JSON array, reusing cached fragments
+        
+        Args:
+            prompts (Iterable[Mapping]): Stored prompts in response order
+        
+        Returns:
+            bytes: JSON array of the prompts
+        """
+        prompts = list(prompts)
+        stamps = [prompt_stamp(prompt) for prompt in prompts]
+        fragments: List[Optional[bytes]] = [None] * len(prompts)
+        
+        # One pass under the lock to collect hits; misses are encoded outside it
+        missing = []
+        with self._lock:
+            entries = self._entries
+            for position, stamp in enumerate(stamps):
+                entry = entries.get(stamp[0])
+                if entry is not None and entry[0] == stamp:
+                    entries.move_to_end(stamp[0])
+                    fragments[position] = entry[1]
+                else:
+                    missing.append(position)
+            self.hits += len(prompts) - len(missing)
+            self.misses += len(missing)
+        
+        if missing:
+            encoded = []
+            for position in missing:
+                fragments[position] = serialize_prompt(prompts[position])
+                encoded.append((stamps[position], fragments[position]))
+            self._store(encoded)
+        
+        return b"[" + b",".join(fragments) + b"]"
+    
+    def _store(self, encoded: List[Tuple[Tuple[Any, Any, Any], bytes]]) -> None:
+        """Cache freshly encoded fragments, evicting the least recently used"""
+        if not self.max_bytes:
+            return
+        with self._lock:
+            for stamp, fragment in encoded:
+                if not isinstance(stamp[0], str):
+                    continue
+                previous = self._entries.pop(stamp[0], None)
+                if previous is not None:
+                    self._size -= len(previous[1])
+                self._entries[stamp[0]] = (stamp, fragment)
+                self._size += len(fragment)
+            
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted[1])
+    
+    def invalidate(self, prompt_id: str) -> None:
+        """Drop a prompt's fragment"""
+        with self._lock:
+            previous = self._entries.pop(prompt_id, None)
+            if previous is not None:
+                self._size -= len(previous[1])
+    
+    def clear(self) -> None:
+        """Drop every fragment"""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the cache size and hit counters
+        
+        Returns:
+            Dict[str, Any]: Entries, bytes, hits and misses
+        """
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._size, "hits": self.hits, "misses": self.misses}
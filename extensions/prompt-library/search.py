@@ -0,0 +1,308 @@
+"""
+Full-text search for the Prompt Library extension
+
+An incrementally maintained inverted index over prompt titles, descriptions,
+content and tags, ranked with BM25. The last query term is matched as a
+prefix so the index can serve type-ahead queries.
+"""
+
+import re
+import math
+import heapq
+import threading
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional, Any, Callable, Tuple
+
+# catalog/index.py keeps a copy of the tokenizer; change both together
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+# Very common English words carry no ranking signal but have huge postings
+STOP_WORDS = frozenset((
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is",
+    "it", "of", "on", "or", "that", "the", "this", "to", "with"
+))
+
+# Field weights applied to term frequencies
+FIELD_WEIGHTS = (
+    ("title", 3.0),
+    ("tags", 2.0),
+    ("description", 1.5),
+    ("content", 1.0)
+)
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lowercase search terms
+    
+    Args:
+        text (str): Text to tokenize
+    
+    Returns:
+        List[str]: Terms in order of appearance, stop words removed
+    """
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOP_WORDS]
+
+class SearchIndex:
+    """Inverted index with BM25 ranking and prefix matching"""
+    
+    def __init__(
+        self,
+        k1: float = 1.2,
+        b: float = 0.75,
+        max_prefix_terms: int = 64,
+        prefix_candidates: int = 1000
+    ):
+        """
+        Initialize an empty index
+        
+        Args:
+            k1 (float): BM25 term frequency saturation
+            b (float): BM25 length normalization
+            max_prefix_terms (int): Maximum number of terms a prefix expands to
+            prefix_candidates (int): Stop expanding a prefix once it matches this many prompts
+        """
+        self.k1 = k1
+        self.b = b
+        self.max_prefix_terms = max_prefix_terms
+        self.prefix_candidates = prefix_candidates
+        
+        # Searches and updates may come from different worker threads
+        self._lock = threading.RLock()
+        self._reset()
+    
+    def _reset(self) -> None:
+        """Drop all indexed documents"""
+        # term -> {doc_id: weighted term frequency}
+        self._postings: Dict[str, Dict[str, float]] = {}
+        # doc_id -> {term: weighted term frequency}, kept for removal
+        self._documents: Dict[str, Dict[str, float]] = {}
+        self._lengths: Dict[str, float] = {}
+        self._total_length = 0.0
+        # Cached BM25 length normalization per document, refreshed when the
+        # average document length drifts
+        self._norms: Dict[str, float] = {}
+        self._norm_average = 0.0
+        # Sorted vocabulary for prefix lookups
+        self._terms: List[str] = []
+    
+    def __len__(self) -> int:
+        return len(self._documents)
+    
+    def __contains__(self, doc_id: object) -> bool:
+        return doc_id in self._documents
+    
+    @staticmethod
+    def _analyze(prompt: Dict[str, Any]) -> Dict[str, float]:
+        """Compute field-weighted term frequencies for a prompt"""
+        frequencies: Dict[str, float] = {}
+        for field, weight in FIELD_WEIGHTS:
+            value = prompt.get(field) or ""
+            if isinstance(value, (list, tuple)):
+                value = " ".join(value)
+            for term in tokenize(value):
+                frequencies[term] = frequencies.get(term, 0.0) + weight
+        return frequencies
+    
+    def add(self, prompt: Dict[str, Any]) -> None:
+        """
+        Index a prompt, replacing any previous version
+        
+        Args:
+            prompt (Dict[str, Any]): Prompt dictionary
+        """
+        doc_id = prompt["id"]
+        frequencies = self._analyze(prompt)
+        length = sum(frequencies.values())
+        
+        with self._lock:
+            if doc_id in self._documents:
+                self.remove(doc_id)
+            
+            for term, frequency in frequencies.items():
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = self._postings[term] = {}
+                    insort(self._terms, term)
+                postings[doc_id] = frequency
+            
+            self._documents[doc_id] = frequencies
+            self._lengths[doc_id] = length
+            self._total_length += length
+            self._norms[doc_id] = self._norm(length, self._norm_average)
+    
+    def remove(self, doc_id: str) -> bool:
+        """
+        Remove a prompt from the index
+        
+        Args:
+            doc_id (str): Prompt ID
+        
+        Returns:
+            bool: True if the prompt was indexed
+        """
+        with self._lock:
+            frequencies = self._documents.pop(doc_id, None)
+            if frequencies is None:
+                return False
+        
+            for term in frequencies:
+                postings = self._postings[term]
+                del postings[doc_id]
+                if not postings:
+                    del self._postings[term]
+                    del self._terms[bisect_left(self._terms, term)]
+        
+            self._total_length -= self._lengths.pop(doc_id)
+            del self._norms[doc_id]
+            return True
+    
+    def rebuild(self, prompts: List[Dict[str, Any]]) -> None:
+        """
+        Replace the index contents with the given prompts
+        
+        Args:
+            prompts (List[Dict[str, Any]]): All prompts
+        """
+        with self._lock:
+            self._reset()
+            for prompt in prompts:
+                self.add(prompt)
+    
+    def _norm(self, length: float, average: float) -> float:
+        """Compute the BM25 length normalization for a document"""
+        return self.k1 * (1.0 - self.b + self.b * length / (average or 1.0))
+    
+    def _refresh_norms(self) -> None:
+        """Recompute cached normalizations once the average length drifts by 10%"""
+        average = self._total_length / len(self._documents)
+        if abs(average - self._norm_average) <= 0.1 * self._norm_average:
+            return
+        self._norm_average = average
+        self._norms = {doc_id: self._norm(length, average) for doc_id, length in self._lengths.items()}
+    
+    def _expand_prefix(self, prefix: str) -> List[str]:
+        """
+        Get indexed terms starting with the prefix
+        
+        The exact term comes first, followed by the shortest completions, and
+        expansion stops once enough prompts are covered to fill a type-ahead list.
+        """
+        start = bisect_left(self._terms, prefix)
+        terms = []
+        for term in self._terms[start:start + self.max_prefix_terms]:
+            if not term.startswith(prefix):
+                break
+            terms.append(term)
+        terms.sort(key=len)
+        
+        expanded = []
+        covered = 0
+        for term in terms:
+            expanded.append(term)
+            covered += len(self._postings[term])
+            if covered >= self.prefix_candidates:
+                break
+        return expanded
+    
+    def _weight(self, postings: Dict[str, float]) -> float:
+        """Compute the BM25 weight (idf * (k1 + 1)) of a term"""
+        doc_count = len(self._documents)
+        idf = math.log(1.0 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+        return idf * (self.k1 + 1.0)
+    
+    def _group_scores(self, terms: List[str], totals: Optional[Dict[str, float]]) -> Dict[str, float]:
+        """
+        Score one query token, given as the indexed terms it expands to
+        
+        Without running totals every document containing one of the terms is
+        scored. With totals only those documents are considered, and the result
+        already includes their running score.
+        """
+        norms = self._norms
+        scores: Dict[str, float] = {}
+        
+        for term in terms:
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            weight = self._weight(postings)
+            
+            if totals is None:
+                term_scores = {
+                    doc_id: weight * frequency / (frequency + norms[doc_id])
+                    for doc_id, frequency in postings.items()
+                }
+            elif len(totals) < len(postings):
+                # Probe the postings for each surviving candidate
+                term_scores = {
+                    doc_id: total + weight * frequency / (frequency + norms[doc_id])
+                    for doc_id, total in totals.items()
+                    if (frequency := postings.get(doc_id)) is not None
+                }
+            else:
+                term_scores = {
+                    doc_id: totals[doc_id] + weight * frequency / (frequency + norms[doc_id])
+                    for doc_id, frequency in postings.items()
+                    if doc_id in totals
+                }
+            
+            if not scores:
+                scores = term_scores
+                continue
+            
+            # A token expanding to several terms of one document keeps the best
+            for doc_id, score in term_scores.items():
+                if score > scores.get(doc_id, 0.0):
+                    scores[doc_id] = score
+        
+        return scores
+    
+    def search(
+        self,
+        query: str,
+        limit: int = 20,
+        prefix: bool = True,
+        predicate: Optional[Callable[[str], bool]] = None
+    ) -> List[Tuple[str, float]]:
+        """
+        Find the best matching prompts for a query
+        
+        Every query token must match. Tokens are processed from the rarest to
+        the most common so later tokens only probe the surviving candidates.
+        
+        Args:
+            query (str): Search query
+            limit (int): Maximum number of results
+            prefix (bool): Match the last query token as a prefix
+            predicate (Optional[Callable[[str], bool]]): Additional filter on prompt IDs
+            
+        Returns:
+            List[Tuple[str, float]]: (prompt ID, score) pairs, best first
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        
+        with self._lock:
+            if not self._documents:
+                return []
+            self._refresh_norms()
+            
+            # Expand each query token into the indexed terms it matches
+            groups = [[token] for token in dict.fromkeys(tokens[:-1])]
+            last = tokens[-1]
+            groups.append(self._expand_prefix(last) if prefix and not query[-1:].isspace() else [last])
+            
+            postings = self._postings
+            groups.sort(key=lambda terms: sum(len(postings.get(term, ())) for term in terms))
+            
+            totals: Optional[Dict[str, float]] = None
+            for terms in groups:
+                totals = self._group_scores(terms, totals)
+                if not totals:
+                    return []
+        
+        items = totals.items()
+        if predicate is not None:
+            items = [(doc_id, score) for doc_id, score in items if predicate(doc_id)]
+        return heapq.nlargest(limit, items, key=lambda item: item[1])
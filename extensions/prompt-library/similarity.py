@@ -0,0 +1,564 @@
+"""
+Similar prompt search for the Prompt Library extension
+
+Every prompt's title and content are turned into a sparse TF-IDF vector over
+hashed word unigrams and bigrams, normalized to unit length, so the cosine
+similarity of two prompts is the dot product of their vectors. The vectors
+are kept as an inverted index from feature bucket to (row, weight) postings,
+and a query sums the postings of its own features per row with NumPy,
+touching only prompts that share a feature with it.
+
+Features are scored rarest first. Once a query has gathered max_postings
+postings, its remaining (common) features only rescore the best candidates
+found so far, by binary search in their row-sorted postings, so a query's
+cost is bounded however common its words are. Near neighbours share rare
+words and word pairs, so they are found by the first stage.
+
+Added and changed prompts are queued and featurized in vectorized batches
+when the next query arrives, or once enough are queued. Each batch becomes a
+chunk of postings sorted by bucket and then row; small chunks are combined
+with their predecessor, so there are only ever a few. Removing a prompt only
+marks its row dead. Once the chunks or dead rows grow past a fraction of the
+base, everything is merged into a new base in one vectorized pass.
+
+Inverse document frequencies are a snapshot taken when the base is built.
+Added prompts and queries are weighted with the same snapshot, so scores are
+exact cosines and identical text scores 1. Each merge takes a new snapshot
+and reweights every vector with it.
+
+NumPy is optional: without it available() is False and the extension
+disables similar prompt search.
+"""
+
+import zlib
+import threading
+from array import array
+from collections.abc import Mapping
+from typing import Dict, List, Optional, Any, Callable, Iterable, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the environment
+    np = None
+
+from .search import TOKEN_PATTERN, STOP_WORDS
+
+# Number of hashed feature buckets; a power of two
+DEFAULT_BUCKETS = 1 << 20
+
+# Prompts featurized per vectorized batch when building the index
+BUILD_BATCH = 2048
+
+# Multiplier of the multiplicative hash that maps features to buckets
+_HASH_MULTIPLIER = 0x9E3779B97F4A7C15
+
+# term -> CRC-32 of the term, or -1 for a stop word, shared by all indexes
+_term_hashes: Dict[str, int] = dict.fromkeys(STOP_WORDS, -1)
+MAX_CACHED_TERMS = 1000000
+
+def hash_terms(terms: List[str]) -> Any:
+    """
+    Hash terms, caching the hashes of the vocabulary seen so far
+    
+    Args:
+        terms (List[str]): Lowercase terms
+    
+    Returns:
+        numpy.ndarray: int64 CRC-32 of each term, -1 for stop words
+    """
+    cache = _term_hashes
+    unknown = set(terms).difference(cache)
+    lookup = cache.__getitem__
+    if unknown:
+        hashes = {term: -1 if term in STOP_WORDS else zlib.crc32(term.encode("utf-8")) for term in unknown}
+        if len(cache) + len(hashes) > MAX_CACHED_TERMS:
+            lookup = lambda term: hashes[term] if term in hashes else cache[term]
+        else:
+            cache.update(hashes)
+    return np.fromiter(map(lookup, terms), dtype=np.int64, count=len(terms))
+
+# Chunks up to this many postings are combined with the next one
+MIN_CHUNK = 65536
+
+def bucket_order(buckets: Any, bits: int) -> Any:
+    """
+    Stable sort order of postings by bucket
+    
+    A least significant digit radix sort over 16 bit digits, the fastest
+    stable sort NumPy offers for integers this wide.
+    
+    Args:
+        buckets (numpy.ndarray): Bucket of each posting
+        bits (int): Bits per bucket number
+    
+    Returns:
+        numpy.ndarray: Posting positions ordered by bucket, keeping the
+            given order within each bucket
+    """
+    order = np.arange(len(buckets))
+    for shift in range(0, bits, 16):
+        digits = ((buckets[order] >> shift) & 0xFFFF).astype(np.uint16)
+        order = order[np.argsort(digits, kind="stable")]
+    return order
+
+class SimilarityIndex:
+    """Incrementally maintained TF-IDF vectors with cosine nearest neighbours"""
+    
+    def __init__(
+        self,
+        buckets: int = DEFAULT_BUCKETS,
+        max_postings: int = 1000000,
+        candidates: int = 200,
+        merge_ratio: float = 1.0
+    ):
+        """
+        Initialize an empty index
+        
+        Args:
+            buckets (int): Number of hashed feature buckets, a power of two
+            max_postings (int): Postings a query sums in full before its
+                remaining features only rescore candidates
+            candidates (int): Minimum number of candidates those features
+                rescore
+            merge_ratio (float): Merge the chunks into the base once they
+                hold this fraction of its postings
+        """
+        self.buckets = buckets
+        self.max_postings = max_postings
+        self.candidates = candidates
+        self.merge_ratio = merge_ratio
+        self._bits = buckets.bit_length() - 1
+        # Queries read while updates merge, from different worker threads
+        self._lock = threading.RLock()
+        self._built = False
+        self._reset()
+    
+    @staticmethod
+    def available() -> bool:
+        """
+        Check whether NumPy is installed
+        
+        Returns:
+            bool: True if the index can be used
+        """
+        return np is not None
+    
+    def _reset(self) -> None:
+        """Drop all indexed prompts"""
+        # row -> prompt ID, or None once the row is dead
+        self._ids: List[Optional[str]] = []
+        self._rows: Dict[str, int] = {}
+        self._dead = 0
+        # prompt ID -> prompt to index, or None to remove, in arrival order
+        self._pending: Dict[str, Optional[Mapping]] = {}
+        if np is None:
+            return
+        # Per row: whether it is live, and the length of its TF-IDF vector
+        # before normalization, kept to reweight it on the next merge
+        self._alive = np.zeros(1024, dtype=bool)
+        self._norms = np.zeros(1024, dtype=np.float32)
+        # Inverse document frequency per bucket, as of the last merge
+        self._idf = np.ones(self.buckets, dtype=np.float32)
+        # Base postings: bucket b's rows and weights are [indptr[b]:indptr[b + 1]]
+        self._indptr = np.zeros(self.buckets + 1, dtype=np.int64)
+        self._base_rows = np.zeros(0, dtype=np.int32)
+        self._base_weights = np.zeros(0, dtype=np.float32)
+        # Postings added since the last merge, oldest first, as (buckets,
+        # rows, weights) chunks sorted by bucket and then row
+        self._chunks: List[Tuple[Any, Any, Any]] = []
+        self._chunk_size = 0
+    
+    def __len__(self) -> int:
+        with self._lock:
+            self._apply_pending()
+            return len(self._rows)
+    
+    @property
+    def built(self) -> bool:
+        """True once the index holds the library"""
+        return self._built
+    
+    def reset(self) -> None:
+        """Drop all indexed prompts; the next ensure() builds the index again"""
+        with self._lock:
+            self._built = False
+            self._reset()
+    
+    def ensure(self, load: Callable[[], Iterable[Mapping]]) -> None:
+        """
+        Build the index unless it is built already
+        
+        Until it is built, add() and remove() do nothing, so the index costs
+        nothing if similar prompts are never asked for. Updates made while
+        it is being built wait for the build and are applied after it.
+        
+        Args:
+            load (Callable[[], Iterable[Mapping]]): Returns every prompt
+        """
+        with self._lock:
+            if self._built:
+                return
+            # Set before reading the library: a prompt stored after load()
+            # has read it is then added once the lock is released
+            self._built = True
+            self.rebuild(load())
+    
+    def _features(self, prompts: List[Mapping]) -> Tuple[Any, Any, Any]:
+        """
+        Count the hashed features of prompts
+        
+        A prompt's features are the words of its title and content and every
+        pair of adjacent words, stop words removed, each hashed into a bucket.
+        
+        Returns:
+            Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]: Each
+                (prompt position, bucket) pair once, ordered by position and
+                bucket, and the feature's sublinear term frequency
+        """
+        tokens = [
+            TOKEN_PATTERN.findall(f"{prompt.get('title') or ''}\n{prompt.get('content') or ''}".lower())
+            for prompt in prompts
+        ]
+        hashes = hash_terms([term for terms in tokens for term in terms]).astype(np.uint64)
+        positions = np.repeat(np.arange(len(prompts), dtype=np.uint64), [len(terms) for terms in tokens])
+        kept = hashes != np.uint64(0xFFFFFFFFFFFFFFFF)
+        hashes, positions = hashes[kept], positions[kept]
+        
+        # Pairs of adjacent terms within one prompt; a pair's key holds both
+        # hashes and is set apart from single terms by its high bit
+        same = positions[1:] == positions[:-1]
+        pairs = (hashes[:-1][same] << np.uint64(32)) | hashes[1:][same] | np.uint64(1 << 63)
+        keys = np.concatenate((hashes, pairs))
+        positions = np.concatenate((positions, positions[1:][same]))
+        
+        # Multiplicative hashing: the top bits of the product are the bucket
+        buckets = (keys * np.uint64(_HASH_MULTIPLIER)) >> np.uint64(64 - self._bits)
+        combined, counts = np.unique((positions << np.uint64(self._bits)) | buckets, return_counts=True)
+        return (
+            (combined >> np.uint64(self._bits)).astype(np.int64),
+            (combined & np.uint64(self.buckets - 1)).astype(np.int32),
+            (1.0 + np.log(counts)).astype(np.float32)
+        )
+    
+    def _snapshot(self, buckets: Any) -> None:
+        """Take inverse document frequencies from every live posting's bucket; the caller holds the lock"""
+        n = len(self._rows)
+        df = np.bincount(buckets, minlength=self.buckets)
+        self._idf = (np.log((1.0 + n) / (1.0 + df)) + 1.0).astype(np.float32)
+    
+    def _weigh(self, buckets: Any, rows: Any, tf: Any) -> Any:
+        """
+        Weight postings of a contiguous range of rows with the current
+        snapshot, normalizing each row and recording its length; the caller
+        holds the lock
+        """
+        weights = tf * self._idf[buckets]
+        if not len(rows):
+            return weights
+        first = int(rows.min())
+        norms = np.sqrt(np.bincount(rows - first, weights=weights * weights)).astype(np.float32)
+        self._norms[first:first + len(norms)] = norms
+        return (weights / norms[rows - first]).astype(np.float32)
+    
+    def _featurize(self, prompts: List[Mapping]) -> Tuple[Any, Any, Any]:
+        """
+        Give prompts new rows and count their features, in batches; the
+        caller holds the lock
+        
+        Returns:
+            Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]: The postings'
+                buckets, rows and term frequencies, in row order
+        """
+        buckets, rows, tf = [], [], []
+        for start in range(0, len(prompts), BUILD_BATCH):
+            batch = prompts[start:start + BUILD_BATCH]
+            batch_rows = []
+            for prompt in batch:
+                # The last of repeated IDs wins
+                if prompt["id"] in self._rows:
+                    self._kill(self._rows[prompt["id"]])
+                batch_rows.append(self._new_row(prompt["id"]))
+            positions, batch_buckets, batch_tf = self._features(batch)
+            buckets.append(batch_buckets)
+            rows.append(np.array(batch_rows, dtype=np.int32)[positions])
+            tf.append(batch_tf)
+        if not buckets:
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32)
+        return np.concatenate(buckets), np.concatenate(rows), np.concatenate(tf)
+    
+    def rebuild(self, prompts: Iterable[Mapping]) -> None:
+        """
+        Replace the index contents with the given prompts
+        
+        Args:
+            prompts (Iterable[Mapping]): All prompts
+        """
+        with self._lock:
+            self._built = True
+            self._reset()
+            buckets, rows, tf = self._featurize(list(prompts))
+            if self._dead:
+                live = self._alive[rows]
+                buckets, rows, tf = buckets[live], rows[live], tf[live]
+            self._snapshot(buckets)
+            weights = self._weigh(buckets, rows, tf)
+            order = bucket_order(buckets, self._bits)
+            self._set_base(buckets[order], rows[order], weights[order])
+    
+    def _new_row(self, prompt_id: str) -> int:
+        """Allocate a live row for a prompt; the caller holds the lock"""
+        row = len(self._ids)
+        if row == len(self._alive):
+            self._alive = np.concatenate((self._alive, np.zeros(row, dtype=bool)))
+            self._norms = np.concatenate((self._norms, np.zeros(row, dtype=np.float32)))
+        self._alive[row] = True
+        self._ids.append(prompt_id)
+        self._rows[prompt_id] = row
+        return row
+    
+    def _kill(self, row: int) -> None:
+        """Mark a row dead; the caller holds the lock"""
+        self._alive[row] = False
+        self._ids[row] = None
+        self._dead += 1
+    
+    def _set_base(self, buckets: Any, rows: Any, weights: Any) -> None:
+        """Replace the base postings, ordered by bucket and row; the caller holds the lock"""
+        self._base_rows = rows
+        self._base_weights = weights
+        self._indptr = np.zeros(self.buckets + 1, dtype=np.int64)
+        np.cumsum(np.bincount(buckets, minlength=self.buckets), out=self._indptr[1:])
+    
+    def add(self, prompt: Mapping) -> None:
+        """
+        Index a prompt, replacing any previous version
+        
+        The prompt is queued and indexed with others on the next query.
+        
+        Args:
+            prompt (Mapping): Prompt dictionary or stored record
+        """
+        if np is None or not self._built:
+            return
+        with self._lock:
+            if self._built:
+                self._pending.pop(prompt["id"], None)
+                self._pending[prompt["id"]] = prompt
+                if len(self._pending) >= BUILD_BATCH:
+                    self._apply_pending()
+    
+    def remove(self, prompt_id: str) -> None:
+        """
+        Remove a prompt from the index
+        
+        Args:
+            prompt_id (str): Prompt ID
+        """
+        with self._lock:
+            if self._built:
+                self._pending.pop(prompt_id, None)
+                self._pending[prompt_id] = None
+                if len(self._pending) >= BUILD_BATCH:
+                    self._apply_pending()
+    
+    def _apply_pending(self) -> None:
+        """Index the queued prompts as one chunk; the caller holds the lock"""
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        added = []
+        for prompt_id, prompt in pending.items():
+            row = self._rows.pop(prompt_id, None)
+            if row is not None:
+                self._kill(row)
+            if prompt is not None:
+                added.append(prompt)
+        
+        buckets, rows, tf = self._featurize(added)
+        if len(buckets):
+            weights = self._weigh(buckets, rows, tf)
+            # Combine small chunks with the new one, so a few chunks hold
+            # everything added since the last merge
+            while self._chunks and len(self._chunks[-1][0]) <= max(2 * len(buckets), MIN_CHUNK):
+                older = self._chunks.pop()
+                buckets = np.concatenate((older[0], buckets))
+                rows = np.concatenate((older[1], rows))
+                weights = np.concatenate((older[2], weights))
+            # Rows are new, so row order within a bucket survives the stable sort
+            order = bucket_order(buckets, self._bits)
+            self._chunks.append((buckets[order], rows[order], weights[order]))
+            self._chunk_size = sum(len(chunk[0]) for chunk in self._chunks)
+        
+        if self._chunk_size > max(self.merge_ratio * len(self._base_rows), MIN_CHUNK):
+            self.merge()
+        elif self._dead > max(len(self._ids) // 4, 1000):
+            # Dead rows are still summed by queries until they are dropped
+            self.merge()
+    
+    def merge(self) -> None:
+        """Fold the chunks into the base, drop dead rows and reweight"""
+        with self._lock:
+            self._apply_pending()
+            base_buckets = np.repeat(np.arange(self.buckets, dtype=np.int32), np.diff(self._indptr))
+            if self._chunks:
+                chunk_buckets, chunk_rows, chunk_weights = (np.concatenate(parts) for parts in zip(*self._chunks))
+                order = bucket_order(chunk_buckets, self._bits)
+                chunk_buckets, chunk_rows, chunk_weights = chunk_buckets[order], chunk_rows[order], chunk_weights[order]
+            else:
+                chunk_buckets = np.zeros(0, dtype=np.int32)
+                chunk_rows = np.zeros(0, dtype=np.int32)
+                chunk_weights = np.zeros(0, dtype=np.float32)
+            
+            # Chunk rows are newer than every base row, so each bucket's chunk
+            # postings go after its base postings: the merged order follows
+            # from the counts without sorting the base
+            base_size = len(self._base_rows)
+            before = np.zeros(self.buckets, dtype=np.int64)
+            np.cumsum(np.bincount(chunk_buckets, minlength=self.buckets)[:-1], out=before[1:])
+            positions = np.empty(base_size + len(chunk_rows), dtype=np.int64)
+            positions[:base_size] = np.arange(base_size) + before[base_buckets]
+            positions[base_size:] = np.arange(len(chunk_rows)) + self._indptr[chunk_buckets + 1]
+            buckets = np.empty(len(positions), dtype=np.int32)
+            buckets[positions] = np.concatenate((base_buckets, chunk_buckets))
+            rows = np.empty(len(positions), dtype=np.int32)
+            rows[positions] = np.concatenate((self._base_rows, chunk_rows))
+            weights = np.empty(len(positions), dtype=np.float32)
+            weights[positions] = np.concatenate((self._base_weights, chunk_weights))
+            
+            # Drop dead rows, and recover the live postings' term frequencies
+            # from their weights under the old snapshot
+            keep = self._alive[rows]
+            buckets, rows = buckets[keep], rows[keep]
+            tf = weights[keep] * self._norms[rows] / self._idf[buckets]
+            
+            # Renumber the live rows from 0 in their current order, which
+            # keeps every bucket sorted by row
+            live = self._alive[:len(self._ids)]
+            rows = (np.cumsum(live, dtype=np.int32) - 1)[rows]
+            self._ids = [prompt_id for prompt_id in self._ids if prompt_id is not None]
+            self._rows = {prompt_id: row for row, prompt_id in enumerate(self._ids)}
+            self._alive = np.zeros(max(1024, 2 * len(self._ids)), dtype=bool)
+            self._alive[:len(self._ids)] = True
+            self._norms = np.zeros(len(self._alive), dtype=np.float32)
+            self._dead = 0
+            self._chunks = []
+            self._chunk_size = 0
+            
+            self._snapshot(buckets)
+            self._set_base(buckets, rows, self._weigh(buckets, rows, tf))
+    
+    def similar(
+        self,
+        prompt: Mapping,
+        limit: int = 10,
+        exclude: Optional[str] = None,
+        min_score: float = 0.0,
+        predicate: Optional[Callable[[str], bool]] = None
+    ) -> List[Tuple[str, float]]:
+        """
+        Find the indexed prompts most similar to a prompt
+        
+        Args:
+            prompt (Mapping): Prompt with a title and content; it does not
+                have to be stored
+            limit (int): Maximum number of results
+            exclude (Optional[str]): Prompt ID to leave out, usually the
+                prompt's own
+            min_score (float): Leave out prompts less similar than this
+            predicate (Optional[Callable[[str], bool]]): Only return prompt
+                IDs it accepts
+        
+        Returns:
+            List[Tuple[str, float]]: (prompt ID, cosine similarity from 0 to 1)
+                pairs, most similar first
+        """
+        if np is None:
+            return []
+        _, buckets, tf = self._features([prompt])
+        if not len(buckets):
+            return []
+        
+        with self._lock:
+            self._apply_pending()
+            weights = tf * self._idf[buckets]
+            weights /= np.sqrt(np.dot(weights, weights))
+            
+            # Every feature's postings in the base and in each chunk
+            sources = [(self._base_rows, self._base_weights, self._indptr[buckets], self._indptr[buckets + 1])]
+            for chunk_buckets, chunk_rows, chunk_weights in self._chunks:
+                sources.append((
+                    chunk_rows, chunk_weights,
+                    chunk_buckets.searchsorted(buckets, "left"), chunk_buckets.searchsorted(buckets, "right")
+                ))
+            sizes = sum(ends - starts for _, _, starts, ends in sources)
+            bounds = [(rows, bucket_weights, starts.tolist(), ends.tolist()) for rows, bucket_weights, starts, ends in sources]
+            postings = [
+                [(rows[starts[i]:ends[i]], bucket_weights[starts[i]:ends[i]]) for rows, bucket_weights, starts, ends in bounds if ends[i] > starts[i]]
+                for i in range(len(buckets))
+            ]
+            order = np.argsort(sizes, kind="stable").tolist()
+            
+            # Sum the rarest features' postings in full
+            rows, scaled = [], []
+            gathered = 0
+            position = 0
+            while position < len(order) and gathered < self.max_postings:
+                index = order[position]
+                for bucket_rows, bucket_weights in postings[index]:
+                    rows.append(bucket_rows)
+                    scaled.append(bucket_weights * weights[index])
+                gathered += int(sizes[index])
+                position += 1
+            if not gathered:
+                return []
+            scores = np.bincount(np.concatenate(rows), weights=np.concatenate(scaled), minlength=len(self._ids))
+            scores[~self._alive[:len(self._ids)]] = 0.0
+            if exclude is not None and exclude in self._rows:
+                scores[self._rows[exclude]] = 0.0
+            
+            # Keep extra candidates, so the common features can reorder them
+            # and a predicate rejecting some still leaves enough
+            wanted = max(self.candidates, limit * 4 if predicate is not None else limit)
+            candidates = np.flatnonzero(scores > 0)
+            if len(candidates) > wanted:
+                candidates = candidates[np.argpartition(scores[candidates], -wanted)[-wanted:]]
+            # Rows as int32 like the postings, which searchsorted would
+            # otherwise convert on every call
+            candidates = np.sort(candidates).astype(np.int32)
+            scores = scores[candidates]
+            
+            # Add the common features' weights for the candidates only
+            for index in order[position:]:
+                for bucket_rows, bucket_weights in postings[index]:
+                    found = np.minimum(bucket_rows.searchsorted(candidates), len(bucket_rows) - 1)
+                    hit = bucket_rows[found] == candidates
+                    scores[hit] += bucket_weights[found[hit]] * weights[index]
+            
+            ranking = np.argsort(-scores, kind="stable")
+            if min_score > 0:
+                # Rounding may leave identical text a hair short of 1
+                ranking = ranking[scores[ranking] >= min_score - 1e-6]
+            ranked = [(self._ids[candidates[i]], min(1.0, float(scores[i]))) for i in ranking.tolist()]
+        
+        if predicate is not None:
+            ranked = [(prompt_id, score) for prompt_id, score in ranked if predicate(prompt_id)]
+        return ranked[:limit]
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get index statistics
+        
+        Returns:
+            Dict[str, Any]: Whether the index is built, indexed prompts,
+                queued updates, and base and chunk postings
+        """
+        with self._lock:
+            return {
+                "built": self._built,
+                "prompts": len(self._rows),
+                "pending": len(self._pending),
+                "postings": len(self._base_rows) if np is not None else 0,
+                "chunks": len(self._chunks) if np is not None else 0,
+                "chunk_postings": self._chunk_size if np is not None else 0,
+                "dead_rows": self._dead
+            }
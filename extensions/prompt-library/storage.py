@@ -0,0 +1,361 @@
+"""
+Append-only storage engine for the Prompt Library extension
+
+Mutations are appended to a write-ahead log (one checksummed JSON record per
+line) and periodically compacted into a snapshot file. A batch of mutations
+that must apply together is a single record, so it is recovered whole or not
+at all. Compaction first rotates the log aside, so the snapshot can be written
+while new records keep arriving. Recovery loads the snapshot and replays the
+rotated and active logs on top of it, discarding a torn trailing record. A
+rotated log left behind by a compaction that crashed or failed is only ever
+appended to, never replaced, until a snapshot covering it has been written.
+"""
+
+import os
+import json
+import shutil
+import time
+import zlib
+import logging
+import threading
+from typing import Dict, List, Any, Optional, Tuple
+
+# Setup logging
+logger = logging.getLogger("prompt_library.storage")
+
+SNAPSHOT_FILE = "snapshot.json"
+LOG_FILE = "prompts.log"
+ROTATED_LOG_FILE = "prompts.log.1"
+FORMAT_VERSION = 1
+
+class PromptLog:
+    """Write-ahead log of prompt and category mutations with snapshot compaction"""
+    
+    def __init__(
+        self,
+        directory: str,
+        fsync_batch: int = 32,
+        fsync_interval: float = 1.0,
+        compact_threshold: int = 10000
+    ):
+        """
+        Initialize the log
+        
+        Args:
+            directory (str): Directory holding the snapshot and log files
+            fsync_batch (int): Number of records written before forcing an fsync
+            fsync_interval (float): Maximum seconds a written record may wait for fsync
+            compact_threshold (int): Minimum number of log records before compaction
+        """
+        self.directory = directory
+        self.snapshot_path = os.path.join(directory, SNAPSHOT_FILE)
+        self.log_path = os.path.join(directory, LOG_FILE)
+        self.rotated_log_path = os.path.join(directory, ROTATED_LOG_FILE)
+        self.fsync_batch = max(1, fsync_batch)
+        self.fsync_interval = fsync_interval
+        self.compact_threshold = compact_threshold
+        
+        self._file = None
+        self._lock = threading.RLock()
+        self._timer: Optional[threading.Timer] = None
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._log_records = 0
+        self._compacting = False
+    
+    def open(self) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Recover state from disk and open the log for appending
+        
+        Returns:
+            Tuple[Dict[str, Any], Dict[str, Any]]: Recovered categories and prompts
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        categories: Dict[str, Any] = {}
+        prompts: Dict[str, Any] = {}
+        
+        # Load the last snapshot, if any
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+            categories.update(snapshot.get("categories", {}))
+            prompts.update(snapshot.get("prompts", {}))
+        
+        # Replay a log left behind by an interrupted compaction, then the active log
+        _, rotated_records = self._replay(self.rotated_log_path, categories, prompts)
+        valid_bytes, records = self._replay(self.log_path, categories, prompts)
+        
+        # Drop a torn or corrupt tail left behind by a crash
+        if os.path.exists(self.log_path) and os.path.getsize(self.log_path) > valid_bytes:
+            logger.warning(f"Truncating damaged log tail at byte {valid_bytes}: {self.log_path}")
+            with open(self.log_path, "r+b") as f:
+                f.truncate(valid_bytes)
+                f.flush()
+                os.fsync(f.fileno())
+        
+        self._file = open(self.log_path, "ab")
+        # Records of a leftover rotated log count too, so the next compaction
+        # folds them into a snapshot soon
+        self._log_records = rotated_records + records
+        logger.info(f"Recovered {len(categories)} categories and {len(prompts)} prompts ({rotated_records + records} log records)")
+        return categories, prompts
+    
+    def _replay(
+        self,
+        path: str,
+        categories: Optional[Dict[str, Any]] = None,
+        prompts: Optional[Dict[str, Any]] = None
+    ) -> Tuple[int, int]:
+        """
+        Apply the records of a log file to the given state
+        
+        Without a state, the records are only checked and counted.
+        
+        Returns:
+            Tuple[int, int]: Number of valid bytes and number of valid records
+        """
+        if not os.path.exists(path):
+            return 0, 0
+        
+        valid_bytes = 0
+        records = 0
+        with open(path, "rb") as f:
+            for line in f:
+                record = self._decode(line)
+                if record is None:
+                    break
+                if categories is not None:
+                    self._apply(record, categories, prompts)
+                valid_bytes += len(line)
+                records += 1
+        return valid_bytes, records
+    
+    @staticmethod
+    def _encode(record: Dict[str, Any]) -> bytes:
+        """Encode a record as a checksummed log line"""
+        payload = json.dumps(record, separators=(",", ":")).encode("utf-8")
+        return b"%08x " % zlib.crc32(payload) + payload + b"\n"
+    
+    @staticmethod
+    def _decode(line: bytes) -> Optional[Dict[str, Any]]:
+        """Decode a log line, returning None if it is incomplete or corrupt"""
+        if not line.endswith(b"\n") or len(line) < 10:
+            return None
+        checksum, payload = line[:8], line[9:-1]
+        try:
+            if int(checksum, 16) != zlib.crc32(payload):
+                return None
+            return json.loads(payload)
+        except ValueError:
+            return None
+    
+    @staticmethod
+    def _apply(record: Dict[str, Any], categories: Dict[str, Any], prompts: Dict[str, Any]) -> None:
+        """Apply a single record to the given state"""
+        if record["op"] == "batch":
+            for inner in record["records"]:
+                PromptLog._apply(inner, categories, prompts)
+            return
+        target = categories if record["kind"] == "category" else prompts
+        if record["op"] == "put":
+            target[record["id"]] = record["data"]
+        elif record["op"] == "delete":
+            target.pop(record["id"], None)
+    
+    def append(self, op: str, kind: str, key: str, data: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Append a mutation record to the log
+        
+        Args:
+            op (str): "put" or "delete"
+            kind (str): "prompt" or "category"
+            key (str): ID of the mutated item
+            data (Optional[Dict[str, Any]]): New item data for "put" records
+        """
+        record = {"op": op, "kind": kind, "id": key}
+        if data is not None:
+            record["data"] = data
+        line = self._encode(record)
+        
+        with self._lock:
+            self._file.write(line)
+            self._unsynced += 1
+            self._log_records += 1
+    
+    def append_batch(self, records: List[Dict[str, Any]]) -> None:
+        """
+        Append mutations that must be recovered together
+        
+        Args:
+            records (List[Dict[str, Any]]): Records in the form append() writes,
+                each with "op", "kind", "id" and, for puts, "data"
+        """
+        line = self._encode({"op": "batch", "records": records})
+        
+        with self._lock:
+            self._file.write(line)
+            self._unsynced += 1
+            # Counted per mutation, so compaction keeps pace with the log's size
+            self._log_records += len(records)
+    
+    def commit(self) -> None:
+        """Hand buffered records to the OS and fsync once the batch is due"""
+        with self._lock:
+            if self._file is None or self._unsynced == 0:
+                return
+            self._file.flush()
+            due = time.monotonic() - self._last_sync >= self.fsync_interval
+            if self._unsynced >= self.fsync_batch or due:
+                self._sync_locked()
+            elif self._timer is None:
+                # Make sure a quiet period still gets the batch onto disk
+                self._timer = threading.Timer(self.fsync_interval, self.sync)
+                self._timer.daemon = True
+                self._timer.start()
+    
+    def sync(self) -> None:
+        """Force buffered records to disk"""
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.flush()
+            if self._unsynced:
+                self._sync_locked()
+    
+    def _sync_locked(self) -> None:
+        """fsync the log file; the caller must hold the lock"""
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+    
+    def needs_compaction(self, live_records: int) -> bool:
+        """
+        Check whether the log has outgrown the live data
+        
+        Compacting only once the log is larger than the live data keeps the
+        amortized cost of each mutation proportional to the mutation itself.
+        
+        Args:
+            live_records (int): Current number of categories and prompts
+        
+        Returns:
+            bool: True if a compaction is due
+        """
+        return self._log_records >= max(self.compact_threshold, live_records)
+    
+    def rotate(self) -> bool:
+        """
+        Start a compaction by moving the active log aside
+        
+        The caller must hold off mutations while it rotates and captures the
+        state to snapshot; writing the snapshot can then proceed concurrently.
+        
+        If a rotated log is still on disk because an earlier compaction
+        crashed or failed, its records are in neither the snapshot nor the
+        active log, so the active log is appended to it instead of replacing it.
+        
+        Returns:
+            bool: False if a compaction is already in progress
+        """
+        with self._lock:
+            if self._compacting:
+                return False
+            self._compacting = True
+            self.sync()
+            self._file.close()
+            self._file = None
+            try:
+                if os.path.exists(self.rotated_log_path):
+                    self._append_to_rotated()
+                    # Replaying the active log again after the rotated one is
+                    # idempotent, so a crash before this truncation loses nothing
+                    self._file = open(self.log_path, "wb")
+                    self._file.flush()
+                    os.fsync(self._file.fileno())
+                else:
+                    os.replace(self.log_path, self.rotated_log_path)
+                    self._file = open(self.log_path, "ab")
+                    self._fsync_directory()
+            except BaseException:
+                self._compacting = False
+                if self._file is None:
+                    self._file = open(self.log_path, "ab")
+                raise
+            self._log_records = 0
+            return True
+    
+    def _append_to_rotated(self) -> None:
+        """Append the active log to a leftover rotated log and fsync it"""
+        # Records after a torn tail would never be replayed, so cut it first
+        valid_bytes, _ = self._replay(self.rotated_log_path)
+        with open(self.rotated_log_path, "r+b") as rotated:
+            rotated.truncate(valid_bytes)
+            rotated.seek(valid_bytes)
+            with open(self.log_path, "rb") as active:
+                shutil.copyfileobj(active, rotated)
+            rotated.flush()
+            os.fsync(rotated.fileno())
+        logger.warning(f"Appended the log to a leftover rotated log from an unfinished compaction: {self.rotated_log_path}")
+    
+    def write_snapshot(self, categories: Dict[str, Any], prompts: Dict[str, Any]) -> None:
+        """
+        Finish a compaction by snapshotting the state captured at rotation
+        
+        Args:
+            categories (Dict[str, Any]): All categories at rotation time
+            prompts (Dict[str, Any]): All prompts at rotation time; values may
+                be any mapping, such as compact in-memory records
+        """
+        try:
+            tmp_path = self.snapshot_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({
+                    "version": FORMAT_VERSION,
+                    "categories": categories,
+                    "prompts": prompts
+                }, f, separators=(",", ":"), default=dict)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.snapshot_path)
+            self._fsync_directory()
+            
+            # Replaying records over a newer snapshot is idempotent, so a crash
+            # before the rotated log is removed loses nothing
+            os.remove(self.rotated_log_path)
+            logger.info(f"Compacted storage to {len(categories) + len(prompts)} records")
+        finally:
+            with self._lock:
+                self._compacting = False
+    
+    def compact(self, categories: Dict[str, Any], prompts: Dict[str, Any]) -> None:
+        """
+        Write a snapshot of the given state and truncate the log
+        
+        Args:
+            categories (Dict[str, Any]): All categories
+            prompts (Dict[str, Any]): All prompts
+        """
+        if self.rotate():
+            self.write_snapshot(categories, prompts)
+    
+    def _fsync_directory(self) -> None:
+        """Persist directory entries after a rename"""
+        if not hasattr(os, "O_DIRECTORY"):
+            return
+        fd = os.open(self.directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+    
+    def close(self) -> None:
+        """Flush, fsync and close the log"""
+        with self._lock:
+            if self._file is None:
+                return
+            self.sync()
+            self._file.close()
+            self._file = None
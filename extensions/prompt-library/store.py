@@ -0,0 +1,1351 @@
+"""
+Pluggable prompt stores for the Prompt Library extension
+
+Every backend keeps prompts indexed by category and tag so filtered list
+calls are index lookups rather than scans over the whole library.
+
+Each stored prompt carries a "version" that the store increments on every
+write, so callers can make updates conditional on the version they read.
+Stored prompts are never modified in place; writes replace them. The
+in-memory stores keep them as compact PromptRecord mappings (records.py).
+"""
+
+import os
+import json
+import logging
+import threading
+from contextlib import ExitStack
+from bisect import bisect_left, bisect_right, insort
+from collections.abc import Mapping
+from typing import Dict, List, Optional, Any, Callable, Iterable, Iterator, Tuple, Collection, ContextManager, TYPE_CHECKING
+
+from .storage import PromptLog
+from .records import PromptRecord, RECORD_SORT_KEYS, as_dict
+from . import changefeed
+
+if TYPE_CHECKING:
+    import sqlite3
+
+# Setup logging
+logger = logging.getLogger("prompt_library.store")
+
+# Fields prompts can be ordered by, mapped to their sort key
+SORT_FIELDS = {
+    "updated_at": lambda prompt: prompt.get("updated_at") or "",
+    "created_at": lambda prompt: prompt.get("created_at") or "",
+    "title": lambda prompt: (prompt.get("title") or "").lower()
+}
+
+def sort_key(prompt: Dict[str, Any], field: str) -> str:
+    """Get the value a prompt is ordered by for the given sort field"""
+    return SORT_FIELDS[field](prompt)
+
+class VersionConflict(Exception):
+    """Raised when a conditional write finds a different prompt version"""
+    
+    def __init__(self, prompt_id: str, current_version: Optional[int]):
+        super().__init__(f"Prompt {prompt_id} is at version {current_version}")
+        self.prompt_id = prompt_id
+        self.current_version = current_version
+
+class BatchRejected(Exception):
+    """Raised when any write of a batch finds a different prompt version; nothing is written"""
+    
+    def __init__(self, conflicts: Dict[int, VersionConflict]):
+        super().__init__(f"{len(conflicts)} batch operations conflict")
+        self.conflicts = conflicts
+
+# One write of a batch: ("put", prompt ID, prompt, expected version) or
+# ("delete", prompt ID, None, expected version); see PromptStore.write_batch
+BatchOperation = Tuple[str, str, Optional[Dict[str, Any]], Optional[int]]
+
+def prompt_version(prompt: Optional[Dict[str, Any]]) -> int:
+    """Get the version of a stored prompt; 0 for prompts written before versioning"""
+    return prompt.get("version", 0) if prompt is not None else 0
+
+def check_batch(operations: List[BatchOperation], stored_version: Callable[[str], int]) -> List[int]:
+    """
+    Check a batch's expected versions, following the versions it produces
+    
+    Args:
+        operations (List[BatchOperation]): Batch to check, in order
+        stored_version (Callable[[str], int]): Current version of a stored
+            prompt, 0 if it does not exist
+    
+    Returns:
+        List[int]: The version each put will write (0 for deletes)
+    
+    Raises:
+        BatchRejected: If any expected version does not match
+    """
+    current: Dict[str, int] = {}
+    versions = []
+    conflicts = {}
+    for index, (op, prompt_id, _, expected_version) in enumerate(operations):
+        version = current[prompt_id] if prompt_id in current else stored_version(prompt_id)
+        if expected_version is not None and expected_version != version:
+            conflicts[index] = VersionConflict(prompt_id, version)
+        current[prompt_id] = version + 1 if op == "put" else 0
+        versions.append(current[prompt_id])
+    if conflicts:
+        raise BatchRejected(conflicts)
+    return versions
+
+class StripedLock:
+    """Fixed set of reentrant locks shared between keys by hash"""
+    
+    def __init__(self, stripes: int = 64):
+        self._locks = [threading.RLock() for _ in range(stripes)]
+    
+    def lock(self, key: str) -> threading.RLock:
+        """Get the lock guarding a key"""
+        return self._locks[hash(key) % len(self._locks)]
+    
+    def lock_many(self, keys: Iterable[str]) -> ExitStack:
+        """
+        Acquire the locks guarding several keys
+        
+        Stripes are always taken in the same order, so two callers locking
+        overlapping keys can't deadlock.
+        
+        Args:
+            keys (Iterable[str]): Keys to lock
+        
+        Returns:
+            ExitStack: Context manager releasing the locks on exit
+        """
+        stack = ExitStack()
+        for stripe in sorted({hash(key) % len(self._locks) for key in keys}):
+            stack.enter_context(self._locks[stripe])
+        return stack
+
+class SortedIndex:
+    """
+    Prompts ordered by (sort key, ID), supporting keyset range scans
+    
+    Entries are the stored records themselves and sort keys are computed
+    while searching (RECORD_SORT_KEYS, matching SORT_FIELDS), so the index
+    costs one reference per prompt rather than a copy of every key.
+    """
+    
+    def __init__(self, field: str):
+        """
+        Initialize an empty index
+        
+        Args:
+            field (str): Sort field, one of SORT_FIELDS
+        """
+        sort_key = RECORD_SORT_KEYS[field]
+        self._key = lambda prompt: (sort_key(prompt), prompt.id)
+        self._entries: List[PromptRecord] = []
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def build(self, prompts: Iterable[PromptRecord]) -> None:
+        """Replace the entries, computing each key once"""
+        self._entries = sorted(prompts, key=self._key)
+    
+    def add(self, prompt: PromptRecord) -> None:
+        insort(self._entries, prompt, key=self._key)
+    
+    def remove(self, prompt: PromptRecord) -> None:
+        position = bisect_left(self._entries, self._key(prompt), key=self._key)
+        if position < len(self._entries) and self._entries[position].id == prompt.id:
+            del self._entries[position]
+    
+    def replace_many(self, removed: List[PromptRecord], added: List[PromptRecord]) -> None:
+        """
+        Remove and add many prompts in one pass
+        
+        Each single add or remove shifts the whole list, so past a few
+        hundred changes it is cheaper to filter the list once and merge the
+        sorted additions in. Only the additions' keys are computed.
+        """
+        if len(removed) + len(added) <= max(64, len(self._entries) >> 8):
+            for prompt in removed:
+                self.remove(prompt)
+            for prompt in added:
+                self.add(prompt)
+            return
+        
+        removed_ids = {prompt.id for prompt in removed}
+        entries = [prompt for prompt in self._entries if prompt.id not in removed_ids]
+        merged: List[PromptRecord] = []
+        start = 0
+        for prompt in sorted(added, key=self._key):
+            position = bisect_left(entries, self._key(prompt), lo=start, key=self._key)
+            merged.extend(entries[start:position])
+            merged.append(prompt)
+            start = position
+        merged.extend(entries[start:])
+        self._entries = merged
+    
+    def scan(self, after: Optional[Tuple[str, str]] = None, descending: bool = False) -> Iterator[PromptRecord]:
+        """
+        Iterate prompts strictly after a position in the given direction
+        
+        Args:
+            after (Optional[Tuple[str, str]]): (key, ID) position to continue from
+            descending (bool): Iterate from the largest key down
+        
+        Returns:
+            Iterator[PromptRecord]: Prompts in order
+        """
+        entries = self._entries
+        if after is None:
+            position = len(entries) if descending else 0
+        elif descending:
+            position = bisect_left(entries, tuple(after), key=self._key)
+        else:
+            position = bisect_right(entries, tuple(after), key=self._key)
+        
+        if descending:
+            for index in range(position - 1, -1, -1):
+                yield entries[index]
+        else:
+            for index in range(position, len(entries)):
+                yield entries[index]
+
+class PromptStore:
+    """Interface implemented by every prompt storage backend"""
+    
+    # Read-only mappings of ID to item dictionary
+    categories: Mapping
+    prompts: Mapping
+    
+    # Increased after every change to the categories or prompts becomes
+    # visible to readers; equal values mean nothing changed in between
+    generation: int = 0
+    
+    # True if readers see mutations before commit(), so commits only add
+    # durability and may be deferred and coalesced by a write-behind flusher
+    defer_commits: bool = False
+    
+    def open(self) -> None:
+        """Open the store and recover any persisted state"""
+    
+    def close(self) -> None:
+        """Flush and close the store"""
+    
+    def commit(self, durable: bool = False) -> None:
+        """
+        Make mutations since the last commit durable
+        
+        Args:
+            durable (bool): Force them to disk now instead of at the store's
+                next scheduled sync
+        """
+    
+    def get_category(self, category_id: str) -> Optional[Dict[str, Any]]:
+        """Get a category by ID"""
+        raise NotImplementedError
+    
+    def list_categories(self) -> List[Dict[str, Any]]:
+        """Get all categories"""
+        raise NotImplementedError
+    
+    def put_category(self, category: Dict[str, Any]) -> None:
+        """Insert or replace a category"""
+        raise NotImplementedError
+    
+    def delete_category(self, category_id: str) -> bool:
+        """Delete a category, returning False if it does not exist"""
+        raise NotImplementedError
+    
+    def get_prompt(self, prompt_id: str) -> Optional[Dict[str, Any]]:
+        """Get a prompt by ID"""
+        raise NotImplementedError
+    
+    def prompt_lock(self, prompt_id: str) -> ContextManager:
+        """
+        Get the lock serializing writes to one prompt
+        
+        Writes hold it while updating the store, so callers can hold it too to
+        keep a read-modify-write sequence or derived indexes consistent. Writes
+        to prompts on other stripes proceed concurrently.
+        
+        Args:
+            prompt_id (str): Prompt ID
+        
+        Returns:
+            ContextManager: Reentrant lock
+        """
+        raise NotImplementedError
+    
+    def prompt_locks(self, prompt_ids: Iterable[str]) -> ContextManager:
+        """
+        Hold the write locks of several prompts, as prompt_lock() does for one
+        
+        Args:
+            prompt_ids (Iterable[str]): Prompt IDs
+        
+        Returns:
+            ContextManager: Releases the locks on exit
+        """
+        raise NotImplementedError
+    
+    def list_prompts(self, category: Optional[str] = None, tag: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get prompts, optionally filtered by category and/or tag"""
+        raise NotImplementedError
+    
+    def iter_prompts(self, batch_size: int = 500) -> Iterator[Dict[str, Any]]:
+        """
+        Lazily iterate over all prompts
+        
+        Prompts are fetched in batches, so the whole library is never
+        materialized at once. Concurrent mutations may or may not be seen.
+        
+        Args:
+            batch_size (int): Number of prompts fetched at a time
+        
+        Returns:
+            Iterator[Dict[str, Any]]: Prompt dictionaries
+        """
+        raise NotImplementedError
+    
+    def page_prompts(
+        self,
+        sort: str,
+        descending: bool = False,
+        after: Optional[Tuple[str, str]] = None,
+        limit: int = 50,
+        category: Optional[str] = None,
+        tag: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Get one page of prompts in keyset order
+        
+        Args:
+            sort (str): Sort field, one of SORT_FIELDS
+            descending (bool): Sort from the largest key down
+            after (Optional[Tuple[str, str]]): (sort key, ID) of the last prompt on the previous page
+            limit (int): Maximum number of prompts to return
+            category (Optional[str]): Category ID to filter by
+            tag (Optional[str]): Tag to filter by
+        
+        Returns:
+            List[Dict[str, Any]]: Prompt dictionaries in order
+        """
+        raise NotImplementedError
+    
+    def count_prompts(self) -> int:
+        """Get the number of prompts"""
+        raise NotImplementedError
+    
+    def put_prompt(self, prompt: Dict[str, Any], expected_version: Optional[int] = None) -> None:
+        """
+        Insert or replace a prompt, setting its "version" to the next version
+        
+        Args:
+            prompt (Dict[str, Any]): Prompt data including its ID
+            expected_version (Optional[int]): Only write if the stored prompt is
+                at this version (0 for a prompt that does not exist yet)
+        
+        Raises:
+            VersionConflict: If expected_version does not match
+        """
+        raise NotImplementedError
+    
+    def delete_prompt(self, prompt_id: str) -> bool:
+        """Delete a prompt, returning False if it does not exist"""
+        raise NotImplementedError
+    
+    def write_batch(self, operations: List[BatchOperation]) -> None:
+        """
+        Apply several prompt writes atomically
+        
+        Operations apply in order, so later ones see the versions earlier ones
+        produce. Every expected version is checked before anything is written;
+        if any does not match, nothing is. Once written, the batch is
+        persisted as a unit: after a crash either all of it or none of it is
+        recovered. Each put prompt gets its new "version" set.
+        
+        Args:
+            operations (List[BatchOperation]): Puts and deletes; an expected
+                version of None makes that write unconditional
+        
+        Raises:
+            BatchRejected: With the conflicting operations by index
+        """
+        raise NotImplementedError
+
+class MemoryPromptStore(PromptStore):
+    """In-memory store with category and tag indexes"""
+    
+    def __init__(self, compress_min_bytes: int = 0):
+        """
+        Initialize an empty store
+        
+        Args:
+            compress_min_bytes (int): Keep prompt content at least this long
+                zlib-compressed in memory; 0 never compresses
+        """
+        self.compress_min_bytes = compress_min_bytes
+        self.categories: Dict[str, Dict[str, Any]] = {}
+        
+        # Prompts are held as compact PromptRecord mappings
+        self.prompts: Dict[str, PromptRecord] = {}
+        
+        # Secondary indexes; dicts are used as insertion-ordered sets
+        self._by_category: Dict[str, Dict[str, None]] = {}
+        self._by_tag: Dict[str, Dict[str, None]] = {}
+        self._ordered: Dict[str, SortedIndex] = {field: SortedIndex(field) for field in SORT_FIELDS}
+        
+        # Per-prompt write locks; the global lock only guards the brief index
+        # updates, and plain dictionary lookups need neither
+        self._prompt_locks = StripedLock()
+        self._lock = threading.RLock()
+        
+        # Copy-on-write tuple of all prompts for lock-free listing and export;
+        # writers drop it and the next reader rebuilds it
+        self._snapshot: Optional[Tuple[PromptRecord, ...]] = None
+        
+        self.generation = 0
+        self.defer_commits = True
+    
+    def _compact(self, prompt: Dict[str, Any]) -> PromptRecord:
+        """Convert a prompt dictionary to the record kept in memory"""
+        if isinstance(prompt, PromptRecord):
+            return prompt
+        return PromptRecord(prompt, self.compress_min_bytes)
+    
+    def _index(self, prompt: PromptRecord, ordered: bool = True) -> None:
+        """Add a prompt to the secondary indexes"""
+        prompt_id = prompt["id"]
+        self._by_category.setdefault(prompt["category"], {})[prompt_id] = None
+        for tag in prompt.get("tags", []):
+            self._by_tag.setdefault(tag, {})[prompt_id] = None
+        if ordered:
+            for index in self._ordered.values():
+                index.add(prompt)
+    
+    def _unindex(self, prompt: PromptRecord, ordered: bool = True) -> None:
+        """Remove a prompt from the secondary indexes"""
+        prompt_id = prompt["id"]
+        self._discard(self._by_category, prompt["category"], prompt_id)
+        for tag in prompt.get("tags", []):
+            self._discard(self._by_tag, tag, prompt_id)
+        if ordered:
+            for index in self._ordered.values():
+                index.remove(prompt)
+    
+    @staticmethod
+    def _discard(index: Dict[str, Dict[str, None]], key: str, prompt_id: str) -> None:
+        """Remove an ID from an index bucket, dropping the bucket once empty"""
+        bucket = index.get(key)
+        if bucket is not None:
+            bucket.pop(prompt_id, None)
+            if not bucket:
+                del index[key]
+    
+    def _rebuild_indexes(self) -> None:
+        """Compact freshly loaded prompts and rebuild the secondary indexes"""
+        self._by_category = {}
+        self._by_tag = {}
+        self._ordered = {field: SortedIndex(field) for field in SORT_FIELDS}
+        self._snapshot = None
+        for prompt_id, prompt in self.prompts.items():
+            record = self.prompts[prompt_id] = self._compact(prompt)
+            self._index(record, ordered=False)
+        for index in self._ordered.values():
+            index.build(self.prompts.values())
+        self.generation += 1
+    
+    def _prompts_snapshot(self) -> Tuple[Dict[str, Any], ...]:
+        """Get an immutable point-in-time tuple of all prompts"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                snapshot = self._snapshot
+                if snapshot is None:
+                    snapshot = self._snapshot = tuple(self.prompts.values())
+        return snapshot
+    
+    def get_category(self, category_id: str) -> Optional[Dict[str, Any]]:
+        return self.categories.get(category_id)
+    
+    def list_categories(self) -> List[Dict[str, Any]]:
+        return list(self.categories.values())
+    
+    def put_category(self, category: Dict[str, Any]) -> None:
+        with self._lock:
+            self.categories[category["id"]] = category
+            self.generation += 1
+    
+    def delete_category(self, category_id: str) -> bool:
+        with self._lock:
+            if self.categories.pop(category_id, None) is None:
+                return False
+            self.generation += 1
+            return True
+    
+    def get_prompt(self, prompt_id: str) -> Optional[Dict[str, Any]]:
+        return self.prompts.get(prompt_id)
+    
+    def prompt_lock(self, prompt_id: str) -> ContextManager:
+        return self._prompt_locks.lock(prompt_id)
+    
+    def prompt_locks(self, prompt_ids: Iterable[str]) -> ContextManager:
+        return self._prompt_locks.lock_many(prompt_ids)
+    
+    def _filter_ids(self, category: Optional[str], tag: Optional[str]) -> Optional[Collection[str]]:
+        """Get the IDs matching the filters in insertion order, or None if unfiltered"""
+        if category is None and tag is None:
+            return None
+        
+        # Walk the smaller bucket and probe the larger one
+        buckets = []
+        if category is not None:
+            buckets.append(self._by_category.get(category, {}))
+        if tag is not None:
+            buckets.append(self._by_tag.get(tag, {}))
+        if len(buckets) == 1:
+            return buckets[0]
+        buckets.sort(key=len)
+        smallest, largest = buckets
+        return {prompt_id: None for prompt_id in smallest if prompt_id in largest}
+    
+    def list_prompts(self, category: Optional[str] = None, tag: Optional[str] = None) -> List[Dict[str, Any]]:
+        if category is None and tag is None:
+            return list(self._prompts_snapshot())
+        with self._lock:
+            ids = self._filter_ids(category, tag)
+            return [self.prompts[prompt_id] for prompt_id in ids]
+    
+    def iter_prompts(self, batch_size: int = 500) -> Iterator[Dict[str, Any]]:
+        # Iterating the snapshot gives a consistent point-in-time export
+        return iter(self._prompts_snapshot())
+    
+    def page_prompts(
+        self,
+        sort: str,
+        descending: bool = False,
+        after: Optional[Tuple[str, str]] = None,
+        limit: int = 50,
+        category: Optional[str] = None,
+        tag: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        with self._lock:
+            ids = self._filter_ids(category, tag)
+            
+            if ids is not None and len(ids) * 8 < len(self.prompts):
+                # A selective filter is cheaper to order directly than to find in
+                # the global index
+                entries = sorted((sort_key(self.prompts[prompt_id], sort), prompt_id) for prompt_id in ids)
+                if descending:
+                    entries.reverse()
+                if after is not None:
+                    entries = [entry for entry in entries if (entry < after if descending else entry > after)]
+                return [self.prompts[prompt_id] for _, prompt_id in entries[:limit]]
+            
+            page = []
+            for prompt in self._ordered[sort].scan(after, descending):
+                if ids is not None and prompt["id"] not in ids:
+                    continue
+                page.append(prompt)
+                if len(page) >= limit:
+                    break
+            return page
+    
+    def count_prompts(self) -> int:
+        return len(self.prompts)
+    
+    def put_prompt(self, prompt: Dict[str, Any], expected_version: Optional[int] = None) -> None:
+        with self._prompt_locks.lock(prompt["id"]):
+            previous = self.prompts.get(prompt["id"])
+            current = prompt_version(previous)
+            if expected_version is not None and expected_version != current:
+                raise VersionConflict(prompt["id"], current)
+            prompt["version"] = current + 1
+            
+            self._replace_prompt(prompt)
+            self._prompt_written(prompt)
+    
+    def delete_prompt(self, prompt_id: str) -> bool:
+        with self._prompt_locks.lock(prompt_id):
+            if not self._drop_prompt(prompt_id):
+                return False
+            self._prompt_deleted(prompt_id)
+            return True
+    
+    def write_batch(self, operations: List[BatchOperation]) -> None:
+        # The global lock is held throughout, so a compaction sees the batch
+        # either entirely or not at all
+        with self._prompt_locks.lock_many(operation[1] for operation in operations), self._lock:
+            versions = check_batch(operations, lambda prompt_id: prompt_version(self.prompts.get(prompt_id)))
+            for (op, _, prompt, _), version in zip(operations, versions):
+                if op == "put":
+                    prompt["version"] = version
+            self._apply_batch(operations)
+            self._batch_written(operations)
+    
+    def _apply_batch(self, operations: List[BatchOperation]) -> None:
+        """Apply a checked batch to the dictionary and indexes in one pass"""
+        # Only the last write to each prompt matters
+        final: Dict[str, Optional[PromptRecord]] = {}
+        for op, prompt_id, prompt, _ in operations:
+            final[prompt_id] = self._compact(prompt) if op == "put" else None
+        
+        with self._lock:
+            removed, added = [], []
+            for prompt_id, record in final.items():
+                previous = self.prompts.get(prompt_id)
+                if previous is not None:
+                    self._unindex(previous, ordered=False)
+                    removed.append(previous)
+                if record is None:
+                    self.prompts.pop(prompt_id, None)
+                else:
+                    self.prompts[prompt_id] = record
+                    self._index(record, ordered=False)
+                    added.append(record)
+            for index in self._ordered.values():
+                index.replace_many(removed, added)
+            self._snapshot = None
+            self.generation += 1
+    
+    def _replace_prompt(self, prompt: Dict[str, Any]) -> None:
+        """Swap a prompt into the dictionary and indexes"""
+        record = self._compact(prompt)
+        with self._lock:
+            previous = self.prompts.get(record["id"])
+            if previous is not None:
+                self._unindex(previous)
+            self.prompts[record["id"]] = record
+            self._index(record)
+            self._snapshot = None
+            self.generation += 1
+    
+    def _drop_prompt(self, prompt_id: str) -> bool:
+        """Remove a prompt from the dictionary and indexes"""
+        with self._lock:
+            prompt = self.prompts.pop(prompt_id, None)
+            if prompt is None:
+                return False
+            self._unindex(prompt)
+            self._snapshot = None
+            self.generation += 1
+            return True
+    
+    def _prompt_written(self, prompt: Dict[str, Any]) -> None:
+        """Hook called under the prompt's lock after it is stored"""
+    
+    def _prompt_deleted(self, prompt_id: str) -> None:
+        """Hook called under the prompt's lock after it is deleted"""
+    
+    def _batch_written(self, operations: List[BatchOperation]) -> None:
+        """Hook called under the batch's locks after it is applied"""
+
+class LogPromptStore(MemoryPromptStore):
+    """In-memory store persisted through the append-only PromptLog"""
+    
+    def __init__(self, log: PromptLog, compress_min_bytes: int = 0):
+        """
+        Initialize the store
+        
+        Args:
+            log (PromptLog): Write-ahead log used for persistence
+            compress_min_bytes (int): Keep prompt content at least this long
+                zlib-compressed in memory; 0 never compresses
+        """
+        super().__init__(compress_min_bytes)
+        self.log = log
+        
+        # Items changed since the last commit, as (kind, ID); commit() logs
+        # their current state, so repeated writes to one item cost one record
+        self._dirty: Dict[Tuple[str, str], None] = {}
+        self._dirty_lock = threading.Lock()
+        self._commit_lock = threading.Lock()
+    
+    def open(self) -> None:
+        with self._lock:
+            self.categories, self.prompts = self.log.open()
+            self._rebuild_indexes()
+    
+    def close(self) -> None:
+        with self._commit_lock:
+            self._append_dirty()
+            self.log.close()
+    
+    def commit(self, durable: bool = False) -> None:
+        # Commits are serialized, so a compaction never runs between taking
+        # the dirty state and appending it
+        with self._commit_lock:
+            self._append_dirty()
+            self.log.commit()
+            if durable:
+                self.log.sync()
+            if not self.log.needs_compaction(len(self.categories) + len(self.prompts)):
+                return
+            
+            # Only the rotation and a shallow copy happen under the lock; the
+            # snapshot is written while reads and writes carry on
+            with self._lock:
+                if not self.log.rotate():
+                    return
+                categories, prompts = dict(self.categories), dict(self.prompts)
+            self.log.write_snapshot(categories, prompts)
+    
+    def _append_dirty(self) -> None:
+        """Log the current state of every item changed since the last commit"""
+        # Taken under the global lock, so a batch is logged entirely or not at
+        # all; the records are encoded and appended after releasing it
+        with self._lock:
+            with self._dirty_lock:
+                dirty, self._dirty = self._dirty, {}
+            items = [
+                (kind, item_id, (self.categories if kind == "category" else self.prompts).get(item_id))
+                for kind, item_id in dirty
+            ]
+        if not items:
+            return
+        
+        records = []
+        for kind, item_id, item in items:
+            if item is None:
+                records.append({"op": "delete", "kind": kind, "id": item_id})
+            else:
+                records.append({"op": "put", "kind": kind, "id": item_id, "data": as_dict(item)})
+        if len(records) == 1:
+            self.log.append(records[0]["op"], records[0]["kind"], records[0]["id"], records[0].get("data"))
+        else:
+            self.log.append_batch(records)
+    
+    def _mark_dirty(self, kind: str, item_ids: Iterable[str]) -> None:
+        """Record items whose current state the next commit must log"""
+        with self._dirty_lock:
+            for item_id in item_ids:
+                self._dirty[(kind, item_id)] = None
+    
+    def put_category(self, category: Dict[str, Any]) -> None:
+        with self._lock:
+            super().put_category(category)
+            self._mark_dirty("category", (category["id"],))
+    
+    def delete_category(self, category_id: str) -> bool:
+        with self._lock:
+            if not super().delete_category(category_id):
+                return False
+            self._mark_dirty("category", (category_id,))
+            return True
+    
+    # Prompts are marked after the in-memory update, under the prompt's lock
+    # but not the global one, so writers to different prompts proceed
+    # concurrently. A write the next commit misses is marked for the one after.
+    
+    def _prompt_written(self, prompt: Dict[str, Any]) -> None:
+        self._mark_dirty("prompt", (prompt["id"],))
+    
+    def _prompt_deleted(self, prompt_id: str) -> None:
+        self._mark_dirty("prompt", (prompt_id,))
+    
+    def _batch_written(self, operations: List[BatchOperation]) -> None:
+        self._mark_dirty("prompt", (operation[1] for operation in operations))
+
+class _SQLiteMapping(Mapping):
+    """Read-only mapping view over one of the SQLite store's tables"""
+    
+    def __init__(self, store: "SQLitePromptStore", table: str):
+        self._store = store
+        self._table = table
+    
+    def __getitem__(self, key: str) -> Dict[str, Any]:
+        item = self._store._get(self._table, key)
+        if item is None:
+            raise KeyError(key)
+        return item
+    
+    def __contains__(self, key: object) -> bool:
+        return self._store._exists(self._table, key)
+    
+    def __iter__(self) -> Iterator[str]:
+        rows = self._store._reader().execute(f"SELECT id FROM {self._table} ORDER BY rowid")
+        return (row[0] for row in rows)
+    
+    def __len__(self) -> int:
+        return self._store._reader().execute(f"SELECT COUNT(*) FROM {self._table}").fetchone()[0]
+
+class SQLitePromptStore(PromptStore):
+    """SQLite store with indexed category, tag and updated_at queries"""
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS categories (
+            id TEXT PRIMARY KEY,
+            data TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS prompts (
+            id TEXT PRIMARY KEY,
+            category TEXT NOT NULL,
+            title TEXT NOT NULL DEFAULT '',
+            created_at TEXT NOT NULL DEFAULT '',
+            updated_at TEXT NOT NULL DEFAULT '',
+            version INTEGER NOT NULL DEFAULT 0,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_prompts_category ON prompts (category);
+        CREATE INDEX IF NOT EXISTS idx_prompts_updated_at ON prompts (updated_at, id);
+        CREATE INDEX IF NOT EXISTS idx_prompts_created_at ON prompts (created_at, id);
+        CREATE INDEX IF NOT EXISTS idx_prompts_title ON prompts (title, id);
+        CREATE TABLE IF NOT EXISTS prompt_tags (
+            tag TEXT NOT NULL,
+            prompt_id TEXT NOT NULL,
+            PRIMARY KEY (tag, prompt_id)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_prompt_tags_prompt ON prompt_tags (prompt_id);
+    """
+    
+    # Statements are kept constant so sqlite3's statement cache prepares each once
+    INSERT_PROMPT = """
+        INSERT INTO prompts (category, title, created_at, updated_at, version, data, id) VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (id) DO NOTHING
+    """
+    # Writes only apply on top of the version that was read, so a write from
+    # another process in between turns into a conflict instead of being lost
+    UPDATE_PROMPT = """
+        UPDATE prompts SET category = ?, title = ?, created_at = ?, updated_at = ?, version = ?, data = ?
+        WHERE id = ? AND version = ?
+    """
+    UPSERT_PROMPT = """
+        INSERT INTO prompts (category, title, created_at, updated_at, version, data, id) VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (id) DO UPDATE SET category = excluded.category, title = excluded.title,
+            created_at = excluded.created_at, updated_at = excluded.updated_at,
+            version = excluded.version, data = excluded.data
+    """
+    UPSERT_CATEGORY = """
+        INSERT INTO categories (id, data) VALUES (?, ?)
+        ON CONFLICT (id) DO UPDATE SET data = excluded.data
+    """
+    SELECT_BY_CATEGORY = "SELECT data FROM prompts WHERE category = ? ORDER BY rowid"
+    SELECT_BY_TAG = """
+        SELECT p.data FROM prompt_tags t JOIN prompts p ON p.id = t.prompt_id
+        WHERE t.tag = ? ORDER BY p.rowid
+    """
+    SELECT_BY_CATEGORY_AND_TAG = """
+        SELECT p.data FROM prompt_tags t JOIN prompts p ON p.id = t.prompt_id
+        WHERE t.tag = ? AND p.category = ? ORDER BY p.rowid
+    """
+    
+    def __init__(self, path: str, change_feed: bool = False):
+        """
+        Initialize the store
+        
+        Args:
+            path (str): Path of the SQLite database file
+            change_feed (bool): Record every mutation in the changes table
+        """
+        self.path = path
+        self.change_feed = change_feed
+        self.categories = _SQLiteMapping(self, "categories")
+        self.prompts = _SQLiteMapping(self, "prompts")
+        
+        # A single writer connection plus one reader connection per thread;
+        # WAL mode lets the readers proceed while a write is in progress
+        self._writer: Optional["sqlite3.Connection"] = None
+        self._write_lock = threading.RLock()
+        self._local = threading.local()
+        self._prompt_locks = StripedLock()
+        
+        # Own commits are counted directly; data_version reveals other
+        # processes' commits (see generation)
+        self._generation = 0
+        self._data_version: Optional[int] = None
+        
+        # Prompt count as the writer sees it, kept up to date by this store's
+        # writes and reloaded when another process commits
+        self._count: Optional[int] = None
+    
+    def _connect(self) -> "sqlite3.Connection":
+        """Open a connection configured for this store"""
+        # Imported here so processes using the other backends never load it
+        import sqlite3
+        
+        conn = sqlite3.connect(self.path, check_same_thread=False, cached_statements=256)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+    
+    def _reader(self) -> "sqlite3.Connection":
+        """Get the calling thread's reader connection"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+        return conn
+    
+    def _get(self, table: str, key: Any) -> Optional[Dict[str, Any]]:
+        """Fetch and decode a single row by ID"""
+        row = self._reader().execute(f"SELECT data FROM {table} WHERE id = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+    
+    def _exists(self, table: str, key: Any) -> bool:
+        """Check for a row by ID without fetching or decoding it"""
+        return self._reader().execute(f"SELECT 1 FROM {table} WHERE id = ?", (key,)).fetchone() is not None
+    
+    def open(self) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._writer = self._connect()
+        self._writer.executescript(self.SCHEMA)
+        
+        # Databases created before prompts were versioned lack the column
+        columns = [row[1] for row in self._writer.execute("PRAGMA table_info(prompts)")]
+        if "version" not in columns:
+            self._writer.execute("ALTER TABLE prompts ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+            self._writer.commit()
+        
+        if self.change_feed:
+            changefeed.create_schema(self._writer)
+        logger.info(f"Opened SQLite prompt store: {self.path}")
+    
+    def close(self) -> None:
+        with self._write_lock:
+            if self._writer is not None:
+                self._writer.commit()
+                self._writer.close()
+                self._writer = None
+                self._count = None
+    
+    def commit(self, durable: bool = False) -> None:
+        # Readers only see committed writes, so commits are never deferred;
+        # each one is durable against a crash of the process
+        with self._write_lock:
+            if self._writer.in_transaction:
+                self._writer.commit()
+                self._generation += 1
+    
+    def _check_data_version(self) -> None:
+        """
+        Notice commits by other connections; the caller holds the write lock
+        
+        The writer's data_version changes whenever another connection commits,
+        which covers other processes writing to the same database, but not
+        the writer's own commits.
+        """
+        if self._writer is None:
+            return
+        data_version = self._writer.execute("PRAGMA data_version").fetchone()[0]
+        if data_version != self._data_version:
+            self._data_version = data_version
+            self._generation += 1
+            self._count = None
+    
+    @property
+    def generation(self) -> int:
+        # Readers only see committed writes, so the count moves on commit
+        with self._write_lock:
+            self._check_data_version()
+            return self._generation
+    
+    def get_category(self, category_id: str) -> Optional[Dict[str, Any]]:
+        return self._get("categories", category_id)
+    
+    def list_categories(self) -> List[Dict[str, Any]]:
+        rows = self._reader().execute("SELECT data FROM categories ORDER BY rowid")
+        return [json.loads(row[0]) for row in rows]
+    
+    def put_category(self, category: Dict[str, Any]) -> None:
+        with self._write_lock:
+            self._writer.execute(self.UPSERT_CATEGORY, (category["id"], json.dumps(category)))
+            self._record("put", "category", category["id"])
+    
+    def delete_category(self, category_id: str) -> bool:
+        with self._write_lock:
+            cursor = self._writer.execute("DELETE FROM categories WHERE id = ?", (category_id,))
+            if cursor.rowcount == 0:
+                return False
+            self._record("delete", "category", category_id)
+            return True
+    
+    def get_prompt(self, prompt_id: str) -> Optional[Dict[str, Any]]:
+        return self._get("prompts", prompt_id)
+    
+    def prompt_lock(self, prompt_id: str) -> ContextManager:
+        return self._prompt_locks.lock(prompt_id)
+    
+    def prompt_locks(self, prompt_ids: Iterable[str]) -> ContextManager:
+        return self._prompt_locks.lock_many(prompt_ids)
+    
+    def list_prompts(self, category: Optional[str] = None, tag: Optional[str] = None) -> List[Dict[str, Any]]:
+        conn = self._reader()
+        if category is not None and tag is not None:
+            rows = conn.execute(self.SELECT_BY_CATEGORY_AND_TAG, (tag, category))
+        elif category is not None:
+            rows = conn.execute(self.SELECT_BY_CATEGORY, (category,))
+        elif tag is not None:
+            rows = conn.execute(self.SELECT_BY_TAG, (tag,))
+        else:
+            rows = conn.execute("SELECT data FROM prompts ORDER BY rowid")
+        return [json.loads(row[0]) for row in rows]
+    
+    def iter_prompts(self, batch_size: int = 500) -> Iterator[Dict[str, Any]]:
+        # Keyset batches on rowid, each a short query on the calling thread's
+        # connection, so iteration may hop between threads
+        last_rowid = 0
+        while True:
+            rows = self._reader().execute(
+                "SELECT rowid, data FROM prompts WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                (last_rowid, batch_size)
+            ).fetchall()
+            if not rows:
+                return
+            for rowid, data in rows:
+                yield json.loads(data)
+            last_rowid = rows[-1][0]
+    
+    def page_prompts(
+        self,
+        sort: str,
+        descending: bool = False,
+        after: Optional[Tuple[str, str]] = None,
+        limit: int = 50,
+        category: Optional[str] = None,
+        tag: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        if sort not in SORT_FIELDS:
+            raise ValueError(f"Unknown sort field: {sort}")
+        
+        # The (sort column, id) indexes serve both the range and the order
+        clauses = []
+        params: List[Any] = []
+        if after is not None:
+            clauses.append(f"({sort}, id) {'<' if descending else '>'} (?, ?)")
+            params.extend(after)
+        if category is not None:
+            clauses.append("category = ?")
+            params.append(category)
+        if tag is not None:
+            clauses.append("id IN (SELECT prompt_id FROM prompt_tags WHERE tag = ?)")
+            params.append(tag)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        direction = "DESC" if descending else "ASC"
+        params.append(limit)
+        
+        rows = self._reader().execute(
+            f"SELECT data FROM prompts {where} ORDER BY {sort} {direction}, id {direction} LIMIT ?",
+            params
+        )
+        return [json.loads(row[0]) for row in rows]
+    
+    def count_prompts(self) -> int:
+        # Counted once, then adjusted by each write instead of a COUNT(*) for
+        # every quota check
+        with self._write_lock:
+            self._check_data_version()
+            if self._count is None:
+                self._count = self._writer.execute("SELECT COUNT(*) FROM prompts").fetchone()[0]
+            return self._count
+    
+    def _count_changed(self, delta: int) -> None:
+        """Adjust the prompt count by a write's change; the caller holds the write lock"""
+        if self._count is not None:
+            self._count += delta
+    
+    def put_prompt(self, prompt: Dict[str, Any], expected_version: Optional[int] = None) -> None:
+        prompt_id = prompt["id"]
+        with self._prompt_locks.lock(prompt_id), self._write_lock:
+            while True:
+                row = self._writer.execute("SELECT version FROM prompts WHERE id = ?", (prompt_id,)).fetchone()
+                current = row[0] if row else 0
+                if expected_version is not None and expected_version != current:
+                    raise VersionConflict(prompt_id, current)
+                prompt["version"] = current + 1
+                
+                values = self._prompt_values(prompt)
+                if row is None:
+                    cursor = self._writer.execute(self.INSERT_PROMPT, values)
+                else:
+                    cursor = self._writer.execute(self.UPDATE_PROMPT, values + (current,))
+                if cursor.rowcount > 0:
+                    break
+                
+                # Another process wrote the prompt after it was read
+                if expected_version is not None:
+                    raise VersionConflict(prompt_id, None)
+            
+            if row is None:
+                self._count_changed(1)
+            self._write_tags(prompt)
+            self._record("put", "prompt", prompt_id)
+    
+    def delete_prompt(self, prompt_id: str) -> bool:
+        with self._prompt_locks.lock(prompt_id), self._write_lock:
+            self._writer.execute("DELETE FROM prompt_tags WHERE prompt_id = ?", (prompt_id,))
+            cursor = self._writer.execute("DELETE FROM prompts WHERE id = ?", (prompt_id,))
+            if cursor.rowcount == 0:
+                return False
+            self._count_changed(-1)
+            self._record("delete", "prompt", prompt_id)
+            return True
+    
+    def write_batch(self, operations: List[BatchOperation]) -> None:
+        with self._prompt_locks.lock_many(operation[1] for operation in operations), self._write_lock:
+            # Commit earlier writes so a rollback only undoes this batch, and
+            # take SQLite's write lock up front so no other process can write
+            # between the version checks and the writes
+            self.commit()
+            self._writer.execute("BEGIN IMMEDIATE")
+            
+            # The count only takes the batch's change once it is committed
+            delta = 0
+            try:
+                versions = check_batch(operations, self._stored_version)
+                for (op, prompt_id, prompt, _), version in zip(operations, versions):
+                    if op == "put":
+                        if self._writer.execute("SELECT 1 FROM prompts WHERE id = ?", (prompt_id,)).fetchone() is None:
+                            delta += 1
+                        prompt["version"] = version
+                        self._writer.execute(self.UPSERT_PROMPT, self._prompt_values(prompt))
+                        self._write_tags(prompt)
+                    else:
+                        self._writer.execute("DELETE FROM prompt_tags WHERE prompt_id = ?", (prompt_id,))
+                        delta -= self._writer.execute("DELETE FROM prompts WHERE id = ?", (prompt_id,)).rowcount
+                    self._record(op, "prompt", prompt_id)
+            except BaseException:
+                self._writer.rollback()
+                raise
+            self.commit()
+            self._count_changed(delta)
+    
+    def _stored_version(self, prompt_id: str) -> int:
+        """Get a prompt's committed version through the writer, 0 if it does not exist"""
+        row = self._writer.execute("SELECT version FROM prompts WHERE id = ?", (prompt_id,)).fetchone()
+        return row[0] if row else 0
+    
+    def _prompt_values(self, prompt: Dict[str, Any]) -> Tuple[Any, ...]:
+        """Get the column values INSERT_PROMPT, UPDATE_PROMPT and UPSERT_PROMPT take"""
+        return (
+            prompt["category"],
+            sort_key(prompt, "title"),
+            sort_key(prompt, "created_at"),
+            sort_key(prompt, "updated_at"),
+            prompt["version"],
+            json.dumps(prompt),
+            prompt["id"]
+        )
+    
+    def _write_tags(self, prompt: Dict[str, Any]) -> None:
+        """Replace a prompt's rows in the tag index"""
+        self._writer.execute("DELETE FROM prompt_tags WHERE prompt_id = ?", (prompt["id"],))
+        self._writer.executemany(
+            "INSERT OR IGNORE INTO prompt_tags (tag, prompt_id) VALUES (?, ?)",
+            [(tag, prompt["id"]) for tag in prompt.get("tags", [])]
+        )
+    
+    def _record(self, op: str, kind: str, item_id: str) -> None:
+        """Add a mutation to the change feed, in the mutation's transaction"""
+        if self.change_feed:
+            changefeed.record_change(self._writer, op, kind, item_id)
+    
+    def read_changes(self, after: int, limit: int = 1000) -> List[Tuple[int, str, str, str]]:
+        """
+        Get committed changes following a sequence number
+        
+        Args:
+            after (int): Last sequence number already applied
+            limit (int): Maximum number of changes
+        
+        Returns:
+            List[Tuple[int, str, str, str]]: (seq, kind, item_id, op) in order
+        """
+        return changefeed.read_changes(self._reader(), after, limit)
+    
+    def change_range(self) -> Tuple[int, int]:
+        """Get the oldest retained and the latest change sequence numbers"""
+        conn = self._reader()
+        return changefeed.first_seq(conn), changefeed.last_seq(conn)
+    
+    def prune_changes(self, through: int) -> int:
+        """
+        Delete changes up to and including a sequence number
+        
+        Args:
+            through (int): Last sequence number to delete
+        
+        Returns:
+            int: Number of deleted changes
+        """
+        with self._write_lock:
+            deleted = changefeed.prune_changes(self._writer, through)
+            self._writer.commit()
+            return deleted
+
+class ReplicaPromptStore(MemoryPromptStore):
+    """
+    In-memory replica of a shared SQLite store, kept current by its change feed
+    
+    Reads are served from memory. Writes go to SQLite, are committed at once
+    and then applied locally. sync() applies the changes other processes
+    made by re-reading the changed items' committed state.
+    """
+    
+    def __init__(self, backing: SQLitePromptStore, retention: int = 100000, compress_min_bytes: int = 0):
+        """
+        Initialize the replica
+        
+        Args:
+            backing (SQLitePromptStore): Shared store with its change feed enabled
+            retention (int): Number of changes kept in the feed
+            compress_min_bytes (int): Keep prompt content at least this long
+                zlib-compressed in memory; 0 never compresses
+        """
+        super().__init__(compress_min_bytes)
+        self.backing = backing
+        self.retention = retention
+        
+        # Writes commit to the backing store as they happen, so other
+        # processes see them; there is nothing left to defer
+        self.defer_commits = False
+        self._seq = 0
+        self._pruned_at = 0
+        self._sync_lock = threading.Lock()
+    
+    def open(self) -> None:
+        self.backing.open()
+        self._load()
+    
+    def _load(self) -> None:
+        """Replace the replica with the backing store's committed state"""
+        # Take the position first; changes committed while loading are then
+        # applied again by the next sync, which is harmless
+        _, seq = self.backing.change_range()
+        categories = {category["id"]: category for category in self.backing.list_categories()}
+        prompts = {prompt["id"]: prompt for prompt in self.backing.iter_prompts()}
+        with self._lock:
+            self.categories, self.prompts = categories, prompts
+            self._rebuild_indexes()
+            self._seq = self._pruned_at = seq
+    
+    def close(self) -> None:
+        self.backing.close()
+    
+    def commit(self, durable: bool = False) -> None:
+        self.backing.commit(durable)
+    
+    def put_category(self, category: Dict[str, Any]) -> None:
+        with self._lock:
+            self.backing.put_category(category)
+            self.backing.commit()
+            super().put_category(category)
+    
+    def delete_category(self, category_id: str) -> bool:
+        with self._lock:
+            deleted = self.backing.delete_category(category_id)
+            self.backing.commit()
+            super().delete_category(category_id)
+            return deleted
+    
+    def put_prompt(self, prompt: Dict[str, Any], expected_version: Optional[int] = None) -> None:
+        with self._prompt_locks.lock(prompt["id"]):
+            # The backing store checks and assigns the version across processes
+            self.backing.put_prompt(prompt, expected_version)
+            self.backing.commit()
+            self._replace_prompt(prompt)
+    
+    def delete_prompt(self, prompt_id: str) -> bool:
+        with self._prompt_locks.lock(prompt_id):
+            deleted = self.backing.delete_prompt(prompt_id)
+            self.backing.commit()
+            self._drop_prompt(prompt_id)
+            return deleted
+    
+    def write_batch(self, operations: List[BatchOperation]) -> None:
+        with self._prompt_locks.lock_many(operation[1] for operation in operations):
+            # The backing store checks, versions and commits the whole batch
+            self.backing.write_batch(operations)
+            self._apply_batch(operations)
+    
+    def sync(self, limit: int = 1000) -> Optional[List[str]]:
+        """
+        Apply changes committed since the last sync, including other processes'
+        
+        Args:
+            limit (int): Maximum number of changes applied per batch
+        
+        Returns:
+            Optional[List[str]]: IDs of prompts that may have changed, or None if
+                the feed was pruned past this replica and it was reloaded
+        """
+        with self._sync_lock:
+            changed: Dict[str, None] = {}
+            while True:
+                changes = self.backing.read_changes(self._seq, limit)
+                if not changes:
+                    break
+                if changes[0][0] > self._seq + 1 and self.backing.change_range()[0] > self._seq + 1:
+                    logger.warning("Change feed was pruned past this replica, reloading")
+                    self._load()
+                    return None
+                
+                for seq, kind, item_id, op in changes:
+                    if kind == "prompt":
+                        self._refresh_prompt(item_id)
+                        changed[item_id] = None
+                    else:
+                        self._refresh_category(item_id)
+                self._seq = changes[-1][0]
+            
+            if self._seq - self._pruned_at >= max(1, self.retention // 10):
+                self.backing.prune_changes(self._seq - self.retention)
+                self._pruned_at = self._seq
+            return list(changed)
+    
+    def _refresh_prompt(self, prompt_id: str) -> None:
+        """Replace the local copy of a prompt with its committed state"""
+        # Local writes happen under the same lock and only after their commit,
+        # so the committed state is never older than the local copy
+        with self._prompt_locks.lock(prompt_id):
+            prompt = self.backing.get_prompt(prompt_id)
+            if prompt is None:
+                self._drop_prompt(prompt_id)
+            elif prompt != self.prompts.get(prompt_id):
+                self._replace_prompt(prompt)
+    
+    def _refresh_category(self, category_id: str) -> None:
+        """Replace the local copy of a category with its committed state"""
+        with self._lock:
+            category = self.backing.get_category(category_id)
+            if category is None:
+                self.categories.pop(category_id, None)
+            else:
+                self.categories[category_id] = category
+            self.generation += 1
+
+def create_store(config: Dict[str, Any], directory: str) -> PromptStore:
+    """
+    Create the store selected by the extension configuration
+    
+    Args:
+        config (Dict[str, Any]): Extension configuration
+        directory (str): Storage directory
+    
+    Returns:
+        PromptStore: Unopened store instance
+    """
+    backend = config.get("storageBackend", "log")
+    compress_min_bytes = int(config.get("compressContentBytes", 0))
+    
+    if config.get("changeFeed", False) and backend != "sqlite":
+        logger.warning("The change feed requires the 'sqlite' storage backend; ignoring it")
+    
+    if backend == "sqlite":
+        path = os.path.join(directory, config.get("sqlitePath", "prompts.db"))
+        if config.get("changeFeed", False):
+            return ReplicaPromptStore(
+                SQLitePromptStore(path, change_feed=True),
+                retention=config.get("changeFeedRetention", 100000),
+                compress_min_bytes=compress_min_bytes
+            )
+        return SQLitePromptStore(path)
+    
+    if backend == "memory":
+        return MemoryPromptStore(compress_min_bytes)
+    
+    if backend != "log":
+        logger.warning(f"Unknown storage backend '{backend}', using 'log'")
+    
+    return LogPromptStore(PromptLog(
+        directory,
+        fsync_batch=config.get("fsyncBatchSize", 32),
+        fsync_interval=config.get("fsyncIntervalMs", 1000) / 1000.0,
+        compact_threshold=config.get("compactThreshold", 10000)
+    ), compress_min_bytes)
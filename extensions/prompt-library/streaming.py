@@ -0,0 +1,297 @@
+"""
+Streaming NDJSON export and import for the Prompt Library extension
+
+Each line is one record: {"type": "category" | "prompt", "data": {...}}.
+Exports are produced lazily from the store and imports are parsed, validated
+and applied in bounded batches, so memory use does not grow with file size.
+Batch rendering reads rows of variable values in the same way.
+"""
+
+import json
+import time
+import zlib
+import logging
+from typing import Dict, List, Optional, Any, Iterator, Tuple
+
+from .validation import validate_prompt, validate_category
+from .dedupe import ImportDiff
+from .templating import MissingVariables
+
+# Setup logging
+logger = logging.getLogger("prompt_library.streaming")
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+def iter_export(extension: Any, compress: bool = False, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    """
+    Lazily encode the library as NDJSON
+    
+    Args:
+        extension (Any): PromptLibraryExtension to export
+        compress (bool): gzip the output
+        chunk_size (int): Approximate size of yielded chunks before compression
+    
+    Returns:
+        Iterator[bytes]: Encoded chunks
+    """
+    compressor = zlib.compressobj(wbits=31) if compress else None
+    buffer: List[bytes] = []
+    buffered = 0
+    exported = 0
+    start = time.perf_counter()
+    
+    def records() -> Iterator[Tuple[str, Dict[str, Any]]]:
+        for category in extension.get_categories():
+            yield "category", category
+        for prompt in extension.iter_prompts():
+            yield "prompt", prompt
+    
+    for record_type, data in records():
+        line = json.dumps({"type": record_type, "data": data}, separators=(",", ":")).encode("utf-8") + b"\n"
+        exported += 1
+        buffer.append(line)
+        buffered += len(line)
+        if buffered >= chunk_size:
+            chunk = b"".join(buffer)
+            buffer, buffered = [], 0
+            chunk = compressor.compress(chunk) if compressor else chunk
+            if chunk:
+                yield chunk
+    
+    chunk = b"".join(buffer)
+    if compressor:
+        chunk = compressor.compress(chunk) + compressor.flush()
+    if chunk:
+        yield chunk
+    
+    # Includes the time the consumer took between chunks
+    extension.metrics.operations.observe(time.perf_counter() - start, "export")
+    extension.metrics.operation_items.inc(exported, "export")
+
+class NDJSONReader:
+    """Incremental NDJSON parser over (optionally gzipped) body chunks"""
+    
+    def __init__(self, max_line_bytes: int = 1024 * 1024):
+        """
+        Initialize the reader
+        
+        Args:
+            max_line_bytes (int): Longest accepted line
+        """
+        self.max_line_bytes = max_line_bytes
+        self._decompressor = None
+        self._started = False
+        self._pending = b""
+        self._skipping = False
+        self.line_number = 0
+    
+    def _lines(self, chunk: bytes) -> Iterator[bytes]:
+        """Decompress a chunk and yield the complete lines it ends"""
+        if not self._started:
+            self._started = True
+            if chunk.startswith(GZIP_MAGIC):
+                self._decompressor = zlib.decompressobj(wbits=31)
+        
+        if self._decompressor is not None:
+            chunk = self._decompressor.decompress(chunk)
+        
+        data = self._pending + chunk
+        lines = data.split(b"\n")
+        self._pending = lines.pop()
+        yield from lines
+        
+        if len(self._pending) > self.max_line_bytes:
+            # Drop the oversized line instead of buffering it
+            self._pending = b""
+            self._skipping = True
+    
+    def _remaining(self) -> Iterator[bytes]:
+        """Yield the final unterminated line, if any"""
+        if self._decompressor is not None:
+            self._pending += self._decompressor.flush()
+        if self._pending:
+            line, self._pending = self._pending, b""
+            yield line
+    
+    def _parse(self, line: bytes) -> Optional[Any]:
+        """
+        Parse one line
+        
+        Returns:
+            Optional[Any]: The decoded JSON value, or None for a blank line
+        
+        Raises:
+            ValueError: If the line is oversized or not valid JSON
+        """
+        self.line_number += 1
+        if self._skipping:
+            self._skipping = False
+            raise ValueError(f"line exceeds {self.max_line_bytes} bytes")
+        if not line.strip():
+            return None
+        return json.loads(line)
+
+class StreamingImporter(NDJSONReader):
+    """Incremental NDJSON importer that applies records in bounded batches"""
+    
+    def __init__(
+        self,
+        extension: Any,
+        batch_size: int = 500,
+        max_line_bytes: int = 1024 * 1024,
+        max_errors: int = 100,
+        dry_run: bool = False,
+        skip_duplicates: bool = False
+    ):
+        """
+        Initialize the importer
+        
+        Args:
+            extension (Any): PromptLibraryExtension to import into
+            batch_size (int): Number of records applied per batch
+            max_line_bytes (int): Longest accepted line
+            max_errors (int): Number of error details kept for the report
+            dry_run (bool): Only report what the import would do
+            skip_duplicates (bool): Skip near-duplicates of other prompts
+        """
+        super().__init__(max_line_bytes)
+        self.extension = extension
+        self.batch_size = batch_size
+        self.max_errors = max_errors
+        
+        # Skips unchanged records and near-duplicates as the batches go by
+        self.diff = ImportDiff(extension, dry_run=dry_run, skip_duplicates=skip_duplicates)
+        
+        self._batch: List[Tuple[str, Dict[str, Any]]] = []
+        self.counts = {"categories": 0, "prompts": 0}
+        self.error_count = 0
+        self.errors: List[Dict[str, Any]] = []
+    
+    def feed(self, chunk: bytes) -> None:
+        """
+        Consume the next chunk of the request body
+        
+        Args:
+            chunk (bytes): Raw (optionally gzipped) bytes
+        """
+        for line in self._lines(chunk):
+            self._line(line)
+    
+    def finish(self) -> Dict[str, Any]:
+        """
+        Apply the remaining records and build the report
+        
+        Returns:
+            Dict[str, Any]: Imported counts, the ImportDiff summary as "diff",
+                and per-line errors
+        """
+        for line in self._remaining():
+            self._line(line)
+        self._flush()
+        
+        return {
+            "categories": self.counts["categories"],
+            "prompts": self.counts["prompts"],
+            "diff": self.diff.summary(),
+            "error_count": self.error_count,
+            "errors": self.errors
+        }
+    
+    def _error(self, message: str) -> None:
+        """Record an error for the current line"""
+        self.error_count += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"line": self.line_number, "error": message})
+    
+    def _line(self, line: bytes) -> None:
+        """Parse, validate and queue a single line"""
+        try:
+            record = self._parse(line)
+            if record is None:
+                return
+            if not isinstance(record, dict):
+                raise ValueError("record must be an object")
+            record_type = record.get("type")
+            if record_type == "prompt":
+                data = validate_prompt(record.get("data"))
+            elif record_type == "category":
+                data = validate_category(record.get("data"))
+            else:
+                raise ValueError(f"unknown record type: {record_type}")
+        except ValueError as e:
+            self._error(str(e))
+            return
+        
+        self._batch.append((record_type, data))
+        if len(self._batch) >= self.batch_size:
+            self._flush()
+    
+    def _flush(self) -> None:
+        """Apply the queued batch"""
+        if not self._batch:
+            return
+        batch, self._batch = self._batch, []
+        applied = self.extension.import_records(batch, self.diff)
+        self.counts["categories"] += applied["categories"]
+        self.counts["prompts"] += applied["prompts"]
+
+class BatchRenderer(NDJSONReader):
+    """Renders one compiled template for each NDJSON line of variable values"""
+    
+    def __init__(self, item_id: str, compiled: Any, strict: bool = True, max_line_bytes: int = 1024 * 1024):
+        """
+        Initialize the renderer
+        
+        Args:
+            item_id (str): Prompt or template ID, echoed in each result
+            compiled (Any): CompiledTemplate to fill
+            strict (bool): Report rows missing required variables as errors
+                instead of leaving their placeholders in place
+            max_line_bytes (int): Longest accepted line
+        """
+        super().__init__(max_line_bytes)
+        self.item_id = item_id
+        self.compiled = compiled
+        self.strict = strict
+        self.rendered = 0
+        self.error_count = 0
+        self._encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+    
+    def feed(self, chunk: bytes) -> bytes:
+        """
+        Render the rows completed by the next chunk of the request body
+        
+        Args:
+            chunk (bytes): Raw (optionally gzipped) bytes
+        
+        Returns:
+            bytes: NDJSON results for the completed rows
+        """
+        return b"".join(self._row(line) for line in self._lines(chunk))
+    
+    def finish(self) -> bytes:
+        """
+        Render the final row, if the body did not end with a newline
+        
+        Returns:
+            bytes: NDJSON results for the remaining row
+        """
+        return b"".join(self._row(line) for line in self._remaining())
+    
+    def _row(self, line: bytes) -> bytes:
+        """Render one row into an encoded result line"""
+        try:
+            values = self._parse(line)
+            if values is None:
+                return b""
+            if not isinstance(values, dict):
+                raise ValueError("row must be an object of variable values")
+            result = {"line": self.line_number, "id": self.item_id, "content": self.compiled.render(values, self.strict)}
+            self.rendered += 1
+        except MissingVariables as e:
+            result = {"line": self.line_number, "id": self.item_id, "error": str(e), "missing": e.names}
+            self.error_count += 1
+        except ValueError as e:
+            result = {"line": self.line_number, "id": self.item_id, "error": str(e)}
+            self.error_count += 1
+        return (self._encoder.encode(result) + "\n").encode("utf-8")
@@ -0,0 +1,253 @@
+"""
+Tag index and facet counts for the Prompt Library extension
+
+The index maps every tag and category to the IDs of its prompts and keeps
+per-category tag counts, updated in place on every mutation. Multi-tag
+filters intersect or union the tag buckets, and facet counts are read from
+bucket sizes, so neither touches prompts that do not match.
+"""
+
+import heapq
+import threading
+from collections.abc import Mapping
+from typing import Dict, List, Optional, Any, Collection, Tuple
+
+MATCH_MODES = ("all", "any")
+
+class TagIndex:
+    """Index of prompt IDs by tag and category"""
+    
+    def __init__(self):
+        # Searches and updates may come from different worker threads
+        self._lock = threading.RLock()
+        self._reset()
+    
+    def _reset(self) -> None:
+        """Drop all indexed prompts"""
+        self._by_tag: Dict[str, Dict[str, None]] = {}
+        self._by_category: Dict[str, Dict[str, None]] = {}
+        # category -> {tag: number of the category's prompts with the tag}
+        self._category_tags: Dict[str, Dict[str, int]] = {}
+        # prompt ID -> (category, tags), kept for removal
+        self._prompts: Dict[str, Tuple[str, Tuple[str, ...]]] = {}
+        # prompt ID -> position in the order prompts were first indexed
+        self._order: Dict[str, int] = {}
+        self._next_order = 0
+    
+    def __len__(self) -> int:
+        return len(self._prompts)
+    
+    def count_tags(self) -> int:
+        """Get the number of distinct tags in use"""
+        return len(self._by_tag)
+    
+    def in_category(self, prompt_id: str, category: str) -> bool:
+        """
+        Check a prompt's category without reading it from the store
+        
+        Args:
+            prompt_id (str): Prompt ID
+            category (str): Category ID
+        
+        Returns:
+            bool: True if the prompt is indexed under the category; False for
+                prompts deleted in the meantime
+        """
+        with self._lock:
+            return prompt_id in self._by_category.get(category, ())
+    
+    def add(self, prompt: Mapping) -> None:
+        """
+        Index a prompt, replacing any previous version
+        
+        Args:
+            prompt (Mapping): Prompt dictionary or stored record
+        """
+        prompt_id = prompt["id"]
+        entry = (prompt.get("category"), tuple(dict.fromkeys(prompt.get("tags") or ())))
+        with self._lock:
+            if self._prompts.get(prompt_id) == entry:
+                return
+            # A re-indexed prompt keeps its place in the order
+            self._unindex(prompt_id)
+            if prompt_id not in self._order:
+                self._order[prompt_id] = self._next_order
+                self._next_order += 1
+            
+            category, tags = entry
+            self._prompts[prompt_id] = entry
+            self._by_category.setdefault(category, {})[prompt_id] = None
+            counts = self._category_tags.setdefault(category, {})
+            for tag in tags:
+                self._by_tag.setdefault(tag, {})[prompt_id] = None
+                counts[tag] = counts.get(tag, 0) + 1
+    
+    def remove(self, prompt_id: str) -> bool:
+        """
+        Remove a prompt from the index
+        
+        Args:
+            prompt_id (str): Prompt ID
+        
+        Returns:
+            bool: True if the prompt was indexed
+        """
+        with self._lock:
+            self._order.pop(prompt_id, None)
+            return self._unindex(prompt_id)
+    
+    def _unindex(self, prompt_id: str) -> bool:
+        """Remove a prompt from the buckets; the caller holds the lock"""
+        entry = self._prompts.pop(prompt_id, None)
+        if entry is None:
+            return False
+        
+        category, tags = entry
+        self._discard(self._by_category, category, prompt_id)
+        counts = self._category_tags[category]
+        for tag in tags:
+            self._discard(self._by_tag, tag, prompt_id)
+            counts[tag] -= 1
+            if not counts[tag]:
+                del counts[tag]
+        if not counts:
+            del self._category_tags[category]
+        return True
+    
+    @staticmethod
+    def _discard(buckets: Dict[str, Dict[str, None]], key: str, prompt_id: str) -> None:
+        """Remove an ID from a bucket, dropping the bucket once it is empty"""
+        bucket = buckets[key]
+        del bucket[prompt_id]
+        if not bucket:
+            del buckets[key]
+    
+    def rebuild(self, prompts: List[Mapping]) -> None:
+        """
+        Replace the index contents with the given prompts
+        
+        Args:
+            prompts (List[Mapping]): All prompts, in listing order
+        """
+        with self._lock:
+            self._reset()
+            for prompt in prompts:
+                self.add(prompt)
+    
+    def _match(self, tags: List[str], match: str, category: Optional[str]) -> Collection[str]:
+        """Get the IDs matching a filter, unordered; the caller holds the lock"""
+        if match not in MATCH_MODES:
+            raise ValueError(f"Invalid tag match mode: {match}")
+        
+        if match == "any":
+            ids: Dict[str, None] = {}
+            for tag in tags:
+                ids.update(self._by_tag.get(tag, {}))
+            if category is None:
+                return ids
+            in_category = self._by_category.get(category, {})
+            return [prompt_id for prompt_id in ids if prompt_id in in_category]
+        
+        # Walk the smallest bucket and probe the others
+        buckets = [self._by_tag.get(tag, {}) for tag in tags]
+        if category is not None:
+            buckets.append(self._by_category.get(category, {}))
+        buckets.sort(key=len)
+        smallest, others = buckets[0], buckets[1:]
+        return [prompt_id for prompt_id in smallest if all(prompt_id in bucket for bucket in others)]
+    
+    def select(self, tags: List[str], match: str = "all", category: Optional[str] = None) -> List[str]:
+        """
+        Get the prompts carrying the given tags
+        
+        Args:
+            tags (List[str]): Tags to filter by; at least one
+            match (str): "all" for prompts with every tag, "any" for prompts
+                with at least one of them
+            category (Optional[str]): Category ID to filter by
+        
+        Returns:
+            List[str]: Matching prompt IDs in the order they were first indexed
+        
+        Raises:
+            ValueError: If match is not "all" or "any"
+        """
+        with self._lock:
+            ids = self._match(tags, match, category)
+            return sorted(ids, key=self._order.__getitem__)
+    
+    def tag_counts(self, category: Optional[str] = None, prefix: Optional[str] = None, limit: Optional[int] = None) -> List[Tuple[str, int]]:
+        """
+        Count the prompts per tag
+        
+        Args:
+            category (Optional[str]): Only count prompts in this category
+            prefix (Optional[str]): Only include tags starting with it
+            limit (Optional[int]): Maximum number of tags
+        
+        Returns:
+            List[Tuple[str, int]]: (tag, prompt count) pairs, most used first
+                and then by tag
+        """
+        with self._lock:
+            if category is not None:
+                counts = list(self._category_tags.get(category, {}).items())
+            else:
+                counts = [(tag, len(bucket)) for tag, bucket in self._by_tag.items()]
+        if prefix:
+            counts = [(tag, count) for tag, count in counts if tag.startswith(prefix)]
+        
+        key = lambda item: (-item[1], item[0])
+        if limit is not None and limit < len(counts):
+            return heapq.nsmallest(limit, counts, key=key)
+        return sorted(counts, key=key)
+    
+    def facets(self, tags: Optional[List[str]] = None, match: str = "all", category: Optional[str] = None, limit: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Count the prompts matching a filter per category and per tag
+        
+        Without tags the counts are bucket sizes. With tags only the matching
+        prompts are counted.
+        
+        Args:
+            tags (Optional[List[str]]): Tags to filter by
+            match (str): "all" or "any", as for select()
+            category (Optional[str]): Category ID to filter by
+            limit (Optional[int]): Maximum number of tags to count
+        
+        Returns:
+            Dict[str, Any]: "total" matching prompts, and "categories" and
+                "tags" mapping each to its number of matching prompts, most
+                used first
+        
+        Raises:
+            ValueError: If match is not "all" or "any"
+        """
+        if not tags:
+            with self._lock:
+                if category is not None:
+                    total = len(self._by_category.get(category, {}))
+                    categories = [(category, total)] if total else []
+                else:
+                    total = len(self._prompts)
+                    categories = [(name, len(bucket)) for name, bucket in self._by_category.items()]
+            tag_counts = self.tag_counts(category, limit=limit)
+        else:
+            category_counts: Dict[str, int] = {}
+            counts: Dict[str, int] = {}
+            with self._lock:
+                ids = self._match(tags, match, category)
+                for prompt_id in ids:
+                    prompt_category, prompt_tags = self._prompts[prompt_id]
+                    category_counts[prompt_category] = category_counts.get(prompt_category, 0) + 1
+                    for tag in prompt_tags:
+                        counts[tag] = counts.get(tag, 0) + 1
+            total = len(ids)
+            categories = list(category_counts.items())
+            tag_counts = sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:limit]
+        
+        return {
+            "total": total,
+            "categories": dict(sorted(categories, key=lambda item: (-item[1], item[0]))),
+            "tags": dict(tag_counts)
+        }
@@ -0,0 +1,246 @@
+"""
+Template registry for the Prompt Library extension
+
+Templates live in static/templates, one JSON list per category file. At
+startup only the files' metadata is indexed. A category's templates are read
+the first time they are needed and kept in an LRU of resident categories.
+The directory is re-listed and each file's mtime and size re-checked at most
+every check_interval seconds, so edited, added and removed files are picked
+up without a restart.
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Any, Tuple
+
+# Setup logging
+logger = logging.getLogger("prompt_library.templates")
+
+class TemplateFile:
+    """Metadata and (when resident) contents of one category file"""
+    
+    __slots__ = ("category", "path", "signature", "templates", "by_id", "ids")
+    
+    def __init__(self, category: str, path: str, signature: Tuple[float, int]):
+        self.category = category
+        self.path = path
+        self.signature = signature
+        self.templates: Optional[List[Dict[str, Any]]] = None
+        self.by_id: Optional[Dict[str, Dict[str, Any]]] = None
+        # IDs the file held when last read; kept after eviction for the index
+        self.ids: Optional[List[str]] = None
+
+class TemplateRegistry:
+    """Lazily loaded, ID-indexed and hot-reloaded templates"""
+    
+    def __init__(self, directory: str, max_resident: int = 64, check_interval: float = 1.0):
+        """
+        Initialize the registry
+        
+        Args:
+            directory (str): Directory of <category>.json template files
+            max_resident (int): Number of categories kept in memory
+            check_interval (float): Seconds between checks for changed files
+        """
+        self.directory = directory
+        self.max_resident = max(1, max_resident)
+        self.check_interval = check_interval
+        
+        self._lock = threading.RLock()
+        self._files: Dict[str, TemplateFile] = {}
+        self._resident: "OrderedDict[str, TemplateFile]" = OrderedDict()
+        self._index: Dict[str, str] = {}
+        self._scanned_at = 0.0
+        self._generation = 0
+    
+    def scan(self) -> None:
+        """Index the template files' metadata, dropping removed files"""
+        with self._lock:
+            self._scanned_at = time.monotonic()
+            try:
+                filenames = [name for name in os.listdir(self.directory) if name.endswith(".json")]
+            except FileNotFoundError:
+                logger.warning(f"Templates directory not found: {self.directory}")
+                filenames = []
+            
+            found = {}
+            for filename in filenames:
+                path = os.path.join(self.directory, filename)
+                signature = self._signature(path)
+                if signature is not None:
+                    found[filename[:-len(".json")]] = (path, signature)
+            
+            for category in list(self._files):
+                if category not in found:
+                    self._drop(category)
+            
+            for category, (path, signature) in found.items():
+                entry = self._files.get(category)
+                if entry is None:
+                    self._files[category] = TemplateFile(category, path, signature)
+                    self._generation += 1
+                elif entry.signature != signature:
+                    self._changed(entry, signature)
+            
+            logger.debug(f"Indexed {len(self._files)} template files")
+    
+    def categories(self) -> List[str]:
+        """
+        Get the template categories
+        
+        Returns:
+            List[str]: Category names
+        """
+        with self._lock:
+            self._maybe_rescan()
+            return sorted(self._files)
+    
+    def get_category(self, category: str) -> List[Dict[str, Any]]:
+        """
+        Get a category's templates, reading its file if needed
+        
+        Args:
+            category (str): Category name
+        
+        Returns:
+            List[Dict[str, Any]]: Templates, or an empty list for an unknown category
+        """
+        with self._lock:
+            self._maybe_rescan()
+            entry = self._files.get(category)
+            if entry is None:
+                return []
+            return self._load(entry)
+    
+    def get_all(self) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Get every category's templates
+        
+        Returns:
+            Dict[str, List[Dict[str, Any]]]: Templates by category
+        """
+        with self._lock:
+            return {category: self.get_category(category) for category in self.categories()}
+    
+    def get(self, template_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a template by ID
+        
+        IDs are indexed as their files are read. An unindexed ID only causes
+        reads of files that have never been read, so each file is read at most
+        once per change to find it.
+        
+        Args:
+            template_id (str): Template ID
+        
+        Returns:
+            Optional[Dict[str, Any]]: Template dictionary or None if not found
+        """
+        with self._lock:
+            self._maybe_rescan()
+            category = self._index.get(template_id)
+            if category is not None:
+                template = self._find(self._files[category], template_id)
+                if template is not None:
+                    return template
+            
+            for entry in list(self._files.values()):
+                if entry.ids is None:
+                    template = self._find(entry, template_id)
+                    if template is not None:
+                        return template
+            return None
+    
+    @property
+    def generation(self) -> int:
+        """Counter increased whenever a template file is added, changed or removed"""
+        with self._lock:
+            self._maybe_rescan()
+            return self._generation
+    
+    def stats(self) -> Dict[str, int]:
+        """
+        Get the number of indexed files, resident categories and indexed IDs
+        
+        Returns:
+            Dict[str, int]: Registry counters
+        """
+        with self._lock:
+            return {"files": len(self._files), "resident": len(self._resident), "indexed_ids": len(self._index)}
+    
+    def _find(self, entry: TemplateFile, template_id: str) -> Optional[Dict[str, Any]]:
+        """Look for a template in one category"""
+        self._load(entry)
+        return entry.by_id.get(template_id)
+    
+    def _load(self, entry: TemplateFile) -> List[Dict[str, Any]]:
+        """Get a file's templates, re-reading it if it changed"""
+        if entry.templates is None:
+            entry.templates = self._read(entry)
+            self._unindex(entry)
+            entry.by_id = {template["id"]: template for template in entry.templates if "id" in template}
+            entry.ids = list(entry.by_id)
+            for template_id in entry.ids:
+                self._index[template_id] = entry.category
+            logger.info(f"Loaded {len(entry.templates)} templates from {entry.category}")
+        
+        self._resident[entry.category] = entry
+        self._resident.move_to_end(entry.category)
+        while len(self._resident) > self.max_resident:
+            _, evicted = self._resident.popitem(last=False)
+            evicted.templates = evicted.by_id = None
+        return entry.templates
+    
+    def _read(self, entry: TemplateFile) -> List[Dict[str, Any]]:
+        """Parse a template file"""
+        try:
+            with open(entry.path, "r") as f:
+                templates = json.load(f)
+            if not isinstance(templates, list):
+                raise ValueError("expected a list of templates")
+            return [template for template in templates if isinstance(template, dict)]
+        except (OSError, ValueError) as e:
+            logger.error(f"Error loading templates from {entry.path}: {e}")
+            return []
+    
+    def _changed(self, entry: TemplateFile, signature: Tuple[float, int]) -> None:
+        """Forget a file's contents so they are read again"""
+        logger.info(f"Template file changed: {entry.path}")
+        entry.signature = signature
+        entry.templates = entry.by_id = None
+        self._resident.pop(entry.category, None)
+        self._unindex(entry)
+        self._generation += 1
+    
+    def _drop(self, category: str) -> None:
+        """Forget a removed file"""
+        entry = self._files.pop(category, None)
+        if entry is not None:
+            self._resident.pop(category, None)
+            self._unindex(entry)
+            self._generation += 1
+    
+    def _unindex(self, entry: TemplateFile) -> None:
+        """Remove a file's IDs from the index"""
+        for template_id in entry.ids or []:
+            if self._index.get(template_id) == entry.category:
+                del self._index[template_id]
+        entry.ids = None
+    
+    def _maybe_rescan(self) -> None:
+        """Re-list the directory if check_interval has passed"""
+        if time.monotonic() - self._scanned_at >= self.check_interval:
+            self.scan()
+    
+    @staticmethod
+    def _signature(path: str) -> Optional[Tuple[float, int]]:
+        """Get a file's mtime and size, or None if it is gone"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (stat.st_mtime, stat.st_size)
@@ -0,0 +1,172 @@
+"""
+Template rendering for the Prompt Library extension
+
+Prompt and template content may contain [variable] placeholders, optionally
+described by "variables" metadata ({"name", "description", "default"}).
+Content is compiled once into a list of literal and slot parts, and
+rendering fills the slots and joins the list.
+"""
+
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Any, Hashable, Mapping
+
+PLACEHOLDER_PATTERN = re.compile(r"\[([A-Za-z_]\w*)\]")
+
+class MissingVariables(ValueError):
+    """Raised when required variables are not supplied"""
+    
+    def __init__(self, names: List[str]):
+        super().__init__(f"Missing variables: {', '.join(names)}")
+        self.names = names
+
+class CompiledTemplate:
+    """Content split into literal parts and variable slots"""
+    
+    __slots__ = ("source", "metadata", "_parts", "_slots", "names", "defaults", "required")
+    
+    def __init__(self, source: str, variables: Optional[List[Dict[str, Any]]] = None):
+        """
+        Compile content
+        
+        Args:
+            source (str): Content with [variable] placeholders
+            variables (Optional[List[Dict[str, Any]]]): Variable metadata
+        """
+        self.source = source
+        self.metadata = variables or []
+        
+        # re.split with one group alternates literal, name, literal, ...
+        self._parts = PLACEHOLDER_PATTERN.split(source)
+        self._slots = [(index, self._parts[index]) for index in range(1, len(self._parts), 2)]
+        
+        self.names = list(dict.fromkeys(name for _, name in self._slots))
+        self.defaults = {
+            variable["name"]: str(variable["default"])
+            for variable in self.metadata
+            if isinstance(variable, dict) and variable.get("default") is not None and "name" in variable
+        }
+        self.required = [name for name in self.names if name not in self.defaults]
+    
+    def describe(self) -> List[Dict[str, Any]]:
+        """
+        Describe the variables used in the content
+        
+        Returns:
+            List[Dict[str, Any]]: Name, description, default and required flag per variable
+        """
+        descriptions = {
+            variable["name"]: variable.get("description", "")
+            for variable in self.metadata
+            if isinstance(variable, dict) and "name" in variable
+        }
+        return [
+            {
+                "name": name,
+                "description": descriptions.get(name, ""),
+                "default": self.defaults.get(name),
+                "required": name not in self.defaults
+            }
+            for name in self.names
+        ]
+    
+    def render(self, values: Mapping[str, Any], strict: bool = True) -> str:
+        """
+        Fill the placeholders
+        
+        Args:
+            values (Mapping[str, Any]): Variable values
+            strict (bool): Raise for missing required variables instead of
+                leaving their placeholders in place
+        
+        Returns:
+            str: Rendered content
+        
+        Raises:
+            MissingVariables: In strict mode, if required variables are missing
+        """
+        if strict:
+            missing = [name for name in self.required if values.get(name) is None]
+            if missing:
+                raise MissingVariables(missing)
+        
+        parts = self._parts.copy()
+        defaults = self.defaults
+        for index, name in self._slots:
+            value = values.get(name)
+            if value is None:
+                value = defaults.get(name)
+            parts[index] = f"[{name}]" if value is None else str(value)
+        return "".join(parts)
+
+class TemplateCache:
+    """Thread-safe LRU cache of compiled templates"""
+    
+    def __init__(self, max_entries: int = 10000):
+        """
+        Initialize the cache
+        
+        Args:
+            max_entries (int): Number of compiled templates kept
+        """
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key: Hashable, item: Mapping) -> CompiledTemplate:
+        """
+        Get the compiled form of a prompt or template
+        
+        Args:
+            key (Hashable): Cache key, e.g. ("prompt", prompt ID)
+            item (Mapping): Item with "content" and optional "variables"
+        
+        Returns:
+            CompiledTemplate: Compiled content
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            # Stored items are replaced rather than modified, so the same
+            # object means the same content
+            if entry is not None and entry[0] is item:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+        
+        source = item.get("content") or ""
+        variables = item.get("variables") or []
+        
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                cached_item, compiled = entry
+                if compiled.source == source and compiled.metadata == variables:
+                    self._entries[key] = (item, compiled)
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return compiled
+        
+        compiled = CompiledTemplate(source, variables)
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = (item, compiled)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return compiled
+    
+    def invalidate(self, key: Hashable) -> None:
+        """Drop the compiled form of an item"""
+        with self._lock:
+            self._entries.pop(key, None)
+    
+    def clear(self) -> None:
+        """Drop all compiled templates"""
+        with self._lock:
+            self._entries.clear()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,89 @@
+"""
+Shared fixtures for the Prompt Library tests
+
+The extension directory name is not a valid Python identifier, so the
+package is loaded from its path under the name "prompt_library", as the
+benchmarks do, and pytest collects the directory as a plain directory instead
+of importing its __init__.py on its own.
+"""
+
+import os
+import sys
+import importlib
+import importlib.util
+from typing import Any, Callable, Dict, Optional
+
+import pytest
+
+EXTENSION_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE_NAME = "prompt_library"
+API_PREFIX = "/api/extensions/prompt-library"
+
+def load_package() -> Any:
+    """Import the extension package"""
+    if PACKAGE_NAME in sys.modules:
+        return sys.modules[PACKAGE_NAME]
+    spec = importlib.util.spec_from_file_location(
+        PACKAGE_NAME,
+        os.path.join(EXTENSION_DIR, "__init__.py"),
+        submodule_search_locations=[EXTENSION_DIR]
+    )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[PACKAGE_NAME] = module
+    spec.loader.exec_module(module)
+    return module
+
+class ExtensionDirectory:
+    """Plugin collecting the extension directory without importing it"""
+    
+    @pytest.hookimpl(tryfirst=True)
+    def pytest_collect_directory(self, path: Any, parent: Any) -> Optional[Any]:
+        if str(path) == EXTENSION_DIR:
+            return pytest.Dir.from_parent(parent, path=path)
+        return None
+
+def pytest_configure(config: Any) -> None:
+    # A conftest's own hooks only apply below its directory, and the
+    # extension directory is collected before this one, so register a plugin
+    config.pluginmanager.register(ExtensionDirectory(), "prompt-library-directory")
+
+@pytest.fixture
+def package() -> Any:
+    """The prompt_library package"""
+    return load_package()
+
+@pytest.fixture
+def make_extension(package: Any, tmp_path: Any) -> Callable[..., Any]:
+    """Create initialized extensions in a temporary storage directory, shut down after the test"""
+    extensions = []
+    
+    def make(config: Optional[Dict[str, Any]] = None, storage_dir: Optional[str] = None) -> Any:
+        extension = package.PromptLibraryExtension()
+        extension.config["storageDir"] = storage_dir or str(tmp_path / "storage")
+        extension.config.update(config or {})
+        extension.initialize()
+        extension.wait_until_ready()
+        extensions.append(extension)
+        return extension
+    
+    yield make
+    for extension in extensions:
+        extension.shutdown()
+
+@pytest.fixture
+def make_client(package: Any, make_extension: Callable[..., Any]) -> Callable[..., Any]:
+    """Create a test client for the API of a fresh extension"""
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    
+    api = importlib.import_module(f"{PACKAGE_NAME}.api")
+    
+    def make(config: Optional[Dict[str, Any]] = None) -> Any:
+        extension = make_extension(config)
+        package._extension_instance = extension
+        app = FastAPI()
+        api.register_routes(app)
+        return TestClient(app)
+    
+    yield make
+    package._extension_instance = None
@@ -0,0 +1,33 @@
+"""Prompt create and update validation"""
+
+from conftest import API_PREFIX
+
+PROMPT = {"title": "Review", "content": "Review [code]", "description": "", "category": "general", "tags": []}
+
+def test_invalid_create_returns_400(make_client):
+    client = make_client({"storageBackend": "memory"})
+    response = client.post(f"{API_PREFIX}/prompts", json=dict(PROMPT, variables=[{"default": "x"}]))
+    assert response.status_code == 400
+    assert "variables" in response.json()["detail"]
+
+def test_invalid_update_returns_400(make_client):
+    client = make_client({"storageBackend": "memory"})
+    prompt_id = client.post(f"{API_PREFIX}/prompts", json=PROMPT).json()["id"]
+    
+    response = client.put(f"{API_PREFIX}/prompts/{prompt_id}", json=dict(PROMPT, variables=[{"default": "x"}]))
+    assert response.status_code == 400
+    assert client.get(f"{API_PREFIX}/prompts/{prompt_id}").json()["variables"] == []
+
+def test_only_normalized_fields_are_stored(make_extension):
+    extension = make_extension({"storageBackend": "memory"})
+    prompt_id = extension.add_prompt(dict(PROMPT, junk={"x": 1}))
+    assert "junk" not in extension.get_prompt(prompt_id)
+    
+    extension.update_prompt(prompt_id, dict(PROMPT, junk={"x": 2}))
+    assert "junk" not in extension.get_prompt(prompt_id)
+    
+    extension.apply_operations([{"op": "create", "id": "bulk-a", "prompt": dict(PROMPT, junk={"x": 3})}])
+    assert "junk" not in extension.get_prompt("bulk-a")
+    
+    extension.import_prompts({"categories": {}, "prompts": {"imported": dict(PROMPT, title="Imported", junk={"x": 4})}})
+    assert "junk" not in extension.get_prompt("imported")
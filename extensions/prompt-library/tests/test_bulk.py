@@ -0,0 +1,89 @@
+"""All-or-nothing bulk prompt operations"""
+
+import pytest
+
+from conftest import API_PREFIX
+
+BACKENDS = ["memory", "log", "sqlite"]
+
+def prompt(title):
+    return {"title": title, "content": f"{title} [text]", "description": "", "category": "general", "tags": []}
+
+def titles(client):
+    return sorted(item["title"] for item in client.get(f"{API_PREFIX}/prompts").json())
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_batch_applies_in_order(make_client, backend):
+    client = make_client({"storageBackend": backend})
+    before = titles(client)
+    
+    response = client.post(f"{API_PREFIX}/prompts/bulk", json={"operations": [
+        {"op": "create", "id": "bulk-a", "prompt": prompt("Bulk A")},
+        {"op": "update", "id": "bulk-a", "prompt": prompt("Bulk A2")},
+        {"op": "create", "id": "bulk-b", "prompt": prompt("Bulk B")},
+        {"op": "delete", "id": "bulk-b"}
+    ]})
+    assert response.status_code == 200
+    assert response.json()["applied"]
+    assert [result["status"] for result in response.json()["results"]] == [201, 200, 201, 200]
+    assert titles(client) == sorted(before + ["Bulk A2"])
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_conflict_applies_nothing(make_client, backend):
+    client = make_client({"storageBackend": backend})
+    before = titles(client)
+    
+    response = client.post(f"{API_PREFIX}/prompts/bulk", json={"operations": [
+        {"op": "create", "id": "bulk-a", "prompt": prompt("Bulk A")},
+        {"op": "update", "id": "missing", "prompt": prompt("Missing")},
+        {"op": "create", "id": "bulk-b", "prompt": prompt("Bulk B")}
+    ]})
+    assert response.status_code == 409
+    assert not response.json()["applied"]
+    assert [result["status"] for result in response.json()["results"]] == [424, 404, 424]
+    assert titles(client) == before
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_version_mismatch_applies_nothing(make_client, backend):
+    client = make_client({"storageBackend": backend})
+    created = client.post(f"{API_PREFIX}/prompts", json=prompt("Kept"))
+    prompt_id = created.json()["id"]
+    
+    response = client.post(f"{API_PREFIX}/prompts/bulk", json={"operations": [
+        {"op": "create", "id": "bulk-a", "prompt": prompt("Bulk A")},
+        {"op": "update", "id": prompt_id, "prompt": prompt("Changed"), "expected_version": 1000}
+    ]})
+    assert response.status_code == 409
+    assert [result["status"] for result in response.json()["results"]] == [424, 412]
+    assert client.get(f"{API_PREFIX}/prompts/bulk-a").status_code == 404
+    current = client.get(f"{API_PREFIX}/prompts/{prompt_id}")
+    assert current.json()["title"] == "Kept"
+    assert current.headers["ETag"] == created.headers["ETag"]
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_invalid_operation_returns_400(make_client, backend):
+    client = make_client({"storageBackend": backend})
+    before = titles(client)
+    
+    response = client.post(f"{API_PREFIX}/prompts/bulk", json={"operations": [
+        {"op": "create", "id": "bulk-a", "prompt": prompt("Bulk A")},
+        {"op": "rename", "id": "bulk-a"}
+    ]})
+    assert response.status_code == 400
+    assert [result["status"] for result in response.json()["results"]] == [424, 400]
+    assert titles(client) == before
+
+@pytest.mark.parametrize("backend", ["log", "sqlite"])
+def test_rejected_batch_is_not_persisted(make_extension, tmp_path, backend):
+    config = {"storageBackend": backend}
+    storage_dir = str(tmp_path / backend)
+    extension = make_extension(config, storage_dir)
+    outcome = extension.apply_operations([
+        {"op": "create", "id": "bulk-a", "prompt": prompt("Bulk A")},
+        {"op": "delete", "id": "missing"}
+    ])
+    assert not outcome["applied"]
+    extension.shutdown()
+    
+    reopened = make_extension(config, storage_dir)
+    assert reopened.get_prompt("bulk-a") is None
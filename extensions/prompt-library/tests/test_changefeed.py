@@ -0,0 +1,75 @@
+"""Sharing one SQLite library between processes through the change feed"""
+
+import importlib
+
+from conftest import PACKAGE_NAME, load_package
+
+load_package()
+store = importlib.import_module(f"{PACKAGE_NAME}.store")
+
+# Long enough that only explicit syncs apply changes
+CONFIG = {"storageBackend": "sqlite", "changeFeed": True, "changeFeedPollMs": 60000}
+
+def prompt(prompt_id, title):
+    return {
+        "id": prompt_id, "title": title, "content": f"{title} [text]", "description": "",
+        "category": "general", "tags": [], "variables": []
+    }
+
+def replica(path, retention=100000):
+    replica = store.ReplicaPromptStore(store.SQLitePromptStore(path, change_feed=True), retention=retention)
+    replica.open()
+    return replica
+
+def test_replica_catches_up_with_another_writer(tmp_path):
+    path = str(tmp_path / "prompts.db")
+    writer, reader = replica(path), replica(path)
+    try:
+        writer.put_prompt(prompt("a", "First"))
+        writer.put_prompt(prompt("b", "Second"))
+        assert reader.get_prompt("a") is None
+        
+        assert sorted(reader.sync()) == ["a", "b"]
+        assert reader.get_prompt("a")["title"] == "First"
+        
+        writer.put_prompt(prompt("a", "Changed"))
+        writer.delete_prompt("b")
+        assert sorted(reader.sync()) == ["a", "b"]
+        assert reader.get_prompt("a")["title"] == "Changed"
+        assert reader.get_prompt("b") is None
+        assert reader.sync() == []
+    finally:
+        writer.close()
+        reader.close()
+
+def test_replica_reloads_when_feed_was_pruned(tmp_path):
+    path = str(tmp_path / "prompts.db")
+    writer, reader = replica(path, retention=1), replica(path)
+    try:
+        for number in range(5):
+            writer.put_prompt(prompt(f"p{number}", f"Prompt {number}"))
+        # The writer prunes the changes the reader has not seen yet
+        writer.sync()
+        
+        assert reader.sync() is None
+        assert sorted(reader.prompts) == [f"p{number}" for number in range(5)]
+    finally:
+        writer.close()
+        reader.close()
+
+def test_extension_indexes_changes_from_another_process(make_extension, tmp_path):
+    storage_dir = str(tmp_path / "shared")
+    first = make_extension(CONFIG, storage_dir)
+    second = make_extension(CONFIG, storage_dir)
+    
+    prompt_id = first.add_prompt({"title": "Quarterly forecast", "content": "Forecast [quarter]", "description": "", "category": "general", "tags": []})
+    assert second.get_prompt(prompt_id) is None
+    
+    second.sync_changes()
+    assert second.get_prompt(prompt_id)["title"] == "Quarterly forecast"
+    assert [result["id"] for result in second.search_prompts("forecast")] == [prompt_id]
+    
+    first.delete_prompt(prompt_id)
+    second.sync_changes()
+    assert second.get_prompt(prompt_id) is None
+    assert second.search_prompts("forecast") == []
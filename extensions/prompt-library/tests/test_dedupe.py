@@ -0,0 +1,39 @@
+"""Near-duplicate detection on import"""
+
+def prompt(prompt_id, content, **fields):
+    return dict({"title": prompt_id.title(), "content": content, "description": "", "category": "general", "tags": []}, **fields)
+
+def library(**prompts):
+    return {"categories": {"general": {"name": "General", "description": "", "icon": "folder"}}, "prompts": prompts}
+
+def test_duplicates_are_imported_and_reported(make_extension):
+    extension = make_extension({"storageBackend": "memory"})
+    extension.import_prompts(library(a=prompt("a", "Summarize this text")))
+    
+    diff = extension.import_prompts(library(b=prompt("b", "  summarize THIS text ")))
+    assert diff["prompts"]["added"] == 1
+    assert diff["prompts"]["duplicates"] == 1
+    assert diff["duplicates"] == [{"id": "b", "duplicate_of": "a"}]
+    assert extension.get_prompt("b") is not None
+
+def test_skip_duplicates_is_opt_in(make_extension):
+    extension = make_extension({"storageBackend": "memory"})
+    extension.import_prompts(library(a=prompt("a", "Summarize this text")))
+    
+    diff = extension.import_prompts(library(b=prompt("b", "summarize this text")), skip_duplicates=True)
+    assert diff["prompts"]["added"] == 0
+    assert diff["prompts"]["duplicates"] == 1
+    assert extension.get_prompt("b") is None
+
+def test_duplicated_prompt_still_takes_metadata_updates(make_extension):
+    extension = make_extension({"storageBackend": "memory"})
+    extension.import_prompts(library(
+        a=prompt("a", "Summarize this text"),
+        b=prompt("b", "Summarize this text")
+    ))
+    
+    diff = extension.import_prompts(library(b=prompt("b", "Summarize this text", title="Renamed", tags=["new"])), skip_duplicates=True)
+    assert diff["prompts"]["changed"] == 1
+    assert diff["prompts"]["duplicates"] == 0
+    assert extension.get_prompt("b")["title"] == "Renamed"
+    assert extension.get_prompt("b")["tags"] == ["new"]
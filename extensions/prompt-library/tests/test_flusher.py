@@ -0,0 +1,77 @@
+"""Write-behind flushing of pending changes"""
+
+import time
+import importlib
+
+from conftest import PACKAGE_NAME, load_package
+
+load_package()
+flusher = importlib.import_module(f"{PACKAGE_NAME}.flusher")
+WriteBehindFlusher = flusher.WriteBehindFlusher
+
+PROMPT = {"title": "Pending", "content": "Pending [text]", "description": "", "category": "general", "tags": []}
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+def test_shutdown_flushes_pending_changes(make_extension, tmp_path):
+    # Long enough that only the shutdown can flush
+    config = {"storageBackend": "log", "flushIntervalMs": 60000}
+    storage_dir = str(tmp_path / "storage")
+    extension = make_extension(config, storage_dir)
+    prompt_id = extension.add_prompt(dict(PROMPT))
+    assert extension.flusher.stats()["pending"] == 1
+    extension.shutdown()
+    
+    reopened = make_extension(config, storage_dir)
+    assert reopened.get_prompt(prompt_id)["title"] == "Pending"
+
+def test_stop_flushes_pending_changes():
+    commits = []
+    writer = WriteBehindFlusher(commits.append, interval=60.0)
+    writer.start()
+    writer.mark(2)
+    assert commits == []
+    
+    writer.stop()
+    assert commits == [False]
+    assert writer.stats()["flushed_changes"] == 2
+
+def test_max_pending_flushes_before_interval():
+    commits = []
+    writer = WriteBehindFlusher(commits.append, interval=60.0, max_pending=3)
+    writer.start()
+    try:
+        writer.mark()
+        writer.mark()
+        time.sleep(0.05)
+        assert commits == []
+        writer.mark()
+        wait_for(lambda: commits)
+        assert writer.stats()["flushed_changes"] == 3
+    finally:
+        writer.stop()
+
+def test_failed_flush_keeps_changes_pending():
+    failures = [RuntimeError("disk full")]
+    commits = []
+    
+    def flush(durable):
+        if failures:
+            raise failures.pop()
+        commits.append(durable)
+    
+    writer = WriteBehindFlusher(flush, interval=60.0)
+    writer.start()
+    writer.mark(2)
+    writer.flush()
+    assert writer.stats()["errors"] == 1
+    assert writer.stats()["pending"] == 2
+    
+    writer.stop()
+    assert commits == [False]
+    assert writer.stats()["pending"] == 0
+    assert writer.stats()["flushed_changes"] == 2
@@ -0,0 +1,41 @@
+"""Cursor pagination of GET /prompts"""
+
+import json
+import base64
+
+import pytest
+
+from conftest import API_PREFIX
+
+def craft(payload):
+    return base64.urlsafe_b64encode(json.dumps(payload).encode("utf-8")).decode("ascii").rstrip("=")
+
+def test_cursor_pages_through_the_library(make_client):
+    client = make_client({"storageBackend": "memory"})
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 2, "sort": "title"}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get(f"{API_PREFIX}/prompts", params=params)
+        assert response.status_code == 200
+        seen.extend(prompt["id"] for prompt in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert seen and len(seen) == len(set(seen))
+
+@pytest.mark.parametrize("payload", [
+    ["title", False, 5, "prompt-1"],
+    ["title", False, None, "prompt-1"],
+    ["title", False, "a", ["prompt-1"]],
+    [["title"], False, "a", "prompt-1"],
+    ["title", "yes", "a", "prompt-1"],
+    ["title", False, "a"]
+])
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_crafted_cursor_returns_400(make_client, payload, backend):
+    client = make_client({"storageBackend": backend})
+    response = client.get(f"{API_PREFIX}/prompts", params={"cursor": craft(payload)})
+    assert response.status_code == 400
@@ -0,0 +1,49 @@
+"""Access to personal and team libraries"""
+
+from conftest import API_PREFIX
+
+PROMPT = {"title": "Mine", "content": "Summarize [text]", "description": "", "category": "general", "tags": []}
+
+def test_scopes_follow_the_caller_identity(make_client):
+    client = make_client({"storageBackend": "memory"})
+    alice = {"X-User-Id": "alice", "X-User-Teams": "research"}
+    
+    created = client.post(f"{API_PREFIX}/prompts", params={"scope": "user:alice"}, json=PROMPT, headers=alice)
+    assert created.status_code == 200
+    
+    # "user" on its own is the caller's own library
+    own = client.get(f"{API_PREFIX}/prompts", params={"scope": "user"}, headers=alice)
+    assert [prompt["id"] for prompt in own.json()] == [created.json()["id"]]
+    
+    assert client.get(f"{API_PREFIX}/prompts", params={"scope": "team:research"}, headers=alice).status_code == 200
+    assert client.get(f"{API_PREFIX}/prompts", params={"scope": "team:sales"}, headers=alice).status_code == 403
+    
+    bob = {"X-User-Id": "bob"}
+    assert client.get(f"{API_PREFIX}/prompts", params={"scope": "user:alice"}, headers=bob).status_code == 403
+    assert client.delete(f"{API_PREFIX}/prompts/{created.json()['id']}", params={"scope": "user:alice"}, headers=bob).status_code == 403
+    
+    # Scoped requests need an identity; the shared library doesn't
+    assert client.get(f"{API_PREFIX}/prompts", params={"scope": "user:alice"}).status_code == 401
+    assert client.get(f"{API_PREFIX}/prompts").status_code == 200
+
+def test_trusted_scope_access_uses_the_scope_as_given(make_client):
+    client = make_client({"storageBackend": "memory", "scopeAccess": "trusted"})
+    assert client.post(f"{API_PREFIX}/prompts", params={"scope": "user:alice"}, json=PROMPT).status_code == 200
+    assert len(client.get(f"{API_PREFIX}/prompts", params={"scope": "user:alice"}).json()) == 1
+
+def test_malformed_scope_is_rejected(make_client):
+    client = make_client({"storageBackend": "memory"})
+    response = client.get(f"{API_PREFIX}/prompts", params={"scope": "group:x"}, headers={"X-User-Id": "alice"})
+    assert response.status_code == 400
+
+def test_prompt_limit_applies_to_partitions_only(make_client):
+    client = make_client({"storageBackend": "memory", "maxPrompts": 1})
+    alice = {"X-User-Id": "alice"}
+    
+    shared = {"allow_duplicates": "true"}
+    for _ in range(3):
+        assert client.post(f"{API_PREFIX}/prompts", params=shared, json=PROMPT).status_code == 200
+    
+    scoped = {"scope": "user", "allow_duplicates": "true"}
+    assert client.post(f"{API_PREFIX}/prompts", params=scoped, json=PROMPT, headers=alice).status_code == 200
+    assert client.post(f"{API_PREFIX}/prompts", params=scoped, json=PROMPT, headers=alice).status_code == 403
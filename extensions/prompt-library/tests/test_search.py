@@ -0,0 +1,29 @@
+"""Category filters of full-text and similar prompt search"""
+
+import pytest
+
+def add(extension, title, category):
+    return extension.add_prompt({"title": title, "content": f"{title} for the team", "description": "", "category": category, "tags": []})
+
+@pytest.mark.parametrize("backend", ["memory", "log"])
+def test_category_filter_skips_prompts_deleted_meanwhile(make_extension, backend):
+    extension = make_extension({"storageBackend": backend})
+    kept = add(extension, "Quarterly report outline", "general")
+    gone = add(extension, "Quarterly report review", "general")
+    add(extension, "Quarterly report code", "coding")
+    
+    # Deleted behind the indexes' backs, as a concurrent delete would be
+    # between the index lookup and the category check
+    extension.store.delete_prompt(gone)
+    
+    results = extension.search_prompts("quarterly", category="general")
+    assert [prompt["id"] for prompt in results] == [kept]
+
+def test_similar_prompts_filter_by_category(make_extension):
+    pytest.importorskip("numpy")
+    extension = make_extension({"storageBackend": "memory"})
+    general = add(extension, "Quarterly report outline", "general")
+    add(extension, "Quarterly report outline draft", "coding")
+    
+    results = extension.find_similar({"title": "Quarterly report outline", "content": "Quarterly report outline for the team"}, category="general")
+    assert [prompt["id"] for prompt in results] == [general]
@@ -0,0 +1,54 @@
+"""Similar prompt search"""
+
+import os
+import sys
+import subprocess
+
+import pytest
+
+pytest.importorskip("numpy")
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Run in a fresh interpreter, since this one may have imported NumPy already
+SCRIPT = """
+import sys
+sys.path.insert(0, {tests!r})
+from conftest import load_package
+
+package = load_package()
+assert "numpy" not in sys.modules, "imported by the package"
+
+extension = package.PromptLibraryExtension()
+extension.config.update(storageDir={storage!r}, storageBackend="memory")
+extension.initialize()
+extension.wait_until_ready()
+assert "numpy" not in sys.modules, "imported by warm-up"
+assert extension.similarity_index is None
+
+prompt = extension.get_prompts()[0]
+similar = extension.find_similar({{"title": prompt["title"], "content": prompt["content"]}}, limit=1)
+assert similar[0]["id"] == prompt["id"]
+assert "numpy" in sys.modules and extension.similarity_index.built
+extension.shutdown()
+"""
+
+def test_index_is_created_on_first_use(tmp_path):
+    script = SCRIPT.format(tests=TESTS_DIR, storage=str(tmp_path / "storage"))
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+
+def test_warm_up_builds_the_index_when_asked(make_extension):
+    extension = make_extension({"storageBackend": "memory", "similarityWarmup": True})
+    # Ready is reported before the index is built
+    if extension._warmup is not None:
+        extension._warmup.join()
+    assert extension.similarity_index is not None and extension.similarity_index.built
+
+def test_prompts_stored_after_creation_are_found(make_extension):
+    extension = make_extension({"storageBackend": "memory"})
+    first = extension.add_prompt({"title": "Quarterly revenue forecast", "content": "Forecast revenue for [quarter]", "description": "", "category": "general", "tags": []})
+    assert [prompt["id"] for prompt in extension.find_similar(extension.get_prompt(first), limit=1, min_score=0.5)] == []
+    
+    second = extension.add_prompt({"title": "Quarterly revenue forecast", "content": "Forecast revenue for [quarter]", "description": "", "category": "general", "tags": []})
+    assert [prompt["id"] for prompt in extension.find_similar(extension.get_prompt(first), limit=1)] == [second]
@@ -0,0 +1,120 @@
+"""Recovery and compaction of the write-ahead log"""
+
+import os
+import importlib
+
+import pytest
+
+from conftest import PACKAGE_NAME, load_package
+
+load_package()
+storage = importlib.import_module(f"{PACKAGE_NAME}.storage")
+PromptLog = storage.PromptLog
+
+def put(log, number):
+    log.append("put", "prompt", f"p{number}", {"id": f"p{number}", "title": f"Prompt {number}"})
+    log.commit()
+
+def crash(log):
+    """Drop the log without the clean shutdown a crash would skip"""
+    log.sync()
+    log._file.close()
+    log._file = None
+
+def reopen(directory):
+    log = PromptLog(directory, compact_threshold=1)
+    categories, prompts = log.open()
+    return log, prompts
+
+def test_crash_mid_compaction_keeps_rotated_records(tmp_path):
+    log, _ = reopen(str(tmp_path))
+    for number in range(3):
+        put(log, number)
+    # Crash after rotating, before the snapshot is written
+    assert log.rotate()
+    crash(log)
+    
+    log, prompts = reopen(str(tmp_path))
+    assert sorted(prompts) == ["p0", "p1", "p2"]
+    # The leftover rotated records count towards the next compaction
+    assert log._log_records == 3
+    assert log.needs_compaction(len(prompts))
+    
+    # A second crashed compaction must not replace the leftover rotated log
+    put(log, 3)
+    assert log.rotate()
+    crash(log)
+    
+    log, prompts = reopen(str(tmp_path))
+    assert sorted(prompts) == ["p0", "p1", "p2", "p3"]
+    
+    # A finished compaction folds everything into the snapshot
+    put(log, 4)
+    log.compact({}, dict(prompts, p4={"id": "p4"}))
+    assert not os.path.exists(log.rotated_log_path)
+    log.close()
+    
+    log, prompts = reopen(str(tmp_path))
+    assert sorted(prompts) == ["p0", "p1", "p2", "p3", "p4"]
+    log.close()
+
+def test_failed_snapshot_write_keeps_rotated_records(tmp_path, monkeypatch):
+    log, _ = reopen(str(tmp_path))
+    for number in range(3):
+        put(log, number)
+    
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+    
+    assert log.rotate()
+    with monkeypatch.context() as patch:
+        patch.setattr(storage.json, "dump", fail)
+        with pytest.raises(OSError):
+            log.write_snapshot({}, {})
+    assert os.path.exists(log.rotated_log_path)
+    
+    # The next compaction starts, then the process dies before its snapshot
+    put(log, 3)
+    assert log.rotate()
+    crash(log)
+    
+    log, prompts = reopen(str(tmp_path))
+    assert sorted(prompts) == ["p0", "p1", "p2", "p3"]
+    log.close()
+
+def test_torn_tail_is_truncated(tmp_path):
+    log, _ = reopen(str(tmp_path))
+    for number in range(3):
+        put(log, number)
+    crash(log)
+    with open(log.log_path, "ab") as f:
+        f.write(b'0badc0de {"op":"put"')
+    
+    log, prompts = reopen(str(tmp_path))
+    assert sorted(prompts) == ["p0", "p1", "p2"]
+    # Records appended after the truncation are replayed
+    put(log, 3)
+    log.close()
+    
+    log, prompts = reopen(str(tmp_path))
+    assert sorted(prompts) == ["p0", "p1", "p2", "p3"]
+    log.close()
+
+def test_torn_rotated_tail_is_cut_before_appending(tmp_path):
+    log, _ = reopen(str(tmp_path))
+    for number in range(2):
+        put(log, number)
+    assert log.rotate()
+    crash(log)
+    with open(log.rotated_log_path, "ab") as f:
+        f.write(b"torn")
+    
+    log, prompts = reopen(str(tmp_path))
+    assert sorted(prompts) == ["p0", "p1"]
+    put(log, 2)
+    assert log.rotate()
+    crash(log)
+    
+    log, prompts = reopen(str(tmp_path))
+    assert sorted(prompts) == ["p0", "p1", "p2"]
+    log.close()
@@ -0,0 +1,61 @@
+"""Prompt count kept by the SQLite store"""
+
+import importlib
+
+import pytest
+
+from conftest import PACKAGE_NAME, load_package
+
+load_package()
+store_module = importlib.import_module(f"{PACKAGE_NAME}.store")
+SQLitePromptStore = store_module.SQLitePromptStore
+BatchRejected = store_module.BatchRejected
+
+def prompt(prompt_id):
+    now = "2024-01-01T00:00:00"
+    return {"id": prompt_id, "title": prompt_id, "category": "general", "created_at": now, "updated_at": now}
+
+@pytest.fixture
+def store(tmp_path):
+    store = SQLitePromptStore(str(tmp_path / "prompts.db"))
+    store.open()
+    yield store
+    store.close()
+
+def test_count_follows_writes(store):
+    assert store.count_prompts() == 0
+    store.put_prompt(prompt("a"))
+    store.put_prompt(prompt("b"))
+    store.put_prompt(prompt("a"))
+    assert store.count_prompts() == 2
+    
+    assert store.delete_prompt("a")
+    assert not store.delete_prompt("a")
+    store.commit()
+    assert store.count_prompts() == 1
+    
+    store.write_batch([("put", "c", prompt("c"), None), ("put", "b", prompt("b"), None), ("delete", "b", None, None)])
+    assert store.count_prompts() == 1
+    assert store.count_prompts() == len(store.prompts)
+
+def test_rejected_batch_keeps_count(store):
+    store.put_prompt(prompt("a"))
+    assert store.count_prompts() == 1
+    with pytest.raises(BatchRejected):
+        store.write_batch([("put", "b", prompt("b"), None), ("put", "a", prompt("a"), 5)])
+    assert store.count_prompts() == 1
+
+def test_count_sees_other_process_writes(store, tmp_path):
+    store.put_prompt(prompt("a"))
+    store.commit()
+    assert store.count_prompts() == 1
+    
+    other = SQLitePromptStore(str(tmp_path / "prompts.db"))
+    other.open()
+    try:
+        other.put_prompt(prompt("b"))
+        other.put_prompt(prompt("c"))
+        other.commit()
+    finally:
+        other.close()
+    assert store.count_prompts() == 3
@@ -0,0 +1,93 @@
+"""Prompt usage recording and rankings"""
+
+import time
+import threading
+import importlib
+
+import pytest
+
+from conftest import API_PREFIX, PACKAGE_NAME, load_package
+
+load_package()
+usage = importlib.import_module(f"{PACKAGE_NAME}.usage")
+
+PROMPT = {"title": "Review", "content": "Review [code]", "description": "", "category": "general", "tags": []}
+
+def test_use_checks_the_store_off_the_event_loop(make_client, package, monkeypatch):
+    client = make_client({"storageBackend": "sqlite"})
+    extension = package._extension_instance
+    prompt_id = client.post(f"{API_PREFIX}/prompts", json=PROMPT).json()["id"]
+    
+    threads = {}
+    has_prompt, record_usage = extension.has_prompt, extension.record_usage
+    
+    def checked(prompt_id):
+        threads["check"] = threading.current_thread()
+        return has_prompt(prompt_id)
+    
+    def recorded(prompt_id):
+        threads["record"] = threading.current_thread()
+        record_usage(prompt_id)
+    
+    monkeypatch.setattr(extension, "has_prompt", checked)
+    monkeypatch.setattr(extension, "record_usage", recorded)
+    
+    assert client.post(f"{API_PREFIX}/prompts/{prompt_id}/use").status_code == 204
+    assert threads["check"] is not threads["record"]
+    assert client.post(f"{API_PREFIX}/prompts/missing/use").status_code == 404
+    
+    usage = client.get(f"{API_PREFIX}/usage").json()
+    assert [(item["id"], item["use_count"]) for item in usage] == [(prompt_id, 1)]
+
+def tracker(path, half_life=3600.0, exists=None):
+    tracker = usage.UsageTracker(path, half_life=half_life, exists=exists)
+    tracker.load()
+    return tracker
+
+def test_flush_only_checks_prompts_used_since_the_last_flush(tmp_path):
+    path = str(tmp_path / "usage.json")
+    checked = []
+    live = {"a", "b", "c"}
+    
+    def exists(prompt_id):
+        checked.append(prompt_id)
+        return prompt_id in live
+    
+    first = tracker(path, exists=exists)
+    for prompt_id in ("a", "b", "c"):
+        first.record(prompt_id)
+    first.flush()
+    
+    checked.clear()
+    live.discard("b")
+    first.forget("b")
+    live.discard("c")
+    first.record("a")
+    first.record("c")
+    first.flush()
+    assert sorted(checked) == ["a", "c"]
+    assert first.get("a")["use_count"] == 2
+    assert first.get("b") is None and first.get("c") is None
+    
+    # Deleted prompts are gone from the file too
+    assert sorted(tracker(path)._entries) == ["a"]
+
+def test_changed_half_life_resets_scores(tmp_path):
+    path = str(tmp_path / "usage.json")
+    now = time.time()
+    first = tracker(path, half_life=3600.0)
+    for hours in (3, 2, 1):
+        first.record("a", when=now - hours * 3600)
+    first.flush()
+    
+    second = tracker(path, half_life=7200.0)
+    entry = second.get("a")
+    assert entry["use_count"] == 3
+    assert entry["score"] == pytest.approx(0.5 ** 0.5, rel=1e-3)
+    
+    # Saved at the new rate, the scores then carry over as they are
+    second.record("a", when=now)
+    second.flush()
+    third = tracker(path, half_life=7200.0)
+    assert third.get("a")["use_count"] == 4
+    assert third.get("a")["score"] == pytest.approx(1 + 0.5 ** 0.5, rel=1e-3)
@@ -0,0 +1,40 @@
+"""Optimistic prompt versioning through If-Match"""
+
+import pytest
+
+from conftest import API_PREFIX
+
+PROMPT = {"title": "Review", "content": "Review [code]", "description": "", "category": "general", "tags": []}
+
+@pytest.mark.parametrize("backend", ["memory", "log", "sqlite"])
+def test_stale_if_match_returns_412_with_current_etag(make_client, backend):
+    client = make_client({"storageBackend": backend})
+    created = client.post(f"{API_PREFIX}/prompts", json=PROMPT)
+    prompt_id = created.json()["id"]
+    first = created.headers["ETag"]
+    
+    updated = client.put(f"{API_PREFIX}/prompts/{prompt_id}", json=dict(PROMPT, title="First"), headers={"If-Match": first})
+    assert updated.status_code == 200
+    second = updated.headers["ETag"]
+    assert second != first
+    
+    # A writer still holding the first version loses
+    stale = client.put(f"{API_PREFIX}/prompts/{prompt_id}", json=dict(PROMPT, title="Second"), headers={"If-Match": first})
+    assert stale.status_code == 412
+    assert stale.headers["ETag"] == second
+    assert client.get(f"{API_PREFIX}/prompts/{prompt_id}").json()["title"] == "First"
+
+def test_update_without_if_match_applies(make_client):
+    client = make_client({"storageBackend": "memory"})
+    prompt_id = client.post(f"{API_PREFIX}/prompts", json=PROMPT).json()["id"]
+    
+    response = client.put(f"{API_PREFIX}/prompts/{prompt_id}", json=dict(PROMPT, title="Changed"))
+    assert response.status_code == 200
+    assert client.get(f"{API_PREFIX}/prompts/{prompt_id}").headers["ETag"] == response.headers["ETag"]
+
+def test_malformed_if_match_returns_412(make_client):
+    client = make_client({"storageBackend": "memory"})
+    prompt_id = client.post(f"{API_PREFIX}/prompts", json=PROMPT).json()["id"]
+    
+    response = client.put(f"{API_PREFIX}/prompts/{prompt_id}", json=PROMPT, headers={"If-Match": '"not-a-version"'})
+    assert response.status_code == 412
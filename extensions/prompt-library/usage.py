@@ -0,0 +1,386 @@
+"""
+Prompt usage tracking for the Prompt Library extension
+
+Recording a use only appends an event to a deque, which needs no lock, so
+it can be called on every insertion into a chat. Events are aggregated into
+per-prompt counters when rankings are read and by a background thread,
+which also merges them into usage.json in the storage directory.
+
+Each prompt has a use count, the time it was last used and a score that
+decays exponentially with usageHalfLifeHours. The score is kept as the log
+of sum(exp(rate * t)) over its uses, so scores never need to be decayed in
+place: every prompt decays at the same rate, and the ranking only changes
+when a prompt is used. Rankings are sorted lists updated per used prompt,
+so the top entries are read off the front instead of sorting the library.
+
+A log-sum-exp score cannot be converted to another rate without the times
+of its uses, so when usageHalfLifeHours changes the saved scores are reset:
+each prompt's score restarts as a single use at its last use, while its use
+count and last use are kept. Workers sharing a storage directory must use the
+same half-life.
+"""
+
+import os
+import json
+import math
+import time
+import logging
+import threading
+from bisect import bisect_left, insort
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional, Any, Callable, Set, Tuple
+
+# Setup logging
+logger = logging.getLogger("prompt_library.usage")
+
+USAGE_FILE = "usage.json"
+
+# Rankings and the entry field each one orders by, highest first
+RANKINGS = {"score": 2, "count": 0, "recent": 1}
+
+def _log_add(a: float, b: float) -> float:
+    """Compute log(exp(a) + exp(b)) without overflow"""
+    if a < b:
+        a, b = b, a
+    return a + math.log1p(math.exp(b - a)) if b > -math.inf else a
+
+def format_time(timestamp: float) -> str:
+    """Format epoch seconds the way the extension writes timestamps"""
+    return datetime.utcfromtimestamp(timestamp).isoformat() + "Z"
+
+class UsageTracker:
+    """Buffered per-prompt usage counters with maintained rankings"""
+    
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        half_life: float = 7 * 24 * 3600,
+        flush_interval: float = 5.0,
+        exists: Optional[Callable[[str], bool]] = None
+    ):
+        """
+        Initialize the tracker
+        
+        Args:
+            path (Optional[str]): File usage is persisted to; None keeps it in memory only
+            half_life (float): Seconds after which a use counts half as much
+            flush_interval (float): Seconds between background flushes
+            exists (Optional[Callable[[str], bool]]): Tells whether a prompt still
+                exists; checked when flushing for the prompts used since the
+                last flush, whose uses are dropped if it was deleted
+        """
+        self.path = path
+        self.half_life = half_life
+        self.rate = math.log(2) / half_life
+        self.flush_interval = flush_interval
+        self.exists = exists
+        
+        # Appended to without a lock; drained under it
+        self._events: "deque[Tuple[str, float]]" = deque()
+        
+        # prompt ID -> [count, last used, log score]
+        self._entries: Dict[str, List[float]] = {}
+        # Aggregated uses not yet merged into the file, in the same form
+        self._deltas: Dict[str, List[float]] = {}
+        # Prompts forgotten since the last flush, to drop from the file
+        self._deleted: Set[str] = set()
+        # Ranking -> sorted (-value, prompt ID) keys
+        self._rankings: Dict[str, List[Tuple[float, str]]] = {name: [] for name in RANKINGS}
+        
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        
+        # Revision of the usage file this tracker last read or wrote
+        self._revision = 0
+        
+        self.flushes = 0
+        self.last_flush_ms = 0.0
+    
+    def record(self, prompt_id: str, when: Optional[float] = None) -> None:
+        """
+        Record one use of a prompt
+        
+        Args:
+            prompt_id (str): Prompt ID
+            when (Optional[float]): Epoch seconds of the use; defaults to now
+        """
+        self._events.append((prompt_id, time.time() if when is None else when))
+    
+    def forget(self, prompt_id: str) -> None:
+        """
+        Drop the usage of a deleted prompt
+        
+        Args:
+            prompt_id (str): Prompt ID
+        """
+        with self._lock:
+            self._deleted.add(prompt_id)
+            self._deltas.pop(prompt_id, None)
+            entry = self._entries.pop(prompt_id, None)
+            if entry is not None:
+                self._unrank(prompt_id, entry)
+    
+    def _drain(self) -> None:
+        """Aggregate buffered events into the counters and rankings"""
+        if not self._events:
+            return
+        
+        # Aggregate outside the lock, then apply one update per prompt
+        uses: Dict[str, List[float]] = {}
+        events = self._events
+        while True:
+            try:
+                prompt_id, when = events.popleft()
+            except IndexError:
+                break
+            entry = uses.get(prompt_id)
+            if entry is None:
+                uses[prompt_id] = [1, when, self.rate * when]
+            else:
+                entry[0] += 1
+                entry[1] = max(entry[1], when)
+                entry[2] = _log_add(entry[2], self.rate * when)
+        
+        with self._lock:
+            for prompt_id, use in uses.items():
+                self._merge(self._deltas, prompt_id, use)
+                previous = self._entries.get(prompt_id)
+                if previous is not None:
+                    self._unrank(prompt_id, previous)
+                self._rank(prompt_id, self._merge(self._entries, prompt_id, use))
+    
+    @staticmethod
+    def _merge(entries: Dict[str, List[float]], prompt_id: str, use: List[float]) -> List[float]:
+        """Add aggregated uses to an entry, creating it if needed"""
+        entry = entries.get(prompt_id)
+        if entry is None:
+            entry = entries[prompt_id] = list(use)
+        else:
+            entry[0] += use[0]
+            entry[1] = max(entry[1], use[1])
+            entry[2] = _log_add(entry[2], use[2])
+        return entry
+    
+    def _rank(self, prompt_id: str, entry: List[float]) -> None:
+        """Insert an entry into every ranking; the caller holds the lock"""
+        for name, field in RANKINGS.items():
+            insort(self._rankings[name], (-entry[field], prompt_id))
+    
+    def _unrank(self, prompt_id: str, entry: List[float]) -> None:
+        """Remove an entry from every ranking; the caller holds the lock"""
+        for name, field in RANKINGS.items():
+            ranking = self._rankings[name]
+            position = bisect_left(ranking, (-entry[field], prompt_id))
+            if position < len(ranking) and ranking[position][1] == prompt_id:
+                del ranking[position]
+    
+    def _describe(self, entry: List[float], now: float) -> Dict[str, Any]:
+        """Format an entry for callers"""
+        return {
+            "use_count": int(entry[0]),
+            "last_used": format_time(entry[1]),
+            "score": round(math.exp(entry[2] - self.rate * now), 6)
+        }
+    
+    def top(self, limit: int = 10, sort: str = "score", predicate: Optional[Callable[[str], bool]] = None) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        Get the most used prompts
+        
+        Args:
+            limit (int): Maximum number of prompts
+            sort (str): "score" (decayed frequency), "count" (all-time uses)
+                or "recent" (last used)
+            predicate (Optional[Callable[[str], bool]]): Only include prompt IDs
+                it accepts, such as ones that still exist
+        
+        Returns:
+            List[Tuple[str, Dict[str, Any]]]: (prompt ID, usage) pairs, best
+                first, with "use_count", "last_used" and the current "score"
+        
+        Raises:
+            ValueError: If sort is not a known ranking
+        """
+        if sort not in RANKINGS:
+            raise ValueError(f"Unknown usage ranking: {sort}")
+        self._drain()
+        
+        now = time.time()
+        results = []
+        with self._lock:
+            for _, prompt_id in self._rankings[sort]:
+                if predicate is not None and not predicate(prompt_id):
+                    continue
+                results.append((prompt_id, self._describe(self._entries[prompt_id], now)))
+                if len(results) >= limit:
+                    break
+        return results
+    
+    def get(self, prompt_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the usage of one prompt
+        
+        Args:
+            prompt_id (str): Prompt ID
+        
+        Returns:
+            Optional[Dict[str, Any]]: Usage as top() reports it, or None if never used
+        """
+        self._drain()
+        with self._lock:
+            entry = self._entries.get(prompt_id)
+            return self._describe(entry, time.time()) if entry is not None else None
+    
+    def load(self) -> None:
+        """Read persisted usage, replacing the in-memory counters"""
+        entries, revision = self._read() if self.path else ({}, 0)
+        with self._lock:
+            self._revision = revision
+            self._adopt(entries)
+    
+    def _adopt(self, entries: Dict[str, List[float]]) -> None:
+        """Replace the counters and rankings; the caller holds the lock"""
+        self._entries = entries
+        for prompt_id, use in self._deltas.items():
+            self._merge(self._entries, prompt_id, use)
+        self._rankings = {
+            name: sorted((-entry[field], prompt_id) for prompt_id, entry in self._entries.items())
+            for name, field in RANKINGS.items()
+        }
+    
+    def _read(self) -> Tuple[Dict[str, List[float]], int]:
+        """Read the usage file and its revision"""
+        if not os.path.exists(self.path):
+            return {}, 0
+        with open(self.path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        
+        entries = {prompt_id: list(entry) for prompt_id, entry in data.get("prompts", {}).items()}
+        # Scores saved at another rate can't be converted, so they restart
+        # as one use at the last use
+        if data.get("rate", self.rate) != self.rate:
+            for entry in entries.values():
+                entry[2] = self.rate * entry[1]
+        return entries, data.get("revision", 0)
+    
+    def flush(self) -> None:
+        """Aggregate buffered uses and merge them into the usage file"""
+        with self._flush_lock:
+            start = time.perf_counter()
+            self._drain()
+            with self._lock:
+                deltas, self._deltas = self._deltas, {}
+                deleted, self._deleted = self._deleted, set()
+            if not self.path or not (deltas or deleted):
+                return
+            
+            # Only the prompts used since the last flush are checked, before
+            # taking the file lock; forget() reports the other deletions
+            if self.exists is not None:
+                for prompt_id in [prompt_id for prompt_id in deltas if not self.exists(prompt_id)]:
+                    del deltas[prompt_id]
+                    deleted.add(prompt_id)
+            
+            try:
+                entries, shared = self._merge_file(deltas, deleted)
+            except Exception as e:
+                # Keep the uses and deletions, so the next flush retries them
+                with self._lock:
+                    for prompt_id, use in deltas.items():
+                        if prompt_id not in self._deleted:
+                            self._merge(self._deltas, prompt_id, use)
+                    self._deleted |= deleted
+                logger.error(f"Error saving prompt usage: {e}")
+                return
+            
+            with self._lock:
+                if shared:
+                    # The file also holds other processes' uses
+                    self._adopt(entries)
+                else:
+                    for prompt_id in deleted:
+                        entry = self._entries.pop(prompt_id, None)
+                        if entry is not None:
+                            self._unrank(prompt_id, entry)
+            self.flushes += 1
+            self.last_flush_ms = (time.perf_counter() - start) * 1000
+    
+    def _merge_file(self, deltas: Dict[str, List[float]], deleted: Set[str]) -> Tuple[Dict[str, List[float]], bool]:
+        """
+        Add uses to the usage file and drop deleted prompts, under an exclusive lock
+        
+        Args:
+            deltas (Dict[str, List[float]]): Aggregated uses to add
+            deleted (Set[str]): Deleted prompts to drop
+        
+        Returns:
+            Tuple[Dict[str, List[float]], bool]: The merged contents, and
+                whether another process wrote the file since this tracker
+                last did
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path + ".lock", "a") as lock_file:
+            try:
+                import fcntl
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            except ImportError:
+                # Without fcntl, processes sharing the file may lose each other's updates
+                pass
+            
+            entries, revision = self._read()
+            for prompt_id in deleted:
+                entries.pop(prompt_id, None)
+            for prompt_id, use in deltas.items():
+                self._merge(entries, prompt_id, use)
+            
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"revision": revision + 1, "rate": self.rate, "prompts": entries}, f, separators=(",", ":"))
+            os.replace(tmp_path, self.path)
+        
+        shared = revision != self._revision
+        self._revision = revision + 1
+        return entries, shared
+    
+    def start(self) -> None:
+        """Start flushing in a daemon thread"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="prompt-library-usage", daemon=True)
+        self._thread.start()
+    
+    def stop(self) -> None:
+        """Stop the thread and flush buffered uses"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
+    
+    def _run(self) -> None:
+        """Flush until stopped"""
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing prompt usage: {e}")
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the buffer depth and flush statistics
+        
+        Returns:
+            Dict[str, Any]: Buffered events, tracked prompts, uses not yet
+                saved, flushes and the last flush time in ms
+        """
+        with self._lock:
+            return {
+                "buffered": len(self._events),
+                "prompts": len(self._entries),
+                "unsaved_prompts": len(self._deltas),
+                "flushes": self.flushes,
+                "last_flush_ms": round(self.last_flush_ms, 3)
+            }
@@ -0,0 +1,82 @@
+"""
+Lightweight record validation for the Prompt Library extension
+
+Used where records arrive outside a pydantic request model, such as
+streamed imports, so each record can be checked and reported on its own.
+The extension also checks every prompt it writes, so list responses can
+serialize stored prompts without validating them again.
+"""
+
+from typing import Dict, Any
+
+PROMPT_REQUIRED_FIELDS = ("title", "content", "description", "category")
+CATEGORY_REQUIRED_FIELDS = ("name",)
+
+def _require_strings(record: Dict[str, Any], fields: tuple) -> None:
+    """Check that the given fields are present and are strings"""
+    for field in fields:
+        value = record.get(field)
+        if not isinstance(value, str):
+            raise ValueError(f"'{field}' must be a string")
+
+def validate_prompt(record: Any) -> Dict[str, Any]:
+    """
+    Validate and normalize a prompt record
+    
+    Args:
+        record (Any): Decoded prompt data
+    
+    Returns:
+        Dict[str, Any]: Normalized prompt dictionary
+    
+    Raises:
+        ValueError: If the record is not a valid prompt
+    """
+    if not isinstance(record, dict):
+        raise ValueError("prompt must be an object")
+    _require_strings(record, ("id",) + PROMPT_REQUIRED_FIELDS)
+    
+    tags = record.get("tags", [])
+    if not isinstance(tags, list) or not all(isinstance(tag, str) for tag in tags):
+        raise ValueError("'tags' must be a list of strings")
+    
+    variables = record.get("variables", [])
+    if not isinstance(variables, list) or not all(
+        isinstance(variable, dict) and isinstance(variable.get("name"), str) for variable in variables
+    ):
+        raise ValueError("'variables' must be a list of objects with a 'name'")
+    
+    prompt = {field: record[field] for field in ("id",) + PROMPT_REQUIRED_FIELDS}
+    prompt["tags"] = tags
+    if variables:
+        prompt["variables"] = variables
+    for field in ("created_at", "updated_at"):
+        value = record.get(field)
+        if value is not None and not isinstance(value, str):
+            raise ValueError(f"'{field}' must be a string")
+        prompt[field] = value
+    return prompt
+
+def validate_category(record: Any) -> Dict[str, Any]:
+    """
+    Validate and normalize a category record
+    
+    Args:
+        record (Any): Decoded category data
+    
+    Returns:
+        Dict[str, Any]: Normalized category dictionary
+    
+    Raises:
+        ValueError: If the record is not a valid category
+    """
+    if not isinstance(record, dict):
+        raise ValueError("category must be an object")
+    _require_strings(record, ("id",) + CATEGORY_REQUIRED_FIELDS)
+    
+    return {
+        "id": record["id"],
+        "name": record["name"],
+        "description": record.get("description") if isinstance(record.get("description"), str) else "",
+        "icon": record.get("icon") if isinstance(record.get("icon"), str) else "folder"
+    }